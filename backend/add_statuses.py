@@ -9,7 +9,7 @@ from backend.app import create_app
 from backend.app.models.masters.master_definitions import StatusMaster
 
 def add_statuses():
-    app = create_app()
+    app = create_app(register_blueprints=False)
     with app.app_context():
         statuses = [
             {'name': '問い合わせ', 'description': '利用前の見込み客や問い合わせ段階', 'sort_order': 1},
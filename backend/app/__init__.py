@@ -1,11 +1,16 @@
+import os
+
 from flask import Flask
 #  修正点: 'from config' を 'from backend.config' に修正
 from backend.config import Config
 #  修正点: '.extensions' を 'backend.app.extensions' に修正
 from backend.app.extensions import db, bcrypt, migrate, jwt, cors
 
-def create_app(config_class=Config): # ★ 引数名を変更し、クラスを受け取れるようにする
-    """アプリケーションファクトリ関数"""
+def create_app(config_class=Config, register_blueprints=True): # ★ 引数名を変更し、クラスを受け取れるようにする
+    """
+    アプリケーションファクトリ関数。
+    DBだけを扱うスクリプトは register_blueprints=False にすると、APIとそれが使う依存ライブラリを読み込まずに起動できる。
+    """
     app = Flask(__name__)
     
     # 渡された設定クラス（本番ならConfig、テストならTestConfig）を適用
@@ -16,7 +21,9 @@ def create_app(config_class=Config): # ★ 引数名を変更し、クラスを
     # --- 1. 拡張機能の初期化 ---
     db.init_app(app)
     bcrypt.init_app(app)
-    migrate.init_app(app, db)
+    # マイグレーション（alembic）は flask コマンド（flask db ...）から起動したときだけ読み込む
+    if os.environ.get('FLASK_RUN_FROM_CLI') == 'true':
+        migrate.init_app(app, db)
     jwt.init_app(app) # ★追加
     # cors.init_app(app, supports_credentials=True) # ★追加 (Cookie連携を許可)
 
@@ -25,10 +32,23 @@ def create_app(config_class=Config): # ★ 引数名を変更し、クラスを
         #  修正点: '.models' を 'backend.app.models' に修正
         from backend.app import models    
         # --- 3. ブループリント（APIルート）の登録 ---
-        from backend.app.api import ALL_BLUEPRINTS # ★ALL_BLUEPRINTSだけをインポート
-        
-        for bp in ALL_BLUEPRINTS:
-            app.register_blueprint(bp) 
+        if register_blueprints:
+            from backend.app.api import ALL_BLUEPRINTS # ★ALL_BLUEPRINTSだけをインポート
+
+            for bp in ALL_BLUEPRINTS:
+                app.register_blueprint(bp)
+
+    # --- 4. リクエスト単位のSQL計測 ---
+    from backend.app.services.query_profiler_service import QueryProfiler
+    QueryProfiler.init_app(app)
+
+    # --- 5. リードレプリカへの読み取りの振り分け ---
+    from backend.app.services.db_router_service import DatabaseRouter
+    DatabaseRouter.init_app(app)
+
+    # --- 6. 利用者×月の活動集計の自動更新 ---
+    from backend.app.services.monthly_activity_service import MonthlyActivityRollup
+    MonthlyActivityRollup.init_app(app)
 
     from backend.app.utils.errors import AppError
     from flask import jsonify
@@ -23,6 +23,9 @@ from .dashboard_staff import dashboard_staff_bp
 from .export import export_bp
 from .support_records import bp as support_records_bp
 from .activities import activities_bp
+from .debug import debug_bp
+from .audit_logs import audit_logs_bp
+from .billing import billing_bp
 
 # すべてのブループリントをリストに集約し、外部に公開する。
 ALL_BLUEPRINTS = [
@@ -46,5 +49,8 @@ ALL_BLUEPRINTS = [
     export_bp,
     support_records_bp,
     activities_bp,
+    debug_bp,
+    audit_logs_bp,
+    billing_bp,
 ]
 
\ No newline at end of file
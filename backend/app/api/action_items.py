@@ -7,8 +7,8 @@ from backend.app.models import (
     User, SupportPlan, UserDailyLog, CaseConferenceLog, StatusMaster,
     UserScheduleTemplate, UserDailySchedule, UserScheduleRequest, SupportRecord
 )
+from backend.app.services.master_data_service import MasterDataCache
 from backend.app.utils.timezone import get_jst_today
-from sqlalchemy import func
 
 action_items_bp = Blueprint('action_items', __name__, url_prefix='/api/action-items')
 
@@ -28,7 +28,7 @@ def get_action_items():
     from datetime import timedelta
     start_date_limit = today - timedelta(days=30)
     attendances = AttendanceRecord.query.filter_by(record_type='CHECK_IN').filter(
-        func.date(AttendanceRecord.timestamp) >= start_date_limit
+        AttendanceRecord.attendance_date >= start_date_limit
     ).all()
     
     # user_id + date (att_date) でユニーク化する
@@ -37,7 +37,7 @@ def get_action_items():
     for att in attendances:
         if not att.user_id or not att.timestamp:
             continue
-        att_date = att.timestamp.date()
+        att_date = att.attendance_date
         key = (att.user_id, att_date)
         if key not in unique_attendances:
             unique_attendances[key] = att
@@ -53,7 +53,7 @@ def get_action_items():
             user_id=user_id, 
             record_type='CHECK_OUT'
         ).filter(
-            func.date(AttendanceRecord.timestamp) == att_date
+            AttendanceRecord.attendance_date == att_date
         ).first()
         
         check_out_at = check_out.timestamp.isoformat() if check_out else None
@@ -110,8 +110,7 @@ def get_action_items():
     # 3. 未作成計画 (利用中だがACTIVEな計画がない)
     # TODO: replace hardcoded status_id with UserStatusMaster code lookup
     # 暫定で status.name = '利用中' のマスターIDを使用し、なければデフォルト 2 とする
-    active_status = StatusMaster.query.filter_by(name='利用中').first()
-    active_status_id = active_status.id if active_status else 2
+    active_status_id = MasterDataCache.get_instance().id_for(StatusMaster, '利用中') or 2
     
     users = User.query.filter(User.status_id == active_status_id, User.deleted_at.is_(None)).all()
     for user in users:
@@ -271,7 +270,7 @@ def get_action_items():
             user_id=sched.user_id,
             record_type='CHECK_IN'
         ).filter(
-            func.date(AttendanceRecord.timestamp) == sched.date
+            AttendanceRecord.attendance_date == sched.date
         ).first()
         
         if not att:
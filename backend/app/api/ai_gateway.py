@@ -24,7 +24,9 @@ def test_ai_gateway():
         response_text = AIGatewayService.generate_text(
             prompt=prompt,
             use_pro=use_pro,
-            system_instruction=system_instruction
+            system_instruction=system_instruction,
+            # 任意入力のため個人情報を含み得る。ディスクキャッシュには残さない
+            contains_pii=True
         )
         return jsonify({
             "success": True,
@@ -42,3 +44,15 @@ def test_ai_gateway():
             "success": False,
             "error": "サーバー内部でエラーが発生しました"
         }), 500
+
+
+@ai_gateway_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+def get_ai_gateway_metrics():
+    """
+    AIゲートウェイの呼び出しメトリクス（レイテンシ・トークン数・キャッシュ命中率など）を返す。
+    """
+    return jsonify({
+        "success": True,
+        "metrics": AIGatewayService.get_metrics()
+    }), 200
@@ -1,6 +1,6 @@
 # backend/app/api/attendance.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime, date
 from zoneinfo import ZoneInfo
@@ -365,6 +365,40 @@ def clock_out(timecard_id):
         "check_out": timecard.check_out.replace(tzinfo=ZoneInfo("Asia/Tokyo")).isoformat()
     }), 200
 
+@attendance_bp.route('/punches/batch', methods=['POST'])
+@jwt_required()
+@handle_attendance_errors
+def record_punch_batch():
+    identity = get_jwt_identity()
+    requester_id = extract_staff_id(identity)
+    claims = get_jwt()
+    scope = resolve_tenant_scope(requester_id, claims.get('role_scopes', []))
+
+    data = request.get_json() or {}
+    office_id = data.get('office_id')
+    if not office_id:
+        return jsonify({"msg": "office_id is required"}), 400
+    punches = data.get('punches')
+    if not isinstance(punches, list) or not punches:
+        return jsonify({"msg": "punches must be a non-empty list"}), 400
+    max_entries = current_app.config.get('KIOSK_BATCH_MAX_ENTRIES', 500)
+    if len(punches) > max_entries:
+        return jsonify({"msg": f"Too many punches (max {max_entries})"}), 400
+
+    svc = AttendanceService(db.session)
+    results = svc.record_punch_batch(
+        office_id, punches, scope, requester_id,
+        max_backlog_hours=current_app.config.get('KIOSK_BACKLOG_MAX_HOURS', 72),
+        clock_skew_seconds=current_app.config.get('KIOSK_CLOCK_SKEW_SECONDS', 300),
+    )
+    db.session.commit()
+    return jsonify({
+        "accepted": sum(1 for r in results if r["status"] == 'ok'),
+        "duplicates": sum(1 for r in results if r["status"] == 'duplicate'),
+        "rejected": sum(1 for r in results if r["status"] == 'error'),
+        "results": results,
+    }), 200
+
 @attendance_bp.route('/timecards', methods=['GET'])
 @jwt_required()
 @handle_attendance_errors
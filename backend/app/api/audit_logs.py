@@ -0,0 +1,60 @@
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from backend.app.models import Supporter
+from backend.app.services.audit_archive_service import AuditArchiveService
+from backend.app.services.core_service import check_permission, parse_jwt_identity
+from backend.app.utils.errors import ValidationError
+
+audit_logs_bp = Blueprint('audit_logs', __name__, url_prefix='/api/audit-logs')
+
+
+def _parse_datetime(name):
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw)
+    except ValueError:
+        raise ValidationError(f"{name} は ISO 8601 形式（YYYY-MM-DD または YYYY-MM-DDTHH:MM:SS）で指定してください")
+
+
+@audit_logs_bp.route('/search', methods=['GET'])
+@jwt_required()
+def search_audit_logs():
+    """
+    監査ログ検索（操作者・対象・操作種別・期間）。運用中のテーブルとアーカイブ済みの月を横断し、新しい順に返す。
+    続きは next_cursor を cursor に指定して取得する。権限 'VIEW_AUDIT_LOG' が必要。
+    """
+    if not check_permission(get_jwt_identity(), 'VIEW_AUDIT_LOG'):
+        return jsonify({"msg": "Permission denied: Missing 'VIEW_AUDIT_LOG' permission"}), 403
+
+    result = AuditArchiveService.search(
+        actor_supporter_id=request.args.get('actor_supporter_id', type=int),
+        entity_type=request.args.get('entity_type') or None,
+        entity_id=request.args.get('entity_id', type=int),
+        action=request.args.get('action') or None,
+        start=_parse_datetime('from'),
+        end=_parse_datetime('to'),
+        limit=request.args.get('limit', 50, type=int),
+        cursor=request.args.get('cursor') or None,
+    )
+    return jsonify({"success": True, **result}), 200
+
+
+@audit_logs_bp.route('/compact', methods=['POST'])
+@jwt_required()
+def compact_audit_logs():
+    """
+    保持期間を過ぎた月の監査ログ・システムログをアーカイブへ移す（システム管理者のみ。定期実行を想定）。
+    """
+    _, staff_id = parse_jwt_identity(get_jwt_identity())
+    current = Supporter.query.get(staff_id) if staff_id else None
+    if not current or not any(r.role_scope == 'SYSTEM' and r.is_admin for r in current.roles):
+        return jsonify({"msg": "監査ログのアーカイブを実行する権限がありません。"}), 403
+
+    data = request.get_json(silent=True) or {}
+    results = []
+    for table in ('audit_action_logs', 'system_logs'):
+        results += AuditArchiveService.compact(table, hot_months=data.get('hot_months'))
+    return jsonify({"success": True, "archived": results}), 200
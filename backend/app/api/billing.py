@@ -0,0 +1,244 @@
+import json
+from datetime import date
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from backend.app import db
+from backend.app.models import Supporter, OfficeSetting
+from backend.app.services.billing_engine_service import MonthlyBillingEngine
+from backend.app.services.copayment_allocation_service import CopaymentAllocator
+from backend.app.services.document_render_service import FILE_SUFFIX, DocumentRenderer, find_document
+from backend.app.services.finance_service import FinanceService
+from backend.app.services.national_claim_csv_service import NationalClaimCsvExporter
+from backend.app.services.wage_engine_service import MonthlyWageEngine
+
+billing_bp = Blueprint('billing', __name__, url_prefix='/api/billing')
+
+
+def get_current_staff():
+    from backend.app.services.core_service import parse_jwt_identity
+    prefix, staff_id = parse_jwt_identity(get_jwt_identity())
+    if prefix == 'staff' and staff_id:
+        return Supporter.query.get(staff_id)
+    return None
+
+
+def _billing_corporation_id():
+    """請求業務は法人・システム管理者のみ。対象は操作者の所属法人"""
+    current = get_current_staff()
+    if not current or not current.office_id:
+        return None, (jsonify({"msg": "Office not found"}), 404)
+    if not any(r.role_scope in ['SYSTEM', 'CORPORATE'] and r.is_admin for r in current.roles):
+        return None, (jsonify({"msg": "請求業務を行う権限がありません。"}), 403)
+    return OfficeSetting.query.get(current.office_id).corporation_id, None
+
+
+def _year_month(data):
+    try:
+        year, month = int(data.get('year')), int(data.get('month'))
+    except (TypeError, ValueError):
+        return None
+    return (year, month) if 1 <= month <= 12 else None
+
+
+def _created_on(args):
+    """CSVの作成日（?created_on=YYYY-MM-DD）。省略時は当日。同じ作成日を指定すれば同じ内容・同じ SHA-256 になる"""
+    value = args.get('created_on')
+    if not value:
+        return None, None
+    try:
+        return date.fromisoformat(value), None
+    except ValueError:
+        return None, (jsonify({"msg": "created_on must be YYYY-MM-DD"}), 400)
+
+
+@billing_bp.route('/monthly-run', methods=['POST'])
+@jwt_required()
+def run_monthly_billing():
+    """
+    法人全体の月次請求を計算して保存し、前回の計算結果との差分を返す。
+    dry_run=true の場合は保存せずに差分だけを返す。確定済みの請求は変更しない。
+    """
+    corporation_id, error = _billing_corporation_id()
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    year_month = _year_month(data)
+    if not year_month:
+        return jsonify({"msg": "year and month are required"}), 400
+
+    dry_run = bool(data.get('dry_run', False))
+    result = MonthlyBillingEngine(corporation_id, *year_month).run(dry_run=dry_run)
+    if not dry_run:
+        db.session.commit()
+    return jsonify(result), 200
+
+
+@billing_bp.route('/copayment-allocation', methods=['POST'])
+@jwt_required()
+def run_copayment_allocation():
+    """
+    法人全体の利用者負担上限額管理を行い、事業所ごとの自己負担額を請求書（ClientInvoice）に反映する。
+    dry_run=true の場合は保存せずに按分結果と差分だけを返す。入金済みの請求書は変更しない。
+    """
+    corporation_id, error = _billing_corporation_id()
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    year_month = _year_month(data)
+    if not year_month:
+        return jsonify({"msg": "year and month are required"}), 400
+
+    dry_run = bool(data.get('dry_run', False))
+    result = CopaymentAllocator(corporation_id, *year_month).run(dry_run=dry_run)
+    if not dry_run:
+        db.session.commit()
+    return jsonify(result), 200
+
+
+@billing_bp.route('/wage-run', methods=['POST'])
+@jwt_required()
+def run_monthly_wages():
+    """
+    A型・B型事業所の月次工賃を利用者全員分まとめて計算して保存し、前回の計算結果との差分を返す。
+    dry_run=true の場合は保存せずに差分だけを返す。支払済みの工賃は変更しない。
+    """
+    corporation_id, error = _billing_corporation_id()
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    year_month = _year_month(data)
+    if not year_month:
+        return jsonify({"msg": "year and month are required"}), 400
+    office = OfficeSetting.query.get(data.get('office_id')) if data.get('office_id') else None
+    if not office or office.corporation_id != corporation_id:
+        return jsonify({"msg": "Office not found"}), 404
+
+    dry_run = bool(data.get('dry_run', False))
+    result = MonthlyWageEngine(office.id, *year_month).run(dry_run=dry_run)
+    if not dry_run:
+        db.session.commit()
+    return jsonify(result), 200
+
+
+@billing_bp.route('/documents', methods=['POST'])
+@jwt_required()
+def render_monthly_documents():
+    """
+    法人の1か月分の請求書・領収証・代理受領書・工賃受取書を描画し、各帳票の URL 列に書き込む。
+    内容が変わらない帳票は描画済みのファイルを再利用する。
+    """
+    corporation_id, error = _billing_corporation_id()
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    year_month = _year_month(data)
+    if not year_month:
+        return jsonify({"msg": "year and month are required"}), 400
+
+    result = DocumentRenderer(corporation_id, *year_month).run()
+    db.session.commit()
+    return jsonify(result), 200
+
+
+@billing_bp.route('/documents/<kind>/<prefix>/<filename>', methods=['GET'])
+@jwt_required()
+def download_document(kind, prefix, filename):
+    """
+    描画済みの帳票を返す。帳票には利用者名や金額が載るため、操作者の法人の帳票として URL 列に
+    登録されているファイルだけを返す（保存ディレクトリは公開しない）。
+    """
+    corporation_id, error = _billing_corporation_id()
+    if error:
+        return error
+
+    key = filename[:-len(FILE_SUFFIX)] if filename.endswith(FILE_SUFFIX) else ''
+    path = find_document(corporation_id, kind, key) if prefix == key[:2] else None
+    if path is None:
+        return jsonify({"msg": "Document not found"}), 404
+
+    response = send_file(path, mimetype='text/html', max_age=0)
+    response.headers['Cache-Control'] = 'private, no-store'
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+@billing_bp.route('/pre-audit', methods=['POST'])
+@jwt_required()
+def run_pre_billing_audit():
+    """
+    請求前の支援実績整合性チェックを法人の当月請求対象者全員に対して行う。
+    計画未作成のリスクを URAC に記録した後、NDJSON で1行目に集計、2行目以降に該当利用者を1件ずつ返す。
+    """
+    corporation_id, error = _billing_corporation_id()
+    if error:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    year_month = _year_month(data)
+    if not year_month:
+        return jsonify({"msg": "year and month are required"}), 400
+
+    report = FinanceService().audit_support_consistency_for_month(corporation_id, date(*year_month, 1))
+    db.session.commit()
+    findings = report.pop("findings")
+
+    def generate():
+        yield json.dumps(dict(report, type="summary"), ensure_ascii=False) + "\n"
+        for finding in findings:
+            yield json.dumps(dict(finding, type="finding"), ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@billing_bp.route('/national-csv', methods=['GET'])
+@jwt_required()
+def download_national_claim_csv():
+    """
+    国保連提出用の請求CSVを法人単位でストリーミングで返す（?year=&month=&created_on=）。
+    照合用の件数・SHA-256 は同じ created_on を指定して /national-csv/manifest で取得する
+    （作成日は制御レコードに入るため、X-Claim-Created-On で返す）。
+    """
+    corporation_id, error = _billing_corporation_id()
+    if error:
+        return error
+    year_month = _year_month(request.args)
+    if not year_month:
+        return jsonify({"msg": "year and month are required"}), 400
+    created_on, error = _created_on(request.args)
+    if error:
+        return error
+
+    exporter = NationalClaimCsvExporter(corporation_id, *year_month, created_on=created_on)
+    return Response(
+        stream_with_context(exporter.iter_bytes()),
+        content_type=f'text/csv; charset={exporter.encoding}',
+        headers={
+            'Content-Disposition': f'attachment; filename={exporter.filename}',
+            'X-Claim-Created-On': exporter.created_on.isoformat(),
+        },
+    )
+
+
+@billing_bp.route('/national-csv/manifest', methods=['GET'])
+@jwt_required()
+def national_claim_csv_manifest():
+    """
+    請求CSVのレコード件数・バイト数・SHA-256（出力は保持せずに同じ手順で計算する）。
+    別の日にダウンロードしたCSVは、その作成日を ?created_on= に指定して照合する。
+    """
+    corporation_id, error = _billing_corporation_id()
+    if error:
+        return error
+    year_month = _year_month(request.args)
+    if not year_month:
+        return jsonify({"msg": "year and month are required"}), 400
+    created_on, error = _created_on(request.args)
+    if error:
+        return error
+
+    exporter = NationalClaimCsvExporter(corporation_id, *year_month, created_on=created_on)
+    return jsonify(exporter.build_manifest()), 200
@@ -52,11 +52,11 @@ def get_dashboard_summary():
 
     # 今日の通所者数（本日のCHECK_IN実績が存在するユニーク利用者数）
     from backend.app.models.support.attendance_workflow import AttendanceRecord
-    from sqlalchemy import func, select
+    from sqlalchemy import select
 
     q_today = db.session.query(AttendanceRecord.user_id).filter(
         AttendanceRecord.record_type == 'CHECK_IN',
-        func.date(AttendanceRecord.timestamp) == today
+        AttendanceRecord.attendance_date == today
     )
     if users_sq is not None:
         q_today = q_today.filter(AttendanceRecord.user_id.in_(select(users_sq.c.user_id)))
@@ -114,7 +114,7 @@ def get_today_users():
     scope = resolve_tenant_scope(staff_id, claims.get('role_scopes', []))
 
     from backend.app.models.support.attendance_workflow import AttendanceRecord
-    from sqlalchemy import func, select
+    from sqlalchemy import select
 
     today = get_jst_today()
     users_sq = get_accessible_users_subquery(scope, today, staff_id)
@@ -126,7 +126,7 @@ def get_today_users():
     # 本日のCHECK_IN実績を取得
     q_check_ins = AttendanceRecord.query.filter(
         AttendanceRecord.record_type == 'CHECK_IN',
-        func.date(AttendanceRecord.timestamp) == today
+        AttendanceRecord.attendance_date == today
     )
     if users_sq is not None:
         q_check_ins = q_check_ins.filter(
@@ -145,7 +145,7 @@ def get_today_users():
             user_id=user_id, 
             record_type='CHECK_OUT'
         ).filter(
-            func.date(AttendanceRecord.timestamp) == today
+            AttendanceRecord.attendance_date == today
         ).first()
         
         # 同日の日報を探す
@@ -4,10 +4,10 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from backend.app.domain.attendance.exceptions import AttendanceDomainError
 from backend.app.extensions import db
-from backend.app.models import Supporter, StaffActionLog, StaffDailyReport, SupporterTimecard, StaffDailyShift
-from datetime import datetime, date
+from backend.app.models import Supporter, StaffActionLog, StaffDailyShift
+from datetime import datetime, date, timedelta
 from zoneinfo import ZoneInfo
-from backend.app.utils.tenant import extract_staff_id, resolve_tenant_scope, filter_query_by_tenant_scope
+from backend.app.utils.tenant import extract_staff_id, resolve_tenant_scope
 from backend.app.domain.attendance.exceptions import handle_attendance_errors
 
 dashboard_staff_bp = Blueprint('dashboard_staff', __name__, url_prefix='/api/dashboard/staff')
@@ -24,34 +24,9 @@ def get_staff_status():
     claims = get_jwt()
     scope = resolve_tenant_scope(staff_id, claims.get('role_scopes', []))
         
-    import pytz
-    tz = pytz.timezone('Asia/Tokyo')
-    now = datetime.now(tz)
-    today = now.date()
-
-    # 本日のシフト
-    query_shifts = StaffDailyShift.query.filter_by(target_date=today)
-    # 本日の全打刻
-    query_tcs = SupporterTimecard.query.filter_by(work_date=today)
-
-    query_tcs, query_shifts, _ = filter_query_by_tenant_scope(scope, query_tcs, query_shifts, requester_id=staff_id)
-
-    shifts = query_shifts.all()
-    timecards = query_tcs.all()
-
-    # 進行中の打刻
-    ongoing_timecards = [tc for tc in timecards if tc.check_in is not None and tc.check_out is None]
-    ongoing_map = {tc.supporter_id: tc for tc in ongoing_timecards}
-
-    # 本日の打刻をsupporter_idでグループ化し、完了済みのみに絞る
-    completed_map = {}
-    for tc in timecards:
-        if tc.check_out is not None:
-            if tc.supporter_id not in completed_map:
-                completed_map[tc.supporter_id] = []
-            completed_map[tc.supporter_id].append(tc)
-
-    staff_data = []
+    from backend.app.services.presence_service import load_presence_entries
+    from backend.app.utils.timezone import get_jst_today
+    today = get_jst_today()
 
     from backend.app.models.core.office import OfficeSetting
     supp_query = Supporter.query.filter_by(is_active=True)
@@ -62,51 +37,97 @@ def get_staff_status():
 
     supporters = supp_query.all()
 
-    for supporter in supporters:
-        shift = next((s for s in shifts if s.supporter_id == supporter.id), None)
-        
-        ongoing = ongoing_map.get(supporter.id)
-        completed_list = completed_map.get(supporter.id, [])
-        # sequence_noでソート
-        completed_list.sort(key=lambda x: x.sequence_no or 0)
-        
-        rep_timecard = ongoing if ongoing else (completed_list[-1] if completed_list else None)
-        
-        total_worked_seconds = 0
-        for tc in completed_list:
-            if tc.check_in and tc.check_out:
-                duration = (tc.check_out - tc.check_in).total_seconds()
-                break_sec = (tc.total_break_minutes or 0) * 60
-                total_worked_seconds += (duration - break_sec)
-        
-        status = "NOT_SCHEDULED"
-        if ongoing:
-            status = "WORKING"
-        elif completed_list:
-            status = "FINISHED"
-        elif shift:
-            status = "SCHEDULED"
-
-        staff_data.append({
-            "supporter_id": supporter.id,
-            "name": f"{supporter.last_name} {supporter.first_name}",
-            "status": status,
-            "shift": {
-                "start": shift.planned_start_time.replace(tzinfo=ZoneInfo("Asia/Tokyo")).isoformat() if shift and shift.planned_start_time else None,
-                "end": shift.planned_end_time.replace(tzinfo=ZoneInfo("Asia/Tokyo")).isoformat() if shift and shift.planned_end_time else None
-            } if shift else None,
-            "timecard": {
-                "check_in": rep_timecard.check_in.replace(tzinfo=ZoneInfo("Asia/Tokyo")).isoformat() if rep_timecard and rep_timecard.check_in else None,
-                "check_out": rep_timecard.check_out.replace(tzinfo=ZoneInfo("Asia/Tokyo")).isoformat() if rep_timecard and rep_timecard.check_out else None,
-                "total_worked_seconds": total_worked_seconds
-            } if rep_timecard or completed_list else None
-        })
-        
+    # 本日のシフト・打刻は職員IDで一括取得し、辞書引きで職員ごとに組み立てる
+    entries = load_presence_entries(supporters, today)
+    staff_data = [entries[supporter.id] for supporter in supporters]
+
     return jsonify({
         "current_staff_id": int(identity.split(':')[1]),
         "staff_list": staff_data
     }), 200
 
+@dashboard_staff_bp.route('/presence', methods=['GET'])
+@jwt_required()
+@handle_attendance_errors
+def get_presence_snapshot():
+    """
+    在席ボードの全量スナップショット。version を /presence/stream の since に渡すと以降の差分を購読できる。
+    """
+    from backend.app.services.presence_service import PresenceService
+
+    identity = get_jwt_identity()
+    staff_id = extract_staff_id(identity)
+    claims = get_jwt()
+    scope = resolve_tenant_scope(staff_id, claims.get('role_scopes', []))
+
+    snapshot = PresenceService.snapshot(scope, staff_id)
+    return jsonify({"current_staff_id": staff_id, **snapshot}), 200
+
+@dashboard_staff_bp.route('/presence/stream', methods=['GET'])
+@jwt_required()
+@handle_attendance_errors
+def stream_presence():
+    """
+    在席ボードの変更をServer-Sent Eventsで配信する。
+    差分で追えない場合（ボード再構築・接続断が長い場合）は snapshot イベントで全量を送り直す。
+    接続は PRESENCE_STREAM_MAX_SECONDS で閉じるため、クライアントは Last-Event-ID を付けて再接続する。
+    """
+    import json
+    import time
+    from flask import Response, current_app, stream_with_context
+    from backend.app.services.presence_service import PresenceService
+
+    identity = get_jwt_identity()
+    staff_id = extract_staff_id(identity)
+    claims = get_jwt()
+    scope = resolve_tenant_scope(staff_id, claims.get('role_scopes', []))
+
+    since = request.headers.get('Last-Event-ID') or request.args.get('since') or -1
+    try:
+        since = int(since)
+    except (TypeError, ValueError):
+        return jsonify({"msg": "since must be an integer"}), 400
+
+    tenant_id = PresenceService.tenant_of(staff_id)
+    PresenceService.ensure_board(tenant_id)
+    registry = PresenceService.get_registry()
+    heartbeat = float(current_app.config.get('PRESENCE_HEARTBEAT_SECONDS', 15))
+    deadline = time.monotonic() + float(current_app.config.get('PRESENCE_STREAM_MAX_SECONDS', 300))
+
+    def sse(event_name, event_id, payload):
+        return f"event: {event_name}\nid: {event_id}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def generate():
+        cursor = since
+        yield f"retry: {int(heartbeat * 1000)}\n\n"
+        while True:
+            # 日付が変わった・再構築間隔を過ぎた場合はここで作り直され、下で snapshot が送られる
+            PresenceService.ensure_board(tenant_id)
+            changes = PresenceService.visible_changes(scope, staff_id, tenant_id, cursor)
+            if changes is None:
+                snapshot = PresenceService.snapshot(scope, staff_id)
+                cursor = snapshot["version"]
+                yield sse("snapshot", cursor, snapshot)
+            elif changes:
+                for change in changes:
+                    yield sse("presence", change["version"], change)
+                cursor = changes[-1]["version"]
+            else:
+                # 他職員の変更など、見えない差分でもカーソルは進める
+                latest, _ = registry.snapshot(tenant_id)
+                cursor = max(cursor, latest or cursor)
+
+            if time.monotonic() >= deadline:
+                return
+            if not registry.wait_for_change(tenant_id, cursor, timeout=heartbeat):
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @dashboard_staff_bp.route('/action-logs', methods=['POST'])
 @jwt_required()
 @handle_attendance_errors
@@ -140,10 +161,12 @@ def get_today_action_logs():
     staff_id = extract_staff_id(identity)
     supporter_id = staff_id
     today = date.today()
+    day_start = datetime.combine(today, datetime.min.time())
 
     logs = StaffActionLog.query.filter(
         StaffActionLog.supporter_id == supporter_id,
-        db.func.date(StaffActionLog.action_timestamp) == today
+        StaffActionLog.action_timestamp >= day_start,
+        StaffActionLog.action_timestamp < day_start + timedelta(days=1)
     ).order_by(StaffActionLog.action_timestamp.desc()).all()
 
     return jsonify([{
@@ -157,50 +180,61 @@ def get_today_action_logs():
 @jwt_required()
 @handle_attendance_errors
 def generate_daily_report():
-    """AIを利用してアクションログから業務日報を下書きする（モック版）"""
+    """アクションログから本人の業務日報を下書きする"""
+    from backend.app.services.staff_daily_report_service import StaffDailyReportService
+
     identity = get_jwt_identity()
     staff_id = extract_staff_id(identity)
     supporter_id = staff_id
     today = date.today()
 
-    # 未処理のログを取得
-    unprocessed_logs = StaffActionLog.query.filter(
-        StaffActionLog.supporter_id == supporter_id,
-        db.func.date(StaffActionLog.action_timestamp) == today,
-        StaffActionLog.is_processed_by_ai == False
-    ).all()
-
-    if not unprocessed_logs:
+    result = StaffDailyReportService.generate_drafts(target_date=today, supporter_ids=[supporter_id])
+    if not result["reports"]:
         return jsonify({"msg": "No unprocessed logs available for today."}), 400
-        
-    # TODO: 実際のGemini APIを呼び出す。今回はモックテキストを生成
-    aggregated_text = "【本日の業務ハイライト】\n"
-    for log in unprocessed_logs:
-        aggregated_text += f"- {log.action_timestamp.strftime('%H:%M')} : {log.action_content}\n"
-        log.is_processed_by_ai = True
-        
-    # 日報モデルの作成または更新
-    report = StaffDailyReport.query.filter_by(supporter_id=supporter_id, target_date=today).first()
-    if report:
-        report.report_content += "\n\n" + aggregated_text
-        report.is_ai_draft = True
-        report.is_submitted = False
-    else:
-        report = StaffDailyReport(
-            supporter_id=supporter_id,
-            target_date=today,
-            report_content=aggregated_text,
-            is_ai_draft=True,
-            is_submitted=False
-        )
-        db.session.add(report)
-        
-    db.session.commit()
 
+    report = result["reports"][0]
     return jsonify({
         "msg": "Daily report draft generated",
-        "report_id": report.id,
-        "content": report.report_content
+        "report_id": report["report_id"],
+        "content": report["content"]
+    }), 200
+
+@dashboard_staff_bp.route('/daily-report/generate-batch', methods=['POST'])
+@jwt_required()
+@handle_attendance_errors
+def generate_daily_reports_batch():
+    """
+    終業時の一括処理：権限スコープ内で未処理ログを持つ全職員の業務日報を下書きする。
+    法人管理者は法人内の全職員、それ以外は本人のみが対象となる。
+    """
+    from backend.app.services.staff_daily_report_service import StaffDailyReportService
+
+    identity = get_jwt_identity()
+    staff_id = extract_staff_id(identity)
+    claims = get_jwt()
+    scope = resolve_tenant_scope(staff_id, claims.get('role_scopes', []))
+    data = request.get_json(silent=True) or {}
+
+    target_date = date.today()
+    if data.get('target_date'):
+        try:
+            target_date = date.fromisoformat(data['target_date'])
+        except (TypeError, ValueError):
+            return jsonify({"msg": "target_date must be YYYY-MM-DD"}), 400
+
+    supporter_ids = [staff_id]
+    if scope['level'] == 'CORPORATE':
+        from backend.app.models.core.office import OfficeSetting
+        supporter_ids = [
+            sid for (sid,) in db.session.query(Supporter.id)
+            .join(OfficeSetting, Supporter.office_id == OfficeSetting.id)
+            .filter(OfficeSetting.corporation_id == scope['corp_id'])
+        ]
+
+    result = StaffDailyReportService.generate_drafts(target_date=target_date, supporter_ids=supporter_ids)
+    return jsonify({
+        "msg": f"{len(result['reports'])} daily report drafts generated",
+        **result
     }), 200
 
 @dashboard_staff_bp.route('/clock-in', methods=['POST'])
@@ -0,0 +1,53 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from backend.app.models import Supporter
+from backend.app.services.query_profiler_service import QueryProfiler
+from backend.app.services.db_router_service import DatabaseRouter
+
+debug_bp = Blueprint('debug', __name__, url_prefix='/api/debug')
+
+
+def _is_system_admin() -> bool:
+    from backend.app.services.core_service import parse_jwt_identity
+    prefix, staff_id = parse_jwt_identity(get_jwt_identity())
+    if prefix != 'staff' or not staff_id:
+        return False
+    current = Supporter.query.get(staff_id)
+    return bool(current) and any(r.role_scope == 'SYSTEM' and r.is_admin for r in current.roles)
+
+
+@debug_bp.route('/sql-stats', methods=['GET'])
+@jwt_required()
+def get_sql_stats():
+    """
+    リクエスト単位のSQL計測結果（エンドポイント別の累計と直近のリクエスト）を返す（システム管理者のみ）。
+    SQL_DEBUG_ENDPOINT_ENABLED が無効な環境では存在しないものとして扱う。
+    """
+    profiler = QueryProfiler.get()
+    if not current_app.config.get('SQL_DEBUG_ENDPOINT_ENABLED') or profiler is None:
+        return jsonify({"msg": "Not Found"}), 404
+    if not _is_system_admin():
+        return jsonify({"msg": "SQL計測結果を参照する権限がありません。"}), 403
+
+    limit = min(request.args.get('limit', 20, type=int), 200)
+    return jsonify({
+        "success": True,
+        "summary": profiler.summary(),
+        "recent": profiler.recent(limit),
+    }), 200
+
+
+@debug_bp.route('/db-routing', methods=['GET'])
+@jwt_required()
+def get_db_routing():
+    """
+    リードレプリカの振り分け状況（バインド別の件数・遅延・接続プール）を返す（システム管理者のみ）。
+    SQL_DEBUG_ENDPOINT_ENABLED が無効、またはレプリカ未設定の環境では存在しないものとして扱う。
+    """
+    router = DatabaseRouter.get()
+    if not current_app.config.get('SQL_DEBUG_ENDPOINT_ENABLED') or router is None:
+        return jsonify({"msg": "Not Found"}), 404
+    if not _is_system_admin():
+        return jsonify({"msg": "振り分け状況を参照する権限がありません。"}), 403
+
+    return jsonify({"success": True, "routing": router.metrics()}), 200
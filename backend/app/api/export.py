@@ -1,4 +1,3 @@
-import openpyxl
 from io import BytesIO
 from flask import Blueprint, request, send_file, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
@@ -19,6 +18,9 @@ def export_attendance():
         now = datetime.now()
         year, month = now.year, now.month
 
+    # openpyxl は読み込みが重いため、エクスポート時にだけ import する
+    import openpyxl
+
     # 行政提出用のエクセルを新規作成（本来はテンプレートをロードする）
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -1,50 +1,61 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import jwt_required
-from backend.app.models import RoleMaster
+from backend.app.models import JobTitleMaster, RoleMaster
+from backend.app.models.masters.master_definitions import (
+    MunicipalityMaster, ServiceTypeMaster, GenderLegalMaster, DisabilityTypeMaster
+)
+from backend.app.services.master_data_service import MasterDataCache
 
 management_masters_bp = Blueprint('management_masters', __name__, url_prefix='/api/management/masters')
 
+
+def _conditional_json(models, build):
+    """マスタの内容から作った ETag を付けて返す。If-None-Match が一致すれば本文なしの 304"""
+    cache = MasterDataCache.get_instance()
+    etag = cache.etag(*models)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build(cache))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 @management_masters_bp.route('', methods=['GET'])
 @jwt_required()
 def get_masters():
     """
     フロントエンドのセレクトボックス等で使用するマスターデータを一括で取得する。
     """
-    from backend.app.models.masters.master_definitions import (
-        MunicipalityMaster, ServiceTypeMaster, GenderLegalMaster, DisabilityTypeMaster
+    return _conditional_json(
+        (MunicipalityMaster, ServiceTypeMaster, GenderLegalMaster, DisabilityTypeMaster),
+        lambda cache: {
+            "municipalities": [{"id": m["id"], "city_name": m["name"], "city_code": m["municipality_code"]}
+                               for m in cache.rows(MunicipalityMaster)],
+            "service_types": [{"id": s["id"], "service_name": s["name"], "service_code": s["service_code"]}
+                              for s in cache.rows(ServiceTypeMaster)],
+            "genders": [{"id": g["id"], "name": g["name"]} for g in cache.rows(GenderLegalMaster)],
+            "disabilities": [{"id": d["id"], "name": d["name"]} for d in cache.rows(DisabilityTypeMaster)],
+        },
     )
-    
-    municipalities = MunicipalityMaster.query.order_by(MunicipalityMaster.id).all()
-    service_types = ServiceTypeMaster.query.order_by(ServiceTypeMaster.id).all()
-    genders = GenderLegalMaster.query.order_by(GenderLegalMaster.id).all()
-    disabilities = DisabilityTypeMaster.query.order_by(DisabilityTypeMaster.id).all()
-    
-    return jsonify({
-        "municipalities": [{"id": m.id, "city_name": m.name, "city_code": m.municipality_code} for m in municipalities],
-        "service_types": [{"id": s.id, "service_name": s.name, "service_code": s.service_code} for s in service_types],
-        "genders": [{"id": g.id, "name": g.name} for g in genders],
-        "disabilities": [{"id": d.id, "name": d.name} for d in disabilities]
-    }), 200
 
 @management_masters_bp.route('/roles', methods=['GET'])
 @jwt_required()
 def get_available_roles():
-    roles = RoleMaster.query.all()
-    return jsonify([{
-        "id": r.id,
-        "name": r.name,
-        "scope": r.role_scope,
-        "is_admin": r.is_admin
-    } for r in roles]), 200
+    return _conditional_json((RoleMaster,), lambda cache: [{
+        "id": r["id"],
+        "name": r["name"],
+        "scope": r["role_scope"],
+        "is_admin": r["is_admin"]
+    } for r in cache.rows(RoleMaster)])
 
 @management_masters_bp.route('/job-titles', methods=['GET'])
 @jwt_required()
 def get_available_job_titles():
-    from backend.app.models import JobTitleMaster
-    titles = JobTitleMaster.query.all()
-    return jsonify([{
-        "id": t.id,
-        "title_name": t.title_name,
-        "is_management_role": t.is_management_role,
-        "is_qualified_role": t.is_qualified_role
-    } for t in titles]), 200
+    return _conditional_json((JobTitleMaster,), lambda cache: [{
+        "id": t["id"],
+        "title_name": t["title_name"],
+        "is_management_role": t["is_management_role"],
+        "is_qualified_role": t["is_qualified_role"]
+    } for t in cache.rows(JobTitleMaster)])
@@ -4,6 +4,7 @@ from backend.app import db
 from backend.app.models import Supporter, OfficeSetting, OfficeServiceConfiguration, OfficeAdditiveFiling, GovernmentFeeMaster
 from datetime import datetime
 from backend.app.utils.errors import AppError
+from backend.app.services.db_router_service import use_primary
 
 management_office_bp = Blueprint('management_office', __name__, url_prefix='/api/management/office')
 
@@ -16,6 +17,7 @@ def get_current_staff():
 
 @management_office_bp.route('', methods=['GET'])
 @jwt_required()
+@use_primary  # サービス設定が無ければ既定値を作成するため、プライマリで読む
 def get_office_settings():
     current = get_current_staff()
     if not current or not current.office_id:
@@ -104,7 +106,7 @@ def get_office_settings():
 @jwt_required()
 def update_office_settings():
     from backend.app.utils.errors import ValidationError
-    from backend.app.services.core_service import reconcile_relations
+    from backend.app.services.core_service import reconcile_keyed
     try:
         current = get_current_staff()
         data = request.get_json()
@@ -151,11 +153,12 @@ def update_office_settings():
             if len(selected_service_types) != len(set(selected_service_types)):
                 raise ValidationError("同じサービス種別を複数登録することはできません。")
 
-            def match_service(existing, incoming):
+            def service_key(incoming):
+                # id が無い・0以下（画面で追加した行）は新規
                 inc_id = incoming.get('id')
                 if not inc_id or int(inc_id) <= 0:
-                    return False
-                return existing.id == int(inc_id)
+                    return None
+                return int(inc_id)
                 
             def update_service(item, incoming):
                 item.office_id = office.id
@@ -193,12 +196,13 @@ def update_office_settings():
                 else:
                     item.designation_expiry_date = None
 
-            reconcile_relations(
+            reconcile_keyed(
                 office.service_configs,
                 incoming_services,
                 OfficeServiceConfiguration,
                 db.session,
-                match_service,
+                lambda existing: existing.id,
+                service_key,
                 update_service
             )
         else:
@@ -359,3 +363,66 @@ def delete_additive_filing(filing_id):
     filing.delete_reason = delete_reason
     db.session.commit()
     return jsonify({"msg": "Filing deleted successfully"}), 200
+
+@management_office_bp.route('/staffing-coverage', methods=['GET'])
+@jwt_required()
+def get_staffing_coverage():
+    """
+    15分単位の人員配置タイムラインと、基準を下回った時間帯を返す（監査対応）。
+    法人・システム管理者は法人内の全事業所、それ以外は所属事業所のみが対象。
+    """
+    from backend.app.services.staffing_coverage_service import StaffingCoverageService
+    current = get_current_staff()
+    if not current or not current.office_id:
+        return jsonify({"msg": "Office not found"}), 404
+
+    today = datetime.now().date()
+    try:
+        year = int(request.args.get('year', today.year))
+        month = int(request.args.get('month', today.month))
+        if not 1 <= month <= 12:
+            raise ValueError
+    except ValueError:
+        return jsonify({"msg": "year/month must be valid integers"}), 400
+    include_timeline = request.args.get('include_timeline', 'false').lower() == 'true'
+
+    office_ids = [current.office_id]
+    is_global_admin = any(r.role_scope in ['SYSTEM', 'CORPORATE'] and r.is_admin for r in current.roles)
+    if is_global_admin:
+        office = OfficeSetting.query.get(current.office_id)
+        office_ids = [oid for (oid,) in db.session.query(OfficeSetting.id).filter(
+            OfficeSetting.corporation_id == office.corporation_id
+        ).order_by(OfficeSetting.id)]
+
+    result = StaffingCoverageService().build_monthly_timeline(year, month, office_ids, include_timeline=include_timeline)
+    result["offices"] = {str(oid): data for oid, data in result["offices"].items()}
+    return jsonify(result), 200
+
+@management_office_bp.route('/fte-rollup', methods=['GET'])
+@jwt_required()
+def get_fte_rollup():
+    """
+    法人内の一体的運営ごとに、構成サービス別FTEと合計を一括で返す（法人・システム管理者のみ）。
+    """
+    from backend.app.services.fte_rollup_service import FteRollupService
+    from datetime import date, timedelta
+    current = get_current_staff()
+    if not current or not current.office_id:
+        return jsonify({"msg": "Office not found"}), 404
+
+    is_global_admin = any(r.role_scope in ['SYSTEM', 'CORPORATE'] and r.is_admin for r in current.roles)
+    if not is_global_admin:
+        return jsonify({"msg": "法人全体のFTEを参照する権限がありません。"}), 403
+
+    try:
+        end_date = date.fromisoformat(request.args['end_date']) if request.args.get('end_date') else datetime.now().date()
+        # 原則：FTEは4週間平均で算出する
+        start_date = date.fromisoformat(request.args['start_date']) if request.args.get('start_date') else end_date - timedelta(days=27)
+    except ValueError:
+        return jsonify({"msg": "start_date/end_date must be YYYY-MM-DD"}), 400
+    if start_date > end_date:
+        return jsonify({"msg": "start_date must be on or before end_date"}), 400
+
+    office = OfficeSetting.query.get(current.office_id)
+    result = FteRollupService().rollup_corporation(office.corporation_id, start_date, end_date)
+    return jsonify(result), 200
@@ -4,6 +4,7 @@ from backend.app import db
 from backend.app.models import Supporter, OfficeSetting, RoleMaster
 from sqlalchemy.orm import joinedload
 from datetime import datetime
+from backend.app.services.master_data_service import MasterDataCache
 from backend.app.utils.text_helpers import convert_to_katakana
 from backend.app.utils.errors import AppError, ValidationError
 
@@ -197,7 +198,7 @@ def update_staff(staff_id):
             staff.roles = roles
 
         if 'job_assignments' in data:
-            from backend.app.services.core_service import reconcile_relations
+            from backend.app.services.core_service import reconcile_keyed
             
             service_config = OfficeServiceConfiguration.query.filter_by(office_id=staff.office_id).first()
             if not service_config:
@@ -213,9 +214,6 @@ def update_staff(staff_id):
                 db.session.flush()
             service_config_id = service_config.id
             
-            def match_job(existing, incoming):
-                return existing.job_title_id == int(incoming['job_title_id'])
-                
             def update_job(item, incoming):
                 item.supporter_id = staff.id
                 item.job_title_id = int(incoming['job_title_id'])
@@ -231,24 +229,22 @@ def update_staff(staff_id):
                         raise ValidationError("みなし資格有効期限の形式が不正です")
                 item.deemed_expiry_date = expiry_val
                 
-            reconcile_relations(
+            reconcile_keyed(
                 staff.job_assignments,
                 data['job_assignments'],
                 SupporterJobAssignment,
                 db.session,
-                match_job,
+                lambda existing: existing.job_title_id,
+                lambda incoming: int(incoming['job_title_id']),
                 update_job
             )
 
         if 'shift_patterns' in data:
             from backend.app.models import EmploymentShiftPattern
-            from backend.app.services.core_service import reconcile_relations
+            from backend.app.services.core_service import reconcile_keyed
             
             valid_patterns = [p for p in data['shift_patterns'] if p.get('day_of_week')]
             
-            def match_shift(existing, incoming):
-                return existing.day_of_week == incoming['day_of_week']
-                
             def update_shift(item, incoming):
                 item.supporter_id = staff.id
                 item.day_of_week = incoming['day_of_week']
@@ -256,12 +252,13 @@ def update_staff(staff_id):
                 item.end_time = incoming.get('end_time')
                 item.break_minutes = int(incoming.get('break_minutes', 0))
                 
-            reconcile_relations(
+            reconcile_keyed(
                 staff.shift_patterns,
                 valid_patterns,
                 EmploymentShiftPattern,
                 db.session,
-                match_shift,
+                lambda existing: existing.day_of_week,
+                lambda incoming: incoming['day_of_week'],
                 update_shift
             )
 
@@ -384,7 +381,8 @@ def register_staff():
             roles = RoleMaster.query.filter(RoleMaster.id.in_(role_ids)).all()
             new_staff.roles = roles
         else:
-            default_role = RoleMaster.query.filter_by(name='事業所管理者').first()
+            masters = MasterDataCache.get_instance()
+            default_role = masters.instance(RoleMaster, masters.id_for(RoleMaster, '事業所管理者'))
             if default_role:
                 new_staff.roles = [default_role]
 
@@ -3,7 +3,6 @@ from flask_jwt_extended import jwt_required
 from backend.app import db
 from backend.app.models import User, UserDailySchedule, UserDailyLog
 from backend.app.models.support.attendance_workflow import AttendanceRecord
-from sqlalchemy import func
 from datetime import datetime
 from backend.app.utils.timezone import get_jst_today
 from backend.app.services.user_schedule_service import get_legacy_schedule_status
@@ -42,7 +41,7 @@ def get_daily_schedule_actuals():
     # 実績（打刻）を取得
     attendances = AttendanceRecord.query.filter(
         AttendanceRecord.user_id.in_(user_ids),
-        func.date(AttendanceRecord.timestamp) == target_date
+        AttendanceRecord.attendance_date == target_date
     ).all()
     
     # ユーザーごとの打刻整理
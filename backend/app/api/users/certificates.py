@@ -7,6 +7,7 @@ from backend.app.models.finance.billing_compliance import ContractReportDetail
 from backend.app.models.masters.master_definitions import ServiceTypeMaster
 from backend.app.models.core.audit_log import AuditActionLog
 from backend.app.services.core_service import check_permission, parse_jwt_identity
+from backend.app.services.certificate_service import CertificateRepository
 from datetime import datetime
 import json
 from . import users_bp
@@ -27,21 +28,24 @@ def check_cbac_cert(supporter_id_int, office_config_id=None, cert=None):
         return supporter.office.corporation_id == office_config.office.corporation_id
     return False
 
-def serialize_cert(cert, mask_pii=False):
+def serialize_cert(cert, mask_pii=False, graph=None):
+    """graph（CertificateGraph）を渡した場合は子レコードを読み直さない"""
+    graph = graph or CertificateRepository.load_graph(cert)
     granted = []
-    for g in cert.granted_services:
+    for g in graph.granted_services:
         cd_info = None
-        if g.contract_detail:
+        contract_detail = graph.contract_details.get(g.id)
+        if contract_detail:
             cd_info = {
-                "office_service_configuration_id": g.contract_detail.office_service_configuration_id,
-                "contract_office_name": g.contract_detail.contract_office_name,
-                "contract_corporation_name": g.contract_detail.contract_corporation_name,
-                "contract_service_type": g.contract_detail.contract_service_type,
-                "contract_date": g.contract_detail.contract_date.isoformat() if g.contract_detail.contract_date else None,
-                "contract_end_date": g.contract_detail.contract_end_date.isoformat() if g.contract_detail.contract_end_date else None,
-                "contract_end_used_days": g.contract_detail.contract_end_used_days,
-                "contract_document_url": g.contract_detail.contract_document_url,
-                "important_matters_url": g.contract_detail.important_matters_url
+                "office_service_configuration_id": contract_detail.office_service_configuration_id,
+                "contract_office_name": contract_detail.contract_office_name,
+                "contract_corporation_name": contract_detail.contract_corporation_name,
+                "contract_service_type": contract_detail.contract_service_type,
+                "contract_date": contract_detail.contract_date.isoformat() if contract_detail.contract_date else None,
+                "contract_end_date": contract_detail.contract_end_date.isoformat() if contract_detail.contract_end_date else None,
+                "contract_end_used_days": contract_detail.contract_end_used_days,
+                "contract_document_url": contract_detail.contract_document_url,
+                "important_matters_url": contract_detail.important_matters_url
             }
         granted.append({
             "id": g.id,
@@ -57,7 +61,7 @@ def serialize_cert(cert, mask_pii=False):
         })
         
     copayments = []
-    for cl in cert.copayment_limits:
+    for cl in graph.copayment_limits:
         copayments.append({
             "id": cl.id,
             "limit_start_date": cl.limit_start_date.isoformat() if cl.limit_start_date else None,
@@ -67,7 +71,7 @@ def serialize_cert(cert, mask_pii=False):
         })
 
     meal_addons = []
-    for ma in cert.meal_addon_statuses:
+    for ma in graph.meal_addon_statuses:
         meal_addons.append({
             "id": ma.id,
             "meal_addon_start_date": ma.meal_addon_start_date.isoformat() if ma.meal_addon_start_date else None,
@@ -76,7 +80,7 @@ def serialize_cert(cert, mask_pii=False):
         })
 
     managements = []
-    for cm in cert.copayment_management:
+    for cm in graph.copayment_managements:
         managements.append({
             "id": cm.id,
             "management_start_date": cm.management_start_date.isoformat() if cm.management_start_date else None,
@@ -531,25 +535,8 @@ def review_service_certificate(user_id, cert_id):
         cert.review_reason = review_reason.strip() if review_reason else None
 
         # Automatic archiving logic for overlapping ACTIVE certs
-        active_certs = ServiceCertificate.query.filter(
-            ServiceCertificate.user_id == cert.user_id,
-            ServiceCertificate.status == 'ACTIVE',
-            ServiceCertificate.id != cert.id
-        ).all()
-
-        for other_cert in active_certs:
-            overlap_found = False
-            for other_g in other_cert.granted_services:
-                for new_g in cert.granted_services:
-                    if other_g.service_type_master_id == new_g.service_type_master_id:
-                        # Check date overlap
-                        if other_g.granted_start_date <= new_g.granted_end_date and new_g.granted_start_date <= other_g.granted_end_date:
-                            overlap_found = True
-                            break
-                if overlap_found:
-                    break
-            if overlap_found:
-                other_cert.status = 'ARCHIVED'
+        for other_cert in CertificateRepository.find_overlapping_active(cert):
+            other_cert.status = 'ARCHIVED'
 
         db.session.commit()
         return jsonify({"msg": "Certificate approved", "status": cert.status}), 200
@@ -4,6 +4,7 @@ from backend.app import db
 from backend.app.models import User
 from backend.app.models.masters.master_definitions import StatusMaster
 from backend.app.services.core_service import check_permission, parse_jwt_identity
+from backend.app.services.master_data_service import MasterDataCache
 from backend.app.models.core.audit_log import AuditActionLog
 from datetime import datetime, timezone
 import re
@@ -79,13 +80,16 @@ def create_user():
     if not display_name or not display_name.strip():
         return jsonify({"msg": "表示名は必須です。"}), 400
 
+    statuses = MasterDataCache.get_instance()
     req_status_id = data.get('status_id')
     if req_status_id:
-        status = StatusMaster.query.get(req_status_id)
-        status_id = status.id if status else 1
+        try:
+            req_status_id = int(req_status_id)
+        except (TypeError, ValueError):
+            return jsonify({"msg": "status_id は整数で指定してください。"}), 400
+        status_id = req_status_id if statuses.get(StatusMaster, req_status_id) else 1
     else:
-        status = StatusMaster.query.filter_by(name='問い合わせ').first()
-        status_id = status.id if status else 1
+        status_id = statuses.id_for(StatusMaster, '問い合わせ') or 1
 
     max_user = User.query.filter(User.user_code.like('USR%')).order_by(User.user_code.desc()).first()
     if max_user and max_user.user_code:
@@ -251,12 +255,9 @@ def update_user(user_id):
 
     if 'emergency_contacts' in data:
         from backend.app.models.core.user_profile import EmergencyContact
-        from backend.app.services.core_service import reconcile_relations
+        from backend.app.services.core_service import reconcile_keyed
         
         valid_contacts = [c for c in data['emergency_contacts'] if c.get('name') and c.get('phone_number')]
-        
-        def match_contact(existing, incoming):
-            return existing.name == incoming['name'] and existing.phone_number == incoming['phone_number']
             
         def update_contact(item, incoming):
             item.user_id = user.id
@@ -264,12 +265,13 @@ def update_user(user_id):
             item.phone_number = incoming['phone_number']
             item.relation = incoming.get('relation', '')
             
-        reconcile_relations(
+        reconcile_keyed(
             user.emergency_contacts,
             valid_contacts,
             EmergencyContact,
             db.session,
-            match_contact,
+            lambda existing: (existing.name, existing.phone_number),
+            lambda incoming: (incoming['name'], incoming['phone_number']),
             update_contact
         )
 
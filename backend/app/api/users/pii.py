@@ -3,7 +3,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from backend.app import db
 from backend.app.models import User, SupportPlan
 from backend.app.services.core_service import check_permission, parse_jwt_identity
-from backend.app.models.core.audit_log import AuditActionLog
+from backend.app.services.audit_writer_service import AuditWriter
+from backend.app.services.certificate_service import CertificateRepository
 from . import users_bp
 
 @users_bp.route('/<int:user_id>/pii', methods=['GET'])
@@ -31,15 +32,12 @@ def get_user_pii(user_id):
 
     if can_view_pii:
         _, supporter_id_int = parse_jwt_identity(current_supporter_id)
-        audit_log = AuditActionLog(
+        AuditWriter.record(
+            'VIEW_PII', 'user_pii',
             actor_supporter_id=supporter_id_int,
-            action='VIEW_PII',
-            entity_type='user_pii',
             entity_id=user_id,
             after_value="User profile and PII decrypted & loaded onto Supporter interface"
         )
-        db.session.add(audit_log)
-        db.session.commit()
 
     active_plan = user.support_plans.filter_by(plan_status='ACTIVE').first()
     latest_plan = user.support_plans.order_by(SupportPlan.created_at.desc()).first() if user.support_plans.count() > 0 else None
@@ -74,22 +72,22 @@ def get_user_pii(user_id):
         "insurance_details": user.profile.insurance_details if user.profile else ""
     }
 
-    from backend.app.models.core.service_certificate import ServiceCertificate
     certificates_data = []
-    certs = ServiceCertificate.query.filter_by(user_id=user.id).order_by(ServiceCertificate.certificate_issue_date.desc(), ServiceCertificate.id.desc()).all()
-    for cert in certs:
+    for graph in CertificateRepository.for_user(user.id):
+        cert = graph.certificate
         granted = []
-        for g in cert.granted_services:
+        for g in graph.granted_services:
             cd_info = None
-            if g.contract_detail:
+            contract_detail = graph.contract_details.get(g.id)
+            if contract_detail:
                 cd_info = {
-                    "office_service_configuration_id": g.contract_detail.office_service_configuration_id,
-                    "contract_office_name": g.contract_detail.contract_office_name,
-                    "contract_corporation_name": g.contract_detail.contract_corporation_name,
-                    "contract_service_type": g.contract_detail.contract_service_type,
-                    "contract_date": g.contract_detail.contract_date.isoformat() if g.contract_detail.contract_date else None,
-                    "contract_end_date": g.contract_detail.contract_end_date.isoformat() if g.contract_detail.contract_end_date else None,
-                    "contract_end_used_days": g.contract_detail.contract_end_used_days
+                    "office_service_configuration_id": contract_detail.office_service_configuration_id,
+                    "contract_office_name": contract_detail.contract_office_name,
+                    "contract_corporation_name": contract_detail.contract_corporation_name,
+                    "contract_service_type": contract_detail.contract_service_type,
+                    "contract_date": contract_detail.contract_date.isoformat() if contract_detail.contract_date else None,
+                    "contract_end_date": contract_detail.contract_end_date.isoformat() if contract_detail.contract_end_date else None,
+                    "contract_end_used_days": contract_detail.contract_end_used_days
                 }
             granted.append({
                 "id": g.id,
@@ -105,7 +103,7 @@ def get_user_pii(user_id):
             })
             
         copayments = []
-        for cl in cert.copayment_limits:
+        for cl in graph.copayment_limits:
             copayments.append({
                 "id": cl.id,
                 "limit_start_date": cl.limit_start_date.isoformat() if cl.limit_start_date else None,
@@ -115,7 +113,7 @@ def get_user_pii(user_id):
             })
 
         meal_addons = []
-        for ma in cert.meal_addon_statuses:
+        for ma in graph.meal_addon_statuses:
             meal_addons.append({
                 "id": ma.id,
                 "meal_addon_start_date": ma.meal_addon_start_date.isoformat() if ma.meal_addon_start_date else None,
@@ -124,7 +122,7 @@ def get_user_pii(user_id):
             })
 
         managements = []
-        for cm in cert.copayment_management:
+        for cm in graph.copayment_managements:
             managements.append({
                 "id": cm.id,
                 "management_start_date": cm.management_start_date.isoformat() if cm.management_start_date else None,
@@ -236,14 +234,11 @@ def decrypt_user_pii(user_id):
 
     _, supporter_id_int = parse_jwt_identity(current_supporter_id)
 
-    audit_log = AuditActionLog(
+    AuditWriter.record(
+        'VIEW_PII', 'user_pii',
         actor_supporter_id=supporter_id_int,
-        action='VIEW_PII',
-        entity_type='user_pii',
         entity_id=user_id,
         after_value=f"PII Type: {pii_type} decrypted & accessed automatically"
     )
-    db.session.add(audit_log)
-    db.session.commit()
 
     return jsonify({"value": val}), 200
@@ -7,7 +7,6 @@ from flask_jwt_extended import jwt_required
 from backend.app import db
 from backend.app.models import User, UserDailyLog
 from backend.app.models.support.attendance_workflow import AttendanceRecord
-from sqlalchemy import func
 from backend.app.services.user_schedule_service import get_legacy_schedule_status
 from . import users_bp
 
@@ -77,7 +76,7 @@ def get_user_attendance_records(user_id: int):
     for att in attendances:
         if not att.timestamp:
             continue
-        att_date = att.timestamp.date()
+        att_date = att.attendance_date
         date_str = att_date.strftime('%Y-%m-%d')
         
         if date_str not in grouped:
@@ -160,7 +159,6 @@ def update_user_attendance_actuals(user_id: int, date_str: str):
     from datetime import datetime
     from backend.app.utils.timezone import JST
     from backend.app.models.support.attendance_workflow import AttendanceRecord
-    from sqlalchemy import func
 
     try:
         target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
@@ -171,7 +169,7 @@ def update_user_attendance_actuals(user_id: int, date_str: str):
     check_in_time = data.get('actual_check_in') # "HH:MM" or None
     check_out_time = data.get('actual_check_out') # "HH:MM" or None
 
-    attendances = AttendanceRecord.query.filter_by(user_id=user_id).filter(func.date(AttendanceRecord.timestamp) == target_date).all()
+    attendances = AttendanceRecord.query.filter_by(user_id=user_id).filter(AttendanceRecord.attendance_date == target_date).all()
     in_record = next((r for r in attendances if r.record_type == 'CHECK_IN'), None)
     out_record = next((r for r in attendances if r.record_type == 'CHECK_OUT'), None)
 
@@ -6,6 +6,7 @@ from backend.app.extensions import db
 from backend.app.models import (
     UserScheduleTemplate, UserDailySchedule, UserScheduleRequest, User
 )
+from backend.app.services.monthly_activity_service import MonthlyActivityRollup
 from backend.app.services.user_schedule_service import UserScheduleService, get_legacy_schedule_status
 from backend.app.utils.errors import ValidationError
 from backend.app.utils.timezone import get_jst_today
@@ -285,16 +286,15 @@ def get_daily_schedules(user_id):
     
     # 打刻実績を取得してマージ
     from backend.app.models.support.attendance_workflow import AttendanceRecord
-    from sqlalchemy import func
     
     attendances_in = AttendanceRecord.query.filter_by(
         user_id=user_id,
         record_type='CHECK_IN'
     )
     if start_date_str:
-        attendances_in = attendances_in.filter(func.date(AttendanceRecord.timestamp) >= start_date)
+        attendances_in = attendances_in.filter(AttendanceRecord.attendance_date >= start_date)
     if end_date_str:
-        attendances_in = attendances_in.filter(func.date(AttendanceRecord.timestamp) <= end_date)
+        attendances_in = attendances_in.filter(AttendanceRecord.attendance_date <= end_date)
     attendances_in = attendances_in.all()
     
     attendances_out = AttendanceRecord.query.filter_by(
@@ -302,13 +302,13 @@ def get_daily_schedules(user_id):
         record_type='CHECK_OUT'
     )
     if start_date_str:
-        attendances_out = attendances_out.filter(func.date(AttendanceRecord.timestamp) >= start_date)
+        attendances_out = attendances_out.filter(AttendanceRecord.attendance_date >= start_date)
     if end_date_str:
-        attendances_out = attendances_out.filter(func.date(AttendanceRecord.timestamp) <= end_date)
+        attendances_out = attendances_out.filter(AttendanceRecord.attendance_date <= end_date)
     attendances_out = attendances_out.all()
     
-    att_in_map = {att.timestamp.date(): att for att in attendances_in}
-    att_out_map = {att.timestamp.date(): att for att in attendances_out}
+    att_in_map = {att.attendance_date: att for att in attendances_in}
+    att_out_map = {att.attendance_date: att for att in attendances_out}
     
     # パディング処理
     result = []
@@ -607,6 +607,50 @@ def apply_schedule_template(user_id):
             }
         }), 500
 
+def _usage_dates(user_id, start_date, end_date):
+    """
+    期間内の (予定日, 実績日, 合計利用日) の集合。実績は来所打刻 または 朝・夕の記録を済ませた日報のある日で、
+    自動作成されただけの日報は数えない。
+    """
+    from backend.app.models.support.attendance_workflow import AttendanceRecord
+    from backend.app.models import UserDailyLog
+    
+    attendances = AttendanceRecord.query.filter_by(
+        user_id=user_id,
+        record_type='CHECK_IN'
+    ).filter(
+        AttendanceRecord.attendance_date >= start_date,
+        AttendanceRecord.attendance_date <= end_date
+    ).all()
+    
+    attendance_dates = {att.attendance_date for att in attendances}
+    
+    daily_logs = UserDailyLog.query.filter_by(user_id=user_id).filter(
+        UserDailyLog.log_date >= start_date,
+        UserDailyLog.log_date <= end_date,
+        UserDailyLog.auto_created == False
+    ).filter(
+        (UserDailyLog.morning_completed == True) | (UserDailyLog.evening_completed == True)
+    ).all()
+    
+    log_dates = {log.log_date for log in daily_logs}
+    
+    actual_dates = attendance_dates.union(log_dates)
+    
+    daily_schedules = UserDailySchedule.query.filter_by(
+        user_id=user_id
+    ).filter(
+        UserDailySchedule.date >= start_date,
+        UserDailySchedule.date <= end_date
+    ).all()
+    
+    scheduled_dates = {
+        s.date for s in daily_schedules 
+        if s.is_scheduled and s.approval_status == 'APPROVED'
+    }
+    
+    return scheduled_dates, actual_dates, actual_dates.union(scheduled_dates)
+
 @users_bp.route('/<int:user_id>/monthly-usage-summary', methods=['GET'])
 @jwt_required()
 def get_monthly_usage_summary(user_id):
@@ -661,59 +705,33 @@ def get_monthly_usage_summary(user_id):
         GrantedService.granted_end_date >= start_date
     ).all()
     
-    from backend.app.models.support.attendance_workflow import AttendanceRecord
-    from backend.app.models import UserDailyLog
-    from sqlalchemy import func
-    
-    attendances = AttendanceRecord.query.filter_by(
-        user_id=user_id,
-        record_type='CHECK_IN'
-    ).filter(
-        func.date(AttendanceRecord.timestamp) >= start_date,
-        func.date(AttendanceRecord.timestamp) <= end_date
-    ).all()
-    
-    attendance_dates = {att.timestamp.date() for att in attendances}
-    
-    daily_logs = UserDailyLog.query.filter_by(user_id=user_id).filter(
-        UserDailyLog.log_date >= start_date,
-        UserDailyLog.log_date <= end_date,
-        UserDailyLog.auto_created == False
-    ).filter(
-        (UserDailyLog.morning_completed == True) | (UserDailyLog.evening_completed == True)
-    ).all()
-    
-    log_dates = {log.log_date for log in daily_logs}
-    
-    actual_dates = attendance_dates.union(log_dates)
-    
-    daily_schedules = UserDailySchedule.query.filter_by(
-        user_id=user_id
-    ).filter(
-        UserDailySchedule.date >= start_date,
-        UserDailySchedule.date <= end_date
-    ).all()
-    
-    scheduled_dates = {
-        s.date for s in daily_schedules 
-        if s.is_scheduled and s.approval_status == 'APPROVED'
-    }
-    
-    total_usage_dates = actual_dates.union(scheduled_dates)
-    
+    # 支給期間が月全体に掛かるサービスは利用者×月の集計行から日数を読み、月の途中で始まる・終わる支給期間だけ日付を集計する
+    activity = MonthlyActivityRollup().get_month([user_id], year, month)[user_id]
+    day_sets = None
+
+    def usage_counts(period_start, period_end):
+        """(予定日数, 実績日数, 合計利用日数)"""
+        nonlocal day_sets
+        if period_start <= start_date and period_end >= end_date:
+            return activity['scheduled_days'], activity['actual_days'], activity['usage_days']
+        if day_sets is None:
+            day_sets = _usage_dates(user_id, start_date, end_date)
+        return tuple(len({d for d in dates if period_start <= d <= period_end}) for dates in day_sets)
+
     summaries = []
     
     if not granted_services:
+        scheduled_count, actual_count, total_count = usage_counts(start_date, end_date)
         summaries.append({
             "granted_service_id": None,
             "service_name": "未設定のサービス",
             "service_code": "UNKNOWN",
             "max_service_days": 23,
-            "scheduled_days_count": len(scheduled_dates),
-            "actual_days_count": len(actual_dates),
-            "total_days_count": len(total_usage_dates),
-            "is_exceeded": len(total_usage_dates) > 23,
-            "exceeded_days": max(0, len(total_usage_dates) - 23)
+            "scheduled_days_count": scheduled_count,
+            "actual_days_count": actual_count,
+            "total_days_count": total_count,
+            "is_exceeded": total_count > 23,
+            "exceeded_days": max(0, total_count - 23)
         })
     else:
         for gs in granted_services:
@@ -724,21 +742,18 @@ def get_monthly_usage_summary(user_id):
             
             gs_start = max(start_date, gs.granted_start_date)
             gs_end = min(end_date, gs.granted_end_date)
-            
-            gs_scheduled = {d for d in scheduled_dates if gs_start <= d <= gs_end}
-            gs_actual = {d for d in actual_dates if gs_start <= d <= gs_end}
-            gs_total = {d for d in total_usage_dates if gs_start <= d <= gs_end}
+            scheduled_count, actual_count, total_count = usage_counts(gs_start, gs_end)
             
             summaries.append({
                 "granted_service_id": gs.id,
                 "service_name": gs.service_type.name if gs.service_type else "不明なサービス",
                 "service_code": gs.service_type.service_code if gs.service_type else "UNKNOWN",
                 "max_service_days": max_days,
-                "scheduled_days_count": len(gs_scheduled),
-                "actual_days_count": len(gs_actual),
-                "total_days_count": len(gs_total),
-                "is_exceeded": len(gs_total) > max_days,
-                "exceeded_days": max(0, len(gs_total) - max_days)
+                "scheduled_days_count": scheduled_count,
+                "actual_days_count": actual_count,
+                "total_days_count": total_count,
+                "is_exceeded": total_count > max_days,
+                "exceeded_days": max(0, total_count - max_days)
             })
             
     return jsonify({
@@ -1,6 +1,7 @@
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
 from flask_bcrypt import Bcrypt
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager # ★追加
 from flask_cors import CORS # ★追加
 
@@ -18,14 +19,46 @@ from flask_cors import CORS # ★追加
 # 参照しても、循環参照エラーが発生しないようにする。
 # ====================================================================
 
+class RoutingSession(FlaskSQLAlchemySession):
+    """
+    リードレプリカへの振り分けに対応したセッション。
+    振り分け先は DatabaseRouter（app.extensions['db_router']）が決め、未設定ならプライマリを使う。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            router = current_app.extensions.get('db_router')
+            if router is not None:
+                engine = router.route_bind(self, clause)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
 # データベースオブジェクト (SQLAlchemy)
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # 暗号化オブジェクト (Bcrypt)
 bcrypt = Bcrypt()
 
+class LazyMigrate:
+    """
+    Flask-Migrate の遅延初期化。alembic の読み込みは起動時間の大きな割合を占めるため、
+    init_app が呼ばれるまで flask_migrate を import しない。
+    """
+
+    def __init__(self):
+        self._migrate = None
+
+    def init_app(self, app, db):
+        from flask_migrate import Migrate
+        if self._migrate is None:
+            self._migrate = Migrate()
+        self._migrate.init_app(app, db)
+
+
 # マイグレーションオブジェクト (Migrate)
-migrate = Migrate()
+migrate = LazyMigrate()
 
 # 将来の認証(JWT)オブジェクト
 jwt = JWTManager() 
@@ -45,7 +45,7 @@ from backend.app.models.core.service_certificate import (
     MealAddonStatus, CopaymentManagement
 )
 from backend.app.models.core.audit_log import (
-    SystemLog, AuditActionLog
+    SystemLog, AuditActionLog, AuditArchivePartition
 )
 from backend.app.models.core.holistic_support_policy import (
     HolisticSupportPolicy
@@ -65,6 +65,9 @@ from backend.app.models.staffing import (
 from backend.app.models.core.session_management import (
     SessionLock # PII揮発性のためのモデル
 )
+from backend.app.models.core.replication import (
+    ReplicaHeartbeat # リードレプリカの遅延計測
+)
 from backend.app.models.core.rbac_links import (
     supporter_role_link, role_permission_link
 )
@@ -106,6 +109,9 @@ from backend.app.models.support.attendance_workflow import (
 from backend.app.models.support.case_management import (
     CaseConferenceLog, CaseConferenceParticipant
 )
+from backend.app.models.support.monthly_activity import (
+    UserMonthlyActivity
+)
 
 # --- 4. finance パッケージ ---
 from backend.app.models.finance.billing_compliance import (
@@ -119,7 +125,7 @@ from backend.app.models.finance.accounting_management import (
     CorporateTransferLog
 )
 from backend.app.models.finance.wage_management import (
-    SalesInvoice, UserWageLog
+    SalesInvoice, UserWageLog, FeeCalculationDecision
 )
 
 # --- 5. comms パッケージ ---
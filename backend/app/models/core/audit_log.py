@@ -2,7 +2,7 @@
 
 # 修正点: 'from backend.app.extensions' (絶対参照)
 from backend.app.extensions import db
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Text, func
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Text, func, Index, UniqueConstraint
 
 # ====================================================================
 # 1. SystemLog (システムイベントログ)
@@ -16,6 +16,12 @@ class SystemLog(db.Model):
     log_level = Column(String(20)) # 例: ERROR, WARNING, INFO
     message = Column(Text, nullable=False)
 
+    __table_args__ = (
+        # 月単位のアーカイブ移動と期間検索のため、時刻 + id の複合索引を持つ
+        Index('ix_system_logs_timestamp_id', 'timestamp', 'id'),
+        Index('ix_system_logs_level_timestamp', 'log_level', 'timestamp', 'id'),
+    )
+
 # ====================================================================
 # 2. AuditActionLog (操作監査証跡)
 # ====================================================================
@@ -44,6 +50,52 @@ class AuditActionLog(db.Model):
     
     created_at = Column(DateTime, default=func.now(), nullable=False)
     
+    # スプール経由で書き込まれたイベントの一意ID（再送時の重複排除に使う）
+    event_id = Column(String(32), nullable=True, unique=True)
+    
     # リレーションシップ
     supporter = db.relationship('Supporter', foreign_keys=[actor_supporter_id])
-    user = db.relationship('User', foreign_keys=[user_id])
\ No newline at end of file
+    user = db.relationship('User', foreign_keys=[user_id])
+
+    __table_args__ = (
+        # 監査検索（操作者・対象・操作種別 × 期間）を (created_at, id) のキーセットで辿るための複合索引
+        Index('ix_audit_action_logs_created_id', 'created_at', 'id'),
+        Index('ix_audit_action_logs_actor_created', 'actor_supporter_id', 'created_at', 'id'),
+        Index('ix_audit_action_logs_entity_created', 'entity_type', 'entity_id', 'created_at', 'id'),
+        Index('ix_audit_action_logs_action_created', 'action', 'created_at', 'id'),
+    )
+
+
+# ====================================================================
+# 3. AuditArchivePartition (アーカイブ済み月次パーティションの目録)
+# ====================================================================
+class AuditArchivePartition(db.Model):
+    """
+    監査ログ・システムログの月次パーティションのうち、ローカルディスクの圧縮アーカイブへ移したものの目録。
+    検索時は期間と、パーティション内に含まれる操作者・操作種別・対象種別の一覧で読むファイルを絞り込む。
+    """
+    __tablename__ = 'audit_archive_partitions'
+
+    id = Column(Integer, primary_key=True)
+    source_table = Column(String(50), nullable=False) # 'audit_action_logs' / 'system_logs'
+    period_start = Column(Date, nullable=False) # 対象月の月初
+    part_no = Column(Integer, nullable=False, default=1) # 同じ月を追加で移した場合の連番
+    file_path = Column(String(500), nullable=False) # アーカイブディレクトリからの相対パス
+    checksum = Column(String(64), nullable=False) # ファイルの SHA-256
+
+    row_count = Column(Integer, nullable=False)
+    min_id = Column(Integer)
+    max_id = Column(Integer)
+    min_time = Column(DateTime)
+    max_time = Column(DateTime)
+
+    # 絞り込み用の要約（JSON配列）
+    actor_ids = Column(Text)
+    actions = Column(Text)
+    entity_types = Column(Text)
+
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('source_table', 'period_start', 'part_no', name='uq_audit_archive_partitions_table_period_part'),
+    )
\ No newline at end of file
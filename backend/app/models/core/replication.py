@@ -0,0 +1,15 @@
+# backend/app/models/core/replication.py
+
+from backend.app.extensions import db
+from sqlalchemy import Column, Integer, DateTime
+
+
+class ReplicaHeartbeat(db.Model):
+    """
+    リードレプリカの遅延計測用のハートビート（1行のみ）。
+    プライマリで定期的に更新し、レプリカ側に届いている値との差を遅延とみなす。
+    """
+    __tablename__ = 'replica_heartbeats'
+
+    id = Column(Integer, primary_key=True)
+    beat_at = Column(DateTime, nullable=False)
@@ -36,6 +36,12 @@ class StaffActionLog(db.Model):
     AIがこれを集約し、業務日報（StaffDailyReport）の下書きを生成する。
     """
     __tablename__ = 'staff_action_logs'
+    __table_args__ = (
+        # 日次集計は action_timestamp の範囲条件で引くため、職員×時刻の複合インデックスを張る
+        db.Index('ix_staff_action_logs_supporter_timestamp', 'supporter_id', 'action_timestamp'),
+        # 終業時の一括日報生成（全職員の未処理ログ走査）用
+        db.Index('ix_staff_action_logs_unprocessed_timestamp', 'is_processed_by_ai', 'action_timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
     supporter_id = Column(Integer, ForeignKey('supporters.id'), nullable=False, index=True)
@@ -209,7 +209,11 @@ class SupporterTimecard(db.Model):
 
     __table_args__ = (
         UniqueConstraint('supporter_id', 'work_date', 'sequence_no', name='uq_supporter_timecards_supporter_date_seq'),
-        Index('uq_supporter_ongoing_timecard', 'supporter_id', unique=True, postgresql_where=db.text('check_in IS NOT NULL AND check_out IS NULL')),
+        Index(
+            'uq_supporter_ongoing_timecard', 'supporter_id', unique=True,
+            postgresql_where=db.text('check_in IS NOT NULL AND check_out IS NULL'),
+            sqlite_where=db.text('check_in IS NOT NULL AND check_out IS NULL'),
+        ),
     )
 
 
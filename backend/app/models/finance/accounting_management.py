@@ -49,6 +49,8 @@ class ClientInvoice(db.Model):
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     billing_month = Column(Date, nullable=False, index=True) # 請求対象月
+    # 請求元のサービス（上限額管理で事業所ごとに負担額を按分するため）。按分導入前の請求書は NULL
+    office_service_configuration_id = Column(Integer, ForeignKey('office_service_configurations.id'), nullable=True, index=True)
     
     # --- 請求内容 ---
     self_pay_amount = Column(Numeric(precision=10, scale=2), nullable=False) # 1割負担などの自己負担額
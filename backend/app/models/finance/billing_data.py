@@ -15,6 +15,8 @@ class BillingData(db.Model):
     # 請求根拠 (Plan-Activity ガードレール)
     plan_id = Column(Integer, ForeignKey('support_plans.id'), nullable=True, index=True)
     user_daily_log_id = Column(Integer, ForeignKey('user_daily_logs.id'), nullable=True, index=True)
+    # どのサービス(事業所番号)の請求か（同じサービス種類の複数事業所を区別する。月次請求エンジンが記録する）
+    office_service_configuration_id = Column(Integer, ForeignKey('office_service_configurations.id'), nullable=True, index=True)
     
     # 請求詳細
     service_type = Column(String(50), nullable=False)
@@ -65,6 +65,8 @@ class UserWageLog(db.Model):
     gross_wage_amount = Column(Numeric(precision=10, scale=2), nullable=False) # 総工賃額
     deductions = Column(Numeric(precision=10, scale=2)) # 控除額（ある場合）
     net_payment_amount = Column(Numeric(precision=10, scale=2), nullable=False) # 差引支払額
+    # 計算に使った入力（製品別の良品数・単価、作業時間、時間単価）のJSON。同じ入力からの再計算で同額になることの証跡
+    calculation_snapshot = Column(Text)
     
     payment_timestamp = Column(DateTime) # 支払日（証跡）
     
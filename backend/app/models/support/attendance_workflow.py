@@ -2,7 +2,9 @@
 
 # 修正点: 'from backend.app.extensions' (絶対参照)
 from backend.app.extensions import db
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Text, func
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Text, func, event
+from sqlalchemy.orm import validates
+from backend.app.utils.timezone import get_jst_today, jst_date_of, to_jst_wall_time
 
 # ====================================================================
 # 1. AttendanceRecord (利用者によるセルフ打刻)
@@ -21,6 +23,8 @@ class AttendanceRecord(db.Model):
     record_type = Column(String(20), nullable=False) 
     
     timestamp = Column(DateTime, nullable=False, default=func.now()) # 打刻日時
+    # 打刻日（JST）。DATE(timestamp) での検索はインデックスが効かないため、日付を実カラムとして保持する
+    attendance_date = Column(Date, nullable=False, index=True)
     
     # 打刻時の場所情報（証跡）
     location_data = Column(String(255)) # GPS座標またはIPアドレス
@@ -30,6 +34,28 @@ class AttendanceRecord(db.Model):
     
     user = db.relationship('User')
 
+    __table_args__ = (
+        db.Index('ix_attendance_records_user_type_date', 'user_id', 'record_type', 'attendance_date'),
+    )
+
+    @validates('timestamp')
+    def _sync_attendance_date(self, key, value):
+        """
+        打刻日時はJSTの壁時計時刻（naive）に揃えて保存し、attendance_date を追従させる。
+        クライアントからUTC（...Z）で届いた打刻も、DATE(timestamp) と attendance_date が同じ日になる。
+        """
+        if value is not None:
+            value = to_jst_wall_time(value)
+            self.attendance_date = jst_date_of(value)
+        return value
+
+
+@event.listens_for(AttendanceRecord, 'before_insert')
+def _default_attendance_date(mapper, connection, target):
+    # timestamp をDBデフォルト(func.now())に任せた場合の補完
+    if target.attendance_date is None:
+        target.attendance_date = get_jst_today()
+
 # ====================================================================
 # 2. UserAttendanceCorrectionRequest (利用者による勤怠修正申請)
 # ====================================================================
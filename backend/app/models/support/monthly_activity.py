@@ -0,0 +1,34 @@
+# backend/app/models/support/monthly_activity.py
+
+from backend.app.extensions import db
+from sqlalchemy import Column, Integer, ForeignKey, Date, DateTime, UniqueConstraint, func
+
+# ====================================================================
+# 1. UserMonthlyActivity (利用者×月の活動集計)
+# ====================================================================
+class UserMonthlyActivity(db.Model):
+    """
+    利用者ごと・月ごとの活動件数の集計（ロールアップ）。
+    打刻・日報・支援記録・通所予定の書き込み時に該当する (利用者, 月) を再集計して更新する
+    （services/monthly_activity_service.py）。月次の画面はイベントを集計し直さずにこの1行を読む。
+    """
+    __tablename__ = 'user_monthly_activities'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    activity_month = Column(Date, nullable=False, index=True) # 対象月（1日）
+
+    attendance_days = Column(Integer, default=0, nullable=False) # 来所打刻（CHECK_IN）のあった日数
+    scheduled_days = Column(Integer, default=0, nullable=False) # 承認済みの通所予定の日数
+    completed_logs = Column(Integer, default=0, nullable=False) # 完了（COMPLETED）した日報の件数
+    support_minutes = Column(Integer, default=0, nullable=False) # 支援記録の支援時間（分）の合計
+    off_site_days = Column(Integer, default=0, nullable=False) # 施設外（就労・在宅）の日報のある日数
+    # 利用実績の日数（来所打刻 または 朝・夕の記録を済ませた日報のある日）と、それに予定日を合わせた日数
+    actual_days = Column(Integer, default=0, nullable=False)
+    usage_days = Column(Integer, default=0, nullable=False)
+
+    refreshed_at = Column(DateTime, default=func.now(), nullable=False) # 最後に再集計した日時
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'activity_month', name='uq_user_monthly_activity'),
+    )
@@ -1,66 +1,590 @@
 import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from flask import current_app
 
+logger = logging.getLogger(__name__)
+
+
+class AIGatewayTimeoutError(ValueError):
+    """AI呼び出しがタイムアウト（同時実行枠の待機・モデル応答のいずれか）した場合の例外"""
+    pass
+
+
+# ====================================================================
+# 1. プロバイダ (モデル呼び出しの実体)
+# ====================================================================
+
+class GeminiProvider:
+    """
+    google-genai SDK を利用するプロバイダ。
+    genai.Client は APIキー単位で1度だけ生成し、以降の呼び出しで再利用する。
+    """
+    name = "gemini"
+
+    def __init__(self, api_key: str, timeout_seconds: float):
+        from google import genai
+        from google.genai import types
+        self.types = types
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(timeout=int(timeout_seconds * 1000))
+        )
+
+    def generate(self, model: str, prompt: str, system_instruction: str = None, options: dict = None) -> dict:
+        options = options or {}
+        config_kwargs = {}
+        if system_instruction:
+            config_kwargs['system_instruction'] = system_instruction
+        for key in ('response_mime_type', 'response_schema', 'temperature'):
+            if options.get(key) is not None:
+                config_kwargs[key] = options[key]
+
+        config = self.types.GenerateContentConfig(**config_kwargs) if config_kwargs else None
+        response = self.client.models.generate_content(model=model, contents=prompt, config=config)
+
+        usage = getattr(response, 'usage_metadata', None)
+        return {
+            "text": response.text,
+            "prompt_tokens": getattr(usage, 'prompt_token_count', None) or 0,
+            "output_tokens": getattr(usage, 'candidates_token_count', None) or 0,
+        }
+
+
+class LocalStubProvider:
+    """
+    オフライン検証用の決定的（deterministic）スタブプロバイダ。
+    同じ入力には常に同じ出力を返すため、キャッシュや合流のテストに利用できる。
+    responder を渡すと、応答生成をテスト側で差し替えられる。
+    """
+    name = "stub"
+
+    def __init__(self, responder=None, latency_seconds: float = 0.0):
+        self.responder = responder
+        self.latency_seconds = latency_seconds
+        self.call_count = 0
+        self._lock = threading.Lock()
+
+    def generate(self, model: str, prompt: str, system_instruction: str = None, options: dict = None) -> dict:
+        options = options or {}
+        with self._lock:
+            self.call_count += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+        if self.responder:
+            text = self.responder(model, prompt, system_instruction, options)
+        elif options.get('response_mime_type') == 'application/json':
+            text = "{}"
+        else:
+            text = f"[Mock AI Response - {model}] 開発環境のためAPIキーが未設定です。プロンプト: {prompt[:20]}..."
+
+        return {
+            "text": text,
+            "prompt_tokens": _estimate_tokens(prompt) + _estimate_tokens(system_instruction),
+            "output_tokens": _estimate_tokens(text),
+        }
+
+
+def _estimate_tokens(text: str) -> int:
+    """スタブ用の簡易トークン概算（4文字 ≒ 1トークン）"""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+# ====================================================================
+# 2. 応答キャッシュ (メモリ + ディスク / 内容アドレス方式)
+# ====================================================================
+
+class AIResponseCache:
+    """
+    モデル名・システム指示・プロンプトのハッシュをキーとする応答キャッシュ。
+    メモリ(LRU)を一次層、ディスク(JSONファイル)を二次層とする。
+    ディスク層は期限切れのファイルを読み込み時に削除し、合計サイズが max_disk_bytes を
+    超えた時点で古いものから削除する。個人情報を含む応答はディスクに書き出さない（persist=False）。
+    """
+
+    def __init__(self, cache_dir: str = None, max_entries: int = 512, ttl_seconds: int = 86400, max_disk_bytes: int = 50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None  # 初回書き込み時にディレクトリを走査して求める
+
+    @staticmethod
+    def build_key(model: str, prompt: str, system_instruction: str = None, options: dict = None) -> str:
+        options = dict(options or {})
+        if options.get('response_schema') is not None:
+            options['response_schema'] = _schema_fingerprint(options['response_schema'])
+        payload = json.dumps({
+            "model": model,
+            "system_instruction": system_instruction or "",
+            "prompt_sha256": hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+            "options": options,
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _is_fresh(self, entry: dict) -> bool:
+        if not self.ttl_seconds:
+            return True
+        return (time.time() - entry.get('created_at', 0)) <= self.ttl_seconds
+
+    def get(self, key: str):
+        """(entry, layer) を返す。layer は 'memory' / 'disk'。見つからなければ (None, None)。"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._is_fresh(entry):
+                    self._memory.move_to_end(key)
+                    return entry, 'memory'
+                del self._memory[key]
+
+        if not self.cache_dir:
+            return None, None
+
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None, None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ AI cache entry unreadable ({path}): {e}")
+            return None, None
+
+        if not self._is_fresh(entry):
+            self._remove_file(path)
+            return None, None
+
+        self._remember(key, entry)
+        return entry, 'disk'
+
+    def set(self, key: str, entry: dict, persist: bool = True):
+        self._remember(key, entry)
+        if not self.cache_dir or not persist:
+            return
+
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 書き込み途中のファイルを読まれないよう、一時ファイル経由で置き換える
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ AI cache write failed ({path}): {e}")
+            return
+
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._scan_disk())
+            else:
+                self._disk_bytes += os.path.getsize(path) - previous_size
+            over_limit = self.max_disk_bytes and self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self.prune()
+
+    def prune(self) -> int:
+        """期限切れのファイルを削除し、合計サイズが上限の 9 割に収まるまで古い順に削除する。削除件数を返す"""
+        if not self.cache_dir:
+            return 0
+        with self._disk_lock:
+            files = sorted(self._scan_disk(), key=lambda f: f[2])
+            total = sum(size for _, size, _ in files)
+            target = int(self.max_disk_bytes * 0.9) if self.max_disk_bytes else None
+            expire_before = time.time() - self.ttl_seconds if self.ttl_seconds else None
+            removed = 0
+            for path, size, mtime in files:
+                expired = expire_before is not None and mtime < expire_before
+                if not expired and (target is None or total <= target):
+                    continue
+                if self._remove_file(path):
+                    total -= size
+                    removed += 1
+            self._disk_bytes = total
+        if removed:
+            logger.info(f"🧹 AI cache pruned: {removed} files removed, {total} bytes kept")
+        return removed
+
+    def _scan_disk(self):
+        """(path, size, mtime) を列挙する"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        files = []
+        for root, _dirs, names in os.walk(self.cache_dir):
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    @staticmethod
+    def _remove_file(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _remember(self, key: str, entry: dict):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+
+def _schema_fingerprint(schema):
+    """
+    response_schema をキャッシュキー用に正規化する。
+    pydantic モデル（list[Model] などの型を含む）は JSON Schema に展開し、フィールド変更をキーに反映させる。
+    """
+    if isinstance(schema, (dict, str)):
+        return schema
+    if hasattr(schema, 'model_json_schema'):
+        return schema.model_json_schema()
+    try:
+        from pydantic import TypeAdapter
+        return TypeAdapter(schema).json_schema()
+    except Exception:
+        return repr(schema)
+
+
+# ====================================================================
+# 3. 同一プロンプトの合流 (single-flight)
+# ====================================================================
+
+class _InFlightCall:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    同一キーの呼び出しが同時に複数到着した場合、最初の1件(リーダー)だけが
+    モデルを呼び出し、残りはその結果を共有する。
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: str, func, wait_timeout: float = None):
+        """(result, coalesced) を返す。"""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+
+        if not is_leader:
+            if not call.event.wait(wait_timeout):
+                raise AIGatewayTimeoutError("AIの生成待機がタイムアウトしました。")
+            if call.error:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+
+# ====================================================================
+# 4. 呼び出しメトリクス
+# ====================================================================
+
+class AIGatewayMetrics:
+    """呼び出し単位のレイテンシ・トークン数と、その累計を保持する。"""
+
+    def __init__(self, recent_size: int = 200):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=recent_size)
+        self._totals = {
+            "calls": 0,
+            "provider_calls": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "total_latency_ms": 0.0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+        }
+
+    def record(self, model: str, source: str, latency_ms: float, prompt_tokens: int = 0, output_tokens: int = 0, status: str = "OK"):
+        """source: PROVIDER / MEMORY / DISK / COALESCED"""
+        with self._lock:
+            totals = self._totals
+            totals["calls"] += 1
+            totals["total_latency_ms"] += latency_ms
+            if status == "TIMEOUT":
+                totals["timeouts"] += 1
+            elif status != "OK":
+                totals["errors"] += 1
+            elif source == "PROVIDER":
+                totals["provider_calls"] += 1
+                totals["prompt_tokens"] += prompt_tokens
+                totals["output_tokens"] += output_tokens
+            elif source == "MEMORY":
+                totals["memory_hits"] += 1
+            elif source == "DISK":
+                totals["disk_hits"] += 1
+            elif source == "COALESCED":
+                totals["coalesced"] += 1
+
+            self._recent.append({
+                "model": model,
+                "source": source,
+                "status": status,
+                "latency_ms": round(latency_ms, 2),
+                "prompt_tokens": prompt_tokens,
+                "output_tokens": output_tokens,
+                "recorded_at": time.time(),
+            })
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            totals = dict(self._totals)
+            recent = list(self._recent)
+        calls = totals["calls"]
+        totals["avg_latency_ms"] = round(totals["total_latency_ms"] / calls, 2) if calls else 0.0
+        totals["total_latency_ms"] = round(totals["total_latency_ms"], 2)
+        return {"totals": totals, "recent_calls": recent}
+
+
+# ====================================================================
+# 5. ゲートウェイ本体
+# ====================================================================
+
+class AIGatewayRuntime:
+    """
+    アプリケーション単位で共有されるゲートウェイの実行時状態。
+    キャッシュ → 合流 → 同時実行数制御 → プロバイダ呼び出し の順に処理する。
+    プロバイダ呼び出しは専用スレッドで実行し、timeout_seconds を超えた時点で呼び出し元へ
+    AIGatewayTimeoutError を返す（応答が返るまで同時実行枠は解放しない）。
+    """
+
+    def __init__(self, provider, cache: AIResponseCache, max_concurrency: int = 4, timeout_seconds: float = 30.0):
+        self.provider = provider
+        self.cache = cache
+        self.timeout_seconds = timeout_seconds
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.single_flight = SingleFlight()
+        self.metrics = AIGatewayMetrics()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='ai-gateway')
+
+    def generate(self, model: str, prompt: str, system_instruction: str = None, options: dict = None,
+                 use_cache: bool = True, persist: bool = True) -> dict:
+        started = time.perf_counter()
+        key = AIResponseCache.build_key(model, prompt, system_instruction, options)
+
+        if use_cache:
+            entry, layer = self.cache.get(key)
+            if entry is not None:
+                self.metrics.record(model, layer.upper(), _elapsed_ms(started))
+                return entry
+
+        try:
+            entry, coalesced = self.single_flight.run(
+                key,
+                lambda: self._call_provider(model, prompt, system_instruction, options, key, use_cache, persist),
+                wait_timeout=self.timeout_seconds * 2
+            )
+        except AIGatewayTimeoutError:
+            self.metrics.record(model, "PROVIDER", _elapsed_ms(started), status="TIMEOUT")
+            raise
+        except Exception:
+            self.metrics.record(model, "PROVIDER", _elapsed_ms(started), status="ERROR")
+            raise
+
+        if coalesced:
+            self.metrics.record(model, "COALESCED", _elapsed_ms(started))
+        else:
+            self.metrics.record(model, "PROVIDER", _elapsed_ms(started), entry["prompt_tokens"], entry["output_tokens"])
+        return entry
+
+    def _call_provider(self, model, prompt, system_instruction, options, key, use_cache, persist) -> dict:
+        if not self.semaphore.acquire(timeout=self.timeout_seconds):
+            raise AIGatewayTimeoutError("AIの同時実行枠が空かず、タイムアウトしました。")
+
+        def call():
+            try:
+                return self.provider.generate(model, prompt, system_instruction, options)
+            finally:
+                self.semaphore.release()
+
+        called_at = time.perf_counter()
+        try:
+            future = self._executor.submit(call)
+        except RuntimeError:
+            self.semaphore.release()
+            raise
+        try:
+            result = future.result(timeout=self.timeout_seconds)
+        except FutureTimeoutError:
+            logger.warning(f"⚠️ AI provider call timed out after {self.timeout_seconds}s ({self.provider.name}/{model})")
+            raise AIGatewayTimeoutError("AIの応答がタイムアウトしました。")
+        latency_ms = _elapsed_ms(called_at)
+
+        entry = {
+            "model": model,
+            "text": result["text"],
+            "prompt_tokens": result.get("prompt_tokens", 0),
+            "output_tokens": result.get("output_tokens", 0),
+            "provider": self.provider.name,
+            "created_at": time.time(),
+        }
+        if use_cache:
+            self.cache.set(key, entry, persist=persist)
+        logger.info(f"🤖 AI call ({self.provider.name}/{model}): {latency_ms:.0f}ms, tokens in={entry['prompt_tokens']} out={entry['output_tokens']}")
+        return entry
+
+
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000
+
+
 class AIGatewayService:
     """
     Ramp-System全体のAI連携を統括するゲートウェイサービス。
     Gemini APIを利用してテキスト生成を行います。
     テスト時のコストを最小化するため、用途に応じて軽量モデルと高性能モデルを切り替えます。
+    応答キャッシュ・同一プロンプトの合流・同時実行数制御・タイムアウト・メトリクスは
+    アプリケーション単位の AIGatewayRuntime が担います。
     """
-    
+
     FLASH_MODEL = "gemini-3.5-flash"
     PRO_MODEL = "gemini-3.5-flash" # Proモデルが未確定のためFlashで代用
-    
+
+    EXTENSION_KEY = 'ai_gateway'
+    _runtime_lock = threading.Lock()
+
     @classmethod
-    def _get_client(cls):
+    def _build_provider(cls, config):
+        provider_name = (config.get('AI_PROVIDER') or 'auto').lower()
+        timeout_seconds = float(config.get('AI_TIMEOUT_SECONDS', 30))
+
+        if provider_name == 'stub':
+            return LocalStubProvider()
+
+        api_key = config.get('GEMINI_API_KEY')
+        if not api_key:
+            return LocalStubProvider()
+
         # google-genaiの新しいSDKのインポート
         try:
-            from google import genai
+            return GeminiProvider(api_key, timeout_seconds)
         except ImportError:
-            return None
-            
-        api_key = current_app.config.get('GEMINI_API_KEY')
-        if not api_key:
-            return None
-            
-        return genai.Client(api_key=api_key)
+            logger.warning("⚠️ google-genai is not installed. Falling back to the local stub provider.")
+            return LocalStubProvider()
+
+    @classmethod
+    def get_runtime(cls) -> AIGatewayRuntime:
+        """現在のアプリケーションに紐づくゲートウェイを取得する（初回のみ生成）。"""
+        app = current_app._get_current_object()
+        runtime = app.extensions.get(cls.EXTENSION_KEY)
+        if runtime is not None:
+            return runtime
+
+        with cls._runtime_lock:
+            runtime = app.extensions.get(cls.EXTENSION_KEY)
+            if runtime is None:
+                config = app.config
+                cache = AIResponseCache(
+                    cache_dir=config.get('AI_CACHE_DIR'),
+                    max_entries=int(config.get('AI_CACHE_MAX_ENTRIES', 512)),
+                    ttl_seconds=int(config.get('AI_CACHE_TTL_SECONDS', 86400)),
+                    max_disk_bytes=int(config.get('AI_CACHE_MAX_DISK_BYTES', 50 * 1024 * 1024))
+                )
+                runtime = AIGatewayRuntime(
+                    provider=cls._build_provider(config),
+                    cache=cache,
+                    max_concurrency=int(config.get('AI_MAX_CONCURRENCY', 4)),
+                    timeout_seconds=float(config.get('AI_TIMEOUT_SECONDS', 30))
+                )
+                app.extensions[cls.EXTENSION_KEY] = runtime
+        return runtime
+
+    @classmethod
+    def set_runtime(cls, runtime: AIGatewayRuntime):
+        """ゲートウェイを差し替える（テストやスタブ運用向け）。"""
+        current_app.extensions[cls.EXTENSION_KEY] = runtime
+
+    @classmethod
+    def is_live(cls) -> bool:
+        """実モデル(スタブ以外)のプロバイダが構成されているか。"""
+        return cls.get_runtime().provider.name != 'stub'
+
+    @classmethod
+    def generate_content(cls, prompt: str, model_name: str, system_instruction: str = None, options: dict = None,
+                         use_cache: bool = True, contains_pii: bool = False) -> dict:
+        """
+        ゲートウェイ経由でモデルを呼び出し、テキストとトークン数を含む結果を返す。
+        options には response_mime_type / response_schema / temperature を指定できる。
+        contains_pii=True の呼び出し（職員・利用者の記録を含むもの）はメモリ上にのみキャッシュする。
+        """
+        try:
+            return cls.get_runtime().generate(
+                model_name, prompt, system_instruction, options, use_cache=use_cache, persist=not contains_pii
+            )
+        except AIGatewayTimeoutError:
+            raise
+        except Exception as e:
+            current_app.logger.error(f"Gemini API Error: {str(e)}")
+            raise ValueError(f"AIの生成中にエラーが発生しました: {str(e)}")
 
     @classmethod
-    def generate_text(cls, prompt: str, use_pro: bool = False, system_instruction: str = None) -> str:
+    def generate_text(cls, prompt: str, use_pro: bool = False, system_instruction: str = None, contains_pii: bool = False) -> str:
         """
         AIにプロンプトを送信し、テキストを生成します。
-        
+
         Args:
             prompt (str): ユーザー入力プロンプト
             use_pro (bool): Trueの場合は高性能なGemini 1.5 Proを使用。Falseの場合は安価/高速なFlashを使用。
             system_instruction (str): AIに対するシステム指示（オプション）
-            
+            contains_pii (bool): 個人情報を含む場合はTrue。応答をディスクキャッシュに残さない。
+
         Returns:
-            str: AIからの返答テキスト。APIキーがない場合はモックテキストを返します。
+            str: AIからの返答テキスト。APIキーがない場合はスタブのモックテキストを返します。
         """
-        client = cls._get_client()
-        
-        if not client:
-            model_name = cls.PRO_MODEL if use_pro else cls.FLASH_MODEL
-            return f"[Mock AI Response - {model_name}] 開発環境のためAPIキーが未設定です。プロンプト: {prompt[:20]}..."
-
         model_name = cls.PRO_MODEL if use_pro else cls.FLASH_MODEL
-        
-        try:
-            # system_instructionが指定された場合は設定に追加
-            config = None
-            if system_instruction:
-                from google.genai import types
-                config = types.GenerateContentConfig(
-                    system_instruction=system_instruction,
-                )
-                
-            response = client.models.generate_content(
-                model=model_name,
-                contents=prompt,
-                config=config
-            )
-            return response.text
-        except Exception as e:
-            current_app.logger.error(f"Gemini API Error: {str(e)}")
-            raise ValueError(f"AIの生成中にエラーが発生しました: {str(e)}")
+        result = cls.generate_content(prompt, model_name, system_instruction=system_instruction, contains_pii=contains_pii)
+        return result["text"]
+
+    @classmethod
+    def get_metrics(cls) -> dict:
+        runtime = cls.get_runtime()
+        snapshot = runtime.metrics.snapshot()
+        snapshot["provider"] = runtime.provider.name
+        return snapshot
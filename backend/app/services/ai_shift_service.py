@@ -1,4 +1,3 @@
-import os
 import json
 from typing import List, Dict
 from pydantic import BaseModel, Field
@@ -15,20 +14,18 @@ class ShiftOverwriteList(BaseModel):
     overwrites: list[ShiftOverwrite]
 
 class AiShiftService:
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        self.client = None
-        if self.api_key:
-            try:
-                from google import genai
-                from google.genai import types
-                self.client = genai.Client(api_key=self.api_key)
-                self.types = types
-            except ImportError:
-                print("WARNING: google-genai is not installed properly.")
+    MODEL_NAME = 'gemini-1.5-flash'
+
+    @property
+    def is_available(self) -> bool:
+        """実モデルに接続できる場合のみAI調整を行う（スタブ時は通常生成にフォールバック）"""
+        from backend.app.services.ai_gateway_service import AIGatewayService
+        return AIGatewayService.is_live()
             
     def adjust_shifts(self, current_shifts: List[Dict], patterns: List[Dict], instruction: str) -> List[Dict]:
-        if not self.client:
+        from backend.app.services.ai_gateway_service import AIGatewayService
+
+        if not self.is_available:
             print("WARNING: GEMINI_API_KEY is not set or google-genai missing. Using dummy fallback (No changes).")
             # Fallback: if no AI, we just return empty list and let the normal generation handle it.
             return []
@@ -55,16 +52,17 @@ class AiShiftService:
         try:
             # Note: We use gemini-1.5-flash as the actual model endpoint, 
             # even though we refer to it conceptually as the latest generation.
-            response = self.client.models.generate_content(
-                model='gemini-1.5-flash',
-                contents=prompt,
-                config=self.types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=ShiftOverwriteList,
-                    temperature=0.0
-                ),
+            # ゲートウェイ経由で呼び出すため、同一入力はキャッシュされ、同時実行数も制御される。
+            response = AIGatewayService.generate_content(
+                prompt,
+                model_name=self.MODEL_NAME,
+                options={
+                    "response_mime_type": "application/json",
+                    "response_schema": ShiftOverwriteList,
+                    "temperature": 0.0
+                }
             )
-            data = json.loads(response.text)
+            data = json.loads(response["text"])
             return data.get("overwrites", [])
         except Exception as e:
             print("Failed to parse AI response:", e)
@@ -1,21 +1,63 @@
 # backend/app/services/attendance_service.py
 
 import calendar
-from datetime import date, datetime
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from backend.app.models import Supporter, EmploymentShiftPattern, StaffDailyShift, SupporterTimecard, AttendanceCorrectionRequest
+from backend.app.models import (
+    Supporter, EmploymentShiftPattern, StaffDailyShift, SupporterTimecard, AttendanceCorrectionRequest,
+    SupporterJobAssignment, OfficeSetting, OfficeServiceConfiguration
+)
 from backend.app.domain.attendance.fte_calculation import FteCalculationDomain
 from backend.app.domain.attendance.decision_rules import AttendanceDecisionDomain
+from backend.app.services.presence_service import PresenceService
 from backend.app.domain.attendance.exceptions import (
     AttendanceDomainError,
     AttendanceValidationError,
     AttendanceNotFoundError,
-    AttendanceConflictError
+    AttendanceConflictError,
+    AttendanceForbiddenError
 )
 
+VALID_LOCATION_TYPES = {"OFFICE", "CLIENT_COMPANY", "USER_HOME", "REMOTE", "EXTERNAL_FACILITY", "TRAVEL", "OTHER"}
+PUNCH_ACTIONS = ('clock_in', 'clock_out')
+
+
+def intervals_overlap(e_start: datetime, e_end: datetime, n_start: datetime, n_end: datetime) -> bool:
+    """勤務区間の重複判定（終了が None は勤務中）"""
+    if e_end is None and n_end is None:
+        return True
+    if e_end is None:
+        return n_end > e_start
+    if n_end is None:
+        return n_start < e_end
+    return max(e_start, n_start) < min(e_end, n_end)
+
+
+@dataclass
+class PunchEntry:
+    """一括打刻の1エントリ（検証済み）"""
+    index: int
+    client_id: str
+    supporter_id: int
+    action: str
+    timestamp: datetime
+    location_type: str = None
+    location_detail: str = None
+    break_minutes: int = 0
+
+
 class AttendanceService:
     def __init__(self, db_session: Session):
         self.db = db_session
+
+    def _notify_presence(self, supporter_id: int):
+        """在席ボードへの反映を予約する（コミット時に再計算、ロールバック時は破棄）"""
+        PresenceService.mark_changed(self.db, supporter_id)
         
     def _check_admin_authorization(self, approver_id: int):
         """
@@ -67,6 +109,7 @@ class AttendanceService:
             planned_break_minutes=data.get('break_minutes', 0)
         )
         self.db.add(shift)
+        self._notify_presence(supporter_id)
         self.db.commit()
         return shift
 
@@ -87,6 +130,7 @@ class AttendanceService:
         if 'break_minutes' in data:
             shift.planned_break_minutes = data['break_minutes']
             
+        self._notify_presence(shift.supporter_id)
         self.db.commit()
         return shift
 
@@ -101,6 +145,7 @@ class AttendanceService:
             raise AttendanceConflictError("Cannot delete a confirmed shift.")
             
         self.db.delete(shift)
+        self._notify_presence(shift.supporter_id)
         self.db.commit()
 
     def generate_monthly_shifts(self, target_year: int, target_month: int, supporter_id: int = None, ai_instruction: str = None):
@@ -150,7 +195,7 @@ class AttendanceService:
         if ai_instruction:
             from backend.app.services.ai_shift_service import AiShiftService
             ai_svc = AiShiftService()
-            if ai_svc.client:
+            if ai_svc.is_available:
                 # Gather data for AI
                 current_shifts_data = []
                 start_date = date(target_year, target_month, 1)
@@ -302,27 +347,10 @@ class AttendanceService:
             query = query.filter(SupporterTimecard.id != exclude_timecard_id)
             
         timecards = query.all()
-        for tc in timecards:
-            if not tc.check_in:
-                continue
-            e_start = tc.check_in
-            e_end = tc.check_out
-            n_start = start_time
-            n_end = end_time
-            
-            if e_end is None and n_end is None:
-                return True
-            if e_end is None:
-                if n_end is None or n_end > e_start:
-                    return True
-                continue
-            if n_end is None:
-                if n_start < e_end:
-                    return True
-                continue
-            if max(e_start, n_start) < min(e_end, n_end):
-                return True
-        return False
+        return any(
+            tc.check_in and intervals_overlap(tc.check_in, tc.check_out, start_time, end_time)
+            for tc in timecards
+        )
 
     def get_ongoing_timecard(self, supporter_id: int) -> SupporterTimecard:
         ongoing_timecards = self.db.query(SupporterTimecard).filter(
@@ -338,10 +366,6 @@ class AttendanceService:
         return None
 
     def clock_in(self, supporter_id: int, office_id: int, location_type: str, location_detail: str) -> SupporterTimecard:
-        from sqlalchemy.exc import IntegrityError
-        from zoneinfo import ZoneInfo
-        from backend.app.domain.attendance.exceptions import AttendanceForbiddenError
-        
         supporter = (
             self.db.query(Supporter)
             .filter(Supporter.id == supporter_id)
@@ -358,16 +382,12 @@ class AttendanceService:
         if ongoing:
             raise AttendanceConflictError("Already clocked in")
 
-        valid_locations = {"OFFICE", "CLIENT_COMPANY", "USER_HOME", "REMOTE", "EXTERNAL_FACILITY", "TRAVEL", "OTHER"}
-        if location_type not in valid_locations:
+        if location_type not in VALID_LOCATION_TYPES:
             raise AttendanceValidationError(f"Invalid location_type: {location_type}")
 
         if self.check_overlap(supporter_id, start_time=now):
             raise AttendanceConflictError("Timecard overlaps with existing completed record")
 
-        from backend.app.models import SupporterJobAssignment
-        from backend.app.models.core.office import OfficeServiceConfiguration
-        
         assignments = self.db.query(SupporterJobAssignment).join(
             OfficeServiceConfiguration,
             SupporterJobAssignment.office_service_configuration_id == OfficeServiceConfiguration.id
@@ -385,7 +405,6 @@ class AttendanceService:
             
         osc_id = assignments[0].office_service_configuration_id
 
-        from sqlalchemy import func
         max_seq = self.db.query(func.max(SupporterTimecard.sequence_no)).filter(
             SupporterTimecard.supporter_id == supporter_id,
             SupporterTimecard.work_date == today
@@ -410,6 +429,7 @@ class AttendanceService:
             if constraint and getattr(constraint, "constraint_name", None) in ("uq_supporter_ongoing_timecard", "uq_supporter_timecards_supporter_date_seq"):
                 raise AttendanceConflictError("Already clocked in or sequence conflict")
             raise e
+        self._notify_presence(supporter_id)
         return timecard
 
     def clock_out(self, supporter_id: int, timecard_id: int = None, break_minutes: int = 0) -> SupporterTimecard:
@@ -426,26 +446,34 @@ class AttendanceService:
         if timecard.check_out:
             raise AttendanceConflictError("Already clocked out")
 
-        from zoneinfo import ZoneInfo
         now = datetime.now(ZoneInfo("Asia/Tokyo")).replace(tzinfo=None)
+        self._validate_clock_out(timecard, now, break_minutes)
+
+        if self.check_overlap(supporter_id, start_time=timecard.check_in, end_time=now, exclude_timecard_id=timecard.id):
+            raise AttendanceConflictError("Timecard overlaps with existing completed record")
+
+        self._close_timecard(timecard, now, break_minutes)
+        self._notify_presence(supporter_id)
+        return timecard
 
-        if timecard.check_in and now <= timecard.check_in:
+    @staticmethod
+    def _validate_clock_out(timecard: SupporterTimecard, check_out: datetime, break_minutes: int):
+        if timecard.check_in and check_out <= timecard.check_in:
             raise AttendanceValidationError("check_out must be after check_in")
 
         if break_minutes < 0:
             raise AttendanceValidationError("break_minutes cannot be negative")
 
         if timecard.check_in:
-            duration_mins = (now - timecard.check_in).total_seconds() / 60
+            duration_mins = (check_out - timecard.check_in).total_seconds() / 60
             if break_minutes > duration_mins:
                 raise AttendanceValidationError("break_minutes cannot exceed worked duration")
 
-        if self.check_overlap(supporter_id, start_time=timecard.check_in, end_time=now, exclude_timecard_id=timecard.id):
-            raise AttendanceConflictError("Timecard overlaps with existing completed record")
-
-        timecard.check_out = now
+    @staticmethod
+    def _close_timecard(timecard: SupporterTimecard, check_out: datetime, break_minutes: int):
+        timecard.check_out = check_out
         timecard.total_break_minutes = break_minutes
-        
+
         # calc scheduled_work_minutes
         timecard.scheduled_work_minutes = 0
         if timecard.check_in:
@@ -454,7 +482,246 @@ class AttendanceService:
             actual_work_mins = max(0, total_mins - break_minutes)
             timecard.scheduled_work_minutes = actual_work_mins
 
-        return timecard
+    # ====================================================================
+    # キオスクの一括打刻
+    # ====================================================================
+    @staticmethod
+    def parse_punch_entry(index: int, raw: dict, now: datetime, max_backlog_hours: float, clock_skew_seconds: float) -> PunchEntry:
+        """一括打刻の1エントリを検証する。時刻はJSTの naive datetime に揃える（タイムゾーンなしはJSTとみなす）"""
+        if not isinstance(raw, dict):
+            raise AttendanceValidationError("entry must be an object")
+        action = raw.get('action')
+        if action not in PUNCH_ACTIONS:
+            raise AttendanceValidationError(f"Invalid action: {action}")
+        try:
+            supporter_id = int(raw.get('supporter_id'))
+            timestamp = datetime.fromisoformat(str(raw.get('timestamp')))
+            break_minutes = int(raw.get('break_minutes') or 0)
+        except (TypeError, ValueError):
+            raise AttendanceValidationError("supporter_id, timestamp and break_minutes must be valid")
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(ZoneInfo("Asia/Tokyo")).replace(tzinfo=None)
+
+        if timestamp > now + timedelta(seconds=clock_skew_seconds):
+            raise AttendanceValidationError("timestamp is in the future")
+        if timestamp < now - timedelta(hours=max_backlog_hours):
+            raise AttendanceValidationError("timestamp is older than the allowed backlog")
+
+        location_type = raw.get('location_type') or 'OFFICE'
+        if action == 'clock_in' and location_type not in VALID_LOCATION_TYPES:
+            raise AttendanceValidationError(f"Invalid location_type: {location_type}")
+
+        return PunchEntry(
+            index=index, client_id=raw.get('client_id'), supporter_id=supporter_id, action=action,
+            timestamp=timestamp, location_type=location_type, location_detail=raw.get('location_detail'),
+            break_minutes=break_minutes,
+        )
+
+    def record_punch_batch(self, office_id: int, raw_entries: list, scope: dict, requester_id: int,
+                           now: datetime = None, max_backlog_hours: float = 72, clock_skew_seconds: float = 300) -> list:
+        """
+        共用キオスクからの打刻をまとめて記録し、エントリごとの結果を入力順で返す。
+        職員のロック・打刻・連番・所属は職員数によらず数回のクエリでまとめて読み込み、
+        打刻時刻順に clock_in / clock_out と同じ規則で検証する。
+        同じ時刻の打刻が既にあれば duplicate として扱うため、オフライン端末の再送はそのまま受け付けられる。
+        書き込みは最後に1回の flush で行い、コミットは呼び出し側が行う。
+        """
+        now = now or datetime.now(ZoneInfo("Asia/Tokyo")).replace(tzinfo=None)
+        results = {}
+        entries = []
+        for index, raw in enumerate(raw_entries):
+            try:
+                entries.append(self.parse_punch_entry(index, raw, now, max_backlog_hours, clock_skew_seconds))
+            except AttendanceDomainError as e:
+                client_id = raw.get('client_id') if isinstance(raw, dict) else None
+                results[index] = self._punch_error(index, client_id, e)
+        if not entries:
+            return [results[i] for i in sorted(results)]
+
+        office = self.db.get(OfficeSetting, office_id)
+        if not office:
+            raise AttendanceNotFoundError("Office not found")
+        if scope['level'] == 'CORPORATE' and office.corporation_id != scope['corp_id']:
+            raise AttendanceForbiddenError("Office is outside of corporate scope")
+
+        supporter_ids = sorted({e.supporter_id for e in entries})
+        min_ts = min(e.timestamp for e in entries)
+        first_day = min_ts.date()
+        last_day = max(e.timestamp for e in entries).date()
+
+        # 同じ職員への並行打刻と直列化するため、職員行をID順にまとめてロックする
+        corp_by_supporter = dict(
+            self.db.query(Supporter.id, OfficeSetting.corporation_id)
+            .outerjoin(OfficeSetting, Supporter.office_id == OfficeSetting.id)
+            .filter(Supporter.id.in_(supporter_ids))
+            .order_by(Supporter.id)
+            .with_for_update(of=Supporter)
+            .all()
+        )
+        timecards = self._prefetch_punch_timecards(supporter_ids, min_ts)
+
+        max_seq = defaultdict(int)
+        for sid, work_date, seq in self.db.query(
+            SupporterTimecard.supporter_id, SupporterTimecard.work_date, func.max(SupporterTimecard.sequence_no)
+        ).filter(
+            SupporterTimecard.supporter_id.in_(supporter_ids),
+            SupporterTimecard.work_date.between(first_day, last_day)
+        ).group_by(SupporterTimecard.supporter_id, SupporterTimecard.work_date):
+            max_seq[(sid, work_date)] = seq or 0
+
+        assignments = defaultdict(list)
+        for a in self.db.query(SupporterJobAssignment).join(
+            OfficeServiceConfiguration,
+            SupporterJobAssignment.office_service_configuration_id == OfficeServiceConfiguration.id
+        ).filter(
+            SupporterJobAssignment.supporter_id.in_(supporter_ids),
+            OfficeServiceConfiguration.office_id == office_id,
+            SupporterJobAssignment.start_date <= last_day,
+            or_(SupporterJobAssignment.end_date >= first_day, SupporterJobAssignment.end_date == None)
+        ):
+            assignments[a.supporter_id].append(a)
+
+        created = []
+        for entry in sorted(entries, key=lambda e: (e.timestamp, e.index)):
+            try:
+                if entry.supporter_id not in corp_by_supporter:
+                    raise AttendanceNotFoundError("Supporter not found")
+                if scope['self_only'] and entry.supporter_id != requester_id:
+                    raise AttendanceForbiddenError("Access to other staff's data is forbidden")
+                if scope['level'] == 'CORPORATE' and corp_by_supporter[entry.supporter_id] != scope['corp_id']:
+                    raise AttendanceForbiddenError("Target supporter is outside of corporate scope")
+
+                own = timecards[entry.supporter_id]
+                if entry.action == 'clock_in':
+                    status, timecard = self._apply_batch_clock_in(entry, office_id, own, assignments, max_seq)
+                    if status == 'ok':
+                        created.append(timecard)
+                else:
+                    status, timecard = self._apply_batch_clock_out(entry, own)
+                results[entry.index] = self._punch_result(entry, status, timecard)
+            except AttendanceDomainError as e:
+                results[entry.index] = self._punch_error(entry.index, entry.client_id, e, entry)
+
+        self.db.add_all(created)
+        try:
+            self.db.flush()
+        except IntegrityError:
+            raise AttendanceConflictError("Concurrent punch detected. Please resend the batch")
+
+        for sid in {r["supporter_id"] for r in results.values() if r["status"] == 'ok'}:
+            self._notify_presence(sid)
+        # 新規の打刻は flush 後に ID が確定する
+        for entry in entries:
+            result = results[entry.index]
+            if result["status"] == 'ok' and result["timecard_id"] is None:
+                result["timecard_id"] = result.pop("_timecard").id
+            result.pop("_timecard", None)
+        return [results[i] for i in sorted(results)]
+
+    def _prefetch_punch_timecards(self, supporter_ids: list, min_ts: datetime):
+        """
+        一括打刻の検証に必要な打刻（勤務中、または min_ts より後に終わったもの）を職員ごとに返す。
+        min_ts より前に始まった勤務中の打刻がある場合は、その退勤の重複判定のために開始以降の打刻も読む。
+        """
+        rows = self.db.query(SupporterTimecard).filter(
+            SupporterTimecard.supporter_id.in_(supporter_ids),
+            SupporterTimecard.check_in != None,
+            or_(SupporterTimecard.check_out == None, SupporterTimecard.check_out > min_ts)
+        ).all()
+        ongoing_starts = [tc.check_in for tc in rows if tc.check_out is None]
+        if ongoing_starts and min(ongoing_starts) < min_ts:
+            rows += self.db.query(SupporterTimecard).filter(
+                SupporterTimecard.supporter_id.in_(supporter_ids),
+                SupporterTimecard.check_in != None,
+                SupporterTimecard.check_out > min(ongoing_starts),
+                SupporterTimecard.check_out <= min_ts
+            ).all()
+
+        by_supporter = defaultdict(list)
+        for tc in rows:
+            by_supporter[tc.supporter_id].append(tc)
+        return by_supporter
+
+    def _apply_batch_clock_in(self, entry: PunchEntry, office_id: int, own: list, assignments: dict, max_seq: dict):
+        if any(tc.check_in == entry.timestamp for tc in own):
+            return 'duplicate', next(tc for tc in own if tc.check_in == entry.timestamp)
+        if any(tc.check_out is None for tc in own):
+            raise AttendanceConflictError("Already clocked in")
+        if any(intervals_overlap(tc.check_in, tc.check_out, entry.timestamp, None) for tc in own):
+            raise AttendanceConflictError("Timecard overlaps with existing completed record")
+
+        work_date = entry.timestamp.date()
+        active = [
+            a for a in assignments.get(entry.supporter_id, ())
+            if a.start_date <= work_date and (a.end_date is None or a.end_date >= work_date)
+        ]
+        if len(active) == 0:
+            raise AttendanceForbiddenError("Not assigned to this office")
+        elif len(active) > 1:
+            raise AttendanceValidationError("Multiple active assignments in this office")
+
+        key = (entry.supporter_id, work_date)
+        max_seq[key] += 1
+        timecard = SupporterTimecard(
+            supporter_id=entry.supporter_id,
+            work_date=work_date,
+            office_id=office_id,
+            office_service_configuration_id=active[0].office_service_configuration_id,
+            location_type=entry.location_type,
+            location_detail=entry.location_detail,
+            sequence_no=max_seq[key],
+            check_in=entry.timestamp
+        )
+        own.append(timecard)
+        return 'ok', timecard
+
+    def _apply_batch_clock_out(self, entry: PunchEntry, own: list):
+        if any(tc.check_out == entry.timestamp for tc in own):
+            return 'duplicate', next(tc for tc in own if tc.check_out == entry.timestamp)
+        ongoing = [tc for tc in own if tc.check_out is None]
+        if not ongoing:
+            raise AttendanceNotFoundError("Timecard not found")
+        elif len(ongoing) > 1:
+            raise AttendanceValidationError("Multiple ongoing timecards found")
+        timecard = ongoing[0]
+
+        self._validate_clock_out(timecard, entry.timestamp, entry.break_minutes)
+        if any(
+            tc is not timecard and intervals_overlap(tc.check_in, tc.check_out, timecard.check_in, entry.timestamp)
+            for tc in own
+        ):
+            raise AttendanceConflictError("Timecard overlaps with existing completed record")
+
+        self._close_timecard(timecard, entry.timestamp, entry.break_minutes)
+        return 'ok', timecard
+
+    @staticmethod
+    def _punch_result(entry: PunchEntry, status: str, timecard: SupporterTimecard) -> dict:
+        jst = ZoneInfo("Asia/Tokyo")
+        return {
+            "index": entry.index,
+            "client_id": entry.client_id,
+            "status": status,
+            "action": entry.action,
+            "supporter_id": entry.supporter_id,
+            "timecard_id": timecard.id,
+            "sequence_no": timecard.sequence_no,
+            "check_in": timecard.check_in.replace(tzinfo=jst).isoformat() if timecard.check_in else None,
+            "check_out": timecard.check_out.replace(tzinfo=jst).isoformat() if timecard.check_out else None,
+            "_timecard": timecard,
+        }
+
+    @staticmethod
+    def _punch_error(index: int, client_id, error: AttendanceDomainError, entry: PunchEntry = None) -> dict:
+        return {
+            "index": index,
+            "client_id": client_id,
+            "status": 'error',
+            "action": entry.action if entry else None,
+            "supporter_id": entry.supporter_id if entry else None,
+            "code": error.status_code,
+            "msg": error.message,
+        }
 
     def process_attendance_correction(self, request_id: int, approver_id: int, is_approved: bool):
         """
@@ -484,6 +751,7 @@ class AttendanceService:
             if timecard:
                 # 申請承認によるみなし時間の再計算とDecision適用を統一メソッドで実行
                 self._apply_attendance_changes(timecard, approver_id, edit_data, reason=f"Approved correction request {request_id}")
+                self._notify_presence(timecard.supporter_id)
             
         self.db.commit()
         return req
@@ -499,6 +767,7 @@ class AttendanceService:
             raise ValueError("Timecard not found")
             
         self._apply_attendance_changes(timecard, approver_id, edit_data, reason="Admin direct edit")
+        self._notify_presence(timecard.supporter_id)
         
         self.db.commit()
         return timecard
@@ -546,6 +815,5 @@ class AttendanceService:
             deemed_work_minutes=deemed
         )
         
-        # 生成された監査ログをDBに保存
-        for log in audit_logs:
-            self.db.add(log)
+        # 生成された監査ログは勤怠の変更と同じトランザクションで保存する（フラッシュ時に一括INSERT）
+        self.db.add_all(audit_logs)
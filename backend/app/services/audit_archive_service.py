@@ -0,0 +1,288 @@
+# backend/app/services/audit_archive_service.py
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, or_, select
+
+from backend.app.extensions import db
+from backend.app.models.core.audit_log import AuditActionLog, AuditArchivePartition, SystemLog
+from backend.app.utils.errors import SystemError as AppSystemError, ValidationError
+from backend.app.utils.timezone import get_jst_today
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ArchiveSpec:
+    model: type
+    time_column: str
+
+
+ARCHIVE_SPECS = {
+    'audit_action_logs': ArchiveSpec(AuditActionLog, 'created_at'),
+    'system_logs': ArchiveSpec(SystemLog, 'timestamp'),
+}
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _to_json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps({"t": created_at.isoformat(), "id": row_id}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(data["t"]), int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise ValidationError("cursor が不正です")
+
+
+class AuditArchiveService:
+    """
+    監査ログ・システムログの月次パーティション管理。
+    運用中のテーブル（ホット）には直近 AUDIT_HOT_MONTHS か月分だけを残し、それより古い月は
+    月単位で gzip 圧縮の JSON Lines としてローカルディスクへ移して目録（AuditArchivePartition）に登録する。
+    検索はホットとアーカイブを (時刻, id) の降順のキーセットで横断する。
+    """
+
+    @staticmethod
+    def archive_dir() -> str:
+        return current_app.config['AUDIT_ARCHIVE_DIR']
+
+    # ====================================================================
+    # コンパクション（ホット → アーカイブ）
+    # ====================================================================
+    @classmethod
+    def compact(cls, source_table: str = 'audit_action_logs', hot_months: int = None, today: date = None,
+                batch_size: int = None) -> list:
+        """
+        保持期間より古い月をアーカイブへ移し、移した月ごとの結果を返す。
+        ファイルを書き終えて fsync した後に、目録の登録と元の行の削除を1トランザクションで行うため、
+        途中で停止しても行が失われることはない（目録にないファイルは検索対象にならない）。
+        """
+        spec = ARCHIVE_SPECS.get(source_table)
+        if spec is None:
+            raise ValidationError(f"アーカイブ対象外のテーブルです: {source_table}")
+        hot_months = hot_months if hot_months is not None else int(current_app.config.get('AUDIT_HOT_MONTHS', 13))
+        batch_size = batch_size or int(current_app.config.get('AUDIT_ARCHIVE_BATCH_SIZE', 5000))
+        cutoff = add_months(month_start(today or get_jst_today()), -hot_months)
+        time_col = getattr(spec.model, spec.time_column)
+
+        oldest = db.session.query(func.min(time_col)).filter(time_col < datetime.combine(cutoff, datetime.min.time())).scalar()
+        if oldest is None:
+            return []
+
+        results = []
+        period = month_start(oldest)
+        while period < cutoff:
+            result = cls._archive_month(source_table, spec, period, batch_size)
+            if result:
+                results.append(result)
+            period = add_months(period, 1)
+        return results
+
+    @classmethod
+    def _archive_month(cls, source_table: str, spec: ArchiveSpec, period: date, batch_size: int):
+        model = spec.model
+        time_col = getattr(model, spec.time_column)
+        columns = [c.name for c in model.__table__.columns]
+        start, end = datetime.combine(period, datetime.min.time()), datetime.combine(add_months(period, 1), datetime.min.time())
+
+        part_no = (db.session.query(func.max(AuditArchivePartition.part_no)).filter_by(
+            source_table=source_table, period_start=period
+        ).scalar() or 0) + 1
+        relative_path = os.path.join(source_table, f"{period:%Y-%m}-part{part_no:03d}.jsonl.gz")
+        path = os.path.join(cls.archive_dir(), relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        ids, actors, actions, entity_types = [], set(), set(), set()
+        min_time = max_time = None
+        last_id = 0
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as out:
+            while True:
+                rows = db.session.execute(
+                    select(model.__table__).where(time_col >= start, time_col < end, model.id > last_id)
+                    .order_by(model.id).limit(batch_size)
+                ).mappings().all()
+                if not rows:
+                    break
+                for row in rows:
+                    record = {c: _to_json_value(row[c]) for c in columns}
+                    out.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+                    ids.append(row['id'])
+                    ts = row[spec.time_column]
+                    min_time = ts if min_time is None or ts < min_time else min_time
+                    max_time = ts if max_time is None or ts > max_time else max_time
+                    if source_table == 'audit_action_logs':
+                        if row['actor_supporter_id'] is not None:
+                            actors.add(row['actor_supporter_id'])
+                        actions.add(row['action'])
+                        entity_types.add(row['entity_type'])
+                last_id = rows[-1]['id']
+            out.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        if not ids:
+            os.remove(tmp_path)
+            return None
+        os.replace(tmp_path, path)
+
+        db.session.add(AuditArchivePartition(
+            source_table=source_table, period_start=period, part_no=part_no,
+            file_path=relative_path, checksum=cls._checksum(path), row_count=len(ids),
+            min_id=min(ids), max_id=max(ids), min_time=min_time, max_time=max_time,
+            actor_ids=json.dumps(sorted(actors)), actions=json.dumps(sorted(actions)),
+            entity_types=json.dumps(sorted(entity_types)),
+        ))
+        # 読み取った行だけを削除する（走査後に追加された同月の行は次回のパートになる）
+        for i in range(0, len(ids), batch_size):
+            db.session.execute(delete(model).where(model.id.in_(ids[i:i + batch_size])))
+        db.session.commit()
+
+        logger.info(f"🗄️ {source_table} {period:%Y-%m} を {len(ids)} 件アーカイブしました: {relative_path}")
+        return {"source_table": source_table, "period": f"{period:%Y-%m}", "part_no": part_no, "rows": len(ids), "file": relative_path}
+
+    @staticmethod
+    def _checksum(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def _read_partition(cls, partition: AuditArchivePartition):
+        path = os.path.join(cls.archive_dir(), partition.file_path)
+        if cls._checksum(path) != partition.checksum:
+            logger.error(f"❌ 監査アーカイブのチェックサムが一致しません: {partition.file_path}")
+            raise AppSystemError("監査ログのアーカイブが破損しています")
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+    # ====================================================================
+    # 検索（ホット + アーカイブ）
+    # ====================================================================
+    @classmethod
+    def search(cls, actor_supporter_id: int = None, entity_type: str = None, entity_id: int = None,
+               action: str = None, start: datetime = None, end: datetime = None,
+               limit: int = 50, cursor: str = None) -> dict:
+        """
+        監査ログを新しい順に検索する。next_cursor を cursor に渡すと続きを返す。
+        start は含み、end は含まない。
+        """
+        limit = max(1, min(int(limit), 200))
+        after = decode_cursor(cursor) if cursor else None
+        filters = {
+            'actor_supporter_id': actor_supporter_id, 'entity_type': entity_type,
+            'entity_id': entity_id, 'action': action,
+        }
+
+        candidates = cls._search_hot(filters, start, end, after, limit + 1)
+        candidates += cls._search_archives(filters, start, end, after, limit + 1)
+        candidates.sort(key=lambda r: (r['created_at'], r['id']), reverse=True)
+
+        page = candidates[:limit]
+        has_more = len(candidates) > limit
+        return {
+            "items": [dict(r, created_at=r['created_at'].isoformat()) for r in page],
+            "next_cursor": encode_cursor(page[-1]['created_at'], page[-1]['id']) if has_more else None,
+        }
+
+    @staticmethod
+    def _search_hot(filters: dict, start, end, after, need: int) -> list:
+        query = select(AuditActionLog.__table__)
+        for name, value in filters.items():
+            if value is not None:
+                query = query.where(getattr(AuditActionLog, name) == value)
+        if start:
+            query = query.where(AuditActionLog.created_at >= start)
+        if end:
+            query = query.where(AuditActionLog.created_at < end)
+        if after:
+            after_time, after_id = after
+            query = query.where(or_(
+                AuditActionLog.created_at < after_time,
+                and_(AuditActionLog.created_at == after_time, AuditActionLog.id < after_id),
+            ))
+        query = query.order_by(AuditActionLog.created_at.desc(), AuditActionLog.id.desc()).limit(need)
+        return [dict(row, source='hot') for row in db.session.execute(query).mappings()]
+
+    @classmethod
+    def _search_archives(cls, filters: dict, start, end, after, need: int) -> list:
+        query = AuditArchivePartition.query.filter_by(source_table='audit_action_logs')
+        if start:
+            query = query.filter(AuditArchivePartition.max_time >= start)
+        if end:
+            query = query.filter(AuditArchivePartition.min_time < end)
+        if after:
+            query = query.filter(AuditArchivePartition.min_time <= after[0])
+        partitions = query.order_by(AuditArchivePartition.max_time.desc(), AuditArchivePartition.id.desc()).all()
+
+        found = []
+        for partition in partitions:
+            # 必要件数が揃い、このパーティションの全行がそれより古ければ以降は読まない
+            if len(found) >= need:
+                found.sort(key=lambda r: (r['created_at'], r['id']), reverse=True)
+                del found[need:]
+                if partition.max_time < found[-1]['created_at']:
+                    break
+            if not cls._may_contain(partition, filters):
+                continue
+            for record in cls._read_partition(partition):
+                record['created_at'] = datetime.fromisoformat(record['created_at'])
+                if cls._matches(record, filters, start, end, after):
+                    record['source'] = 'archive'
+                    found.append(record)
+        return found
+
+    @staticmethod
+    def _may_contain(partition: AuditArchivePartition, filters: dict) -> bool:
+        summaries = {
+            'actor_supporter_id': partition.actor_ids,
+            'action': partition.actions,
+            'entity_type': partition.entity_types,
+        }
+        for name, summary in summaries.items():
+            if filters.get(name) is not None and summary is not None and filters[name] not in json.loads(summary):
+                return False
+        return True
+
+    @staticmethod
+    def _matches(record: dict, filters: dict, start, end, after) -> bool:
+        for name, value in filters.items():
+            if value is not None and record.get(name) != value:
+                return False
+        created_at = record['created_at']
+        if start and created_at < start:
+            return False
+        if end and created_at >= end:
+            return False
+        if after and (created_at, record['id']) >= after:
+            return False
+        return True
@@ -0,0 +1,295 @@
+# backend/app/services/audit_writer_service.py
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import insert, select
+
+from backend.app.extensions import db
+from backend.app.models.core.audit_log import AuditActionLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_FIELDS = (
+    'actor_supporter_id', 'user_id', 'action', 'entity_type', 'entity_id',
+    'before_value', 'after_value', 'reason', 'ip_address', 'user_agent',
+)
+
+
+class AuditSpool:
+    """
+    監査イベントのローカルスプール（JSON Lines のセグメントファイル）。
+    書き込み中のセグメントは *.open、書き込みを締めたものは *.ready、取り込み中のものは *.claimed として置く。
+    追記は fsync してから返す。同時に追記したスレッドの fsync は1回にまとめる（グループコミット）。
+    """
+
+    def __init__(self, directory: str, fsync: bool = True, stale_seconds: float = 300):
+        self.directory = directory
+        self.fsync = fsync
+        self.stale_seconds = stale_seconds
+        os.makedirs(directory, exist_ok=True)
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._segment_no = 0
+        self._written = 0
+        self._synced = 0
+
+    def append(self, events: list):
+        payload = ''.join(json.dumps(e, ensure_ascii=False, default=str) + '\n' for e in events).encode('utf-8')
+        with self._lock:
+            if self._file is None:
+                self._segment_no += 1
+                self._path = os.path.join(self.directory, f"audit-{self._owner}-{self._segment_no:06d}.open")
+                self._file = open(self._path, 'ab')
+            self._file.write(payload)
+            self._file.flush()
+            self._written += 1
+            seq, f = self._written, self._file
+
+        if not self.fsync:
+            return
+        with self._sync_lock:
+            # 後から来たスレッドの追記分も含めて1回で同期する。締め済みのセグメントは rotate で同期済み
+            if self._synced < seq and not f.closed:
+                target = self._written
+                os.fsync(f.fileno())
+                self._synced = target
+
+    def rotate(self):
+        """書き込み中のセグメントを締めて *.ready にする（空なら何もしない）"""
+        with self._sync_lock, self._lock:
+            if self._file is None:
+                return None
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+            ready = self._path[:-len('.open')] + '.ready'
+            os.replace(self._path, ready)
+            self._file, self._path = None, None
+            self._synced = self._written
+            return ready
+
+    def claim(self) -> list:
+        """
+        取り込み対象のセグメントを *.claimed に改名して確保する。改名は原子的なため、同じディレクトリを
+        複数プロセスで共有しても1つのセグメントを取り込むのは1プロセスだけになる。
+        停止したプロセスが残した *.open / *.claimed も、一定時間更新がなければ取り込み対象にする。
+        改名では更新日時が変わらないため、確保した時点で更新日時を付け直し、*.claimed は確保からの経過時間で判定する。
+        """
+        claimed = []
+        now = time.time()
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.ready'):
+                pass
+            elif name.endswith('.open') or '.claimed' in name:
+                if path == self._path:
+                    continue
+                try:
+                    if now - os.path.getmtime(path) < self.stale_seconds:
+                        continue
+                except OSError:
+                    continue
+            else:
+                continue
+            base = name.split('.', 1)[0]
+            target = os.path.join(self.directory, f"{base}.claimed-{self._owner}")
+            try:
+                os.replace(path, target)
+            except OSError:
+                continue  # 他プロセスが先に確保した
+            try:
+                os.utime(target)
+            except OSError:
+                continue  # 付け直す前に停止扱いで他プロセスに確保された
+            claimed.append(target)
+        return claimed
+
+    def release(self, path: str):
+        """取り込みに失敗したセグメントを次回の取り込み対象に戻す"""
+        os.replace(path, path.split('.claimed', 1)[0] + '.ready')
+
+    def discard(self, path: str):
+        os.remove(path)
+
+    @staticmethod
+    def read(path: str) -> list:
+        events = []
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # 書き込み途中で停止した末尾の行。fsync 前の行のため記録として確定していない
+                    logger.warning(f"⚠️ 監査スプールの不完全な行を読み飛ばしました: {path}")
+        return events
+
+
+class AuditWriter:
+    """
+    監査ログの書き込み口。
+    スプールが有効な場合、record はイベントをローカルスプールへ追記（fsync）して即座に返し、
+    バックグラウンドスレッドがまとめて audit_action_logs に一括INSERTする。
+    取り込みが完了したセグメントだけを削除するため、途中で停止しても再起動後に再送される（at-least-once）。
+    再送分は event_id で重複を除く。
+    AUDIT_SPOOL_DIR が空の場合はスプールを使わず、従来どおりリクエストのセッションでコミットする。
+    """
+
+    EXTENSION_KEY = 'audit_writer'
+    _writer_lock = threading.Lock()
+
+    def __init__(self, app, spool_dir: str = None, flush_interval: float = 1.0, batch_size: int = 500,
+                 fsync: bool = True, stale_seconds: float = 300):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool = AuditSpool(spool_dir, fsync=fsync, stale_seconds=stale_seconds) if spool_dir else None
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    @classmethod
+    def get(cls, app=None):
+        app = app or current_app._get_current_object()
+        writer = app.extensions.get(cls.EXTENSION_KEY)
+        if writer is None:
+            with cls._writer_lock:
+                writer = app.extensions.get(cls.EXTENSION_KEY)
+                if writer is None:
+                    writer = cls(
+                        app,
+                        spool_dir=app.config.get('AUDIT_SPOOL_DIR'),
+                        flush_interval=float(app.config.get('AUDIT_FLUSH_INTERVAL_SECONDS', 1.0)),
+                        batch_size=int(app.config.get('AUDIT_FLUSH_BATCH_SIZE', 500)),
+                        fsync=bool(app.config.get('AUDIT_SPOOL_FSYNC', True)),
+                        stale_seconds=float(app.config.get('AUDIT_SPOOL_STALE_SECONDS', 300)),
+                    )
+                    writer.start()
+                    app.extensions[cls.EXTENSION_KEY] = writer
+        return writer
+
+    @classmethod
+    def record(cls, action: str, entity_type: str, **fields) -> str:
+        """
+        監査イベントを1件記録し、event_id を返す。fields は AuditActionLog の列
+        （actor_supporter_id, user_id, entity_id, before_value, after_value, reason, ip_address, user_agent）。
+        """
+        unknown = set(fields) - set(AUDIT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown audit fields: {sorted(unknown)}")
+        event = {name: fields.get(name) for name in AUDIT_FIELDS}
+        event.update(
+            action=action,
+            entity_type=entity_type,
+            event_id=uuid.uuid4().hex,
+            created_at=datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+        )
+        cls.get()._write(event)
+        return event['event_id']
+
+    def _write(self, event: dict):
+        if self.spool is None:
+            db.session.add(AuditActionLog(**self._to_row(event)))
+            db.session.commit()
+            return
+        self.spool.append([event])
+        with self._pending_lock:
+            self._pending += 1
+            full = self._pending >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    # ====================================================================
+    # スプール → DB
+    # ====================================================================
+    def flush(self) -> int:
+        """スプール済みのイベントをDBへ取り込み、新規にINSERTした件数を返す（アプリコンテキスト内で呼ぶ）"""
+        if self.spool is None:
+            return 0
+        with self._flush_lock:
+            with self._pending_lock:
+                self._pending = 0
+            self.spool.rotate()
+            inserted = 0
+            for path in self.spool.claim():
+                try:
+                    inserted += self._insert_events(self.spool.read(path))
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    self.spool.release(path)
+                    raise
+                self.spool.discard(path)
+            if inserted:
+                logger.debug(f"📝 監査ログを {inserted} 件取り込みました")
+            return inserted
+
+    def _insert_events(self, events: list) -> int:
+        inserted = 0
+        seen = set()
+        for start in range(0, len(events), self.batch_size):
+            chunk = [e for e in events[start:start + self.batch_size] if e['event_id'] not in seen]
+            seen.update(e['event_id'] for e in chunk)
+            existing = set(db.session.scalars(
+                select(AuditActionLog.event_id).where(AuditActionLog.event_id.in_([e['event_id'] for e in chunk]))
+            ))
+            rows = [self._to_row(e) for e in chunk if e['event_id'] not in existing]
+            if rows:
+                db.session.execute(insert(AuditActionLog), rows)
+                inserted += len(rows)
+        return inserted
+
+    @staticmethod
+    def _to_row(event: dict) -> dict:
+        row = {name: event.get(name) for name in AUDIT_FIELDS}
+        row['event_id'] = event['event_id']
+        row['created_at'] = datetime.fromisoformat(event['created_at'])
+        return row
+
+    # ====================================================================
+    # バックグラウンドスレッド
+    # ====================================================================
+    def start(self):
+        if self.spool is None or self.flush_interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._flush_in_context()
+
+    def _flush_in_context(self):
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ 監査ログの取り込みに失敗しました（スプールに残し再試行します）: {e}")
+            finally:
+                db.session.remove()
+
+    def shutdown(self):
+        """スレッドを止め、残りを取り込む（失敗してもスプールに残るため次回起動時に再送される）"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._flush_in_context()
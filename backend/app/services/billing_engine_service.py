@@ -0,0 +1,491 @@
+# backend/app/services/billing_engine_service.py
+
+import calendar
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, ROUND_FLOOR
+
+from sqlalchemy import and_, delete, exists, insert, select, update
+
+from backend.app.extensions import db
+from backend.app.models import (
+    AttendanceRecord, BillingData, CopaymentLimit, FeeCalculationDecision, GrantedService,
+    MealAddonStatus, MonthlyBillingSummary, OfficeAdditiveFiling, OfficeServiceConfiguration, OfficeSetting,
+    ServiceCertificate, ServiceTypeMaster, UserDailyLog
+)
+from backend.app.services.fee_catalog_service import CompiledFeeCatalog, FeeCatalog, FeeRule
+
+logger = logging.getLogger(__name__)
+
+BILLABLE_LOG_STATUS = 'COMPLETED'
+COPAY_RATE = Decimal('0.1')
+YEN = Decimal('1')
+
+# 加算・減算の算定日判定（GovernmentFeeMaster.logic_key -> (利用者の月次コンテキスト, 請求日) -> bool）
+FEE_DAY_RULES = {
+    None: lambda ctx, day: True,
+    'EVERY_DAY': lambda ctx, day: True,
+    'ON_SITE': lambda ctx, day: day.location_type == 'ON_SITE',
+    'OFF_SITE': lambda ctx, day: day.location_type != 'ON_SITE',
+    'MEAL_PROVIDED': lambda ctx, day: ctx.meal_applicable(day.log_date),
+}
+# 月に1回だけ算定する加算（最初の算定日に計上する）
+MONTHLY_LOGIC_KEYS = {'MONTHLY'}
+
+
+def month_range(year: int, month: int):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _yen(value) -> str:
+    return str(Decimal(value).quantize(YEN))
+
+
+def _covers(start, end, day) -> bool:
+    return (start is None or start <= day) and (end is None or day <= end)
+
+
+@dataclass
+class BillableDay:
+    """通所実績（来所打刻）のある完了済み日報の1日"""
+    log_id: int
+    user_id: int
+    log_date: date
+    location_type: str
+
+
+@dataclass
+class Entitlement:
+    """利用者がサービス（事業所番号）で請求できる支給決定期間"""
+    user_id: int
+    osc_id: int
+    certificate_id: int
+    start: date
+    end: date
+    max_days: int = None  # None は上限なし
+
+
+@dataclass
+class UserMonth:
+    """利用者×サービスの月次計算コンテキスト"""
+    user_id: int
+    osc_id: int
+    certificate_id: int
+    meal_periods: list = field(default_factory=list)
+
+    def meal_applicable(self, day: date) -> bool:
+        return any(_covers(start, end, day) for start, end in self.meal_periods)
+
+
+class FilingIndex:
+    """(サービス, 加算) ごとの届出期間"""
+
+    def __init__(self, filings):
+        self._periods = defaultdict(list)
+        for f in filings:
+            self._periods[(f.office_service_configuration_id, f.fee_master_id)].append(
+                (f.effective_start_date, f.effective_end_date)
+            )
+
+    def is_filed(self, osc_id: int, fee_id: int, day: date) -> bool:
+        return any(_covers(start, end, day) for start, end in self._periods.get((osc_id, fee_id), ()))
+
+
+class MonthlyBillingEngine:
+    """
+    法人全体の月次請求計算。
+    通所実績のある完了済み日報を、支給決定・単位数単価・加算減算マスタ・加算届出と突き合わせ、
+    MonthlyBillingSummary（利用者×サービス）、BillingData（請求日ごと）、FeeCalculationDecision（サービスごとの適用加算）を
+    まとめて書き込む。読み込みは利用者数によらず十数回のクエリで、書き込みは一括の INSERT/UPDATE/DELETE で行う。
+    同じ入力からは同じ結果になり、前回の結果との差分を返す。確定済み（PENDING 以外）の請求は変更しない。
+    """
+
+    def __init__(self, corporation_id: int, year: int, month: int):
+        self.corporation_id = corporation_id
+        self.billing_month, self.month_end = month_range(year, month)
+        self.warnings = []
+
+    def run(self, dry_run: bool = False) -> dict:
+        services = dict(db.session.execute(
+            select(OfficeServiceConfiguration.id, ServiceTypeMaster.service_code)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .join(ServiceTypeMaster, OfficeServiceConfiguration.service_type_master_id == ServiceTypeMaster.id)
+            .where(OfficeSetting.corporation_id == self.corporation_id)
+        ).all())
+        if not services:
+            return self._report([], {}, {}, dry_run)
+
+        entitlements = self._load_entitlements(list(services))
+        user_ids = sorted({e.user_id for e in entitlements})
+        days = self._load_billable_days(user_ids)
+        contexts = self._load_contexts(entitlements)
+        catalog = FeeCatalog.current()
+        fees = [fee for fee in catalog.fees(('ADD', 'SUB')) if fee.units]
+        filings = FilingIndex(OfficeAdditiveFiling.query.filter(
+            OfficeAdditiveFiling.office_service_configuration_id.in_(list(services)),
+            OfficeAdditiveFiling.is_filed.is_(True),
+            OfficeAdditiveFiling.deleted_at.is_(None),
+        ).all())
+        limits = self._load_copayment_limits(entitlements)
+
+        lines = self._assign_days(days, entitlements)
+        results = {}
+        for (user_id, osc_id), billed in sorted(lines.items()):
+            result = self._price_user_month(contexts[(user_id, osc_id)], services[osc_id], billed, catalog, fees, filings)
+            if result is not None:
+                result["copayment_limit"] = limits.get(result["certificate_id"])
+                self._apply_copayment(result)
+                results[(user_id, osc_id)] = result
+        return self._report(list(services), services, results, dry_run)
+
+    # ====================================================================
+    # 読み込み（集合単位）
+    # ====================================================================
+    def _load_entitlements(self, osc_ids: list) -> list:
+        """ACTIVE な受給者証の、サービスと同じ種類で当月にかかる支給決定"""
+        days_in_month = (self.month_end - self.billing_month).days + 1
+        rows = db.session.execute(
+            select(
+                ServiceCertificate.user_id, ServiceCertificate.office_service_configuration_id, ServiceCertificate.id,
+                GrantedService.granted_start_date, GrantedService.granted_end_date,
+                GrantedService.max_service_days, GrantedService.max_service_days_type,
+            )
+            .join(GrantedService, GrantedService.certificate_id == ServiceCertificate.id)
+            .join(OfficeServiceConfiguration, and_(
+                OfficeServiceConfiguration.id == ServiceCertificate.office_service_configuration_id,
+                OfficeServiceConfiguration.service_type_master_id == GrantedService.service_type_master_id,
+            ))
+            .where(
+                ServiceCertificate.office_service_configuration_id.in_(osc_ids),
+                ServiceCertificate.status == 'ACTIVE',
+                GrantedService.granted_start_date <= self.month_end,
+                GrantedService.granted_end_date >= self.billing_month,
+            )
+            .order_by(ServiceCertificate.user_id, ServiceCertificate.office_service_configuration_id,
+                      GrantedService.granted_start_date, GrantedService.id)
+        ).all()
+        entitlements = []
+        for user_id, osc_id, cert_id, start, end, max_days, max_days_type in rows:
+            if max_days_type == 'DYNAMIC_MONTH_MINUS_8':
+                max_days = days_in_month - 8
+            entitlements.append(Entitlement(user_id, osc_id, cert_id, start, end, max_days))
+        return entitlements
+
+    def _load_billable_days(self, user_ids: list) -> list:
+        """完了済みの日報のうち、同じ日に来所打刻があるもの"""
+        if not user_ids:
+            return []
+        checked_in = exists().where(
+            AttendanceRecord.user_id == UserDailyLog.user_id,
+            AttendanceRecord.attendance_date == UserDailyLog.log_date,
+            AttendanceRecord.record_type == 'CHECK_IN',
+        )
+        rows = db.session.execute(
+            select(UserDailyLog.id, UserDailyLog.user_id, UserDailyLog.log_date, UserDailyLog.location_type)
+            .where(
+                UserDailyLog.user_id.in_(user_ids),
+                UserDailyLog.log_date.between(self.billing_month, self.month_end),
+                UserDailyLog.log_status == BILLABLE_LOG_STATUS,
+                checked_in,
+            )
+            .order_by(UserDailyLog.user_id, UserDailyLog.log_date, UserDailyLog.id)
+        ).all()
+        return [BillableDay(*row) for row in rows]
+
+    def _load_contexts(self, entitlements: list) -> dict:
+        cert_ids = sorted({e.certificate_id for e in entitlements})
+        meals = defaultdict(list)
+        if cert_ids:
+            for status in MealAddonStatus.query.filter(
+                MealAddonStatus.certificate_id.in_(cert_ids), MealAddonStatus.is_applicable.is_(True)
+            ):
+                meals[status.certificate_id].append((status.meal_addon_start_date, status.meal_addon_end_date))
+        return {
+            (e.user_id, e.osc_id): UserMonth(e.user_id, e.osc_id, e.certificate_id, meals.get(e.certificate_id, []))
+            for e in entitlements
+        }
+
+    def _load_copayment_limits(self, entitlements: list) -> dict:
+        """受給者証ごとの当月の負担上限月額（月初時点、なければ月内で最初に始まる期間）"""
+        cert_ids = sorted({e.certificate_id for e in entitlements})
+        limits = {}
+        if cert_ids:
+            for limit in CopaymentLimit.query.filter(
+                CopaymentLimit.certificate_id.in_(cert_ids),
+                CopaymentLimit.limit_start_date <= self.month_end,
+                CopaymentLimit.limit_end_date >= self.billing_month,
+            ).order_by(CopaymentLimit.limit_start_date, CopaymentLimit.id):
+                limits.setdefault(limit.certificate_id, Decimal(limit.limit_amount))
+        return limits
+
+    # ====================================================================
+    # 計算
+    # ====================================================================
+    def _assign_days(self, days: list, entitlements: list) -> dict:
+        """請求日を支給決定に割り当て、支給量（日数）を超えた日は請求しない"""
+        by_user = defaultdict(list)
+        for e in entitlements:
+            by_user[e.user_id].append(e)
+
+        used = defaultdict(int)
+        lines = defaultdict(list)
+        for day in days:
+            entitlement = next((e for e in by_user[day.user_id] if e.start <= day.log_date <= e.end), None)
+            if entitlement is None:
+                continue
+            if entitlement.max_days is not None and used[id(entitlement)] >= entitlement.max_days:
+                self.warnings.append({
+                    "code": "OVER_GRANTED_DAYS", "user_id": day.user_id,
+                    "office_service_configuration_id": entitlement.osc_id, "date": day.log_date.isoformat(),
+                })
+                continue
+            used[id(entitlement)] += 1
+            lines[(day.user_id, entitlement.osc_id)].append(day)
+        return lines
+
+    def _price_user_month(self, ctx: UserMonth, service_type: str, billed: list, catalog: CompiledFeeCatalog,
+                          fees: list, filings: FilingIndex):
+        day_lines = []
+        applied = defaultdict(int)  # 加算コード -> 単位数の合計
+        monthly_done = set()
+        prices = catalog.price_many((service_type, day.log_date) for day in billed)
+        for day, price in zip(billed, prices):
+            if price is None:
+                self.warnings.append({
+                    "code": "MISSING_UNIT_PRICE", "user_id": ctx.user_id,
+                    "office_service_configuration_id": ctx.osc_id, "date": day.log_date.isoformat(),
+                })
+                continue
+
+            units = price.unit_count
+            fee_codes = []
+            for fee in fees:
+                if fee.needs_office_filing and not filings.is_filed(ctx.osc_id, fee.id, day.log_date):
+                    continue
+                if fee.logic_key in MONTHLY_LOGIC_KEYS:
+                    if fee.id in monthly_done:
+                        continue
+                    monthly_done.add(fee.id)
+                elif fee.logic_key not in FEE_DAY_RULES:
+                    self._warn_unknown_logic(fee)
+                    continue
+                elif not FEE_DAY_RULES[fee.logic_key](ctx, day):
+                    continue
+                fee_units = (fee.units or 0) * (-1 if fee.category == 'SUB' or fee.calculation_type == 'SUBTRACTION' else 1)
+                units += fee_units
+                applied[fee.code] += fee_units
+                fee_codes.append(fee.code)
+
+            units = max(0, units)
+            day_lines.append({
+                "user_daily_log_id": day.log_id,
+                "billing_date": day.log_date,
+                "unit_count": units,
+                "cost": (Decimal(units) * price.unit_price).quantize(YEN, rounding=ROUND_FLOOR),
+                "fee_codes": fee_codes,
+            })
+        if not day_lines:
+            return None
+        return {
+            "user_id": ctx.user_id,
+            "office_service_configuration_id": ctx.osc_id,
+            "certificate_id": ctx.certificate_id,
+            "service_type": service_type,
+            "days": day_lines,
+            "applied_fees": dict(applied),
+            "total_units": sum(line["unit_count"] for line in day_lines),
+            "total_cost": sum((line["cost"] for line in day_lines), Decimal(0)),
+        }
+
+    def _warn_unknown_logic(self, fee: FeeRule):
+        warning = {"code": "UNKNOWN_FEE_LOGIC", "fee_code": fee.code, "logic_key": fee.logic_key}
+        if warning not in self.warnings:
+            logger.warning(f"⚠️ 未対応の加算ロジックのため算定しません: {fee.code} ({fee.logic_key})")
+            self.warnings.append(warning)
+
+    @staticmethod
+    def _apply_copayment(result: dict):
+        """利用者負担は総費用の1割（負担上限月額まで）、請求額（公費）は総費用から利用者負担を除いた額"""
+        copayment = (result["total_cost"] * COPAY_RATE).quantize(YEN, rounding=ROUND_FLOOR)
+        if result["copayment_limit"] is not None:
+            copayment = min(copayment, result["copayment_limit"])
+        result["copayment"] = copayment
+        result["claim_amount"] = result["total_cost"] - copayment
+
+    # ====================================================================
+    # 差分と書き込み
+    # ====================================================================
+    def _report(self, osc_ids: list, services: dict, results: dict, dry_run: bool) -> dict:
+        existing = {}
+        if osc_ids:
+            for summary in MonthlyBillingSummary.query.filter(
+                MonthlyBillingSummary.office_service_configuration_id.in_(osc_ids),
+                MonthlyBillingSummary.billing_month == self.billing_month,
+            ).order_by(MonthlyBillingSummary.id):
+                existing.setdefault((summary.user_id, summary.office_service_configuration_id), summary)
+
+        diff = {"added": [], "changed": [], "removed": [], "locked": [], "unchanged": 0}
+        inserts, updates, removed_ids, locked = [], [], [], set()
+        for key in sorted(set(existing) | set(results)):
+            before, after = existing.get(key), results.get(key)
+            entry = {"user_id": key[0], "office_service_configuration_id": key[1]}
+            new_values = None
+            if after is not None:
+                new_values = {"total_units_claimed": after["total_units"], "claim_amount": after["claim_amount"]}
+                entry.update(total_units=after["total_units"], claim_amount=_yen(after["claim_amount"]))
+
+            if before is not None and before.claim_status != 'PENDING':
+                locked.add(key)
+                if new_values is None or (before.total_units_claimed, Decimal(before.claim_amount)) != tuple(new_values.values()):
+                    diff["locked"].append(dict(entry, claim_status=before.claim_status))
+                else:
+                    diff["unchanged"] += 1
+            elif before is None:
+                diff["added"].append(entry)
+                inserts.append(dict(new_values, user_id=key[0], office_service_configuration_id=key[1],
+                                    billing_month=self.billing_month, claim_status='PENDING'))
+            elif new_values is None:
+                diff["removed"].append(dict(entry, total_units=before.total_units_claimed, claim_amount=_yen(before.claim_amount)))
+                removed_ids.append(before.id)
+            elif (before.total_units_claimed, Decimal(before.claim_amount)) != tuple(new_values.values()):
+                diff["changed"].append(dict(entry, previous_total_units=before.total_units_claimed,
+                                            previous_claim_amount=_yen(before.claim_amount)))
+                updates.append(dict(new_values, id=before.id))
+            else:
+                diff["unchanged"] += 1
+
+        if not dry_run:
+            self._write_summaries(inserts, updates, removed_ids)
+            self._write_billing_data(services, results, {k[0] for k in existing} | {k[0] for k in results}, locked)
+            self._write_fee_decisions(osc_ids, results)
+            logger.info(
+                f"🧾 月次請求計算 corp={self.corporation_id} {self.billing_month:%Y-%m}: "
+                f"added={len(diff['added'])} changed={len(diff['changed'])} removed={len(diff['removed'])}"
+            )
+
+        return {
+            "corporation_id": self.corporation_id,
+            "billing_month": self.billing_month.isoformat(),
+            "dry_run": dry_run,
+            "summaries": [
+                {
+                    "user_id": r["user_id"],
+                    "office_service_configuration_id": r["office_service_configuration_id"],
+                    "days": len(r["days"]),
+                    "total_units": r["total_units"],
+                    "total_cost": _yen(r["total_cost"]),
+                    "copayment": _yen(r["copayment"]),
+                    "claim_amount": _yen(r["claim_amount"]),
+                    "applied_fees": r["applied_fees"],
+                }
+                for _, r in sorted(results.items())
+            ],
+            "diff": diff,
+            "warnings": self.warnings,
+        }
+
+    @staticmethod
+    def _write_summaries(inserts: list, updates: list, removed_ids: list):
+        if inserts:
+            db.session.execute(insert(MonthlyBillingSummary), inserts)
+        if updates:
+            db.session.execute(update(MonthlyBillingSummary), updates)
+        if removed_ids:
+            db.session.execute(
+                delete(MonthlyBillingSummary).where(MonthlyBillingSummary.id.in_(removed_ids)),
+                execution_options={"synchronize_session": False},
+            )
+
+    def _write_billing_data(self, services: dict, results: dict, user_ids: set, locked: set):
+        """日報ごとの請求データを洗い替える（確定済みの請求に含まれる利用者×サービス種類は変更しない）"""
+        if not user_ids:
+            return
+        locked_types = {(user_id, services[osc_id]) for user_id, osc_id in locked}
+        wanted = {}
+        for key, result in results.items():
+            if key in locked:
+                continue
+            for line in result["days"]:
+                wanted[line["user_daily_log_id"]] = {
+                    "user_id": result["user_id"],
+                    "office_service_configuration_id": result["office_service_configuration_id"],
+                    "user_daily_log_id": line["user_daily_log_id"],
+                    "service_type": result["service_type"],
+                    "billing_date": line["billing_date"],
+                    "unit_count": line["unit_count"],
+                    "cost": line["cost"],
+                    "is_audit_passed": True,
+                    "audit_notes": json.dumps({"fees": line["fee_codes"]}, ensure_ascii=False),
+                }
+
+        current = db.session.execute(
+            select(BillingData.id, BillingData.user_id, BillingData.user_daily_log_id,
+                   BillingData.office_service_configuration_id, BillingData.service_type, BillingData.unit_count,
+                   BillingData.cost, BillingData.audit_notes)
+            .where(
+                BillingData.user_id.in_(sorted(user_ids)),
+                BillingData.user_daily_log_id.isnot(None),
+                BillingData.service_type.in_(set(services.values())),
+                BillingData.billing_date.between(self.billing_month, self.month_end),
+            )
+        ).all()
+
+        updates, removed_ids = [], []
+        for row in current:
+            if (row.user_id, row.service_type) in locked_types:
+                wanted.pop(row.user_daily_log_id, None)
+                continue
+            values = wanted.pop(row.user_daily_log_id, None)
+            if values is None:
+                removed_ids.append(row.id)
+            elif (row.office_service_configuration_id, row.service_type, row.unit_count, Decimal(row.cost),
+                  row.audit_notes) != (values["office_service_configuration_id"], values["service_type"],
+                                       values["unit_count"], values["cost"], values["audit_notes"]):
+                updates.append(dict(values, id=row.id))
+
+        if wanted:
+            db.session.execute(insert(BillingData), [wanted[k] for k in sorted(wanted)])
+        if updates:
+            db.session.execute(update(BillingData), updates)
+        if removed_ids:
+            db.session.execute(
+                delete(BillingData).where(BillingData.id.in_(removed_ids)),
+                execution_options={"synchronize_session": False},
+            )
+
+    def _write_fee_decisions(self, osc_ids: list, results: dict):
+        """サービスごとに当月適用した加算・減算を記録する（確定済みは変更しない）"""
+        by_service = defaultdict(lambda: {"users": 0, "total_units": 0, "fees": defaultdict(int)})
+        for (_, osc_id), result in results.items():
+            summary = by_service[osc_id]
+            summary["users"] += 1
+            summary["total_units"] += result["total_units"]
+            for code, units in result["applied_fees"].items():
+                summary["fees"][code] += units
+
+        existing = {
+            d.office_service_configuration_id: d for d in FeeCalculationDecision.query.filter(
+                FeeCalculationDecision.office_service_configuration_id.in_(osc_ids),
+                FeeCalculationDecision.calculation_month == self.billing_month,
+            ).order_by(FeeCalculationDecision.id)
+        }
+        inserts, updates = [], []
+        for osc_id in sorted(set(by_service) | set(existing)):
+            summary = by_service.get(osc_id, {"users": 0, "total_units": 0, "fees": {}})
+            applied = json.dumps(
+                {"users": summary["users"], "total_units": summary["total_units"], "fees": dict(summary["fees"])},
+                ensure_ascii=False, sort_keys=True,
+            )
+            decision = existing.get(osc_id)
+            if decision is None:
+                inserts.append({"office_service_configuration_id": osc_id, "calculation_month": self.billing_month,
+                                "applied_fees_json": applied, "is_finalized": False})
+            elif not decision.is_finalized and decision.applied_fees_json != applied:
+                updates.append({"id": decision.id, "applied_fees_json": applied})
+        if inserts:
+            db.session.execute(insert(FeeCalculationDecision), inserts)
+        if updates:
+            db.session.execute(update(FeeCalculationDecision), updates)
@@ -0,0 +1,145 @@
+# backend/app/services/certificate_service.py
+
+import bisect
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from backend.app.extensions import db
+from backend.app.models.core.service_certificate import (
+    ServiceCertificate, GrantedService, CopaymentLimit, MealAddonStatus, CopaymentManagement
+)
+from backend.app.models.finance.billing_compliance import ContractReportDetail
+
+
+@dataclass
+class CertificateGraph:
+    """受給者証1件と子レコード一式（一括読み込み済み）"""
+    certificate: ServiceCertificate
+    granted_services: list = field(default_factory=list)
+    contract_details: dict = field(default_factory=dict)  # granted_service_id -> ContractReportDetail
+    copayment_limits: list = field(default_factory=list)
+    meal_addon_statuses: list = field(default_factory=list)
+    copayment_managements: list = field(default_factory=list)
+
+
+class GrantedIntervalIndex:
+    """
+    支給決定期間の区間インデックス。(利用者, サービス種類) ごとに開始日でソートした区間と
+    終了日の累積最大値を持ち、重なる区間を二分探索で求める。
+    """
+
+    def __init__(self):
+        self._buckets = defaultdict(list)
+        self._built = {}
+
+    def add(self, user_id: int, gs: GrantedService):
+        key = (user_id, gs.service_type_master_id)
+        self._buckets[key].append((gs.granted_start_date, gs.granted_end_date, gs.certificate_id))
+        self._built.pop(key, None)
+
+    def _bucket(self, key):
+        built = self._built.get(key)
+        if built is None:
+            intervals = sorted(self._buckets.get(key, ()), key=lambda i: i[0])
+            starts = [i[0] for i in intervals]
+            max_ends = []
+            for _, end, _ in intervals:
+                max_ends.append(end if not max_ends or end > max_ends[-1] else max_ends[-1])
+            built = self._built[key] = (intervals, starts, max_ends)
+        return built
+
+    def overlapping(self, user_id: int, service_type_master_id: int, start, end) -> set:
+        """[start, end] と重なる区間を持つ受給者証IDの集合（両端を含む）"""
+        intervals, starts, max_ends = self._bucket((user_id, service_type_master_id))
+        found = set()
+        # 開始日が end 以下の区間だけが候補。後ろから辿り、累積最大の終了日が start を下回ったら打ち切る
+        i = bisect.bisect_right(starts, end) - 1
+        while i >= 0 and max_ends[i] >= start:
+            if intervals[i][1] >= start:
+                found.add(intervals[i][2])
+            i -= 1
+        return found
+
+
+class CertificateRepository:
+    """
+    受給者証の読み込み。子テーブル（支給決定・契約内容・負担上限・食事加算・上限管理）は
+    受給者証の件数によらずテーブルごとに1回の IN クエリで読み込む。
+    """
+
+    @staticmethod
+    def _group(model, cert_ids, order_by):
+        grouped = defaultdict(list)
+        if cert_ids:
+            for row in model.query.filter(model.certificate_id.in_(cert_ids)).order_by(*order_by):
+                grouped[row.certificate_id].append(row)
+        return grouped
+
+    @classmethod
+    def load_graphs(cls, certificates) -> list:
+        """受給者証のリストから CertificateGraph のリストを（同じ順序で）返す"""
+        cert_ids = [c.id for c in certificates]
+        granted = cls._group(GrantedService, cert_ids, (GrantedService.id,))
+        granted_ids = [gs.id for rows in granted.values() for gs in rows]
+        contracts = {}
+        if granted_ids:
+            contracts = {
+                cd.granted_service_id: cd
+                for cd in ContractReportDetail.query.filter(ContractReportDetail.granted_service_id.in_(granted_ids))
+            }
+        limits = cls._group(CopaymentLimit, cert_ids, (CopaymentLimit.id,))
+        meals = cls._group(MealAddonStatus, cert_ids, (MealAddonStatus.id,))
+        managements = cls._group(CopaymentManagement, cert_ids, (CopaymentManagement.id,))
+
+        return [
+            CertificateGraph(
+                certificate=c,
+                granted_services=granted.get(c.id, []),
+                contract_details={gs.id: contracts[gs.id] for gs in granted.get(c.id, []) if gs.id in contracts},
+                copayment_limits=limits.get(c.id, []),
+                meal_addon_statuses=meals.get(c.id, []),
+                copayment_managements=managements.get(c.id, []),
+            )
+            for c in certificates
+        ]
+
+    @classmethod
+    def load_graph(cls, certificate: ServiceCertificate) -> CertificateGraph:
+        return cls.load_graphs([certificate])[0]
+
+    @classmethod
+    def for_user(cls, user_id: int) -> list:
+        """利用者の受給者証を交付日の新しい順に、子レコード込みで返す"""
+        certs = ServiceCertificate.query.filter_by(user_id=user_id).order_by(
+            ServiceCertificate.certificate_issue_date.desc(), ServiceCertificate.id.desc()
+        ).all()
+        return cls.load_graphs(certs)
+
+    @staticmethod
+    def find_overlapping_active(cert: ServiceCertificate) -> list:
+        """
+        cert と同じ利用者の他の ACTIVE な受給者証のうち、同じサービス種類で支給決定期間が重なるものを返す。
+        受給者証の件数によらず、他の受給者証の支給決定・cert の支給決定・該当する受給者証の3クエリで済む。
+        """
+        others = db.session.query(GrantedService).join(
+            ServiceCertificate, GrantedService.certificate_id == ServiceCertificate.id
+        ).filter(
+            ServiceCertificate.user_id == cert.user_id,
+            ServiceCertificate.status == 'ACTIVE',
+            ServiceCertificate.id != cert.id,
+        ).all()
+        if not others:
+            return []
+
+        index = GrantedIntervalIndex()
+        for gs in others:
+            index.add(cert.user_id, gs)
+
+        overlapping_ids = set()
+        for new_g in GrantedService.query.filter_by(certificate_id=cert.id):
+            overlapping_ids |= index.overlapping(
+                cert.user_id, new_g.service_type_master_id, new_g.granted_start_date, new_g.granted_end_date
+            )
+        if not overlapping_ids:
+            return []
+        return ServiceCertificate.query.filter(ServiceCertificate.id.in_(overlapping_ids)).order_by(ServiceCertificate.id).all()
@@ -123,7 +123,7 @@ class ComplianceService:
         
         # 1. 施設外活動の特定 (UserDailyLog & SupportRecord)
         off_site_logs = UserDailyLog.query.filter(
-            func.date(UserDailyLog.log_date) == target_date,
+            UserDailyLog.log_date == target_date,
             UserDailyLog.location_type.in_(['OFF_SITE_EXTERNAL', 'OFF_SITE_USER_HOME'])
         ).all()
         
@@ -235,4 +235,61 @@ class ComplianceService:
             logger.error("❌ URAC Integrity Error occurred during tracking.")
         except Exception as e:
             logger.exception(f"⚠️ ERROR: Failed to track URAC for supporter {supporter_id}: {e}")
-            db.session.rollback()
\ No newline at end of file
+            db.session.rollback()
+
+    def track_unresolved_risks(self, risks: List[Dict[str, Any]]) -> int:
+        """
+        track_unresolved_risk の一括版。risks の各要素は supporter_id, risk_type, linked_entity_id,
+        linked_entity_type, count（省略時1）を持つ。(職員, リスク種別) ごとに集計し、1文の UPSERT で
+        継続回数を加算する。コミットは呼び出し側で行う。更新した (職員, リスク種別) の件数を返す。
+        """
+        merged = {}
+        for risk in risks:
+            key = (risk['supporter_id'], risk['risk_type'])
+            row = merged.setdefault(key, {
+                'supporter_id': key[0], 'risk_type': key[1], 'cumulative_count': 0,
+                'last_unresolved_at': datetime.now(timezone.utc),
+            })
+            row['cumulative_count'] += risk.get('count', 1)
+            row['linked_entity_id'] = risk.get('linked_entity_id')
+            row['linked_entity_type'] = risk.get('linked_entity_type')
+        if not merged:
+            return 0
+        rows = [merged[key] for key in sorted(merged)]
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            for row in rows:
+                self._merge_unresolved_risk(row)
+            return len(rows)
+
+        stmt = insert(UnresolvedRiskCounter).values(rows)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['supporter_id', 'risk_type'],
+            set_={
+                'cumulative_count': UnresolvedRiskCounter.cumulative_count + stmt.excluded.cumulative_count,
+                'last_unresolved_at': stmt.excluded.last_unresolved_at,
+                'linked_entity_id': stmt.excluded.linked_entity_id,
+                'linked_entity_type': stmt.excluded.linked_entity_type,
+            },
+        ))
+        logger.info(f"📊 URAC BULK: {len(rows)} unresolved risk counters upserted.")
+        return len(rows)
+
+    @staticmethod
+    def _merge_unresolved_risk(row: Dict[str, Any]):
+        """ON CONFLICT を持たないDB向けの1件ずつの更新"""
+        urac_record = UnresolvedRiskCounter.query.filter_by(
+            supporter_id=row['supporter_id'], risk_type=row['risk_type']
+        ).with_for_update().first()
+        if urac_record:
+            urac_record.cumulative_count += row['cumulative_count']
+            urac_record.last_unresolved_at = row['last_unresolved_at']
+            urac_record.linked_entity_id = row['linked_entity_id']
+            urac_record.linked_entity_type = row['linked_entity_type']
+        else:
+            db.session.add(UnresolvedRiskCounter(**row))
@@ -0,0 +1,277 @@
+# backend/app/services/copayment_allocation_service.py
+
+import bisect
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, ROUND_FLOOR
+
+from sqlalchemy import and_, func, insert, select, update
+
+from backend.app.extensions import db
+from backend.app.models import (
+    BillingData, ClientInvoice, CopaymentLimit, CopaymentManagement, MonthlyBillingSummary,
+    OfficeServiceConfiguration, OfficeSetting, ServiceCertificate
+)
+from backend.app.services.billing_engine_service import COPAY_RATE, YEN, month_range
+
+logger = logging.getLogger(__name__)
+
+
+def _yen(value) -> str:
+    return str(Decimal(value).quantize(YEN))
+
+
+class PeriodIndex:
+    """
+    利用者ごとの有効期間の索引。期間は開始日順に並べ、対象月に掛かる期間は二分探索で引く。
+    複数の期間が掛かる場合は開始日の新しい方（同じ開始日なら後に登録した方）を採用する。
+    """
+
+    def __init__(self, rows):
+        self._starts = defaultdict(list)
+        self._periods = defaultdict(list)
+        for key, start, end, value in sorted(rows, key=lambda r: (r[0], r[1])):
+            self._starts[key].append(start)
+            self._periods[key].append((end, value))
+
+    def covering(self, key, period_start: date, period_end: date):
+        starts = self._starts.get(key)
+        if not starts:
+            return None
+        periods = self._periods[key]
+        for i in range(bisect.bisect_right(starts, period_end) - 1, -1, -1):
+            end, value = periods[i]
+            if end >= period_start:
+                return value
+        return None
+
+
+@dataclass
+class OfficeCharge:
+    """利用者×サービスの月の費用と利用者負担（按分前・按分後）"""
+    summary_id: int
+    user_id: int
+    osc_id: int
+    office_number: str
+    total_cost: Decimal
+    first_service_date: date
+    copayment: Decimal = Decimal(0)
+    adjusted: Decimal = Decimal(0)
+
+
+class CopaymentAllocator:
+    """
+    法人全体の利用者負担上限額管理。
+    月次請求（MonthlyBillingSummary）ごとの総費用を請求明細（BillingData）から1回の集計クエリで求め、
+    利用者の負担上限月額と上限管理事業所を期間の索引から引いて、事業所ごとの負担額を按分する。
+      - 上限管理事業所が法人内にある場合: 管理事業所の負担を先に充て、残りを利用開始日の早い事業所から順に充てる
+      - 上限管理事業所が法人外の場合: 上限額管理結果票を待つため各事業所で上限額までとし、警告を返す
+      - 上限管理の登録がない場合: 各事業所で上限額までとし、合計が上限を超えれば警告を返す
+    按分結果は ClientInvoice.self_pay_amount に事業所ごとに一括で書き込む。入金済みの請求書は変更しない。
+    """
+
+    def __init__(self, corporation_id: int, year: int, month: int):
+        self.corporation_id = corporation_id
+        self.billing_month, self.month_end = month_range(year, month)
+        self.warnings = []
+
+    def run(self, dry_run: bool = False) -> dict:
+        charges = self._load_charges()
+        limits, management = self._load_periods()
+        by_user = defaultdict(list)
+        for charge in charges:
+            by_user[charge.user_id].append(charge)
+
+        allocations = []
+        for user_id, user_charges in sorted(by_user.items()):
+            limit = limits.covering(user_id, self.billing_month, self.month_end)
+            managing_office_number = management.covering(user_id, self.billing_month, self.month_end)
+            self._allocate(user_id, user_charges, limit, managing_office_number)
+            allocations.append({
+                "user_id": user_id,
+                "copayment_limit": None if limit is None else _yen(limit),
+                "managing_office_number": managing_office_number,
+                "offices": [
+                    {
+                        "office_service_configuration_id": c.osc_id,
+                        "office_number": c.office_number,
+                        "total_cost": _yen(c.total_cost),
+                        "copayment": _yen(c.copayment),
+                        "self_pay_amount": _yen(c.adjusted),
+                    }
+                    for c in user_charges
+                ],
+            })
+        return self._report(charges, allocations, dry_run)
+
+    # ====================================================================
+    # 読み込み（集合単位）
+    # ====================================================================
+    def _billed(self):
+        return and_(
+            MonthlyBillingSummary.billing_month == self.billing_month,
+            OfficeSetting.corporation_id == self.corporation_id,
+        )
+
+    def _billed_users(self):
+        return (
+            select(MonthlyBillingSummary.user_id)
+            .join(OfficeServiceConfiguration,
+                  MonthlyBillingSummary.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .where(self._billed())
+        )
+
+    def _load_charges(self) -> list:
+        """
+        請求ごとの総費用（請求明細の合計）と最初の利用日。
+        明細は記録された事業所で請求に結び付ける（同じサービス種類の事業所を月の途中で移った場合も二重に数えない）
+        """
+        rows = db.session.execute(
+            select(MonthlyBillingSummary.id, MonthlyBillingSummary.user_id,
+                   MonthlyBillingSummary.office_service_configuration_id, OfficeServiceConfiguration.jigyosho_bango,
+                   func.coalesce(func.sum(BillingData.cost), 0), func.min(BillingData.billing_date))
+            .join(OfficeServiceConfiguration,
+                  MonthlyBillingSummary.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .outerjoin(BillingData, and_(
+                BillingData.user_id == MonthlyBillingSummary.user_id,
+                BillingData.office_service_configuration_id == MonthlyBillingSummary.office_service_configuration_id,
+                BillingData.billing_date >= self.billing_month,
+                BillingData.billing_date <= self.month_end,
+            ))
+            .where(self._billed())
+            .group_by(MonthlyBillingSummary.id, MonthlyBillingSummary.user_id,
+                      MonthlyBillingSummary.office_service_configuration_id, OfficeServiceConfiguration.jigyosho_bango)
+            .order_by(MonthlyBillingSummary.user_id, MonthlyBillingSummary.id)
+        ).all()
+        return [
+            OfficeCharge(summary_id, user_id, osc_id, office_number, Decimal(cost), first_date)
+            for summary_id, user_id, osc_id, office_number, cost, first_date in rows
+        ]
+
+    def _load_periods(self):
+        """対象月に掛かる負担上限月額と上限管理事業所（有効な受給者証のもの）を利用者ごとの期間索引にする"""
+        billed_users = self._billed_users()
+        active = (
+            ServiceCertificate.user_id.in_(billed_users),
+            ServiceCertificate.status == 'ACTIVE',
+            ServiceCertificate.voided_at.is_(None),
+        )
+        limits = db.session.execute(
+            select(ServiceCertificate.user_id, CopaymentLimit.limit_start_date, CopaymentLimit.limit_end_date,
+                   CopaymentLimit.limit_amount)
+            .join(ServiceCertificate, CopaymentLimit.certificate_id == ServiceCertificate.id)
+            .where(*active, CopaymentLimit.limit_start_date <= self.month_end,
+                   CopaymentLimit.limit_end_date >= self.billing_month)
+            .order_by(CopaymentLimit.id)
+        ).all()
+        management = db.session.execute(
+            select(ServiceCertificate.user_id, CopaymentManagement.management_start_date,
+                   CopaymentManagement.management_end_date, CopaymentManagement.managing_office_number)
+            .join(ServiceCertificate, CopaymentManagement.certificate_id == ServiceCertificate.id)
+            .where(*active, CopaymentManagement.is_applicable.is_(True),
+                   CopaymentManagement.management_start_date <= self.month_end,
+                   CopaymentManagement.management_end_date >= self.billing_month)
+            .order_by(CopaymentManagement.id)
+        ).all()
+        return PeriodIndex(limits), PeriodIndex(management)
+
+    # ====================================================================
+    # 按分
+    # ====================================================================
+    def _allocate(self, user_id: int, charges: list, limit, managing_office_number):
+        for charge in charges:
+            charge.copayment = (charge.total_cost * COPAY_RATE).quantize(YEN, rounding=ROUND_FLOOR)
+
+        if limit is None:
+            self.warnings.append({"code": "MISSING_COPAYMENT_LIMIT", "user_id": user_id})
+            for charge in charges:
+                charge.adjusted = charge.copayment
+            return
+
+        limit = Decimal(limit)
+        manager = next((c for c in charges if managing_office_number and c.office_number == managing_office_number), None)
+        if manager is not None:
+            others = sorted((c for c in charges if c is not manager),
+                            key=lambda c: (c.first_service_date or date.max, c.office_number))
+            remaining = limit
+            for charge in [manager, *others]:
+                charge.adjusted = min(charge.copayment, remaining)
+                remaining -= charge.adjusted
+            return
+
+        for charge in charges:
+            charge.adjusted = min(charge.copayment, limit)
+        if managing_office_number:
+            self.warnings.append({"code": "EXTERNAL_MANAGEMENT", "user_id": user_id,
+                                  "managing_office_number": managing_office_number})
+        elif len(charges) > 1 and sum(c.adjusted for c in charges) > limit:
+            self.warnings.append({"code": "MANAGEMENT_NOT_REGISTERED", "user_id": user_id})
+
+    # ====================================================================
+    # 差分と書き込み
+    # ====================================================================
+    def _report(self, charges: list, allocations: list, dry_run: bool) -> dict:
+        wanted = {(c.user_id, c.osc_id): c for c in charges}
+        existing = {}
+        if wanted:
+            corporation_services = (
+                select(OfficeServiceConfiguration.id)
+                .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+                .where(OfficeSetting.corporation_id == self.corporation_id)
+            )
+            for invoice in ClientInvoice.query.filter(
+                ClientInvoice.billing_month == self.billing_month,
+                ClientInvoice.office_service_configuration_id.in_(corporation_services),
+            ).order_by(ClientInvoice.id):
+                existing.setdefault((invoice.user_id, invoice.office_service_configuration_id), invoice)
+
+        diff = {"added": [], "changed": [], "locked": [], "orphaned": [], "unchanged": 0}
+        inserts, updates = [], []
+        for key in sorted(set(existing) | set(wanted)):
+            before, charge = existing.get(key), wanted.get(key)
+            entry = {"user_id": key[0], "office_service_configuration_id": key[1]}
+            if charge is None:
+                # 請求が無くなったサービスの請求書は実費等を含むため削除せず報告する
+                diff["orphaned"].append(dict(entry, self_pay_amount=_yen(before.self_pay_amount)))
+                continue
+            entry["self_pay_amount"] = _yen(charge.adjusted)
+            if before is None:
+                diff["added"].append(entry)
+                inserts.append({
+                    "user_id": key[0], "office_service_configuration_id": key[1], "billing_month": self.billing_month,
+                    "self_pay_amount": charge.adjusted, "actual_cost_amount": Decimal(0),
+                    "total_amount": charge.adjusted, "payment_status": 'PENDING',
+                })
+            elif Decimal(before.self_pay_amount) == charge.adjusted:
+                diff["unchanged"] += 1
+            elif before.payment_status == 'PAID':
+                diff["locked"].append(dict(entry, previous_self_pay_amount=_yen(before.self_pay_amount)))
+            else:
+                diff["changed"].append(dict(entry, previous_self_pay_amount=_yen(before.self_pay_amount)))
+                updates.append({
+                    "id": before.id, "self_pay_amount": charge.adjusted,
+                    "total_amount": charge.adjusted + Decimal(before.actual_cost_amount or 0),
+                })
+
+        if not dry_run:
+            if inserts:
+                db.session.execute(insert(ClientInvoice), inserts)
+            if updates:
+                db.session.execute(update(ClientInvoice), updates)
+            logger.info(
+                f"💴 上限額管理 corp={self.corporation_id} {self.billing_month:%Y-%m}: "
+                f"added={len(diff['added'])} changed={len(diff['changed'])} locked={len(diff['locked'])}"
+            )
+
+        return {
+            "corporation_id": self.corporation_id,
+            "billing_month": self.billing_month.isoformat(),
+            "dry_run": dry_run,
+            "allocations": allocations,
+            "diff": diff,
+            "warnings": self.warnings,
+        }
@@ -1,5 +1,7 @@
 # backend/app/services/core_service.py
 
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
 from datetime import date
 from flask import current_app # ★この行をインポートに追加★
 from backend.app.extensions import db
@@ -8,6 +10,7 @@ from backend.app.models import (
     Corporation, ServiceCertificate, GrantedService, 
     ContractReportDetail, OfficeServiceConfiguration, OfficeSetting
 )
+from sqlalchemy import inspect as sa_inspect
 import os
 import logging
 
@@ -227,43 +230,91 @@ def check_pii_access(supporter_id: int) -> bool:
     logger.debug(f"✅ Supporter {supporter_id} has PII access.")
     return True
 
-def reconcile_relations(existing_items, incoming_payload, model_class, db_session, unique_match_func, update_func):
+@dataclass
+class ReconcileChangeSet:
+    """
+    reconcile_keyed の適用結果。監査ログ用に、追加・更新（変更された列と新旧値）・削除の内訳を保持する。
+    """
+    table: str
+    inserted: list = field(default_factory=list)
+    updated: list = field(default_factory=list)  # [(item, {列名: (旧値, 新値)})]
+    unchanged: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def to_audit_dict(self) -> dict:
+        """
+        監査ログ向けの要約（ID と変更列名のみ。値は個人情報を含み得るため含めない）。
+        追加行のIDはフラッシュ後に確定する。
+        """
+        return {
+            "table": self.table,
+            "inserted": [item.id for item in self.inserted],
+            "updated": [{"id": item.id, "fields": sorted(changes)} for item, changes in self.updated],
+            "deleted": [item.id for item in self.deleted],
+        }
+
+
+def reconcile_keyed(existing_items, incoming_payload, model_class, db_session, existing_key, incoming_key, update_func) -> ReconcileChangeSet:
     """
     関連テーブル（子テーブル）の差分整合を行う汎用関数。
-    
-    :param existing_items: データベースに存在する既存レコードのリスト
+    既存レコードをキーで索引化してから送信データを突き合わせるため、件数に対して線形時間で処理する。
+
+    :param existing_items: データベースに存在する既存レコード（リストまたはクエリ）
     :param incoming_payload: クライアントから送信されたデータのリスト (dictのリスト)
     :param model_class: 新規作成する際のSQLAlchemyモデルクラス
     :param db_session: SQLAlchemyのデータベースセッション
-    :param unique_match_func: (item, payload) -> bool : 既存レコードと送信データが同一要素か判定する関数
-    :param update_func: (item, payload) -> None : 既存レコードのプロパティを更新する関数
+    :param existing_key: (item) -> key : 既存レコードの照合キー
+    :param incoming_key: (payload) -> key : 送信データの照合キー。None の場合は常に新規扱い
+    :param update_func: (item, payload) -> None : レコードのプロパティを更新する関数
+    :return: ReconcileChangeSet
+
+    同じキーの送信データが複数ある場合は、同じキーの既存レコードに先頭から順に対応付ける。
+    追加・削除はセッションにまとめて登録し、フラッシュ時に一括で発行される
+    （ORM経由のため、delete-orphan のカスケードやフラッシュ時のキャッシュ無効化も従来どおり動く）。
     """
-    # 既存の要素を追跡するリスト（変更されないようにコピーする）
-    unmatched_existing = list(existing_items)
-    
+    columns = [attr.key for attr in sa_inspect(model_class).column_attrs]
+    change_set = ReconcileChangeSet(table=model_class.__tablename__)
+
+    index = defaultdict(deque)
+    for item in existing_items:
+        index[existing_key(item)].append(item)
+
     for payload in incoming_payload:
-        # payloadとマッチする既存レコードを探す
-        matched_item = None
-        for item in unmatched_existing:
-            if unique_match_func(item, payload):
-                matched_item = item
-                break
-        
-        if matched_item:
-            # マッチした場合はUPDATE
-            update_func(matched_item, payload)
-            # 処理済みとしてリストから削除
-            unmatched_existing.remove(matched_item)
+        key = incoming_key(payload)
+        candidates = index.get(key) if key is not None else None
+        if candidates:
+            item = candidates.popleft()
+            before = {c: getattr(item, c) for c in columns}
+            update_func(item, payload)
+            changes = {c: (before[c], getattr(item, c)) for c in columns if getattr(item, c) != before[c]}
+            if changes:
+                change_set.updated.append((item, changes))
+            else:
+                change_set.unchanged.append(item)
         else:
-            # マッチしない場合はINSERT
             new_item = model_class()
             update_func(new_item, payload)
-            db_session.add(new_item)
-            
-    # ペイロードに含まれていなかった既存レコードはDELETE
-    for leftover in unmatched_existing:
+            change_set.inserted.append(new_item)
+
+    # 送信データに含まれていなかった既存レコードは削除
+    for leftovers in index.values():
+        change_set.deleted.extend(leftovers)
+
+    if change_set.inserted:
+        db_session.add_all(change_set.inserted)
+    for leftover in change_set.deleted:
         db_session.delete(leftover)
 
+    if change_set.has_changes:
+        logger.debug(
+            f"🔄 reconcile {change_set.table}: +{len(change_set.inserted)} ~{len(change_set.updated)} -{len(change_set.deleted)}"
+        )
+    return change_set
+
 def validate_last_admin_protection(staff, data):
     """
     唯一の有効なシステム管理者(SYSTEM)または法人管理者(CORPORATE)が不在になるのを防ぐバリデーション。
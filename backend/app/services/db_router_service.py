@@ -0,0 +1,295 @@
+# backend/app/services/db_router_service.py
+
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from flask import current_app, g, request
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.sql.dml import UpdateBase
+
+from backend.app.extensions import db
+from backend.app.models.core.replication import ReplicaHeartbeat
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'primary'
+READ_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+
+def use_primary(view):
+    """
+    GETでも読み取った値をもとに書き込むビューに付け、プライマリで読ませる。
+    jwt_required などのデコレータより内側（def の直上）に置く。
+    """
+    view._db_use_primary = True
+    return view
+
+
+@dataclass
+class RequestRoute:
+    """1リクエスト（または1ジョブ）の読み取り先"""
+    replica: str = None  # 読み取りに使うレプリカのバインド名。None はプライマリ
+    reason: str = ''     # プライマリで読む理由
+    wrote: bool = False  # 書き込みを行った（以降の読み取りはプライマリ）
+
+
+@dataclass
+class ReplicaHealth:
+    reachable: bool = False
+    lag_seconds: float = None  # None は未計測（レプリカにハートビートが届いていない）
+    checked_at: float = None
+    error: str = None
+
+
+class DatabaseRouter:
+    """
+    読み取りのリードレプリカへの振り分け。
+    GET/HEAD/OPTIONS のリクエストの SELECT はレプリカへ、それ以外（書き込み・flush・行ロック・生SQL）はプライマリへ送る。
+    - 書き込みを行ったリクエストは以降の読み取りもプライマリで行い、応答に Cookie を付けて
+      DB_REPLICA_STICKY_SECONDS の間そのクライアントの読み取りをプライマリに固定する（read-your-writes）。
+    - 遅延はプライマリで更新するハートビート行とレプリカに届いている値の差で計測し、
+      DB_REPLICA_MAX_LAG_SECONDS を超えた・接続できないレプリカは使わずプライマリで読む。
+    """
+
+    EXTENSION_KEY = 'db_router'
+    ROUTE_KEY = '_db_route'
+    STICKY_COOKIE = 'db_primary_until'
+    BIND_HEADER = 'X-DB-Read-Bind'
+
+    def __init__(self, replica_urls, sticky_seconds: float = 5, max_lag_seconds: float = 5, check_seconds: float = 2):
+        # レプリカのエンジンはアプリごとに持つ（SQLALCHEMY_BINDS に載せるとモデルのメタデータ側にもバインドが増えるため）
+        self.engines = {
+            f"replica_{i}": create_engine(url, pool_pre_ping=True) for i, url in enumerate(replica_urls, start=1)
+        }
+        self.replica_keys = list(self.engines)
+        self.sticky_seconds = sticky_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self._health = {key: ReplicaHealth() for key in self.replica_keys}
+        self._rotation = itertools.cycle(self.replica_keys)
+        self._last_check = None
+        self._lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._binds = {key: Counter() for key in [PRIMARY] + self.replica_keys}
+        self._decisions = Counter()
+
+    @classmethod
+    def init_app(cls, app):
+        """DATABASE_REPLICA_URLS のレプリカを replica_1, replica_2, ... として登録する。未設定なら何もしない"""
+        urls = app.config.get('DATABASE_REPLICA_URLS') or []
+        if not urls:
+            return None
+        router = cls(
+            urls,
+            sticky_seconds=float(app.config.get('DB_REPLICA_STICKY_SECONDS', 5)),
+            max_lag_seconds=float(app.config.get('DB_REPLICA_MAX_LAG_SECONDS', 5)),
+            check_seconds=float(app.config.get('DB_REPLICA_CHECK_SECONDS', 2)),
+        )
+        app.extensions[cls.EXTENSION_KEY] = router
+        app.before_request(router.begin)
+        app.after_request(router.finish)
+        return router
+
+    @classmethod
+    def get(cls, app=None):
+        app = app or current_app._get_current_object()
+        return app.extensions.get(cls.EXTENSION_KEY)
+
+    # ====================================================================
+    # リクエストのライフサイクル
+    # ====================================================================
+    def begin(self):
+        setattr(g, self.ROUTE_KEY, self._decide())
+
+    def _decide(self) -> RequestRoute:
+        if request.method not in READ_METHODS:
+            return self._primary('write_method')
+        view = current_app.view_functions.get(request.endpoint)
+        if view is not None and getattr(view, '_db_use_primary', False):
+            return self._primary('primary_only')
+        if self._is_sticky():
+            return self._primary('sticky')
+        replica, reason = self.choose_replica()
+        if replica is None:
+            return self._primary(reason)
+        self._count_decision(replica)
+        return RequestRoute(replica=replica)
+
+    def _primary(self, reason: str) -> RequestRoute:
+        self._count_decision(f"{PRIMARY}:{reason}")
+        return RequestRoute(reason=reason)
+
+    def _is_sticky(self) -> bool:
+        try:
+            return float(request.cookies.get(self.STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def finish(self, response):
+        route = g.pop(self.ROUTE_KEY, None)
+        if route is None:
+            return response
+        if route.wrote and self.sticky_seconds > 0:
+            response.set_cookie(
+                self.STICKY_COOKIE, f"{time.time() + self.sticky_seconds:.3f}",
+                max_age=math.ceil(self.sticky_seconds), httponly=True, samesite='Lax',
+            )
+        response.headers[self.BIND_HEADER] = route.replica or PRIMARY
+        return response
+
+    @classmethod
+    @contextmanager
+    def replica_reads(cls):
+        """
+        リクエスト外のレポート・エクスポート処理の読み取りをレプリカへ振り分ける。
+        レプリカ未設定・利用不可ならプライマリで読む。
+        """
+        router = current_app.extensions.get(cls.EXTENSION_KEY)
+        if router is None:
+            yield
+            return
+        previous = g.get(cls.ROUTE_KEY)
+        replica, reason = router.choose_replica()
+        setattr(g, cls.ROUTE_KEY, RequestRoute(replica=replica, reason=reason or ''))
+        try:
+            yield
+        finally:
+            if previous is None:
+                g.pop(cls.ROUTE_KEY, None)
+            else:
+                setattr(g, cls.ROUTE_KEY, previous)
+
+    # ====================================================================
+    # セッションからの振り分け（RoutingSession.get_bind から呼ばれる）
+    # ====================================================================
+    def route_bind(self, session, clause):
+        """レプリカで実行する場合はそのエンジンを返す。None ならプライマリ"""
+        route = g.get(self.ROUTE_KEY)
+        if route is None:
+            return None
+        if session._flushing or isinstance(clause, UpdateBase):
+            route.wrote = True
+            self._count_bind(PRIMARY, 'writes')
+            return None
+        if (route.replica is None or route.wrote or not getattr(clause, 'is_select', False)
+                or getattr(clause, '_for_update_arg', None) is not None):
+            self._count_bind(PRIMARY, 'reads')
+            return None
+        self._count_bind(route.replica, 'reads')
+        return self.engines[route.replica]
+
+    # ====================================================================
+    # レプリカの選択と遅延計測
+    # ====================================================================
+    def choose_replica(self):
+        """使えるレプリカを順番に返す。なければ (None, 理由)"""
+        self._refresh_health()
+        with self._lock:
+            for _ in self.replica_keys:
+                key = next(self._rotation)
+                health = self._health[key]
+                if health.reachable and health.lag_seconds is not None and health.lag_seconds <= self.max_lag_seconds:
+                    return key, None
+            reachable = any(h.reachable for h in self._health.values())
+        return None, ('lag' if reachable else 'unavailable')
+
+    def _refresh_health(self):
+        if self._last_check is not None and time.monotonic() - self._last_check < self.check_seconds:
+            return
+        # 計測中のスレッドがあれば、その間は前回の結果を使う
+        if not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            if self._last_check is None or time.monotonic() - self._last_check >= self.check_seconds:
+                self.check_replicas()
+        finally:
+            self._check_lock.release()
+
+    def check_replicas(self):
+        """
+        プライマリのハートビートを更新し、各レプリカの遅延を計測する。
+        遅延は「前回プライマリに書いたハートビート」と「レプリカに届いているハートビート」の差で、精度は計測間隔程度。
+        """
+        try:
+            primary_beat = self._beat(db.engine)
+        except SQLAlchemyError as e:
+            logger.error(f"❌ プライマリのハートビート更新に失敗しました: {e}")
+            return
+        finally:
+            self._last_check = time.monotonic()
+
+        for key in self.replica_keys:
+            try:
+                with self.engines[key].connect() as conn:
+                    replica_beat = conn.execute(
+                        select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1)
+                    ).scalar()
+                if primary_beat is None:
+                    lag = 0.0
+                elif replica_beat is None:
+                    lag = None
+                else:
+                    lag = max(0.0, (primary_beat - replica_beat).total_seconds())
+                health = ReplicaHealth(reachable=True, lag_seconds=lag, checked_at=time.time())
+                if lag is None or lag > self.max_lag_seconds:
+                    logger.warning(f"🐢 レプリカ {key} の遅延が大きいためプライマリで読み取ります (lag={lag})")
+            except SQLAlchemyError as e:
+                health = ReplicaHealth(reachable=False, checked_at=time.time(), error=str(e)[:200])
+                logger.warning(f"⚠️ レプリカ {key} に接続できないためプライマリで読み取ります: {e}")
+            with self._lock:
+                self._health[key] = health
+
+    @staticmethod
+    def _beat(engine):
+        """ハートビートを現在時刻に更新し、更新前の値を返す"""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        try:
+            with engine.begin() as conn:
+                previous = conn.execute(select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1)).scalar()
+                if previous is None:
+                    conn.execute(insert(ReplicaHeartbeat).values(id=1, beat_at=now))
+                else:
+                    conn.execute(update(ReplicaHeartbeat).where(ReplicaHeartbeat.id == 1).values(beat_at=now))
+        except IntegrityError:
+            return None  # 他プロセスが同時に最初の行を作った
+        return previous
+
+    # ====================================================================
+    # メトリクス
+    # ====================================================================
+    def _count_bind(self, key: str, kind: str):
+        with self._lock:
+            self._binds[key][kind] += 1
+
+    def _count_decision(self, key: str):
+        with self._lock:
+            self._decisions[key] += 1
+
+    def metrics(self) -> dict:
+        """バインド別の振り分け件数・接続プール・レプリカの状態と、リクエストの振り分け理由の内訳"""
+        with self._lock:
+            binds = {}
+            for key, counts in self._binds.items():
+                engine = db.engine if key == PRIMARY else self.engines[key]
+                binds[key] = {"reads": counts["reads"], "writes": counts["writes"], "pool": engine.pool.status()}
+                health = self._health.get(key)
+                if health is not None:
+                    binds[key].update(
+                        reachable=health.reachable, lag_seconds=health.lag_seconds, error=health.error,
+                        checked_at=datetime.fromtimestamp(health.checked_at, timezone.utc).isoformat() if health.checked_at else None,
+                    )
+            decisions = dict(self._decisions)
+        return {
+            "max_lag_seconds": self.max_lag_seconds,
+            "sticky_seconds": self.sticky_seconds,
+            "binds": binds,
+            "decisions": decisions,
+        }
@@ -0,0 +1,230 @@
+# backend/app/services/deduction_risk_scanner_service.py
+
+import logging
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, exists, func, insert, or_, select, update
+
+from backend.app.extensions import db
+from backend.app.models import (
+    CaseConferenceLog, ComplianceEventLog, MonitoringReport, OfficeServiceConfiguration, ServiceCertificate,
+    SupportPlan, User
+)
+from backend.app.services.compliance_service import ComplianceService
+from backend.app.services.staffing_coverage_service import StaffingCoverageService
+from backend.app.utils.timezone import get_jst_today
+
+logger = logging.getLogger(__name__)
+
+# 検出ルール -> (ComplianceEventLog.event_type, URAC の risk_type)
+RULES = {
+    'PLAN_EXPIRED': ('PLAN_UNCREATED_SUBTRACTION', 'PLAN_EXPIRED'),
+    'PLAN_MISSING': ('PLAN_UNCREATED_SUBTRACTION', 'PLAN_UNCREATED'),
+    'MONITORING_OVERDUE': ('MONITORING_OVERDUE', 'MONITORING_OVERDUE'),
+    'CASE_CONFERENCE_MISSING': ('CASE_CONFERENCE_MISSING', 'CASE_CONFERENCE_MISSING'),
+    'STAFFING_SHORTFALL': ('STAFFING_SHORTFALL_SUBTRACTION', 'STAFFING_SHORTFALL'),
+}
+EVENT_TYPES = sorted({event_type for event_type, _ in RULES.values()})
+RULE_NOTES = {
+    'PLAN_EXPIRED': "個別支援計画の期間が終了したまま更新されていません。",
+    'PLAN_MISSING': "有効な個別支援計画がありません。",
+    'MONITORING_OVERDUE': "モニタリングの実施間隔を超過しています。",
+    'CASE_CONFERENCE_MISSING': "個別支援計画に対応する担当者会議の記録がありません。",
+    'STAFFING_SHORTFALL': "前日に人員配置基準を下回る時間帯がありました。",
+}
+# 自動検出した事象の証憑欄（ComplianceService.log_deduction_event と同じ）
+SYSTEM_DOCUMENT = "SYSTEM_GENERATED"
+
+
+class DeductionRiskScanner:
+    """
+    減算につながる事象を全利用者について集合単位のクエリで検出し、1日1回の定時処理で記録する。
+      - 個別支援計画の期限切れ・未作成
+      - モニタリングの実施間隔の超過
+      - 計画に対応する担当者会議の記録なし
+      - 前日の人員配置基準の不足（StaffingCoverageService のタイムライン）
+    検出結果は (利用者, 事象) ごとに ComplianceEventLog の期間として記録する。前日まで続いている事象は終了日を延ばし、
+    途切れていれば新しい期間を始める。同じ日に何度実行しても、期間と URAC の継続回数は1日分しか進まない。
+    """
+
+    def __init__(self, scan_date: date = None, monitoring_interval_days: int = None):
+        self.scan_date = scan_date or get_jst_today()
+        self.monitoring_interval_days = (
+            monitoring_interval_days or current_app.config.get('DEDUCTION_SCAN_MONITORING_DAYS', 180)
+        )
+
+    def run(self) -> dict:
+        findings = self._dedupe(
+            self._plan_findings() + self._monitoring_findings()
+            + self._case_conference_findings() + self._staffing_findings()
+        )
+        return self._record(findings)
+
+    # ====================================================================
+    # 検出（ルールごとに1回のクエリ）
+    # ====================================================================
+    def _active_users(self):
+        """有効な受給者証を持つ利用者と、その事業所・担当職員（未設定ならサービス管理責任者）"""
+        return (
+            select(
+                ServiceCertificate.user_id.label('user_id'),
+                OfficeServiceConfiguration.office_id.label('office_id'),
+                func.coalesce(User.primary_supporter_id, OfficeServiceConfiguration.manager_supporter_id)
+                .label('supporter_id'),
+                OfficeServiceConfiguration.manager_supporter_id.label('manager_id'),
+            )
+            .join(OfficeServiceConfiguration,
+                  ServiceCertificate.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(User, ServiceCertificate.user_id == User.id)
+            .where(ServiceCertificate.status == 'ACTIVE', ServiceCertificate.voided_at.is_(None),
+                   ServiceCertificate.certificate_issue_date <= self.scan_date)
+            .subquery()
+        )
+
+    def _covering_plan(self):
+        return and_(
+            SupportPlan.plan_status == 'ACTIVE',
+            SupportPlan.plan_start_date <= self.scan_date,
+            or_(SupportPlan.plan_end_date.is_(None), SupportPlan.plan_end_date >= self.scan_date),
+        )
+
+    def _plan_findings(self) -> list:
+        active = self._active_users()
+        has_plan = exists().where(SupportPlan.user_id == active.c.user_id, self._covering_plan())
+        expired_plan = (
+            select(func.max(SupportPlan.id))
+            .where(SupportPlan.user_id == active.c.user_id, SupportPlan.plan_status.in_(['ACTIVE', 'ARCHIVED']),
+                   SupportPlan.plan_end_date < self.scan_date)
+            .correlate(active)
+            .scalar_subquery()
+        )
+        rows = db.session.execute(
+            select(active.c.user_id, active.c.supporter_id, expired_plan).where(~has_plan).order_by(active.c.user_id)
+        ).all()
+        return [
+            ('PLAN_MISSING', user_id, supporter_id, user_id, 'User') if plan_id is None
+            else ('PLAN_EXPIRED', user_id, supporter_id, plan_id, 'SupportPlan')
+            for user_id, supporter_id, plan_id in rows
+        ]
+
+    def _monitoring_findings(self) -> list:
+        """最後のモニタリング（なければ計画開始日）から実施間隔を超えた有効な計画"""
+        active = self._active_users()
+        last_report = func.max(MonitoringReport.report_date)
+        deadline = self.scan_date - timedelta(days=self.monitoring_interval_days)
+        rows = db.session.execute(
+            select(active.c.user_id, active.c.supporter_id, SupportPlan.id)
+            .join(SupportPlan, SupportPlan.user_id == active.c.user_id)
+            .outerjoin(MonitoringReport, and_(MonitoringReport.support_plan_id == SupportPlan.id,
+                                              MonitoringReport.deleted_at.is_(None)))
+            .where(self._covering_plan())
+            .group_by(active.c.user_id, active.c.supporter_id, SupportPlan.id, SupportPlan.plan_start_date)
+            .having(func.coalesce(last_report, SupportPlan.plan_start_date) < deadline)
+            .order_by(active.c.user_id, SupportPlan.id)
+        ).all()
+        return [('MONITORING_OVERDUE', user_id, supporter_id, plan_id, 'SupportPlan')
+                for user_id, supporter_id, plan_id in rows]
+
+    def _case_conference_findings(self) -> list:
+        active = self._active_users()
+        has_conference = exists().where(CaseConferenceLog.support_plan_id == SupportPlan.id,
+                                        CaseConferenceLog.deleted_at.is_(None))
+        rows = db.session.execute(
+            select(active.c.user_id, active.c.supporter_id, SupportPlan.id)
+            .join(SupportPlan, SupportPlan.user_id == active.c.user_id)
+            .where(self._covering_plan(), ~has_conference)
+            .order_by(active.c.user_id, SupportPlan.id)
+        ).all()
+        return [('CASE_CONFERENCE_MISSING', user_id, supporter_id, plan_id, 'SupportPlan')
+                for user_id, supporter_id, plan_id in rows]
+
+    def _staffing_findings(self) -> list:
+        """前日に人員不足の時間帯があった事業所の利用者全員（減算は事業所の利用者全員に掛かる）"""
+        target_day = self.scan_date - timedelta(days=1)
+        day_start = datetime.combine(target_day, time.min)
+        day_end = day_start + timedelta(days=1)
+        timeline = StaffingCoverageService().build_monthly_timeline(target_day.year, target_day.month)
+        short_offices = [
+            office_id for office_id, office in timeline["offices"].items()
+            if any(datetime.fromisoformat(i["start"]) < day_end and datetime.fromisoformat(i["end"]) > day_start
+                   for i in office["under_staffed_intervals"])
+        ]
+        if not short_offices:
+            return []
+        active = self._active_users()
+        rows = db.session.execute(
+            select(active.c.user_id, active.c.manager_id, active.c.office_id)
+            .where(active.c.office_id.in_(short_offices))
+            .order_by(active.c.user_id)
+        ).all()
+        return [('STAFFING_SHORTFALL', user_id, manager_id, office_id, 'OfficeSetting')
+                for user_id, manager_id, office_id in rows]
+
+    @staticmethod
+    def _dedupe(findings: list) -> dict:
+        """(利用者, 事象) ごとに1件。複数の事業所・計画に該当する場合は最初に見つかったものを使う"""
+        deduped = {}
+        for rule, user_id, supporter_id, entity_id, entity_type in findings:
+            event_type, _ = RULES[rule]
+            deduped.setdefault((user_id, event_type), (rule, supporter_id, entity_id, entity_type))
+        return deduped
+
+    # ====================================================================
+    # 記録（一括）
+    # ====================================================================
+    def _record(self, findings: dict) -> dict:
+        yesterday = self.scan_date - timedelta(days=1)
+        open_events = {}
+        if findings:
+            user_ids = sorted({user_id for user_id, _ in findings})
+            for event_id, user_id, event_type, end_date in db.session.execute(
+                select(ComplianceEventLog.id, ComplianceEventLog.user_id, ComplianceEventLog.event_type,
+                       ComplianceEventLog.end_date)
+                .where(ComplianceEventLog.user_id.in_(user_ids), ComplianceEventLog.event_type.in_(EVENT_TYPES),
+                       ComplianceEventLog.document_url == SYSTEM_DOCUMENT,
+                       ComplianceEventLog.start_date <= self.scan_date, ComplianceEventLog.end_date >= yesterday)
+                .order_by(ComplianceEventLog.end_date, ComplianceEventLog.id)
+            ):
+                open_events[(user_id, event_type)] = (event_id, end_date)
+
+        inserts, extends, risks = [], [], []
+        counts = Counter()
+        unchanged = 0
+        for (user_id, event_type), (rule, supporter_id, entity_id, entity_type) in sorted(findings.items()):
+            counts[rule] += 1
+            current = open_events.get((user_id, event_type))
+            if current is not None and current[1] >= self.scan_date:
+                unchanged += 1
+                continue
+            if current is not None:
+                extends.append({"id": current[0], "end_date": self.scan_date})
+            else:
+                inserts.append({"user_id": user_id, "event_type": event_type, "start_date": self.scan_date,
+                                "end_date": self.scan_date, "notes": RULE_NOTES[rule], "document_url": SYSTEM_DOCUMENT})
+            if supporter_id is not None:
+                risks.append({"supporter_id": supporter_id, "risk_type": RULES[rule][1],
+                              "linked_entity_id": entity_id, "linked_entity_type": entity_type})
+
+        if inserts:
+            db.session.execute(insert(ComplianceEventLog), inserts)
+        if extends:
+            db.session.execute(update(ComplianceEventLog), extends)
+        tracked = ComplianceService().track_unresolved_risks(risks)
+
+        by_supporter = defaultdict(int)
+        for risk in risks:
+            by_supporter[risk["supporter_id"]] += 1
+        logger.info(
+            f"🔎 減算リスク {self.scan_date}: {sum(counts.values())}件 "
+            f"(新規 {len(inserts)} / 継続 {len(extends)} / 記録済み {unchanged}) 職員 {len(by_supporter)}名"
+        )
+        return {
+            "scan_date": self.scan_date.isoformat(),
+            "findings": dict(sorted(counts.items())),
+            "events_opened": len(inserts),
+            "events_extended": len(extends),
+            "already_recorded": unchanged,
+            "risks_tracked": tracked,
+        }
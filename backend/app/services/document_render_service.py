@@ -0,0 +1,354 @@
+# backend/app/services/document_render_service.py
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+from flask import current_app
+from jinja2 import Environment
+from sqlalchemy import select, update
+
+from backend.app.extensions import db
+from backend.app.models import (
+    AgencyReceiptStatement, ClientInvoice, Corporation, MonthlyBillingSummary, OfficeServiceConfiguration,
+    OfficeSetting, ServiceCertificate, User, UserWageLog
+)
+from backend.app.services.billing_engine_service import month_range
+
+logger = logging.getLogger(__name__)
+
+# 帳票の種類 -> (モデル, URL を書き込む列名)
+INVOICE = 'invoice'
+RECEIPT = 'receipt'
+AGENCY_RECEIPT = 'agency_receipt'
+WAGE_RECEIPT = 'wage_receipt'
+URL_COLUMNS = {
+    INVOICE: (ClientInvoice, 'invoice_pdf_url'),
+    RECEIPT: (ClientInvoice, 'receipt_pdf_url'),
+    AGENCY_RECEIPT: (AgencyReceiptStatement, 'statement_pdf_url'),
+    WAGE_RECEIPT: (UserWageLog, 'recipient_receipt_url'),
+}
+FILE_SUFFIX = '.html'
+
+_LAYOUT_HEAD = (
+    '<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>{{ title }}</title>'
+    '<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;width:100%}'
+    'th,td{border:1px solid #333;padding:4px 8px}td.num{text-align:right}</style></head><body>'
+    '<h1>{{ title }}</h1><p>{{ corporation_name }} {{ office_name }}</p>'
+)
+_LAYOUT_FOOT = '</body></html>'
+
+TEMPLATES = {
+    INVOICE: _LAYOUT_HEAD + (
+        '<p>{{ user_name }} 様</p><p>{{ billing_month }} 分のご利用料金を下記のとおりご請求いたします。</p>'
+        '<table><tr><th>利用者負担額</th><td class="num">{{ self_pay_amount|yen }}</td></tr>'
+        '<tr><th>実費</th><td class="num">{{ actual_cost_amount|yen }}</td></tr>'
+        '<tr><th>合計</th><td class="num">{{ total_amount|yen }}</td></tr></table>'
+        '<p>請求番号: {{ document_no }}</p>'
+    ) + _LAYOUT_FOOT,
+    RECEIPT: _LAYOUT_HEAD + (
+        '<p>{{ user_name }} 様</p><p>{{ billing_month }} 分のご利用料金として下記の金額を領収いたしました。</p>'
+        '<table><tr><th>領収金額</th><td class="num">{{ total_amount|yen }}</td></tr>'
+        '<tr><th>内 利用者負担額</th><td class="num">{{ self_pay_amount|yen }}</td></tr>'
+        '<tr><th>内 実費</th><td class="num">{{ actual_cost_amount|yen }}</td></tr></table>'
+        '<p>入金日: {{ payment_date or "" }} / 領収番号: {{ document_no }}</p>'
+    ) + _LAYOUT_FOOT,
+    AGENCY_RECEIPT: _LAYOUT_HEAD + (
+        '<p>{{ user_name }} 様</p>'
+        '<p>{{ billing_month }} 分の障害福祉サービス費について、市町村から下記のとおり代理受領いたしました。</p>'
+        '<table><tr><th>事業所番号</th><td>{{ office_number }}</td></tr>'
+        '<tr><th>請求単位数</th><td class="num">{{ total_units }}</td></tr>'
+        '<tr><th>代理受領額</th><td class="num">{{ claim_amount|yen }}</td></tr>'
+        '<tr><th>受領日</th><td>{{ payment_date }}</td></tr></table>'
+    ) + _LAYOUT_FOOT,
+    WAGE_RECEIPT: _LAYOUT_HEAD + (
+        '<p>{{ corporation_name }} 御中</p><p>{{ billing_month }} 分の工賃として下記の金額を受け取りました。</p>'
+        '<table><tr><th>作業時間（分）</th><td class="num">{{ total_work_minutes or 0 }}</td></tr>'
+        '<tr><th>良品数</th><td class="num">{{ total_units_passed or 0 }}</td></tr>'
+        '<tr><th>工賃総額</th><td class="num">{{ gross_wage_amount|yen }}</td></tr>'
+        '<tr><th>控除額</th><td class="num">{{ deductions|yen }}</td></tr>'
+        '<tr><th>差引支払額</th><td class="num">{{ net_payment_amount|yen }}</td></tr></table>'
+        '<p>受取日: ______年____月____日　氏名: {{ user_name }}　（署名）____________</p>'
+    ) + _LAYOUT_FOOT,
+}
+# テンプレートを変更したら帳票を作り直すため、キーにテンプレートのハッシュを含める
+TEMPLATE_DIGESTS = {kind: hashlib.sha256(source.encode('utf-8')).hexdigest()[:16] for kind, source in TEMPLATES.items()}
+
+
+def _yen_filter(value) -> str:
+    return f"{int(Decimal(value or 0)):,}円"
+
+
+# ====================================================================
+# ワーカー（プロセスプールの各プロセスで動く。DBやアプリには触れない）
+# ====================================================================
+_compiled = None
+
+
+def _init_worker():
+    """ワーカーの起動時にテンプレートを一度だけコンパイルする"""
+    global _compiled
+    env = Environment(autoescape=True)
+    env.filters['yen'] = _yen_filter
+    _compiled = {kind: env.from_string(source) for kind, source in TEMPLATES.items()}
+
+
+def _render_to_disk(job):
+    """
+    1件を描画して一時ファイル経由で path に置き、(path, バイト数) を返す。
+    出力はワーカーが直接書き込むため、描画結果をプロセス間で受け渡さない。
+    """
+    kind, context, path = job
+    if _compiled is None:
+        _init_worker()
+    body = _compiled[kind].render(**context).encode('utf-8')
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(body)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path, len(body)
+
+
+def document_key(kind: str, context: dict) -> str:
+    """テンプレートと差し込みデータから決まる内容ハッシュ。描画は決定的なので同じキーなら同じ帳票になる"""
+    payload = json.dumps(context, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(f"{kind}\0{TEMPLATE_DIGESTS[kind]}\0{payload}".encode('utf-8')).hexdigest()
+
+
+def _corporation_users(corporation_id: int):
+    """法人の事業所の受給者証を持つ利用者（工賃は事業所を持たないため、利用者から法人を決める）"""
+    return (
+        select(ServiceCertificate.user_id)
+        .join(OfficeServiceConfiguration,
+              ServiceCertificate.office_service_configuration_id == OfficeServiceConfiguration.id)
+        .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+        .where(OfficeSetting.corporation_id == corporation_id)
+    )
+
+
+def document_relative_path(kind: str, key: str) -> str:
+    """保存ディレクトリ・URL の接頭辞からの相対パス（{種類}/{ハッシュ先頭2文字}/{ハッシュ}.html）"""
+    return f"{kind}/{key[:2]}/{key}{FILE_SUFFIX}"
+
+
+def find_document(corporation_id: int, kind: str, key: str):
+    """
+    法人の帳票として URL 列に書き込まれているファイルのパスを返す。種類・ハッシュの形式が不正なもの、
+    他法人の帳票、どの行からも参照されていないファイルは None（ファイル名だけでは取得できない）。
+    """
+    if kind not in URL_COLUMNS or len(key) != 64 or any(c not in '0123456789abcdef' for c in key):
+        return None
+    model, column_name = URL_COLUMNS[kind]
+    relative = document_relative_path(kind, key)
+    query = select(model.id).where(getattr(model, column_name).like(f"%/{relative}"))
+    if model is ClientInvoice:
+        query = (
+            query.join(OfficeServiceConfiguration,
+                       ClientInvoice.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .where(OfficeSetting.corporation_id == corporation_id)
+        )
+    elif model is AgencyReceiptStatement:
+        query = (
+            query.join(MonthlyBillingSummary, AgencyReceiptStatement.monthly_summary_id == MonthlyBillingSummary.id)
+            .join(OfficeServiceConfiguration,
+                  MonthlyBillingSummary.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .where(OfficeSetting.corporation_id == corporation_id)
+        )
+    else:
+        query = query.where(UserWageLog.user_id.in_(_corporation_users(corporation_id)))
+    if db.session.execute(query.limit(1)).first() is None:
+        return None
+    path = os.path.join(current_app.config['DOCUMENT_STORAGE_DIR'], *relative.split('/'))
+    return path if os.path.isfile(path) else None
+
+
+class DocumentRenderer:
+    """
+    法人の1か月分の請求書・領収証・代理受領書・工賃受取書をまとめて描画する。
+    差し込みデータは帳票の種類ごとに1回のクエリで読み、内容ハッシュをファイル名にしてローカルディスクに置く。
+    既に同じファイルがある帳票は描画せず URL だけを合わせるため、内容が変わらない帳票は二度描画されない。
+    未作成の帳票が多い場合はプロセスプールで並列に描画する（テンプレートはワーカーごとに一度だけコンパイルする）。
+    PDF生成ライブラリを依存に持たないため、出力は印刷用の HTML とする。
+    """
+
+    def __init__(self, corporation_id: int, year: int, month: int, workers: int = None):
+        self.corporation_id = corporation_id
+        self.billing_month, self.month_end = month_range(year, month)
+        config = current_app.config
+        self.storage_dir = config['DOCUMENT_STORAGE_DIR']
+        self.base_url = config.get('DOCUMENT_BASE_URL', '/api/billing/documents/')
+        self.workers = workers or config.get('DOCUMENT_RENDER_WORKERS') or os.cpu_count() or 1
+        self.inline_threshold = config.get('DOCUMENT_RENDER_INLINE_THRESHOLD', 32)
+
+    def run(self) -> dict:
+        documents = self._collect()
+        pending, seen = [], set()
+        for kind, _, key, context in documents:
+            path = self._path(kind, key)
+            if path not in seen and not os.path.exists(path):
+                pending.append((kind, context, path))
+            seen.add(path)
+
+        rendered_bytes = self._render(pending)
+        updated = self._update_urls(documents)
+        counts = {}
+        for kind, *_ in documents:
+            counts[kind] = counts.get(kind, 0) + 1
+        logger.info(
+            f"🖨️ 帳票 corp={self.corporation_id} {self.billing_month:%Y-%m}: "
+            f"{len(documents)}件 (描画 {len(pending)} / 再利用 {len(documents) - len(pending)})"
+        )
+        return {
+            "corporation_id": self.corporation_id,
+            "billing_month": self.billing_month.isoformat(),
+            "documents": counts,
+            "rendered": len(pending),
+            "reused": len(documents) - len(pending),
+            "rendered_bytes": rendered_bytes,
+            "urls_updated": updated,
+        }
+
+    # ====================================================================
+    # 差し込みデータ（帳票の種類ごとに1回のクエリ）
+    # ====================================================================
+    def _collect(self) -> list:
+        """(種類, 行ID, 内容ハッシュ, 差し込みデータ) のリスト"""
+        documents = []
+        for kind, row_id, context in self._invoices() + self._agency_receipts() + self._wage_receipts():
+            documents.append((kind, row_id, document_key(kind, context), context))
+        return documents
+
+    def _month_label(self) -> str:
+        return f"{self.billing_month.year}年{self.billing_month.month}月"
+
+    def _invoices(self) -> list:
+        rows = db.session.execute(
+            select(ClientInvoice.id, ClientInvoice.self_pay_amount, ClientInvoice.actual_cost_amount,
+                   ClientInvoice.total_amount, ClientInvoice.payment_status, ClientInvoice.payment_date,
+                   User.display_name, OfficeSetting.office_name, Corporation.corporation_name)
+            .join(User, ClientInvoice.user_id == User.id)
+            .join(OfficeServiceConfiguration,
+                  ClientInvoice.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .join(Corporation, OfficeSetting.corporation_id == Corporation.id)
+            .where(ClientInvoice.billing_month == self.billing_month,
+                   OfficeSetting.corporation_id == self.corporation_id)
+            .order_by(ClientInvoice.id)
+        ).all()
+        jobs = []
+        for (invoice_id, self_pay, actual_cost, total, payment_status, payment_date,
+             user_name, office_name, corporation_name) in rows:
+            context = {
+                "title": "ご利用料金請求書", "corporation_name": corporation_name, "office_name": office_name,
+                "user_name": user_name, "billing_month": self._month_label(), "document_no": invoice_id,
+                "self_pay_amount": str(self_pay), "actual_cost_amount": str(actual_cost), "total_amount": str(total),
+            }
+            jobs.append((INVOICE, invoice_id, context))
+            # 領収証は入金済みの請求書だけ
+            if payment_status == 'PAID':
+                jobs.append((RECEIPT, invoice_id, dict(
+                    context, title="領収証",
+                    payment_date=payment_date.isoformat() if payment_date else None,
+                )))
+        return jobs
+
+    def _agency_receipts(self) -> list:
+        rows = db.session.execute(
+            select(AgencyReceiptStatement.id, AgencyReceiptStatement.kokuhoren_payment_date,
+                   MonthlyBillingSummary.total_units_claimed, MonthlyBillingSummary.claim_amount,
+                   OfficeServiceConfiguration.jigyosho_bango, User.display_name, OfficeSetting.office_name,
+                   Corporation.corporation_name)
+            .join(MonthlyBillingSummary, AgencyReceiptStatement.monthly_summary_id == MonthlyBillingSummary.id)
+            .join(User, AgencyReceiptStatement.user_id == User.id)
+            .join(OfficeServiceConfiguration,
+                  MonthlyBillingSummary.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .join(Corporation, OfficeSetting.corporation_id == Corporation.id)
+            .where(AgencyReceiptStatement.billing_month == self.billing_month,
+                   OfficeSetting.corporation_id == self.corporation_id)
+            .order_by(AgencyReceiptStatement.id)
+        ).all()
+        return [
+            (AGENCY_RECEIPT, statement_id, {
+                "title": "代理受領額通知書", "corporation_name": corporation_name, "office_name": office_name,
+                "office_number": office_number, "user_name": user_name, "billing_month": self._month_label(),
+                "total_units": units or 0, "claim_amount": str(amount or 0), "payment_date": payment_date.isoformat(),
+            })
+            for statement_id, payment_date, units, amount, office_number, user_name, office_name, corporation_name
+            in rows
+        ]
+
+    def _wage_receipts(self) -> list:
+        """工賃は事業所を持たないため、法人の事業所の受給者証を持つ利用者の分を対象にする"""
+        corporation_users = _corporation_users(self.corporation_id)
+        corporation_name = db.session.get(Corporation, self.corporation_id).corporation_name
+        rows = db.session.execute(
+            select(UserWageLog.id, UserWageLog.total_work_minutes, UserWageLog.total_units_passed,
+                   UserWageLog.gross_wage_amount, UserWageLog.deductions, UserWageLog.net_payment_amount,
+                   User.display_name)
+            .join(User, UserWageLog.user_id == User.id)
+            .where(UserWageLog.calculation_month == self.billing_month, UserWageLog.user_id.in_(corporation_users))
+            .order_by(UserWageLog.id)
+        ).all()
+        return [
+            (WAGE_RECEIPT, wage_id, {
+                "title": "工賃受取書", "corporation_name": corporation_name, "office_name": "",
+                "user_name": user_name, "billing_month": self._month_label(),
+                "total_work_minutes": minutes, "total_units_passed": units, "gross_wage_amount": str(gross),
+                "deductions": str(deductions or 0), "net_payment_amount": str(net),
+            })
+            for wage_id, minutes, units, gross, deductions, net, user_name in rows
+        ]
+
+    # ====================================================================
+    # 描画と書き込み
+    # ====================================================================
+    def _path(self, kind: str, key: str) -> str:
+        return os.path.join(self.storage_dir, *document_relative_path(kind, key).split('/'))
+
+    def _url(self, kind: str, key: str) -> str:
+        return f"{self.base_url.rstrip('/')}/{document_relative_path(kind, key)}"
+
+    def _render(self, pending: list) -> int:
+        if not pending:
+            return 0
+        workers = min(self.workers, len(pending))
+        if workers <= 1 or len(pending) < self.inline_threshold:
+            return sum(size for _, size in map(_render_to_disk, pending))
+        # 親プロセスは監査スプールなどのスレッドを持つため fork ではなく spawn でワーカーを起動する
+        chunksize = max(1, len(pending) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker) as pool:
+            return sum(size for _, size in pool.map(_render_to_disk, pending, chunksize=chunksize))
+
+    def _update_urls(self, documents: list) -> int:
+        """URL が変わった行だけを種類ごとに一括更新する"""
+        wanted = {}
+        for kind, row_id, key, _ in documents:
+            model, column = URL_COLUMNS[kind]
+            wanted.setdefault((model, column), {})[row_id] = self._url(kind, key)
+
+        updated = 0
+        for (model, column), urls in wanted.items():
+            current = dict(db.session.execute(
+                select(model.id, getattr(model, column)).where(model.id.in_(list(urls)))
+            ).all())
+            changes = [{"id": row_id, column: url} for row_id, url in urls.items() if current.get(row_id) != url]
+            if changes:
+                db.session.execute(update(model), changes)
+                updated += len(changes)
+        return updated
@@ -0,0 +1,245 @@
+# backend/app/services/fee_catalog_service.py
+
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from backend.app.extensions import db
+from backend.app.models import GovernmentFeeMaster, ServiceUnitMaster
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UnitPrice:
+    """ある日に適用されるサービス種類の単位数・単価"""
+    service_type: str
+    unit_count: int
+    unit_price: Decimal
+    start_date: date
+    end_date: date
+    source_id: int  # 採用した ServiceUnitMaster の行
+
+
+@dataclass(frozen=True)
+class FeeRule:
+    """GovernmentFeeMaster の読み込み時点の値"""
+    id: int
+    code: str
+    name: str
+    category: str
+    units: int
+    needs_office_filing: bool
+    needs_user_eligibility: bool
+    needs_daily_logs: bool
+    calculation_type: str
+    logic_key: str
+
+
+class CompiledFeeCatalog:
+    """
+    読み込み済みの単価・報酬マスタ（不変のスナップショット）。
+    単位数単価はサービス種類ごとに重ならない期間へ展開してあり、日付での参照は二分探索で行う。
+    同じ日に複数の行がかかる場合は後から登録した行（commit_timestamp, id の大きい方）を採用する（追記型台帳）。
+    """
+
+    def __init__(self, unit_rows, fee_rows, version):
+        self.version = version
+        self._starts = {}
+        self._segments = {}
+        by_type = defaultdict(list)
+        for row in unit_rows:
+            by_type[row.service_type].append(row)
+        for service_type, rows in by_type.items():
+            segments = self._compile_segments(service_type, rows)
+            self._segments[service_type] = segments
+            self._starts[service_type] = [s.start_date for s in segments]
+        self._fees = {row.code: row for row in fee_rows}
+
+    @staticmethod
+    def _compile_segments(service_type: str, rows) -> list:
+        rows = sorted(rows, key=lambda r: (r.commit_timestamp, r.id))
+        boundaries = sorted({r.start_date for r in rows} | {r.end_date + timedelta(days=1) for r in rows if r.end_date < date.max})
+        segments = []
+        for i, start in enumerate(boundaries):
+            end = boundaries[i + 1] - timedelta(days=1) if i + 1 < len(boundaries) else date.max
+            winner = next((r for r in reversed(rows) if r.start_date <= start <= r.end_date), None)
+            if winner is None:
+                continue
+            previous = segments[-1] if segments else None
+            if previous and previous.source_id == winner.id and previous.end_date + timedelta(days=1) == start:
+                segments[-1] = UnitPrice(service_type, previous.unit_count, previous.unit_price, previous.start_date,
+                                         min(end, winner.end_date), winner.id)
+            else:
+                segments.append(UnitPrice(service_type, winner.unit_count or 0, Decimal(winner.unit_price or 0),
+                                          start, min(end, winner.end_date), winner.id))
+        return segments
+
+    def unit_price_at(self, service_type: str, day: date):
+        """service_type の day 時点の単位数・単価。該当がなければ None"""
+        starts = self._starts.get(service_type)
+        if not starts:
+            return None
+        i = bisect.bisect_right(starts, day) - 1
+        if i >= 0 and day <= self._segments[service_type][i].end_date:
+            return self._segments[service_type][i]
+        return None
+
+    def price_many(self, pairs) -> list:
+        """
+        (service_type, 日付) の並びをまとめて引き、入力と同じ順序で UnitPrice（なければ None）を返す。
+        サービス種類ごとに日付順へ並べ、期間を先頭から一度だけ走査する。
+        """
+        pairs = list(pairs)
+        results = [None] * len(pairs)
+        positions = defaultdict(list)
+        for position, (service_type, day) in enumerate(pairs):
+            positions[service_type].append(position)
+        for service_type, indexes in positions.items():
+            segments = self._segments.get(service_type)
+            if not segments:
+                continue
+            indexes.sort(key=lambda p: pairs[p][1])
+            cursor = 0
+            for position in indexes:
+                day = pairs[position][1]
+                while cursor < len(segments) and segments[cursor].end_date < day:
+                    cursor += 1
+                if cursor < len(segments) and segments[cursor].start_date <= day:
+                    results[position] = segments[cursor]
+        return results
+
+    def fee(self, code: str):
+        return self._fees.get(code)
+
+    def fees(self, categories=None) -> list:
+        """加算・減算の定義をコード順に返す。categories を指定すると該当区分のみ"""
+        return [
+            fee for code, fee in sorted(self._fees.items())
+            if categories is None or fee.category in categories
+        ]
+
+
+class FeeCatalog:
+    """
+    アプリごとの単価・報酬マスタのキャッシュ。
+    同じプロセスでのマスタ変更はコミット時に世代を進めて次の参照で読み直し、
+    他プロセスでの変更は FEE_CATALOG_CHECK_SECONDS ごとにマスタの件数・最大ID・最終登録日時を比べて検知する。
+    読み直しは新しいスナップショットを作ってから差し替えるため、参照中の呼び出しは古いスナップショットのまま一貫して計算できる。
+    """
+
+    EXTENSION_KEY = 'fee_catalog'
+    PENDING_KEY = '_fee_catalog_changed'
+    _init_lock = threading.Lock()
+
+    def __init__(self, check_seconds: float = 60):
+        self.check_seconds = check_seconds
+        self._generation = 0
+        self._snapshot = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, app=None) -> 'FeeCatalog':
+        app = app or current_app._get_current_object()
+        catalog = app.extensions.get(cls.EXTENSION_KEY)
+        if catalog is None:
+            with cls._init_lock:
+                catalog = app.extensions.get(cls.EXTENSION_KEY)
+                if catalog is None:
+                    catalog = cls(check_seconds=float(app.config.get('FEE_CATALOG_CHECK_SECONDS', 60)))
+                    app.extensions[cls.EXTENSION_KEY] = catalog
+        return catalog
+
+    @classmethod
+    def current(cls) -> CompiledFeeCatalog:
+        return cls.get_instance().snapshot()
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+
+    def snapshot(self) -> CompiledFeeCatalog:
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version[0] == self._generation and not self._check_due():
+            return snapshot
+
+        with self._lock:
+            generation = self._generation
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version[0] == generation and not self._check_due():
+                return snapshot
+            stamp = self._db_stamp()
+            self._checked_at = time.monotonic()
+            if snapshot is not None and snapshot.version == (generation, stamp):
+                return snapshot
+            snapshot = CompiledFeeCatalog(
+                ServiceUnitMaster.query.all(),
+                [self._fee_rule(f) for f in GovernmentFeeMaster.query.all()],
+                (generation, stamp),
+            )
+            self._snapshot = snapshot
+        logger.info(f"💴 単価・報酬マスタを読み込みました (version={snapshot.version})")
+        return snapshot
+
+    def _check_due(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.check_seconds
+
+    @staticmethod
+    def _db_stamp() -> tuple:
+        """
+        マスタの変更検知用の値。単価マスタは追記型のため件数・最大ID・最終登録日時で変更が分かる。
+        加算減算マスタはその場で書き換えられ、更新日時の列もないため、算定に使う列の内容ハッシュで判定する
+        （数百行程度の小さな表のため、確認のたびに全行を読んでも軽い）。
+        """
+        units = db.session.execute(select(
+            func.count(ServiceUnitMaster.id), func.max(ServiceUnitMaster.id), func.max(ServiceUnitMaster.commit_timestamp)
+        )).one()
+        digest = hashlib.sha256()
+        for row in db.session.execute(
+            select(GovernmentFeeMaster.id, GovernmentFeeMaster.code, GovernmentFeeMaster.name,
+                   GovernmentFeeMaster.category, GovernmentFeeMaster.units, GovernmentFeeMaster.needs_office_filing,
+                   GovernmentFeeMaster.needs_user_eligibility, GovernmentFeeMaster.needs_daily_logs,
+                   GovernmentFeeMaster.calculation_type, GovernmentFeeMaster.logic_key)
+            .order_by(GovernmentFeeMaster.id)
+        ):
+            digest.update(repr(tuple(row)).encode('utf-8'))
+        return tuple(units) + (digest.hexdigest(),)
+
+    @staticmethod
+    def _fee_rule(fee: GovernmentFeeMaster) -> FeeRule:
+        return FeeRule(
+            id=fee.id, code=fee.code, name=fee.name, category=fee.category, units=fee.units or 0,
+            needs_office_filing=bool(fee.needs_office_filing), needs_user_eligibility=bool(fee.needs_user_eligibility),
+            needs_daily_logs=bool(fee.needs_daily_logs), calculation_type=fee.calculation_type, logic_key=fee.logic_key,
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_fee_masters_changed(session, flush_context):
+    if any(isinstance(obj, (ServiceUnitMaster, GovernmentFeeMaster)) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[FeeCatalog.PENDING_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_fee_catalog(session):
+    """マスタの変更がコミットされたら世代を進める（ロールバックされた変更は読み込まない）"""
+    if session.info.pop(FeeCatalog.PENDING_KEY, False) and has_app_context():
+        catalog = current_app.extensions.get(FeeCatalog.EXTENSION_KEY)
+        if catalog is not None:
+            catalog.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_fee_catalog_change(session):
+    session.info.pop(FeeCatalog.PENDING_KEY, None)
@@ -180,6 +180,82 @@ class FinanceService:
             "errors": errors
         }
 
+    def audit_support_consistency_for_month(self, corporation_id: int, target_month: date) -> dict:
+        """
+        check_support_consistency の法人一括版（請求前監査）。
+        当月の請求対象者（MonthlyBillingSummary）のうち、有効な個別支援計画がない・支援記録が1件もない利用者を
+        利用者数によらず一定回数のクエリ（EXISTS による反結合）で抽出する。
+        計画未作成は担当職員ごとに集計し、URAC を1文の UPSERT で更新する（コミットは呼び出し側）。
+        戻り値の findings は該当利用者を1件ずつ返すイテレータで、全件をメモリに載せない。
+        """
+        from sqlalchemy import case, exists, select
+        from backend.app.models import MonthlyBillingSummary, SupportRecord, User
+        from backend.app.services.billing_engine_service import month_range
+        from backend.app.services.compliance_service import ComplianceService
+
+        month_start, month_end = month_range(target_month.year, target_month.month)
+        billed_user_ids = (
+            select(MonthlyBillingSummary.user_id)
+            .join(OfficeServiceConfiguration, MonthlyBillingSummary.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .where(OfficeSetting.corporation_id == corporation_id, MonthlyBillingSummary.billing_month == month_start)
+        )
+        has_plan = exists().where(
+            SupportPlan.user_id == User.id,
+            SupportPlan.plan_status == 'ACTIVE',
+            SupportPlan.plan_start_date <= month_end,
+            (SupportPlan.plan_end_date == None) | (SupportPlan.plan_end_date >= month_start)
+        )
+        has_records = exists().where(
+            SupportRecord.user_id == User.id,
+            SupportRecord.log_date.between(month_start, month_end)
+        )
+        billed = User.id.in_(billed_user_ids)
+
+        billed_count, missing_plan_count, missing_record_count = db.session.execute(
+            select(
+                func.count(User.id),
+                func.coalesce(func.sum(case((~has_plan, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((~has_records, 1), else_=0)), 0),
+            ).where(billed)
+        ).one()
+
+        # 第一段（計画未作成）は担当職員ごとに URAC へ
+        risks = [
+            {'supporter_id': supporter_id, 'risk_type': 'PLAN_UNCREATED', 'count': count,
+             'linked_entity_id': last_user_id, 'linked_entity_type': 'User'}
+            for supporter_id, count, last_user_id in db.session.execute(
+                select(User.primary_supporter_id, func.count(User.id), func.max(User.id))
+                .where(billed, ~has_plan, User.primary_supporter_id != None)
+                .group_by(User.primary_supporter_id)
+            )
+        ]
+        ComplianceService().track_unresolved_risks(risks)
+
+        def findings():
+            rows = db.session.execute(
+                select(User.id, User.primary_supporter_id, has_plan.label('has_plan'), has_records.label('has_records'))
+                .where(billed, ~has_plan | ~has_records)
+                .order_by(User.id)
+                .execution_options(yield_per=500)
+            )
+            for user_id, primary_supporter_id, plan_ok, records_ok in rows:
+                errors = []
+                if not plan_ok:
+                    errors.append("有効な個別支援計画が存在しません。")
+                if not records_ok:
+                    errors.append("指定月の支援記録が1件もありません。")
+                yield {"user_id": user_id, "primary_supporter_id": primary_supporter_id, "passed": False, "errors": errors}
+
+        return {
+            "target_month": month_start.isoformat(),
+            "billed_users": billed_count,
+            "missing_plan": missing_plan_count,
+            "missing_support_records": missing_record_count,
+            "risks_tracked": len(risks),
+            "findings": findings(),
+        }
+
     def _is_supporter_full_time_dedicated(self, supporter: Supporter) -> bool:
         """
         職員が「常勤かつ専従」の条件を満たしているかを判定する。（ロジックは既存のまま）
@@ -0,0 +1,327 @@
+# backend/app/services/fte_rollup_service.py
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, selectinload
+
+from backend.app.extensions import db
+from backend.app.models import (
+    IntegratedServiceOperation, IntegratedServiceOperationMember, OfficeServiceConfiguration,
+    OfficeSetting, Supporter, SupporterJobAssignment, SupporterTimecard
+)
+
+logger = logging.getLogger(__name__)
+
+
+class FteRollupCache:
+    """
+    (一体的運営ID, 期間) 単位のFTEロールアップ結果キャッシュ。
+    結果が依存するサービス・職員・事業所を記録し、変更があったものを含む運営の結果だけを無効化する。
+    他プロセスでの更新は検知できないため、TTLで鮮度の上限を設ける。
+    """
+
+    def __init__(self, ttl_seconds: int = 300):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        # ('service' | 'supporter' | 'office', ID) -> 運営IDの集合
+        self._operations_by_dependency = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def get(self, operation_id: int, start_date: date, end_date: date):
+        with self._lock:
+            entry = self._entries.get((operation_id, start_date, end_date))
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                self._entries.pop((operation_id, start_date, end_date), None)
+                return None
+            return result
+
+    def set(self, operation_id: int, start_date: date, end_date: date, result: dict, service_ids,
+            supporter_ids=(), office_ids=()):
+        with self._lock:
+            self._entries[(operation_id, start_date, end_date)] = (time.monotonic(), result)
+            for kind, ids in (('service', service_ids), ('supporter', supporter_ids), ('office', office_ids)):
+                for dependency_id in ids:
+                    self._operations_by_dependency[(kind, dependency_id)].add(operation_id)
+
+    def invalidate_services(self, service_ids) -> int:
+        """指定サービスを含む運営のキャッシュを全期間分破棄し、破棄件数を返す"""
+        return self._invalidate_dependencies('service', service_ids)
+
+    def invalidate_supporters(self, supporter_ids) -> int:
+        """指定職員が算入・専従判定に関わる運営のキャッシュを破棄する"""
+        return self._invalidate_dependencies('supporter', supporter_ids)
+
+    def invalidate_offices(self, office_ids) -> int:
+        """指定事業所（常勤の所定労働時間）を分母に使う運営のキャッシュを破棄する"""
+        return self._invalidate_dependencies('office', office_ids)
+
+    def _invalidate_dependencies(self, kind: str, dependency_ids) -> int:
+        with self._lock:
+            operation_ids = set()
+            for dependency_id in dependency_ids:
+                operation_ids |= self._operations_by_dependency.get((kind, dependency_id), set())
+            if not operation_ids:
+                return 0
+            stale = [key for key in self._entries if key[0] in operation_ids]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def invalidate_operations(self, operation_ids) -> int:
+        with self._lock:
+            stale = [key for key in self._entries if key[0] in operation_ids]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._operations_by_dependency.clear()
+
+
+class FteRollupService:
+    """
+    法人・一体的運営単位の常勤換算（FTE）ロールアップエンジン。
+    FinanceService.calculate_fte_for_service と同じ算定ルール（個人FTEは1.0で頭打ち、
+    みなし時間は常勤専従のみ算入）を、対象の全サービスについて共有スキャンで一括計算する。
+    勤怠・職務割当・職員の読み込みはサービス数に関わらずそれぞれ1クエリとなる。
+    """
+
+    EXTENSION_KEY = 'fte_rollup_cache'
+    _cache_lock = threading.Lock()
+
+    @classmethod
+    def get_cache(cls) -> FteRollupCache:
+        app = current_app._get_current_object()
+        cache = app.extensions.get(cls.EXTENSION_KEY)
+        if cache is None:
+            with cls._cache_lock:
+                cache = app.extensions.get(cls.EXTENSION_KEY)
+                if cache is None:
+                    cache = FteRollupCache(ttl_seconds=int(app.config.get('FTE_ROLLUP_CACHE_TTL_SECONDS', 300)))
+                    app.extensions[cls.EXTENSION_KEY] = cache
+        return cache
+
+    # ====================================================================
+    # 1. 共有スキャンによるサービス別FTE
+    # ====================================================================
+    def calculate_services(self, service_ids, target_start_date: date, target_end_date: date) -> dict:
+        """
+        複数サービスのFTEを一括計算し、{service_id: fte} を返す。
+        """
+        return self._calculate_services(service_ids, target_start_date, target_end_date)[0]
+
+    def _calculate_services(self, service_ids, target_start_date: date, target_end_date: date):
+        """({service_id: fte}, {service_id: 算入した職員IDの集合}) を返す"""
+        service_ids = sorted(set(service_ids))
+        if not service_ids:
+            return {}, {}
+
+        configs = OfficeServiceConfiguration.query.options(
+            selectinload(OfficeServiceConfiguration.office)
+        ).filter(OfficeServiceConfiguration.id.in_(service_ids)).all()
+        config_map = {c.id: c for c in configs}
+        missing = set(service_ids) - set(config_map)
+        if missing or any(not c.office for c in configs):
+            raise Exception(f"Invalid service configuration ID: {sorted(missing) or [c.id for c in configs if not c.office]}")
+        for c in configs:
+            if c.office.full_time_weekly_minutes == 0:
+                raise Exception(f"Office {c.office.office_name} has no standard work time set.")
+
+        # 期間内に割り当てのある職員（サービス別）
+        assignments = db.session.query(
+            SupporterJobAssignment.office_service_configuration_id, SupporterJobAssignment.supporter_id
+        ).filter(
+            SupporterJobAssignment.office_service_configuration_id.in_(service_ids),
+            SupporterJobAssignment.start_date <= target_end_date,
+            (SupporterJobAssignment.end_date == None) | (SupporterJobAssignment.end_date >= target_start_date)
+        ).all()
+        supporters_by_service = defaultdict(set)
+        for service_id, supporter_id in assignments:
+            supporters_by_service[service_id].add(supporter_id)
+        supporter_ids = set().union(*supporters_by_service.values()) if supporters_by_service else set()
+
+        dedicated = self._full_time_dedicated_ids(supporter_ids)
+
+        # 勤怠の共有スキャン: (職員, サービス) ごとの算入可能分数
+        minutes = defaultdict(float)
+        if supporter_ids:
+            timecards = db.session.query(
+                SupporterTimecard.supporter_id, SupporterTimecard.office_service_configuration_id,
+                SupporterTimecard.check_in, SupporterTimecard.check_out,
+                SupporterTimecard.total_break_minutes, SupporterTimecard.deemed_work_minutes
+            ).filter(
+                SupporterTimecard.supporter_id.in_(supporter_ids),
+                SupporterTimecard.office_service_configuration_id.in_(service_ids),
+                SupporterTimecard.work_date.between(target_start_date, target_end_date)
+            ).all()
+            for supporter_id, service_id, check_in, check_out, break_minutes, deemed in timecards:
+                actual_minutes = 0
+                if check_in and check_out:
+                    actual_minutes = max(0, (check_out - check_in).total_seconds() / 60 - break_minutes)
+                deemed_minutes = (deemed or 0) if supporter_id in dedicated else 0
+                minutes[(supporter_id, service_id)] += actual_minutes + deemed_minutes
+
+        total_weeks_in_period = ((target_end_date - target_start_date).days + 1) / 7
+        results = {}
+        for service_id in service_ids:
+            standard_minutes = config_map[service_id].office.full_time_weekly_minutes * total_weeks_in_period
+            total_fte = 0.0
+            for supporter_id in supporters_by_service.get(service_id, ()):
+                # 🚨 厳格な監査ルール: 1.0 を超える個人FTEは算入不可
+                total_fte += min(1.0, minutes[(supporter_id, service_id)] / standard_minutes)
+            results[service_id] = round(total_fte, 2)
+        return results, supporters_by_service
+
+    def _full_time_dedicated_ids(self, supporter_ids) -> set:
+        """FinanceService._is_supporter_full_time_dedicated を職員集合に対して一括判定する"""
+        if not supporter_ids:
+            return set()
+        full_time = {sid for (sid,) in db.session.query(Supporter.id).filter(
+            Supporter.id.in_(supporter_ids), Supporter.employment_type == 'FULL_TIME'
+        )}
+        if not full_time:
+            return set()
+
+        today = datetime.now(timezone.utc).date()
+        services_by_supporter = defaultdict(set)
+        for supporter_id, service_id in db.session.query(
+            SupporterJobAssignment.supporter_id, SupporterJobAssignment.office_service_configuration_id
+        ).filter(
+            SupporterJobAssignment.supporter_id.in_(full_time),
+            (SupporterJobAssignment.end_date == None) | (SupporterJobAssignment.end_date >= today)
+        ):
+            services_by_supporter[supporter_id].add(service_id)
+        return {sid for sid, services in services_by_supporter.items() if len(services) == 1}
+
+    # ====================================================================
+    # 2. 一体的運営・法人単位のロールアップ
+    # ====================================================================
+    def rollup_operations(self, operation_ids, target_start_date: date, target_end_date: date, use_cache: bool = True) -> list:
+        """
+        一体的運営ごとの構成サービス別FTEと合計を返す。キャッシュにない運営だけをまとめて再計算する。
+        """
+        operation_ids = list(dict.fromkeys(operation_ids))
+        cache = self.get_cache()
+        results = {}
+        pending = []
+        for op_id in operation_ids:
+            cached = cache.get(op_id, target_start_date, target_end_date) if use_cache else None
+            if cached is not None:
+                results[op_id] = cached
+            else:
+                pending.append(op_id)
+
+        if pending:
+            operations = IntegratedServiceOperation.query.options(
+                selectinload(IntegratedServiceOperation.members).selectinload(IntegratedServiceOperationMember.office_service_configuration)
+            ).filter(IntegratedServiceOperation.id.in_(pending)).all()
+
+            all_service_ids = {m.office_service_configuration_id for op in operations for m in op.members}
+            service_fte, supporters_by_service = self._calculate_services(all_service_ids, target_start_date, target_end_date)
+
+            for op in operations:
+                member_ids = sorted(m.office_service_configuration_id for m in op.members)
+                members = [{
+                    "office_service_configuration_id": m.office_service_configuration_id,
+                    "jigyosho_bango": m.office_service_configuration.jigyosho_bango if m.office_service_configuration else None,
+                    "fte": service_fte[m.office_service_configuration_id],
+                } for m in sorted(op.members, key=lambda m: m.office_service_configuration_id)]
+                result = {
+                    "operation_id": op.id,
+                    "operation_name": op.operation_name,
+                    "status": op.status,
+                    "period_start": target_start_date.isoformat(),
+                    "period_end": target_end_date.isoformat(),
+                    "members": members,
+                    "total_fte": round(sum(m["fte"] for m in members), 2),
+                }
+                supporter_ids = set().union(*(supporters_by_service.get(sid, set()) for sid in member_ids))
+                office_ids = {m.office_service_configuration.office_id for m in op.members if m.office_service_configuration}
+                cache.set(op.id, target_start_date, target_end_date, result, member_ids, supporter_ids, office_ids)
+                results[op.id] = result
+
+        logger.info(f"💰 FTE roll-up: {len(operation_ids)} operations ({len(operation_ids) - len(pending)} cached, {len(pending)} computed)")
+        return [results[op_id] for op_id in operation_ids if op_id in results]
+
+    def rollup_corporation(self, corporation_id: int, target_start_date: date, target_end_date: date, use_cache: bool = True) -> dict:
+        """法人内で期間に有効な全一体的運営のFTEをまとめて返す"""
+        operation_ids = [op_id for (op_id,) in db.session.query(IntegratedServiceOperation.id).filter(
+            IntegratedServiceOperation.corporation_id == corporation_id,
+            IntegratedServiceOperation.effective_from <= target_end_date,
+            (IntegratedServiceOperation.effective_to == None) | (IntegratedServiceOperation.effective_to >= target_start_date)
+        ).order_by(IntegratedServiceOperation.id)]
+        operations = self.rollup_operations(operation_ids, target_start_date, target_end_date, use_cache=use_cache)
+        return {
+            "corporation_id": corporation_id,
+            "period_start": target_start_date.isoformat(),
+            "period_end": target_end_date.isoformat(),
+            "operations": operations,
+            "total_fte": round(sum(op["total_fte"] for op in operations), 2),
+        }
+
+
+def _changed_service_ids(obj) -> set:
+    """変更前後のサービスIDをどちらも無効化対象にする（サービス付け替えに対応）"""
+    history = inspect(obj).attrs.office_service_configuration_id.history
+    return {sid for sid in (*history.added, *history.unchanged, *history.deleted) if sid is not None}
+
+
+def _attribute_changed(obj, session, attribute: str) -> bool:
+    """追加・削除されたオブジェクト、または指定属性が更新されたオブジェクトか"""
+    if obj in session.new or obj in session.deleted:
+        return True
+    return inspect(obj).attrs[attribute].history.has_changes()
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_fte_rollup_cache(session, flush_context):
+    """
+    勤怠・職務割当・職員の雇用形態・事業所の常勤所定時間の変更をフラッシュ時に検知し、
+    該当するサービス・職員・事業所を含む運営のキャッシュを破棄する。
+    """
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get(FteRollupService.EXTENSION_KEY)
+    if cache is None:
+        return
+
+    service_ids, supporter_ids, office_ids, operation_ids = set(), set(), set(), set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (SupporterTimecard, SupporterJobAssignment)):
+            service_ids |= _changed_service_ids(obj)
+            if isinstance(obj, SupporterJobAssignment):
+                # 兼務の増減は他サービスの運営でも常勤専従の判定を変える
+                supporter_ids.add(obj.supporter_id)
+        elif isinstance(obj, Supporter):
+            if _attribute_changed(obj, session, 'employment_type'):
+                supporter_ids.add(obj.id)
+        elif isinstance(obj, OfficeSetting):
+            if _attribute_changed(obj, session, 'full_time_weekly_minutes'):
+                office_ids.add(obj.id)
+        elif isinstance(obj, IntegratedServiceOperationMember):
+            operation_ids.add(obj.integrated_service_operation_id)
+        elif isinstance(obj, IntegratedServiceOperation):
+            operation_ids.add(obj.id)
+
+    dropped = 0
+    if service_ids:
+        dropped += cache.invalidate_services(service_ids)
+    if supporter_ids:
+        dropped += cache.invalidate_supporters(supporter_ids)
+    if office_ids:
+        dropped += cache.invalidate_offices(office_ids)
+    if operation_ids:
+        dropped += cache.invalidate_operations(operation_ids)
+    if dropped:
+        logger.debug(f"🧹 FTE roll-up cache invalidated: {dropped} entries (services {sorted(service_ids)}, supporters {sorted(supporter_ids)}, offices {sorted(office_ids)}, operations {sorted(operation_ids)})")
@@ -0,0 +1,173 @@
+# backend/app/services/master_data_service.py
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from backend.app.extensions import db
+
+logger = logging.getLogger(__name__)
+
+MASTER_TABLE_SUFFIX = '_master'
+
+
+@dataclass
+class MasterTable:
+    """1つのマスタテーブルの読み込み結果（行は読み取り専用の辞書、ID順）"""
+    rows: tuple
+    by_id: dict
+    digest: str
+    version: int
+    loaded_at: float
+    _indexes: dict = field(default_factory=dict)
+
+    def index(self, column: str) -> dict:
+        """column の値 -> ID。初回の参照時に作る"""
+        index = self._indexes.get(column)
+        if index is None:
+            index = {row[column]: row['id'] for row in self.rows}
+            self._indexes[column] = index
+        return index
+
+
+class MasterDataCache:
+    """
+    *_master テーブルのアプリ内キャッシュ。
+    テーブルは初回参照時に読み込み、同じプロセスでの変更はコミット時にテーブルの版を進めて次の参照で読み直す。
+    他プロセスでの変更は MASTER_CACHE_TTL_SECONDS で読み直して取り込む。
+    ETag は行の内容から作るため、プロセスが異なっても同じ内容なら同じ値になる。
+    """
+
+    EXTENSION_KEY = 'master_data_cache'
+    PENDING_KEY = '_master_tables_changed'
+    _init_lock = threading.Lock()
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._tables = {}
+        self._versions = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls, app=None) -> 'MasterDataCache':
+        app = app or current_app._get_current_object()
+        cache = app.extensions.get(cls.EXTENSION_KEY)
+        if cache is None:
+            with cls._init_lock:
+                cache = app.extensions.get(cls.EXTENSION_KEY)
+                if cache is None:
+                    cache = cls(ttl_seconds=float(app.config.get('MASTER_CACHE_TTL_SECONDS', 300)))
+                    app.extensions[cls.EXTENSION_KEY] = cache
+        return cache
+
+    # ====================================================================
+    # 参照
+    # ====================================================================
+
+    def rows(self, model) -> tuple:
+        return self._table(model).rows
+
+    def get(self, model, master_id):
+        """ID の行。該当がなければ None"""
+        return self._table(model).by_id.get(master_id)
+
+    def id_for(self, model, value, column: str = 'name'):
+        """column の値から ID を引く（例: StatusMaster の '利用中'）。該当がなければ None"""
+        return self._table(model).index(column).get(value)
+
+    def instance(self, model, master_id):
+        """
+        関連付けに使う ORM オブジェクトをクエリなしで現在のセッションに載せる。
+        キャッシュの値から作るため、関連の読み込みや更新には使わない。
+        """
+        row = self.get(model, master_id)
+        if row is None:
+            return None
+        existing = db.session.identity_map.get(inspect(model).identity_key_from_primary_key((master_id,)))
+        if existing is not None:
+            return existing
+        obj = model(**row)
+        make_transient_to_detached(obj)
+        return db.session.merge(obj, load=False)
+
+    def etag(self, *models) -> str:
+        digests = '|'.join(f"{model.__tablename__}:{self._table(model).digest}" for model in models)
+        return hashlib.sha1(digests.encode()).hexdigest()
+
+    def invalidate(self, *table_names):
+        with self._lock:
+            for name in table_names or list(self._tables):
+                self._versions[name] += 1
+
+    # ====================================================================
+    # 読み込み
+    # ====================================================================
+
+    def _table(self, model) -> MasterTable:
+        name = model.__tablename__
+        if not name.endswith(MASTER_TABLE_SUFFIX):
+            raise ValueError(f"{name} はマスタテーブルではありません")
+        table = self._tables.get(name)
+        if table is not None and not self._stale(name, table):
+            return table
+        with self._lock:
+            table = self._tables.get(name)
+            if table is None or self._stale(name, table):
+                table = self._load(model, self._versions[name])
+                self._tables[name] = table
+                logger.debug(f"📚 マスタを読み込みました: {name} ({len(table.rows)}件)")
+        return table
+
+    def _stale(self, name: str, table: MasterTable) -> bool:
+        return table.version != self._versions[name] or time.monotonic() - table.loaded_at >= self.ttl_seconds
+
+    @staticmethod
+    def _load(model, version: int) -> MasterTable:
+        columns = [c.key for c in inspect(model).column_attrs]
+        rows = tuple(
+            MappingProxyType(dict(zip(columns, values)))
+            for values in db.session.query(*(getattr(model, c) for c in columns)).order_by(model.id)
+        )
+        payload = json.dumps([dict(row) for row in rows], default=str, ensure_ascii=False, sort_keys=True)
+        return MasterTable(
+            rows=rows,
+            by_id={row['id']: row for row in rows},
+            digest=hashlib.sha1(payload.encode()).hexdigest(),
+            version=version,
+            loaded_at=time.monotonic(),
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_master_tables_changed(session, flush_context):
+    # 関連コレクションだけの変更（ロールへの職員の割り当て等）はマスタの変更として扱わない
+    dirty = (obj for obj in session.dirty if session.is_modified(obj, include_collections=False))
+    changed = {
+        obj.__tablename__ for obj in (*session.new, *dirty, *session.deleted)
+        if getattr(obj, '__tablename__', '').endswith(MASTER_TABLE_SUFFIX)
+    }
+    if changed:
+        session.info.setdefault(MasterDataCache.PENDING_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_master_tables(session):
+    changed = session.info.pop(MasterDataCache.PENDING_KEY, None)
+    if changed and has_app_context():
+        cache = current_app.extensions.get(MasterDataCache.EXTENSION_KEY)
+        if cache is not None:
+            cache.invalidate(*changed)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_master_table_changes(session):
+    session.info.pop(MasterDataCache.PENDING_KEY, None)
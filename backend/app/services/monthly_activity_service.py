@@ -0,0 +1,300 @@
+# backend/app/services/monthly_activity_service.py
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, delete, event, inspect, or_, select, update
+from sqlalchemy.orm import Session
+
+from backend.app.extensions import db
+from backend.app.models import (
+    AttendanceRecord, SupportRecord, UserDailyLog, UserDailySchedule, UserMonthlyActivity
+)
+from backend.app.services.billing_engine_service import month_range
+
+logger = logging.getLogger(__name__)
+
+# 集計する列（UserMonthlyActivity の列名）
+COUNTER_COLUMNS = ('attendance_days', 'scheduled_days', 'completed_logs', 'support_minutes', 'off_site_days',
+                   'actual_days', 'usage_days')
+# 施設外の日報（StaffingCoverageService.OFF_SITE_USER_LOCATIONS と同じ）
+OFF_SITE_LOCATIONS = ('OFF_SITE_EXTERNAL', 'OFF_SITE_USER_HOME')
+# 書き込みを検知するモデルと、月を決める日付列
+TRACKED_MODELS = {
+    AttendanceRecord: 'attendance_date',
+    UserDailyLog: 'log_date',
+    SupportRecord: 'log_date',
+    UserDailySchedule: 'date',
+}
+PENDING_KEY = 'monthly_activity_pending'
+
+
+def _empty_counters() -> dict:
+    return dict.fromkeys(COUNTER_COLUMNS, 0)
+
+
+class MonthlyActivityRollup:
+    """
+    利用者×月の活動集計（UserMonthlyActivity）の更新と読み出し。
+    打刻・日報・支援記録・通所予定がフラッシュされると該当する (利用者, 月) を記録し、コミットの直前に
+    同じトランザクション内でその組の集計行をロックしてから再集計して更新する。件数を差分で加減しないため、日付の
+    付け替えや削除でも集計がずれず、同時にコミットする書き込みも後からロックを取った側が両方を含めて集計する。一括の取り込みなど ORM を通らない書き込みの後は rebuild_month で月ごとに作り直す。
+    """
+
+    EXTENSION_KEY = 'monthly_activity_rollup'
+
+    @classmethod
+    def init_app(cls, app):
+        app.extensions[cls.EXTENSION_KEY] = app.config.get('MONTHLY_ACTIVITY_ROLLUP_ENABLED', True)
+
+    def __init__(self, session=None):
+        self.session = session or db.session
+
+    # ====================================================================
+    # 集計（ソースごとに1回のクエリ）
+    # ====================================================================
+    def _aggregate(self, first_day: date, last_day: date, user_ids=None) -> dict:
+        """期間内の活動を (利用者, 月初日) ごとの件数にする。user_ids を省略すると全利用者"""
+        def scoped(user_col, date_col, *conditions):
+            criteria = [date_col >= first_day, date_col <= last_day, *conditions]
+            if user_ids is not None:
+                criteria.append(user_col.in_(user_ids))
+            return criteria
+
+        attendance, scheduled, actual, off_site = (defaultdict(set) for _ in range(4))
+        counters = defaultdict(_empty_counters)
+
+        for user_id, day in self.session.execute(
+            select(AttendanceRecord.user_id, AttendanceRecord.attendance_date).distinct()
+            .where(*scoped(AttendanceRecord.user_id, AttendanceRecord.attendance_date,
+                           AttendanceRecord.record_type == 'CHECK_IN'))
+        ):
+            attendance[(user_id, day.replace(day=1))].add(day)
+
+        for user_id, day in self.session.execute(
+            select(UserDailySchedule.user_id, UserDailySchedule.date)
+            .where(*scoped(UserDailySchedule.user_id, UserDailySchedule.date,
+                           UserDailySchedule.approval_status == 'APPROVED',
+                           UserDailySchedule.start_time.isnot(None), UserDailySchedule.end_time.isnot(None)))
+        ):
+            scheduled[(user_id, day.replace(day=1))].add(day)
+
+        # 利用実績として数える日報は、自動作成ではなく朝・夕いずれかの記録を済ませたもの（利用日数の集計と同じ条件）
+        counts_as_actual = and_(
+            UserDailyLog.auto_created == False,
+            or_(UserDailyLog.morning_completed == True, UserDailyLog.evening_completed == True),
+        )
+        for user_id, day, log_status, location_type, is_actual in self.session.execute(
+            select(UserDailyLog.user_id, UserDailyLog.log_date, UserDailyLog.log_status, UserDailyLog.location_type,
+                   counts_as_actual)
+            .where(*scoped(UserDailyLog.user_id, UserDailyLog.log_date))
+        ):
+            key = (user_id, day.replace(day=1))
+            if log_status == 'COMPLETED':
+                counters[key]['completed_logs'] += 1
+            if location_type in OFF_SITE_LOCATIONS:
+                off_site[key].add(day)
+            if is_actual:
+                actual[key].add(day)
+
+        for user_id, day, started, ended in self.session.execute(
+            select(SupportRecord.user_id, SupportRecord.log_date, SupportRecord.support_start_time,
+                   SupportRecord.support_end_time)
+            .where(*scoped(SupportRecord.user_id, SupportRecord.log_date),
+                   SupportRecord.support_start_time.isnot(None), SupportRecord.support_end_time.isnot(None))
+        ):
+            minutes = int((ended - started).total_seconds() // 60)
+            if minutes > 0:
+                counters[(user_id, day.replace(day=1))]['support_minutes'] += minutes
+
+        for key in set(attendance) | set(scheduled) | set(actual) | set(off_site):
+            row = counters[key]
+            row['attendance_days'] = len(attendance[key])
+            row['scheduled_days'] = len(scheduled[key])
+            row['off_site_days'] = len(off_site[key])
+            actual_days = attendance[key] | actual[key]
+            row['actual_days'] = len(actual_days)
+            row['usage_days'] = len(actual_days | scheduled[key])
+        return dict(counters)
+
+    def compute(self, keys) -> dict:
+        """(利用者, 月初日) の組ごとの件数。活動のない組は0件として返す"""
+        keys = set(keys)
+        if not keys:
+            return {}
+        first_day = min(month for _, month in keys)
+        last_month = max(month for _, month in keys)
+        last_day = month_range(last_month.year, last_month.month)[1]
+        aggregated = self._aggregate(first_day, last_day, sorted({user_id for user_id, _ in keys}))
+        return {key: aggregated.get(key) or _empty_counters() for key in keys}
+
+    # ====================================================================
+    # 書き込み
+    # ====================================================================
+    def refresh(self, keys) -> int:
+        """
+        指定した (利用者, 月初日) を再集計して更新する。コミットは呼び出し側で行う。
+        同じ組を同時に更新するトランザクションが互いの書き込みを見落とさないよう、集計行をロックしてから集計する
+        （ロックを待った側は、先にコミットした側の行を含めて集計し直す）。
+        """
+        keys = sorted(set(keys))
+        if not keys:
+            return 0
+        row_ids = self._lock_rows(keys)
+        computed = self.compute(keys)
+        now = datetime.now(timezone.utc)
+        self.session.execute(update(UserMonthlyActivity), [
+            dict(computed[key], id=row_ids[key], refreshed_at=now) for key in keys
+        ])
+        return len(keys)
+
+    def _lock_rows(self, keys: list) -> dict:
+        """集計行がなければ0件で作り（INSERT … ON CONFLICT DO NOTHING）、キー順に SELECT … FOR UPDATE でロックする"""
+        now = datetime.now(timezone.utc)
+        rows = [dict(_empty_counters(), user_id=user_id, activity_month=month, refreshed_at=now)
+                for user_id, month in keys]
+
+        dialect = self.session.get_bind().dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            self.session.execute(insert(UserMonthlyActivity).values(rows).on_conflict_do_nothing(
+                index_elements=['user_id', 'activity_month'],
+            ))
+
+        wanted = set(keys)
+        row_ids = {}
+        for row_id, user_id, month in self.session.execute(
+            select(UserMonthlyActivity.id, UserMonthlyActivity.user_id, UserMonthlyActivity.activity_month)
+            .where(UserMonthlyActivity.user_id.in_(sorted({user_id for user_id, _ in keys})),
+                   UserMonthlyActivity.activity_month.in_(sorted({month for _, month in keys})))
+            .order_by(UserMonthlyActivity.user_id, UserMonthlyActivity.activity_month)
+            .with_for_update()
+        ):
+            if (user_id, month) in wanted:
+                row_ids[(user_id, month)] = row_id
+
+        # ON CONFLICT を持たないDBでは、まだない行だけを作る
+        missing = [row for row in rows if (row['user_id'], row['activity_month']) not in row_ids]
+        if missing:
+            self.session.execute(UserMonthlyActivity.__table__.insert(), missing)
+            return self._lock_rows(keys)
+        return row_ids
+
+    def rebuild_month(self, year: int, month: int) -> dict:
+        """対象月の集計を全利用者分作り直す（活動のない利用者の行は削除される）。コミットは呼び出し側で行う"""
+        first_day, last_day = month_range(year, month)
+        aggregated = self._aggregate(first_day, last_day)
+        self.session.execute(delete(UserMonthlyActivity).where(UserMonthlyActivity.activity_month == first_day))
+        if aggregated:
+            now = datetime.now(timezone.utc)
+            self.session.execute(
+                UserMonthlyActivity.__table__.insert(),
+                [dict(counters, user_id=user_id, activity_month=first_day, refreshed_at=now)
+                 for (user_id, _), counters in sorted(aggregated.items())],
+            )
+        logger.info(f"📊 月次活動集計 {first_day:%Y-%m}: {len(aggregated)}名分を再集計")
+        return {"activity_month": first_day.isoformat(), "users": len(aggregated)}
+
+    # ====================================================================
+    # 読み出し
+    # ====================================================================
+    def get_month(self, user_ids, year: int, month: int) -> dict:
+        """
+        利用者ごとの月の件数（user_id -> {列名: 件数}）。集計行がまだない利用者はその場で集計して返す
+        （読み取り専用の処理から呼ばれるため、ここでは保存しない）。
+        """
+        first_day = date(year, month, 1)
+        user_ids = sorted(set(user_ids))
+        result = {}
+        if user_ids:
+            for record in self.session.execute(
+                select(UserMonthlyActivity).where(UserMonthlyActivity.activity_month == first_day,
+                                                  UserMonthlyActivity.user_id.in_(user_ids))
+            ).scalars():
+                result[record.user_id] = {column: getattr(record, column) for column in COUNTER_COLUMNS}
+        missing = [(user_id, first_day) for user_id in user_ids if user_id not in result]
+        for (user_id, _), counters in self.compute(missing).items():
+            result[user_id] = counters
+        return result
+
+
+# ====================================================================
+# 書き込みの検知（フラッシュで (利用者, 月) を記録し、コミット直前に再集計）
+# ====================================================================
+def _activity_keys(obj, date_attribute: str) -> set:
+    """フラッシュした行の利用者・日付の組（削除した行は削除前の値。書き換え前の値は before_flush で引く）"""
+    state = inspect(obj)
+    values = []
+    for attribute in ('user_id', date_attribute):
+        history = state.attrs[attribute].history
+        found = {v for v in (*history.added, *history.unchanged, *history.deleted) if v is not None}
+        if not found and getattr(obj, attribute, None) is not None:
+            found = {getattr(obj, attribute)}
+        values.append(found)
+    user_ids, days = values
+    return {(user_id, day.replace(day=1)) for user_id in user_ids for day in days}
+
+
+def _rollup_enabled() -> bool:
+    return has_app_context() and bool(current_app.extensions.get(MonthlyActivityRollup.EXTENSION_KEY))
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_previous_activity_keys(session, flush_context, instances):
+    """
+    利用者や日付を書き換えた行の変更前の月。コミット後に読み直していない属性は旧値を持たないため、
+    書き換えた行だけをモデルごとに1回のクエリでDBから引く。
+    """
+    if not _rollup_enabled():
+        return
+    changed = defaultdict(list)
+    for obj in session.dirty:
+        date_attribute = TRACKED_MODELS.get(type(obj))
+        if date_attribute is None:
+            continue
+        state = inspect(obj)
+        if state.identity and any(state.attrs[a].history.has_changes() for a in ('user_id', date_attribute)):
+            changed[type(obj)].append(state.identity[0])
+    keys = set()
+    for model, ids in changed.items():
+        date_col = getattr(model, TRACKED_MODELS[model])
+        for user_id, day in session.execute(select(model.user_id, date_col).where(model.id.in_(ids))):
+            keys.add((user_id, day.replace(day=1)))
+    if keys:
+        session.info.setdefault(PENDING_KEY, set()).update(keys)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_monthly_activity_keys(session, flush_context):
+    if not _rollup_enabled():
+        return
+    keys = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        date_attribute = TRACKED_MODELS.get(type(obj))
+        if date_attribute is not None:
+            keys |= _activity_keys(obj, date_attribute)
+    if keys:
+        session.info.setdefault(PENDING_KEY, set()).update(keys)
+
+
+@event.listens_for(Session, 'before_commit')
+def _refresh_monthly_activity(session):
+    """コミットの直前に、記録した (利用者, 月) を同じトランザクション内で再集計する"""
+    if not _rollup_enabled():
+        return
+    # コミット時のフラッシュはこのイベントの後に行われるため、未フラッシュの変更を先に反映して検知する
+    session.flush()
+    keys = session.info.pop(PENDING_KEY, None)
+    if keys:
+        refreshed = MonthlyActivityRollup(session).refresh(keys)
+        logger.debug(f"📊 月次活動集計を更新: {refreshed}件")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_monthly_activity_keys(session):
+    session.info.pop(PENDING_KEY, None)
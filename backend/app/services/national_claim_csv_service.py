@@ -0,0 +1,273 @@
+# backend/app/services/national_claim_csv_service.py
+
+import hashlib
+import logging
+from collections import Counter
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import and_, func, select
+
+from backend.app.extensions import db
+from backend.app.models import (
+    CopaymentLimit, CopaymentManagement, GrantedService, MonthlyBillingSummary, MunicipalityMaster,
+    OfficeServiceConfiguration, OfficeSetting, ServiceCertificate, ServiceTypeMaster
+)
+from backend.app.services.billing_engine_service import month_range
+from backend.app.utils.timezone import get_jst_today
+
+logger = logging.getLogger(__name__)
+
+# 国保連の請求データは Shift_JIS（Windows拡張を含む cp932）・CRLF 区切りの固定レイアウトCSV
+DEFAULT_ENCODING = 'cp932'
+LINE_END = '\r\n'
+# 文字コードで表せない文字の代替（ゲタ記号）
+SUBSTITUTE_CHAR = '〓'
+CHUNK_BYTES = 64 * 1024
+STREAM_BATCH_SIZE = 500
+
+# レコード種別
+CONTROL_RECORD = '1'
+DATA_RECORD = '2'
+END_RECORD = '3'
+# 交換情報識別番号
+CLAIM_HEADER = 'J11'  # 請求書（事業所ごとの合計）
+CLAIM_DETAIL = 'J12'  # 明細書（利用者×サービスごと）
+DATA_KIND = 'J1'  # データ種別: 障害福祉サービス費等の請求
+
+# 各レコードの項目（順序がそのまま出力順）
+CONTROL_FIELDS = ('record_kind', 'record_no', 'volume_no', 'record_count', 'data_kind', 'target_month', 'created_on')
+HEADER_FIELDS = ('record_kind', 'record_no', 'exchange_id', 'target_month', 'office_number', 'claim_count',
+                 'total_units', 'claim_amount')
+DETAIL_FIELDS = ('record_kind', 'record_no', 'exchange_id', 'target_month', 'municipality_code', 'office_number',
+                 'recipient_number', 'service_code', 'granted_days', 'managing_office_number', 'copayment_limit',
+                 'total_units', 'claim_amount')
+END_FIELDS = ('record_kind', 'record_no')
+# 文字列として引用符で囲む項目（番号は先頭の0を保つため文字列）
+QUOTED_FIELDS = frozenset({'exchange_id', 'data_kind', 'office_number', 'municipality_code', 'recipient_number',
+                           'service_code', 'managing_office_number'})
+
+
+def _amount(value) -> int:
+    return int(value or 0)
+
+
+class NationalClaimCsvExporter:
+    """
+    法人の月次請求（MonthlyBillingSummary）から国保連提出用CSVを生成する。
+    明細は1回のクエリを STREAM_BATCH_SIZE 件ずつ読みながら レコード → CSV行 → 文字コード変換 の順に流すため、
+    法人の規模によらずメモリ使用量は一定。事業所ごとの合計とレコード件数は先に集計クエリで求める。
+    出力を最後まで読むと manifest（レコード件数・バイト数・SHA-256）が確定する。
+    """
+
+    def __init__(self, corporation_id: int, year: int, month: int, encoding: str = None, created_on: date = None):
+        self.corporation_id = corporation_id
+        self.billing_month, self.month_end = month_range(year, month)
+        self.encoding = encoding or current_app.config.get('NATIONAL_CLAIM_CSV_ENCODING', DEFAULT_ENCODING)
+        self.created_on = created_on or get_jst_today()
+        self.manifest = None
+
+    @property
+    def filename(self) -> str:
+        return f"claim_{self.corporation_id}_{self.billing_month:%Y%m}.csv"
+
+    # ====================================================================
+    # 読み込み
+    # ====================================================================
+    def _summary_filter(self):
+        return and_(
+            MonthlyBillingSummary.billing_month == self.billing_month,
+            OfficeSetting.corporation_id == self.corporation_id,
+        )
+
+    def _office_totals(self) -> list:
+        """事業所番号ごとの件数・単位数・請求額（事業所数の分だけの行）"""
+        return db.session.execute(
+            select(OfficeServiceConfiguration.jigyosho_bango, func.count(MonthlyBillingSummary.id),
+                   func.sum(MonthlyBillingSummary.total_units_claimed), func.sum(MonthlyBillingSummary.claim_amount))
+            .join(OfficeServiceConfiguration,
+                  MonthlyBillingSummary.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .where(self._summary_filter())
+            .group_by(OfficeServiceConfiguration.jigyosho_bango)
+            .order_by(OfficeServiceConfiguration.jigyosho_bango)
+        ).all()
+
+    def _detail_rows(self):
+        """明細の元データ。受給者証・支給量・上限額・上限管理事業所は対象月に有効な最新の行を相関サブクエリで引く"""
+        certificate_id = (
+            select(func.max(ServiceCertificate.id))
+            .where(
+                ServiceCertificate.user_id == MonthlyBillingSummary.user_id,
+                ServiceCertificate.office_service_configuration_id == MonthlyBillingSummary.office_service_configuration_id,
+                ServiceCertificate.status == 'ACTIVE',
+                ServiceCertificate.voided_at.is_(None),
+            )
+            .correlate(MonthlyBillingSummary)
+            .scalar_subquery()
+        )
+
+        def latest(column, model, start, end, *conditions):
+            return (
+                select(column).where(model.certificate_id == ServiceCertificate.id, start <= self.month_end,
+                                     end >= self.billing_month, *conditions)
+                .order_by(start.desc(), model.id.desc()).limit(1)
+                .correlate_except(model)
+                .scalar_subquery()
+            )
+
+        return db.session.execute(
+            select(
+                OfficeServiceConfiguration.jigyosho_bango,
+                MunicipalityMaster.municipality_code,
+                ServiceCertificate.recipient_number,
+                ServiceTypeMaster.service_code,
+                latest(GrantedService.max_service_days, GrantedService,
+                       GrantedService.granted_start_date, GrantedService.granted_end_date,
+                       GrantedService.service_type_master_id == OfficeServiceConfiguration.service_type_master_id),
+                latest(CopaymentManagement.managing_office_number, CopaymentManagement,
+                       CopaymentManagement.management_start_date, CopaymentManagement.management_end_date,
+                       CopaymentManagement.is_applicable.is_(True)),
+                latest(CopaymentLimit.limit_amount, CopaymentLimit,
+                       CopaymentLimit.limit_start_date, CopaymentLimit.limit_end_date),
+                MonthlyBillingSummary.total_units_claimed,
+                MonthlyBillingSummary.claim_amount,
+            )
+            .join(OfficeServiceConfiguration,
+                  MonthlyBillingSummary.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(OfficeSetting, OfficeServiceConfiguration.office_id == OfficeSetting.id)
+            .join(ServiceTypeMaster, OfficeServiceConfiguration.service_type_master_id == ServiceTypeMaster.id)
+            .outerjoin(ServiceCertificate, ServiceCertificate.id == certificate_id)
+            .outerjoin(MunicipalityMaster, ServiceCertificate.municipality_master_id == MunicipalityMaster.id)
+            .where(self._summary_filter())
+            .order_by(OfficeServiceConfiguration.jigyosho_bango, MonthlyBillingSummary.user_id, MonthlyBillingSummary.id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+
+    # ====================================================================
+    # パイプライン: レコード → CSV行 → バイト列
+    # ====================================================================
+    def records(self):
+        """(項目名, 値) の辞書をレコード順に返す。レコード番号は1から通し"""
+        month = f"{self.billing_month:%Y%m}"
+        totals = self._office_totals()
+        data_count = len(totals) + sum(count for _, count, _, _ in totals)
+        record_no = 1
+        yield {"record_kind": CONTROL_RECORD, "record_no": record_no, "volume_no": 0, "record_count": data_count,
+               "data_kind": DATA_KIND, "target_month": month, "created_on": f"{self.created_on:%Y%m%d}"}
+
+        details = iter(self._detail_rows())
+        pending = next(details, None)
+        for office_number, count, units, amount in totals:
+            record_no += 1
+            yield {"record_kind": DATA_RECORD, "record_no": record_no, "exchange_id": CLAIM_HEADER,
+                   "target_month": month, "office_number": office_number, "claim_count": count,
+                   "total_units": units or 0, "claim_amount": _amount(amount)}
+            while pending is not None and pending[0] == office_number:
+                (_, municipality_code, recipient_number, service_code, granted_days, managing_office_number,
+                 copayment_limit, detail_units, detail_amount) = pending
+                record_no += 1
+                yield {"record_kind": DATA_RECORD, "record_no": record_no, "exchange_id": CLAIM_DETAIL,
+                       "target_month": month, "municipality_code": municipality_code, "office_number": office_number,
+                       "recipient_number": recipient_number, "service_code": service_code,
+                       "granted_days": granted_days, "managing_office_number": managing_office_number,
+                       "copayment_limit": None if copayment_limit is None else _amount(copayment_limit),
+                       "total_units": detail_units, "claim_amount": _amount(detail_amount)}
+                pending = next(details, None)
+
+        record_no += 1
+        yield {"record_kind": END_RECORD, "record_no": record_no}
+
+    @staticmethod
+    def format_record(record: dict) -> str:
+        kind = record["record_kind"]
+        if kind == CONTROL_RECORD:
+            fields = CONTROL_FIELDS
+        elif kind == END_RECORD:
+            fields = END_FIELDS
+        else:
+            fields = HEADER_FIELDS if record["exchange_id"] == CLAIM_HEADER else DETAIL_FIELDS
+        values = []
+        for name in fields:
+            value = record.get(name)
+            text = '' if value is None else str(value)
+            values.append(f'"{text}"' if name in QUOTED_FIELDS else text)
+        return ','.join(values) + LINE_END
+
+    def iter_bytes(self):
+        """CSV をエンコード済みのチャンクで返す。最後まで読むと self.manifest が設定される"""
+        digest = hashlib.sha256()
+        counts = Counter()
+        size = replaced = 0
+        missing_recipient = 0
+        buffer = bytearray()
+
+        for record in self.records():
+            counts[record.get("exchange_id") or record["record_kind"]] += 1
+            if record.get("exchange_id") == CLAIM_DETAIL and not record["recipient_number"]:
+                missing_recipient += 1
+            line = self.format_record(record)
+            try:
+                encoded = line.encode(self.encoding)
+            except UnicodeEncodeError:
+                encoded, substituted = self._encode_substituting(line)
+                replaced += substituted
+            buffer += encoded
+            if len(buffer) >= CHUNK_BYTES:
+                chunk = bytes(buffer)
+                digest.update(chunk)
+                size += len(chunk)
+                buffer.clear()
+                yield chunk
+
+        if buffer:
+            chunk = bytes(buffer)
+            digest.update(chunk)
+            size += len(chunk)
+            yield chunk
+
+        self.manifest = {
+            "filename": self.filename,
+            "corporation_id": self.corporation_id,
+            "billing_month": self.billing_month.isoformat(),
+            "encoding": self.encoding,
+            "created_on": self.created_on.isoformat(),
+            "record_counts": {
+                "control": counts[CONTROL_RECORD],
+                CLAIM_HEADER: counts[CLAIM_HEADER],
+                CLAIM_DETAIL: counts[CLAIM_DETAIL],
+                "end": counts[END_RECORD],
+            },
+            "total_records": sum(counts.values()),
+            "bytes": size,
+            "sha256": digest.hexdigest(),
+            "replaced_characters": replaced,
+            "missing_recipient_numbers": missing_recipient,
+        }
+        if replaced or missing_recipient:
+            logger.warning(
+                f"⚠️ 請求CSV {self.filename}: 代替文字 {replaced}件、受給者証番号なし {missing_recipient}件"
+            )
+
+    def _encode_substituting(self, line: str):
+        substituted = 0
+        encoded = bytearray()
+        for char in line:
+            try:
+                encoded += char.encode(self.encoding)
+            except UnicodeEncodeError:
+                encoded += SUBSTITUTE_CHAR.encode(self.encoding)
+                substituted += 1
+        return bytes(encoded), substituted
+
+    def write(self, fileobj) -> dict:
+        """fileobj（バイナリ）に書き出して manifest を返す"""
+        for chunk in self.iter_bytes():
+            fileobj.write(chunk)
+        return self.manifest
+
+    def build_manifest(self) -> dict:
+        """出力を保持せずに manifest だけを求める（ダウンロード済みのファイルの照合用）"""
+        for _ in self.iter_bytes():
+            pass
+        return self.manifest
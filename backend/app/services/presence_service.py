@@ -0,0 +1,331 @@
+# backend/app/services/presence_service.py
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from zoneinfo import ZoneInfo
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.app.extensions import db
+from backend.app.models import Supporter, SupporterTimecard, StaffDailyShift, OfficeSetting
+from backend.app.utils.timezone import get_jst_today
+
+logger = logging.getLogger(__name__)
+
+_JST = ZoneInfo("Asia/Tokyo")
+
+
+def build_presence_entry(supporter, shift, timecards) -> dict:
+    """
+    職員1名分の勤務状況（シフト・打刻・ステータス）を組み立てる。
+    GET /api/dashboard/staff/status とプレゼンスボードで同じ表現を共有する。
+    """
+    ongoing = next((tc for tc in timecards if tc.check_in is not None and tc.check_out is None), None)
+    completed_list = sorted((tc for tc in timecards if tc.check_out is not None), key=lambda x: x.sequence_no or 0)
+    rep_timecard = ongoing if ongoing else (completed_list[-1] if completed_list else None)
+
+    total_worked_seconds = 0
+    for tc in completed_list:
+        if tc.check_in and tc.check_out:
+            duration = (tc.check_out - tc.check_in).total_seconds()
+            break_sec = (tc.total_break_minutes or 0) * 60
+            total_worked_seconds += (duration - break_sec)
+
+    status = "NOT_SCHEDULED"
+    if ongoing:
+        status = "WORKING"
+    elif completed_list:
+        status = "FINISHED"
+    elif shift:
+        status = "SCHEDULED"
+
+    return {
+        "supporter_id": supporter.id,
+        "name": f"{supporter.last_name} {supporter.first_name}",
+        "status": status,
+        "shift": {
+            "start": shift.planned_start_time.replace(tzinfo=_JST).isoformat() if shift.planned_start_time else None,
+            "end": shift.planned_end_time.replace(tzinfo=_JST).isoformat() if shift.planned_end_time else None
+        } if shift else None,
+        "timecard": {
+            "check_in": rep_timecard.check_in.replace(tzinfo=_JST).isoformat() if rep_timecard and rep_timecard.check_in else None,
+            "check_out": rep_timecard.check_out.replace(tzinfo=_JST).isoformat() if rep_timecard and rep_timecard.check_out else None,
+            "total_worked_seconds": total_worked_seconds
+        } if rep_timecard or completed_list else None
+    }
+
+
+def load_presence_entries(supporters, target_date) -> dict:
+    """職員一覧に対する当日のシフト・打刻を一括取得し、{supporter_id: entry} を返す（辞書引きで O(職員 + 件数)）"""
+    supporter_ids = [s.id for s in supporters]
+    if not supporter_ids:
+        return {}
+
+    shift_map = {}
+    for shift in StaffDailyShift.query.filter(
+        StaffDailyShift.target_date == target_date, StaffDailyShift.supporter_id.in_(supporter_ids)
+    ).order_by(StaffDailyShift.id):
+        shift_map.setdefault(shift.supporter_id, shift)
+
+    # 前日以前に始まり退勤していない勤務（夜勤など）も当日の在席として扱う
+    timecard_map = defaultdict(list)
+    for tc in SupporterTimecard.query.filter(
+        SupporterTimecard.supporter_id.in_(supporter_ids),
+        (SupporterTimecard.work_date == target_date) | (
+            (SupporterTimecard.work_date < target_date)
+            & (SupporterTimecard.check_in != None) & (SupporterTimecard.check_out == None)
+        )
+    ):
+        timecard_map[tc.supporter_id].append(tc)
+
+    return {s.id: build_presence_entry(s, shift_map.get(s.id), timecard_map.get(s.id, [])) for s in supporters}
+
+
+class _TenantBoard:
+    def __init__(self, target_date, entries: dict, version: int, history_size: int):
+        self.target_date = target_date
+        self.built_at = time.monotonic()
+        self.entries = entries
+        self.version = version
+        # これ以前の購読位置は変更ログから追えない（再構築時点 or ログから押し出された最新の変更）
+        self.horizon = version
+        self.changes = deque()
+        self.history_size = history_size
+
+    def record(self, version: int, supporter_id: int, entry):
+        self.changes.append((version, supporter_id, entry))
+        if len(self.changes) > self.history_size:
+            self.horizon = self.changes.popleft()[0]
+        self.version = version
+
+
+class PresenceRegistry:
+    """
+    法人（テナント）単位のインメモリ職員在席ボード。
+    打刻・シフトのコミット時に差分が適用され、SSE購読者へ通知される。
+    ボードはDBからいつでも再構築でき、日付が変わるか REBUILD 間隔を過ぎると作り直す
+    （他プロセスでの更新はこの間隔で取り込まれる）。
+    """
+
+    def __init__(self, rebuild_seconds: int = 600, history_size: int = 1000):
+        self.rebuild_seconds = rebuild_seconds
+        self.history_size = history_size
+        self._boards = {}
+        self._version = 0
+        self._cond = threading.Condition()
+
+    def has_board(self, tenant_id) -> bool:
+        with self._cond:
+            return tenant_id in self._boards
+
+    def is_fresh(self, tenant_id, target_date) -> bool:
+        with self._cond:
+            board = self._boards.get(tenant_id)
+            return bool(board and board.target_date == target_date
+                        and time.monotonic() - board.built_at < self.rebuild_seconds)
+
+    def replace(self, tenant_id, target_date, entries: dict) -> int:
+        """DBから再構築したボードで置き換える。購読者には全量スナップショットを要求する"""
+        with self._cond:
+            self._version += 1
+            self._boards[tenant_id] = _TenantBoard(target_date, entries, self._version, self.history_size)
+            self._cond.notify_all()
+            return self._version
+
+    def apply(self, tenant_id, target_date, entries: dict):
+        """職員単位の差分（None は削除）を適用し、変更ログに積む"""
+        with self._cond:
+            board = self._boards.get(tenant_id)
+            if board is None or board.target_date != target_date:
+                return
+            for supporter_id, entry in entries.items():
+                self._version += 1
+                if entry is None:
+                    board.entries.pop(supporter_id, None)
+                else:
+                    board.entries[supporter_id] = entry
+                board.record(self._version, supporter_id, entry)
+            self._cond.notify_all()
+
+    def snapshot(self, tenant_id):
+        with self._cond:
+            board = self._boards.get(tenant_id)
+            if board is None:
+                return None, []
+            return board.version, list(board.entries.values())
+
+    def changes_since(self, tenant_id, since: int):
+        """
+        since より新しい変更を返す。変更ログから追えない場合（再構築・ログ溢れ）は None を返し、
+        呼び出し側で全量スナップショットを送り直す。
+        """
+        with self._cond:
+            board = self._boards.get(tenant_id)
+            if board is None or since < board.horizon:
+                return None
+            return [c for c in board.changes if c[0] > since]
+
+    def wait_for_change(self, tenant_id, since: int, timeout: float) -> bool:
+        with self._cond:
+            board = self._boards.get(tenant_id)
+            if board is not None and board.version > since:
+                return True
+            self._cond.wait(timeout)
+            board = self._boards.get(tenant_id)
+            return board is not None and board.version > since
+
+
+class PresenceService:
+    """
+    職員在席ボードの読み書きを担うサービス。
+    AttendanceService の打刻・シフト編集が mark_changed で変更職員をセッションに登録し、
+    コミット直前に該当職員のエントリを再計算、コミット後にレジストリへ反映する（ロールバック時は破棄）。
+    """
+
+    EXTENSION_KEY = 'presence_registry'
+    PENDING_KEY = 'presence_pending'
+    READY_KEY = 'presence_ready'
+    _registry_lock = threading.Lock()
+
+    @classmethod
+    def get_registry(cls) -> PresenceRegistry:
+        app = current_app._get_current_object()
+        registry = app.extensions.get(cls.EXTENSION_KEY)
+        if registry is None:
+            with cls._registry_lock:
+                registry = app.extensions.get(cls.EXTENSION_KEY)
+                if registry is None:
+                    registry = PresenceRegistry(rebuild_seconds=int(app.config.get('PRESENCE_REBUILD_SECONDS', 600)))
+                    app.extensions[cls.EXTENSION_KEY] = registry
+        return registry
+
+    @staticmethod
+    def tenant_of(supporter_id: int):
+        """職員の所属法人ID（法人未所属の場合は None）"""
+        row = db.session.query(OfficeSetting.corporation_id).join(
+            Supporter, Supporter.office_id == OfficeSetting.id
+        ).filter(Supporter.id == supporter_id).first()
+        return row[0] if row else None
+
+    @staticmethod
+    def _tenant_supporters_query(tenant_id):
+        query = Supporter.query.filter_by(is_active=True)
+        if tenant_id is None:
+            return query.filter(Supporter.office_id == None)
+        return query.join(OfficeSetting, Supporter.office_id == OfficeSetting.id).filter(OfficeSetting.corporation_id == tenant_id)
+
+    @classmethod
+    def rebuild(cls, tenant_id, target_date=None) -> int:
+        target_date = target_date or get_jst_today()
+        supporters = cls._tenant_supporters_query(tenant_id).order_by(Supporter.id).all()
+        entries = load_presence_entries(supporters, target_date)
+        logger.info(f"🟢 Presence board rebuilt for tenant {tenant_id}: {len(entries)} staff")
+        return cls.get_registry().replace(tenant_id, target_date, entries)
+
+    @classmethod
+    def ensure_board(cls, tenant_id):
+        today = get_jst_today()
+        if not cls.get_registry().is_fresh(tenant_id, today):
+            cls.rebuild(tenant_id, today)
+
+    @classmethod
+    def snapshot(cls, scope: dict, staff_id: int) -> dict:
+        """権限スコープに応じた在席ボードの全量を返す（法人管理者は法人全体、それ以外は本人のみ）"""
+        tenant_id = cls.tenant_of(staff_id)
+        cls.ensure_board(tenant_id)
+        version, entries = cls.get_registry().snapshot(tenant_id)
+        visible = [e for e in entries if cls._is_visible(scope, staff_id, e["supporter_id"])]
+        visible.sort(key=lambda e: e["supporter_id"])
+        return {"version": version, "staff_list": visible}
+
+    @staticmethod
+    def _is_visible(scope: dict, staff_id: int, supporter_id: int) -> bool:
+        return not scope['self_only'] or supporter_id == staff_id
+
+    @classmethod
+    def visible_changes(cls, scope: dict, staff_id: int, tenant_id, since: int):
+        """since 以降の変更をスコープで絞って返す。差分で追えない場合は None"""
+        changes = cls.get_registry().changes_since(tenant_id, since)
+        if changes is None:
+            return None
+        return [
+            {"version": version, "supporter_id": supporter_id, "entry": entry}
+            for version, supporter_id, entry in changes
+            if cls._is_visible(scope, staff_id, supporter_id)
+        ]
+
+    # ====================================================================
+    # コミット連動の差分更新
+    # ====================================================================
+    @classmethod
+    def mark_changed(cls, session, supporter_id: int):
+        """打刻・シフトを変更した職員を、現在のトランザクションのコミット時に再計算する対象として登録する"""
+        if supporter_id is not None and _registry_active():
+            session.info.setdefault(cls.PENDING_KEY, set()).add(supporter_id)
+
+    @classmethod
+    def _prepare_entries(cls, session):
+        pending = session.info.pop(cls.PENDING_KEY, None)
+        if not pending:
+            return
+        registry = cls.get_registry()
+        today = get_jst_today()
+
+        rows = session.query(Supporter, OfficeSetting.corporation_id).outerjoin(
+            OfficeSetting, Supporter.office_id == OfficeSetting.id
+        ).filter(Supporter.id.in_(pending)).all()
+        by_tenant = defaultdict(list)
+        for supporter, tenant_id in rows:
+            if registry.has_board(tenant_id):
+                by_tenant[tenant_id].append(supporter)
+        if not by_tenant:
+            return
+
+        ready = session.info.setdefault(cls.READY_KEY, [])
+        for tenant_id, supporters in by_tenant.items():
+            active = [s for s in supporters if s.is_active]
+            entries = load_presence_entries(active, today)
+            for s in supporters:
+                entries.setdefault(s.id, None)
+            ready.append((tenant_id, today, entries))
+
+    @classmethod
+    def _publish(cls, session):
+        ready = session.info.pop(cls.READY_KEY, None)
+        if not ready:
+            return
+        registry = cls.get_registry()
+        for tenant_id, target_date, entries in ready:
+            registry.apply(tenant_id, target_date, entries)
+
+    @classmethod
+    def _discard(cls, session):
+        session.info.pop(cls.PENDING_KEY, None)
+        session.info.pop(cls.READY_KEY, None)
+
+
+def _registry_active() -> bool:
+    return has_app_context() and current_app.extensions.get(PresenceService.EXTENSION_KEY) is not None
+
+
+@event.listens_for(Session, 'before_commit')
+def _presence_before_commit(session):
+    # 在席の変更が登録されたトランザクションだけを対象にする（それ以外のコミットには何もしない）
+    if session.info.get(PresenceService.PENDING_KEY) and _registry_active():
+        session.flush()
+        PresenceService._prepare_entries(session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _presence_after_commit(session):
+    if PresenceService.READY_KEY in session.info and _registry_active():
+        PresenceService._publish(session)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _presence_after_rollback(session):
+    PresenceService._discard(session)
@@ -0,0 +1,222 @@
+# backend/app/services/query_profiler_service.py
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    SQLをテンプレートに正規化する。リテラルとプレースホルダを ? に置き換え、IN句の要素数の違いは1つにまとめる。
+    同じ箇所から発行されたSQLは引数が違っても同じテンプレートになる。
+    """
+    text = _STRING_LITERAL.sub('?', statement)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = _IN_LIST.sub('(?)', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+@dataclass
+class RequestQueryProfile:
+    """1リクエスト中に発行されたSQLの集計"""
+    method: str = ''
+    path: str = ''
+    endpoint: str = ''
+    status_code: int = None
+    query_count: int = 0
+    db_time_ms: float = 0.0
+    templates: Counter = field(default_factory=Counter)
+    template_time_ms: Counter = field(default_factory=Counter)
+    slow_queries: list = field(default_factory=list)
+    n_plus_one: list = field(default_factory=list)
+
+    def record(self, statement: str, elapsed_ms: float):
+        template = normalize_statement(statement)
+        self.query_count += 1
+        self.db_time_ms += elapsed_ms
+        self.templates[template] += 1
+        self.template_time_ms[template] += elapsed_ms
+        return template
+
+    def to_dict(self, top: int = 10) -> dict:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "endpoint": self.endpoint,
+            "status_code": self.status_code,
+            "query_count": self.query_count,
+            "db_time_ms": round(self.db_time_ms, 2),
+            "top_templates": [
+                {"template": t, "count": c, "db_time_ms": round(self.template_time_ms[t], 2)}
+                for t, c in self.templates.most_common(top)
+            ],
+            "slow_queries": self.slow_queries,
+            "n_plus_one": self.n_plus_one,
+        }
+
+
+class QueryProfiler:
+    """
+    リクエスト単位のSQL計測。エンジンのカーソル実行イベントで件数・DB時間・テンプレート別の回数を集計し、
+    同一テンプレートが閾値を超えて繰り返された場合を N+1 として警告する。
+    直近のリクエストの集計と、エンドポイント別の累計を保持する。
+    """
+
+    EXTENSION_KEY = 'query_profiler'
+    PROFILE_KEY = '_sql_profile'
+    COUNT_HEADER = 'X-DB-Query-Count'
+    TIME_HEADER = 'X-DB-Time-Ms'
+
+    def __init__(self, n_plus_one_threshold: int = 10, slow_query_ms: float = 200, history_size: int = 200):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_query_ms = slow_query_ms
+        self._recent = deque(maxlen=history_size)
+        self._by_endpoint = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def init_app(cls, app):
+        if not app.config.get('SQL_PROFILING_ENABLED', True):
+            return None
+        profiler = cls(
+            n_plus_one_threshold=int(app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 10)),
+            slow_query_ms=float(app.config.get('SQL_SLOW_QUERY_MS', 200)),
+            history_size=int(app.config.get('SQL_PROFILE_HISTORY', 200)),
+        )
+        app.extensions[cls.EXTENSION_KEY] = profiler
+        app.before_request(profiler.begin)
+        app.after_request(profiler.finish)
+        return profiler
+
+    @classmethod
+    def get(cls, app=None):
+        app = app or current_app._get_current_object()
+        return app.extensions.get(cls.EXTENSION_KEY)
+
+    # ====================================================================
+    # リクエストのライフサイクル
+    # ====================================================================
+    def begin(self):
+        setattr(g, self.PROFILE_KEY, RequestQueryProfile(
+            method=request.method, path=request.path, endpoint=request.endpoint or ''
+        ))
+
+    def finish(self, response=None):
+        profile = g.pop(self.PROFILE_KEY, None)
+        if profile is None:
+            return response
+
+        for template, count in profile.templates.items():
+            if count > self.n_plus_one_threshold:
+                profile.n_plus_one.append({"template": template, "count": count})
+                logger.warning(
+                    f"🔁 N+1の疑い: {profile.method} {profile.path} で同一SQLが {count} 回発行されました: {template[:200]}"
+                )
+
+        if response is not None:
+            profile.status_code = response.status_code
+            response.headers[self.COUNT_HEADER] = str(profile.query_count)
+            response.headers[self.TIME_HEADER] = f"{profile.db_time_ms:.2f}"
+        self._store(profile)
+        return response
+
+    def _store(self, profile: RequestQueryProfile):
+        with self._lock:
+            self._recent.append(profile)
+            key = f"{profile.method} {profile.endpoint or profile.path}"
+            stats = self._by_endpoint.setdefault(key, {"requests": 0, "queries": 0, "max_queries": 0, "db_time_ms": 0.0, "n_plus_one_requests": 0})
+            stats["requests"] += 1
+            stats["queries"] += profile.query_count
+            stats["max_queries"] = max(stats["max_queries"], profile.query_count)
+            stats["db_time_ms"] += profile.db_time_ms
+            if profile.n_plus_one:
+                stats["n_plus_one_requests"] += 1
+
+    def _on_statement(self, statement: str, elapsed_ms: float):
+        profile = g.get(self.PROFILE_KEY)
+        if profile is None:
+            return
+        template = profile.record(statement, elapsed_ms)
+        if elapsed_ms >= self.slow_query_ms:
+            profile.slow_queries.append({"template": template[:500], "db_time_ms": round(elapsed_ms, 2)})
+            logger.warning(f"🐢 スロークエリ ({elapsed_ms:.1f}ms) {profile.method} {profile.path}: {template[:200]}")
+
+    # ====================================================================
+    # 参照
+    # ====================================================================
+    def recent(self, limit: int = 20) -> list:
+        with self._lock:
+            profiles = list(self._recent)[-limit:]
+        return [p.to_dict() for p in reversed(profiles)]
+
+    def last_profile(self) -> RequestQueryProfile:
+        with self._lock:
+            return self._recent[-1] if self._recent else None
+
+    def summary(self) -> dict:
+        with self._lock:
+            endpoints = {}
+            for key, stats in self._by_endpoint.items():
+                endpoints[key] = dict(
+                    stats,
+                    avg_queries=round(stats["queries"] / stats["requests"], 1),
+                    db_time_ms=round(stats["db_time_ms"], 2),
+                )
+        return {
+            "n_plus_one_threshold": self.n_plus_one_threshold,
+            "slow_query_ms": self.slow_query_ms,
+            "endpoints": endpoints,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._by_endpoint.clear()
+
+
+def _active_profiler():
+    if not has_request_context() or QueryProfiler.PROFILE_KEY not in g:
+        return None
+    return current_app.extensions.get(QueryProfiler.EXTENSION_KEY)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _profiler_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active_profiler() is not None:
+        conn.info.setdefault('query_profiler_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _profiler_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_profiler_started')
+    if not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    profiler = _active_profiler()
+    if profiler is not None:
+        profiler._on_statement(statement, elapsed_ms)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _profiler_handle_error(exception_context):
+    # 失敗したSQLは after_cursor_execute が呼ばれないため、計測開始時刻だけを捨てる
+    conn = exception_context.connection
+    started = conn.info.get('query_profiler_started') if conn is not None else None
+    if started:
+        started.pop()
@@ -0,0 +1,182 @@
+# backend/app/services/staff_daily_report_service.py
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+from flask import current_app
+from sqlalchemy import update
+
+from backend.app.extensions import db
+from backend.app.models import StaffActionLog, StaffDailyReport
+from backend.app.services.ai_gateway_service import AIGatewayService
+from backend.app.utils.timezone import get_jst_today
+
+logger = logging.getLogger(__name__)
+
+
+class StaffDailyReportService:
+    """
+    職員のアクションログ（StaffActionLog）から業務日報（StaffDailyReport）の下書きを生成するサービス。
+    終業時に事業所（法人）全体の未処理ログを一括で集約し、AI要約は上限付きワーカープールで並列実行する。
+    """
+
+    SYSTEM_INSTRUCTION = (
+        "あなたは就労支援事業所の職員の業務日報を作成するアシスタントです。"
+        "与えられた活動ログを時系列に沿って、3〜5文の簡潔な日本語の日報本文に要約してください。"
+    )
+    # IN句のパラメータ数が肥大化しないよう、一括更新はこの件数ごとに分割する
+    UPDATE_CHUNK_SIZE = 500
+
+    @staticmethod
+    def day_range(target_date: date):
+        """対象日の [00:00, 翌00:00) を返す。DATE()キャストではなく範囲条件でインデックスを利用するため。"""
+        start = datetime.combine(target_date, time.min)
+        return start, start + timedelta(days=1)
+
+    @staticmethod
+    def build_highlights(logs) -> str:
+        """アクションログを時系列の箇条書きに整形する（AI要約が使えない場合もこの形で保存する）"""
+        text = "【本日の業務ハイライト】\n"
+        for log in logs:
+            text += f"- {log.action_timestamp.strftime('%H:%M')} : {log.action_content}\n"
+        return text
+
+    @classmethod
+    def _claim_unprocessed_logs(cls, target_date: date, supporter_ids=None) -> dict:
+        """
+        対象日の未処理ログを処理済みに更新して確定（claim）し、確定できたログを職員ごとにグループ化して返す。
+        UPDATE ... WHERE is_processed_by_ai = false RETURNING で取得とロックを1文で行うため、
+        同じ職員に対する生成が重なっても、同じログを二重に日報へ追記しない。
+        """
+        start, end = cls.day_range(target_date)
+        stmt = update(StaffActionLog).where(
+            StaffActionLog.action_timestamp >= start,
+            StaffActionLog.action_timestamp < end,
+            StaffActionLog.is_processed_by_ai == False
+        )
+        if supporter_ids is not None:
+            if not supporter_ids:
+                return {}
+            stmt = stmt.where(StaffActionLog.supporter_id.in_(list(supporter_ids)))
+
+        claimed_ids = db.session.execute(
+            stmt.values(is_processed_by_ai=True).returning(StaffActionLog.id)
+        ).scalars().all()
+        db.session.commit()
+        if not claimed_ids:
+            return {}
+
+        grouped = {}
+        for i in range(0, len(claimed_ids), cls.UPDATE_CHUNK_SIZE):
+            chunk = claimed_ids[i:i + cls.UPDATE_CHUNK_SIZE]
+            for log in StaffActionLog.query.filter(StaffActionLog.id.in_(chunk)).all():
+                grouped.setdefault(log.supporter_id, []).append(log)
+        for logs in grouped.values():
+            logs.sort(key=lambda log: (log.action_timestamp, log.id))
+        return dict(sorted(grouped.items()))
+
+    @classmethod
+    def _summarize_all(cls, highlights_map: dict, max_workers: int) -> dict:
+        """
+        職員ごとのハイライトをワーカープールでAI要約する。
+        ワーカーはDBセッションに触れず、文字列だけを受け渡す。失敗した職員は要約なしとして扱う。
+        """
+        if not highlights_map or not AIGatewayService.is_live():
+            return {}
+
+        app = current_app._get_current_object()
+
+        def summarize(highlights: str) -> str:
+            with app.app_context():
+                return AIGatewayService.generate_text(highlights, system_instruction=cls.SYSTEM_INSTRUCTION, contains_pii=True)
+
+        summaries = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='daily-report') as executor:
+            futures = {sid: executor.submit(summarize, text) for sid, text in highlights_map.items()}
+            for sid, future in futures.items():
+                try:
+                    summaries[sid] = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ 日報のAI要約に失敗したため、ハイライトのみで下書きを作成します (supporter_id={sid}): {e}")
+        return summaries
+
+    @classmethod
+    def _release_claims(cls, log_ids: list):
+        """下書きの保存に失敗した場合、確定したログを未処理に戻して次回の生成対象に残す"""
+        for i in range(0, len(log_ids), cls.UPDATE_CHUNK_SIZE):
+            chunk = log_ids[i:i + cls.UPDATE_CHUNK_SIZE]
+            StaffActionLog.query.filter(StaffActionLog.id.in_(chunk)).update(
+                {StaffActionLog.is_processed_by_ai: False}, synchronize_session=False
+            )
+        db.session.commit()
+
+    @classmethod
+    def generate_drafts(cls, target_date: date = None, supporter_ids=None, max_workers: int = None) -> dict:
+        """
+        未処理のアクションログを持つ全職員の日報下書きを一括生成する。
+
+        Args:
+            target_date: 対象日（省略時はJSTの今日）
+            supporter_ids: 対象職員を限定する場合のID一覧（None の場合は全職員）
+            max_workers: AI要約の並列数（省略時は AI_MAX_CONCURRENCY）
+
+        Returns:
+            dict: target_date / reports（supporter_id, report_id, log_count, content）/ processed_log_count / ai_summarized_count
+        """
+        target_date = target_date or get_jst_today()
+        max_workers = max(1, int(max_workers or current_app.config.get('AI_MAX_CONCURRENCY', 4)))
+
+        grouped = cls._claim_unprocessed_logs(target_date, supporter_ids)
+        if not grouped:
+            return {"target_date": target_date.isoformat(), "reports": [], "processed_log_count": 0, "ai_summarized_count": 0}
+
+        log_ids = [log.id for logs in grouped.values() for log in logs]
+        highlights_map = {sid: cls.build_highlights(logs) for sid, logs in grouped.items()}
+        summaries = cls._summarize_all(highlights_map, max_workers)
+
+        reports = []
+        try:
+            existing_reports = {
+                r.supporter_id: r for r in StaffDailyReport.query.filter(
+                    StaffDailyReport.supporter_id.in_(list(grouped.keys())),
+                    StaffDailyReport.target_date == target_date
+                ).all()
+            }
+            for sid, logs in grouped.items():
+                content = highlights_map[sid]
+                if sid in summaries:
+                    content = f"{summaries[sid]}\n\n{content}"
+
+                report = existing_reports.get(sid)
+                if report:
+                    report.report_content += "\n\n" + content
+                    report.is_ai_draft = True
+                    report.is_submitted = False
+                else:
+                    report = StaffDailyReport(
+                        supporter_id=sid,
+                        target_date=target_date,
+                        report_content=content,
+                        is_ai_draft=True,
+                        is_submitted=False
+                    )
+                    db.session.add(report)
+                reports.append((sid, report, len(logs)))
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            cls._release_claims(log_ids)
+            raise
+
+        logger.info(f"📝 日報下書きを一括生成しました: {len(reports)}名 / ログ{len(log_ids)}件 (AI要約 {len(summaries)}名)")
+        return {
+            "target_date": target_date.isoformat(),
+            "reports": [
+                {"supporter_id": sid, "report_id": report.id, "log_count": count, "content": report.report_content}
+                for sid, report, count in reports
+            ],
+            "processed_log_count": len(log_ids),
+            "ai_summarized_count": len(summaries),
+        }
@@ -0,0 +1,262 @@
+# backend/app/services/staffing_coverage_service.py
+
+import calendar
+import logging
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+from backend.app.extensions import db
+from backend.app.utils.timezone import get_jst_now
+from backend.app.models import (
+    AttendanceRecord, GrantedService, OfficeServiceConfiguration, OfficeSetting,
+    ServiceCertificate, SupporterTimecard, UserDailyLog
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StaffingCoverageService:
+    """
+    事業所ごとの人員配置カバレッジを、15分単位のタイムラインとして算出するサービス。
+    職員の勤務区間（SupporterTimecard）と利用者の在所区間（AttendanceRecord の CHECK_IN/CHECK_OUT）を
+    差分配列＋累積和のスイープラインで全事業所・1か月分まとめて集計し、基準を下回る時間帯をすべて列挙する。
+
+    監査で不利にならないよう、端数の扱いは保守的に寄せる:
+      - 職員はバケット全体を勤務している場合のみ計上（開始は切り上げ、終了は切り捨て）
+      - 利用者はバケットに一瞬でも在所していれば計上（開始は切り捨て、終了は切り上げ）
+    """
+
+    BUCKET_MINUTES = 15
+    REQUIRED_STAFF_RATIO = 6.0 # 利用者6人に対し職員1人（ComplianceService と同じ基準）
+    ON_SITE_STAFF_LOCATIONS = {None, 'OFFICE'}
+    OFF_SITE_USER_LOCATIONS = ('OFF_SITE_EXTERNAL', 'OFF_SITE_USER_HOME')
+
+    def __init__(self, bucket_minutes: int = None, required_staff_ratio: float = None):
+        self.bucket_minutes = bucket_minutes or self.BUCKET_MINUTES
+        self.required_staff_ratio = required_staff_ratio or self.REQUIRED_STAFF_RATIO
+
+    # ====================================================================
+    # 1. 区間データの収集
+    # ====================================================================
+    def _collect_staff_intervals(self, period_start: datetime, period_end: datetime, office_ids):
+        """事業所内で勤務した職員の (office_id, 開始, 終了) を返す。打刻中の区間は現在時刻（期間末で頭打ち）までとする。"""
+        office_col = func.coalesce(SupporterTimecard.office_id, OfficeServiceConfiguration.office_id)
+        rows = db.session.query(
+            office_col, SupporterTimecard.check_in, SupporterTimecard.check_out, SupporterTimecard.location_type
+        ).join(
+            OfficeServiceConfiguration, SupporterTimecard.office_service_configuration_id == OfficeServiceConfiguration.id
+        ).filter(
+            SupporterTimecard.check_in != None,
+            SupporterTimecard.check_in < period_end,
+            (SupporterTimecard.check_out == None) | (SupporterTimecard.check_out > period_start),
+            (SupporterTimecard.is_absent == False) | (SupporterTimecard.is_absent == None),
+            office_col.in_(office_ids)
+        ).all()
+
+        now = min(get_jst_now().replace(tzinfo=None), period_end)
+        intervals = []
+        for office_id, check_in, check_out, location_type in rows:
+            if location_type not in self.ON_SITE_STAFF_LOCATIONS:
+                continue
+            intervals.append((office_id, check_in, check_out or now))
+        return intervals
+
+    def _collect_user_intervals(self, period_start: datetime, period_end: datetime, office_ids):
+        """
+        利用者の打刻を CHECK_IN→CHECK_OUT の組に変換し、(office_id, 開始, 終了) を返す。
+        退所打刻のない来所はその日の終わりまで在所とみなす（監査上の安全側）。
+        施設外就労の日は事業所内の在所から除外する。
+        """
+        # 利用者の所属事業所は、対象月に支給決定期間が掛かる有効（ACTIVE）な受給者証の事業所から解決する（最新交付分を優先）
+        cert_rows = db.session.query(
+            ServiceCertificate.user_id, OfficeServiceConfiguration.office_id
+        ).join(
+            OfficeServiceConfiguration, ServiceCertificate.office_service_configuration_id == OfficeServiceConfiguration.id
+        ).join(
+            GrantedService, GrantedService.certificate_id == ServiceCertificate.id
+        ).filter(
+            ServiceCertificate.status == 'ACTIVE',
+            ServiceCertificate.voided_at == None,
+            GrantedService.granted_start_date < period_end.date(),
+            GrantedService.granted_end_date >= period_start.date(),
+            OfficeServiceConfiguration.office_id.in_(office_ids)
+        ).order_by(ServiceCertificate.certificate_issue_date, ServiceCertificate.id).all()
+        user_office = {user_id: office_id for user_id, office_id in cert_rows}
+        if not user_office:
+            return [], 0
+
+        off_site_days = set(db.session.query(UserDailyLog.user_id, UserDailyLog.log_date).filter(
+            UserDailyLog.log_date >= period_start.date(),
+            UserDailyLog.log_date < period_end.date(),
+            UserDailyLog.location_type.in_(self.OFF_SITE_USER_LOCATIONS)
+        ).all())
+
+        records = db.session.query(
+            AttendanceRecord.user_id, AttendanceRecord.record_type, AttendanceRecord.timestamp
+        ).filter(
+            AttendanceRecord.timestamp >= period_start - timedelta(days=1),
+            AttendanceRecord.timestamp < period_end,
+            AttendanceRecord.user_id.in_(list(user_office.keys()))
+        ).order_by(AttendanceRecord.user_id, AttendanceRecord.timestamp, AttendanceRecord.id).all()
+
+        intervals = []
+        unpaired = 0
+        open_user, open_at = None, None
+
+        def close(user_id, started, ended):
+            if (user_id, started.date()) in off_site_days:
+                return
+            intervals.append((user_office[user_id], started, ended))
+
+        for user_id, record_type, timestamp in records:
+            if open_user is not None and open_user != user_id:
+                close(open_user, open_at, datetime.combine(open_at.date() + timedelta(days=1), datetime.min.time()))
+                unpaired += 1
+                open_user = None
+
+            if record_type == 'CHECK_IN':
+                if open_user is not None:
+                    # 来所が連続した場合は先の来所をその時点で打ち切る
+                    close(open_user, open_at, timestamp)
+                    unpaired += 1
+                open_user, open_at = user_id, timestamp
+            elif record_type == 'CHECK_OUT' and open_user == user_id:
+                close(user_id, open_at, timestamp)
+                open_user = None
+
+        if open_user is not None:
+            close(open_user, open_at, datetime.combine(open_at.date() + timedelta(days=1), datetime.min.time()))
+            unpaired += 1
+
+        return intervals, unpaired
+
+    # ====================================================================
+    # 2. スイープライン
+    # ====================================================================
+    def _sweep(self, intervals, office_index: dict, period_start: datetime, n_buckets: int, conservative_inside: bool) -> np.ndarray:
+        """
+        区間の集合を (事業所数, バケット数) の同時在席数に変換する。
+        差分配列に +1/-1 を np.add.at で一括加算し、累積和をとるだけなので、区間数に対して線形。
+        """
+        counts = np.zeros((len(office_index), n_buckets + 1), dtype=np.int32)
+        if not intervals:
+            return counts[:, :-1]
+
+        bucket_seconds = self.bucket_minutes * 60
+        rows = np.fromiter((office_index[o] for o, _, _ in intervals), dtype=np.int64, count=len(intervals))
+        starts = np.fromiter(((s - period_start).total_seconds() for _, s, _ in intervals), dtype=np.float64, count=len(intervals)) / bucket_seconds
+        ends = np.fromiter(((e - period_start).total_seconds() for _, _, e in intervals), dtype=np.float64, count=len(intervals)) / bucket_seconds
+
+        if conservative_inside:
+            start_idx, end_idx = np.ceil(starts), np.floor(ends)
+        else:
+            start_idx, end_idx = np.floor(starts), np.ceil(ends)
+        start_idx = np.clip(start_idx, 0, n_buckets).astype(np.int64)
+        end_idx = np.clip(end_idx, 0, n_buckets).astype(np.int64)
+
+        valid = end_idx > start_idx
+        np.add.at(counts, (rows[valid], start_idx[valid]), 1)
+        np.add.at(counts, (rows[valid], end_idx[valid]), -1)
+        return np.cumsum(counts, axis=1)[:, :-1]
+
+    def _under_staffed_runs(self, mask: np.ndarray):
+        """真偽配列から連続する True 区間を (開始, 終了) のインデックス組で返す"""
+        padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+        edges = np.flatnonzero(np.diff(padded))
+        return list(zip(edges[0::2], edges[1::2]))
+
+    # ====================================================================
+    # 3. 月次タイムライン
+    # ====================================================================
+    def build_monthly_timeline(self, year: int, month: int, office_ids: list = None, include_timeline: bool = False) -> dict:
+        """
+        指定月の全事業所（または office_ids）の人員配置タイムラインを1パスで算出する。
+
+        Returns:
+            dict: office_id -> {
+                under_staffed_intervals: [{start, end, max_users_present, min_staff_on_duty, required_staff}],
+                under_staffed_minutes, peak_users_present, unpaired_user_check_ins,
+                (include_timeline=True の場合) timeline: {staff_on_duty: [...], users_present: [...]}
+            }
+        """
+        if office_ids is None:
+            office_ids = [oid for (oid,) in db.session.query(OfficeSetting.id).order_by(OfficeSetting.id)]
+        office_ids = list(office_ids)
+        if not office_ids:
+            return {}
+
+        period_start = datetime(year, month, 1)
+        days_in_month = calendar.monthrange(year, month)[1]
+        period_end = period_start + timedelta(days=days_in_month)
+        n_buckets = days_in_month * 24 * 60 // self.bucket_minutes
+        office_index = {oid: i for i, oid in enumerate(office_ids)}
+
+        staff_intervals = self._collect_staff_intervals(period_start, period_end, office_ids)
+        user_intervals, unpaired = self._collect_user_intervals(period_start, period_end, office_ids)
+
+        staff = self._sweep(staff_intervals, office_index, period_start, n_buckets, conservative_inside=True)
+        users = self._sweep(user_intervals, office_index, period_start, n_buckets, conservative_inside=False)
+
+        # 利用者がいる時間帯で「利用者数 > 職員数 × 基準比率」となるバケットが人員不足
+        under = (users > 0) & (users > staff * self.required_staff_ratio)
+
+        bucket = timedelta(minutes=self.bucket_minutes)
+        result = {}
+        for oid, row in office_index.items():
+            intervals = []
+            for s, e in self._under_staffed_runs(under[row]):
+                max_users = int(users[row, s:e].max())
+                intervals.append({
+                    "start": (period_start + bucket * int(s)).isoformat(),
+                    "end": (period_start + bucket * int(e)).isoformat(),
+                    "max_users_present": max_users,
+                    "min_staff_on_duty": int(staff[row, s:e].min()),
+                    "required_staff": math.ceil(max_users / self.required_staff_ratio),
+                })
+
+            office_result = {
+                "under_staffed_intervals": intervals,
+                "under_staffed_minutes": int(under[row].sum()) * self.bucket_minutes,
+                "peak_users_present": int(users[row].max()) if n_buckets else 0,
+                "peak_staff_on_duty": int(staff[row].max()) if n_buckets else 0,
+            }
+            if include_timeline:
+                office_result["timeline"] = {
+                    "staff_on_duty": staff[row].tolist(),
+                    "users_present": users[row].tolist(),
+                }
+            result[oid] = office_result
+
+        logger.info(
+            f"📊 Staffing coverage built for {len(office_ids)} offices ({year}-{month:02d}): "
+            f"{len(staff_intervals)} staff / {len(user_intervals)} user intervals, {unpaired} unpaired check-ins."
+        )
+        return {
+            "year": year,
+            "month": month,
+            "bucket_minutes": self.bucket_minutes,
+            "required_staff_ratio": self.required_staff_ratio,
+            "period_start": period_start.isoformat(),
+            "unpaired_user_check_ins": unpaired,
+            "offices": result,
+        }
+
+    def coverage_at(self, office_id: int, at: datetime) -> dict:
+        """監査向け：特定時刻を含むバケットの職員数・利用者数を返す"""
+        timeline = self.build_monthly_timeline(at.year, at.month, [office_id], include_timeline=True)
+        office = timeline["offices"][office_id]
+        period_start = datetime(at.year, at.month, 1)
+        idx = int((at - period_start).total_seconds() // (self.bucket_minutes * 60))
+        staff_on_duty = office["timeline"]["staff_on_duty"][idx]
+        users_present = office["timeline"]["users_present"][idx]
+        bucket_start = period_start + timedelta(minutes=self.bucket_minutes * idx)
+        return {
+            "bucket_start": bucket_start.isoformat(),
+            "bucket_end": (bucket_start + timedelta(minutes=self.bucket_minutes)).isoformat(),
+            "staff_on_duty": staff_on_duty,
+            "users_present": users_present,
+            "ratio_met": users_present == 0 or users_present <= staff_on_duty * self.required_staff_ratio,
+        }
@@ -49,7 +49,6 @@ class UserScheduleService:
         template_dict = {t.day_of_week: t for t in templates}
 
         from backend.app.models.support.attendance_workflow import AttendanceRecord
-        from sqlalchemy import func
 
         created_count = 0
         curr = start_date
@@ -65,7 +64,7 @@ class UserScheduleService:
                 user_id=user_id,
                 record_type='CHECK_IN'
             ).filter(
-                func.date(AttendanceRecord.timestamp) == curr
+                AttendanceRecord.attendance_date == curr
             ).first() is not None
 
             # 承認された申請があるかチェック
@@ -0,0 +1,280 @@
+# backend/app/services/wage_engine_service.py
+
+import json
+import logging
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+
+from backend.app.extensions import db
+from backend.app.models import (
+    AttendanceRecord, BreakRecord, DailyProductivityLog, GrantedService, OfficeServiceConfiguration,
+    ProductMaster, ServiceCertificate, ServiceTypeMaster, UserDailyLog, UserWageLog
+)
+from backend.app.services.billing_engine_service import BILLABLE_LOG_STATUS, month_range
+
+logger = logging.getLogger(__name__)
+
+# 工賃の支払対象となるサービス種類（就労継続支援A型・B型）
+WAGE_SERVICE_CODES = ('CONTINUOUS_A', 'CONTINUOUS_B')
+# 入力スナップショットの形式。計算方法を変える場合は上げる
+SNAPSHOT_VERSION = 1
+YEN = Decimal('1')
+
+
+def _money(value) -> str:
+    return str(Decimal(value).quantize(YEN))
+
+
+class MonthlyWageEngine:
+    """
+    A型・B型事業所の月次工賃計算。
+    対象月の完了済み日報に紐づく生産実績（良品数 × 製品の標準工賃単価）と、打刻から求めた作業時間（休憩を除く）× 時間単価を
+    事業所の利用者全員分まとめて集計し、UserWageLog を一括で書き込む。
+    各行には計算に使った入力（製品別の良品数・単価、作業時間、時間単価）を保存し、同じ入力からは同じ額になる。
+    支払済み（payment_timestamp あり）の行は変更せず、差分は locked として報告する。
+    """
+
+    def __init__(self, office_id: int, year: int, month: int, hourly_rate=None):
+        self.office_id = office_id
+        self.calculation_month, self.month_end = month_range(year, month)
+        if hourly_rate is None:
+            hourly_rate = current_app.config.get('WAGE_HOURLY_RATE', 0)
+        self.hourly_rate = Decimal(str(hourly_rate))
+        self.warnings = []
+
+    def run(self, dry_run: bool = False) -> dict:
+        user_ids = self._load_users()
+        results = {}
+        if user_ids:
+            production = self._load_production(user_ids)
+            attendance_minutes = self._load_attendance_minutes(user_ids)
+            break_minutes = self._load_break_minutes(user_ids)
+            for user_id in user_ids:
+                result = self._calculate(
+                    user_id, production.get(user_id, []), attendance_minutes.get(user_id, 0), break_minutes.get(user_id, 0)
+                )
+                if result is not None:
+                    results[user_id] = result
+        return self._report(user_ids, results, dry_run)
+
+    # ====================================================================
+    # 読み込み（集合単位）
+    # ====================================================================
+    def _load_users(self) -> list:
+        """対象月に支給決定期間が掛かる、事業所のA型・B型の有効な受給者証を持つ利用者"""
+        return list(db.session.scalars(
+            select(ServiceCertificate.user_id).distinct()
+            .join(OfficeServiceConfiguration, ServiceCertificate.office_service_configuration_id == OfficeServiceConfiguration.id)
+            .join(ServiceTypeMaster, OfficeServiceConfiguration.service_type_master_id == ServiceTypeMaster.id)
+            .join(GrantedService, GrantedService.certificate_id == ServiceCertificate.id)
+            .where(
+                OfficeServiceConfiguration.office_id == self.office_id,
+                ServiceTypeMaster.service_code.in_(WAGE_SERVICE_CODES),
+                ServiceCertificate.status == 'ACTIVE',
+                ServiceCertificate.voided_at.is_(None),
+                GrantedService.granted_start_date <= self.month_end,
+                GrantedService.granted_end_date >= self.calculation_month,
+            )
+            .order_by(ServiceCertificate.user_id)
+        ))
+
+    def _month_logs(self, user_ids: list):
+        return (
+            UserDailyLog.user_id.in_(user_ids),
+            UserDailyLog.log_date >= self.calculation_month,
+            UserDailyLog.log_date <= self.month_end,
+        )
+
+    def _load_production(self, user_ids: list) -> dict:
+        """利用者 -> [(製品ID, 良品数, 標準工賃単価)]。完了済みの日報の実績のみ"""
+        rows = db.session.execute(
+            select(UserDailyLog.user_id, DailyProductivityLog.product_id, ProductMaster.standard_wage_rate,
+                   func.coalesce(func.sum(DailyProductivityLog.units_passed_inspection), 0))
+            .join(UserDailyLog, DailyProductivityLog.user_daily_log_id == UserDailyLog.id)
+            .join(ProductMaster, DailyProductivityLog.product_id == ProductMaster.id)
+            .where(*self._month_logs(user_ids), UserDailyLog.log_status == BILLABLE_LOG_STATUS)
+            .group_by(UserDailyLog.user_id, DailyProductivityLog.product_id, ProductMaster.standard_wage_rate)
+            .order_by(UserDailyLog.user_id, DailyProductivityLog.product_id)
+        ).all()
+        production = defaultdict(list)
+        for user_id, product_id, rate, units in rows:
+            production[user_id].append((product_id, int(units), rate))
+        return production
+
+    def _load_attendance_minutes(self, user_ids: list) -> dict:
+        """来所→退所の打刻の組から求めた利用者ごとの在所時間（分）。退所のない来所は数えない"""
+        records = db.session.execute(
+            select(AttendanceRecord.user_id, AttendanceRecord.attendance_date, AttendanceRecord.record_type,
+                   AttendanceRecord.timestamp)
+            .where(
+                AttendanceRecord.user_id.in_(user_ids),
+                AttendanceRecord.attendance_date >= self.calculation_month,
+                AttendanceRecord.attendance_date <= self.month_end,
+            )
+            .order_by(AttendanceRecord.user_id, AttendanceRecord.timestamp, AttendanceRecord.id)
+        ).all()
+        seconds = defaultdict(int)
+        open_key, open_at = None, None
+        unpaired = 0
+        for user_id, day, record_type, timestamp in records:
+            if record_type == 'CHECK_IN':
+                if open_key is not None:
+                    unpaired += 1
+                open_key, open_at = (user_id, day), timestamp
+            elif record_type == 'CHECK_OUT':
+                if open_key == (user_id, day):
+                    seconds[user_id] += max(0, int((timestamp - open_at).total_seconds()))
+                else:
+                    unpaired += 1
+                open_key = None
+        if open_key is not None:
+            unpaired += 1
+        if unpaired:
+            self.warnings.append({"code": "UNPAIRED_ATTENDANCE", "count": unpaired})
+        return {user_id: total // 60 for user_id, total in seconds.items()}
+
+    def _load_break_minutes(self, user_ids: list) -> dict:
+        """終了済みの休憩の合計（分）"""
+        rows = db.session.execute(
+            select(UserDailyLog.user_id, func.sum(BreakRecord.break_duration_seconds))
+            .join(UserDailyLog, BreakRecord.user_daily_log_id == UserDailyLog.id)
+            .where(*self._month_logs(user_ids), BreakRecord.break_duration_seconds.isnot(None))
+            .group_by(UserDailyLog.user_id)
+        ).all()
+        return {user_id: int(total or 0) // 60 for user_id, total in rows}
+
+    # ====================================================================
+    # 計算
+    # ====================================================================
+    def _calculate(self, user_id: int, production: list, attendance_minutes: int, break_minutes: int):
+        work_minutes = max(0, attendance_minutes - break_minutes)
+        if not production and not work_minutes:
+            return None
+
+        products = []
+        piece_amount = Decimal(0)
+        for product_id, units, rate in production:
+            if rate is None:
+                self.warnings.append({"code": "MISSING_WAGE_RATE", "user_id": user_id, "product_id": product_id})
+                rate = Decimal(0)
+            amount = Decimal(units) * Decimal(rate)
+            piece_amount += amount
+            products.append({"product_id": product_id, "units": units, "rate": str(rate), "amount": str(amount)})
+        time_amount = self.hourly_rate * work_minutes / 60
+
+        # 賃金の端数は1円未満を四捨五入する（50銭未満切捨て・50銭以上切上げ）
+        gross = (piece_amount + time_amount).quantize(YEN, rounding=ROUND_HALF_UP)
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "office_id": self.office_id,
+            "calculation_month": self.calculation_month.isoformat(),
+            "products": products,
+            "attendance_minutes": attendance_minutes,
+            "break_minutes": break_minutes,
+            "work_minutes": work_minutes,
+            "hourly_rate": str(self.hourly_rate),
+            "piece_amount": str(piece_amount),
+            "time_amount": str(time_amount),
+        }
+        return {
+            "user_id": user_id,
+            "total_work_minutes": work_minutes,
+            "total_units_passed": sum(units for _, units, _ in production),
+            "gross_wage_amount": gross,
+            "calculation_snapshot": json.dumps(snapshot, ensure_ascii=False, sort_keys=True),
+        }
+
+    # ====================================================================
+    # 差分と書き込み
+    # ====================================================================
+    def _report(self, user_ids: list, results: dict, dry_run: bool) -> dict:
+        existing = {}
+        if user_ids:
+            for log in UserWageLog.query.filter(
+                UserWageLog.user_id.in_(user_ids), UserWageLog.calculation_month == self.calculation_month
+            ).order_by(UserWageLog.id):
+                existing.setdefault(log.user_id, log)
+
+        diff = {"added": [], "changed": [], "removed": [], "locked": [], "manual": [], "unchanged": 0}
+        inserts, updates, removed_ids = [], [], []
+        for user_id in sorted(set(existing) | set(results)):
+            before, after = existing.get(user_id), results.get(user_id)
+            entry = {"user_id": user_id}
+            if after is not None:
+                # 控除額は手入力の値を引き継ぐ
+                deductions = Decimal(before.deductions or 0) if before is not None else Decimal(0)
+                after["deductions"] = deductions
+                after["net_payment_amount"] = after["gross_wage_amount"] - deductions
+                entry.update(gross_wage_amount=_money(after["gross_wage_amount"]),
+                             net_payment_amount=_money(after["net_payment_amount"]))
+
+            if before is not None and before.payment_timestamp is not None:
+                if after is None or self._differs(before, after):
+                    diff["locked"].append(dict(entry, payment_timestamp=before.payment_timestamp.isoformat()))
+                else:
+                    diff["unchanged"] += 1
+            elif before is None:
+                diff["added"].append(entry)
+                inserts.append(dict(after, calculation_month=self.calculation_month))
+            elif after is None and before.calculation_snapshot is None:
+                # 手入力の工賃（計算結果ではない行）は削除せずに報告する
+                diff["manual"].append(dict(entry, gross_wage_amount=_money(before.gross_wage_amount)))
+            elif after is None:
+                diff["removed"].append(dict(entry, gross_wage_amount=_money(before.gross_wage_amount)))
+                removed_ids.append(before.id)
+            elif self._differs(before, after):
+                diff["changed"].append(dict(entry, previous_gross_wage_amount=_money(before.gross_wage_amount)))
+                updates.append(dict(after, id=before.id))
+            else:
+                diff["unchanged"] += 1
+
+        if not dry_run:
+            self._write(inserts, updates, removed_ids)
+            logger.info(
+                f"💰 月次工賃計算 office={self.office_id} {self.calculation_month:%Y-%m}: "
+                f"added={len(diff['added'])} changed={len(diff['changed'])} removed={len(diff['removed'])}"
+            )
+
+        return {
+            "office_id": self.office_id,
+            "calculation_month": self.calculation_month.isoformat(),
+            "dry_run": dry_run,
+            "wages": [
+                {
+                    "user_id": r["user_id"],
+                    "total_work_minutes": r["total_work_minutes"],
+                    "total_units_passed": r["total_units_passed"],
+                    "gross_wage_amount": _money(r["gross_wage_amount"]),
+                    "deductions": _money(r["deductions"]),
+                    "net_payment_amount": _money(r["net_payment_amount"]),
+                }
+                for _, r in sorted(results.items())
+            ],
+            "diff": diff,
+            "warnings": self.warnings,
+        }
+
+    @staticmethod
+    def _differs(before: UserWageLog, after: dict) -> bool:
+        return (
+            before.total_work_minutes, before.total_units_passed, Decimal(before.gross_wage_amount),
+            Decimal(before.net_payment_amount), before.calculation_snapshot,
+        ) != (
+            after["total_work_minutes"], after["total_units_passed"], after["gross_wage_amount"],
+            after["net_payment_amount"], after["calculation_snapshot"],
+        )
+
+    @staticmethod
+    def _write(inserts: list, updates: list, removed_ids: list):
+        if inserts:
+            db.session.execute(insert(UserWageLog), inserts)
+        if updates:
+            db.session.execute(update(UserWageLog), updates)
+        if removed_ids:
+            db.session.execute(
+                delete(UserWageLog).where(UserWageLog.id.in_(removed_ids)),
+                execution_options={"synchronize_session": False},
+            )
@@ -13,3 +13,13 @@ def get_jst_today():
 def get_jst_now():
     return datetime.now(JST)
 
+
+def to_jst_wall_time(value: datetime) -> datetime:
+    """タイムゾーン付きの日時はJSTへ変換してnaiveにする。naiveの日時はJSTの壁時計時刻とみなしてそのまま返す"""
+    if value.tzinfo is not None:
+        value = value.astimezone(JST).replace(tzinfo=None)
+    return value
+
+def jst_date_of(value: datetime):
+    """日時のJST日付（to_jst_wall_time と同じ規則）"""
+    return to_jst_wall_time(value).date()
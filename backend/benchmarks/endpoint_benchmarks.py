@@ -0,0 +1,216 @@
+# backend/benchmarks/endpoint_benchmarks.py
+"""
+合成データに対して主要な処理経路（ダッシュボード・アクションアイテム・勤務実績エクスポート・
+シフト生成・FTE・月次利用実績）を実行し、レイテンシとSQL発行数を記録するベンチマーク。
+
+    python -m backend.benchmarks.endpoint_benchmarks --scale medium --output result.json
+    python -m backend.benchmarks.endpoint_benchmarks --baseline backend/benchmarks/baseline.json
+
+--baseline を指定すると、基準値より遅い・SQLが増えたケースを回帰として報告し、終了コード1で終了する。
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from backend.app.extensions import db
+from backend.config import Config
+
+logger = logging.getLogger(__name__)
+
+SCALES = {
+    "tiny": dict(corporations=1, offices_per_corporation=1, supporters_per_office=3, users_per_office=4, years=0.1),
+    "small": dict(corporations=1, offices_per_corporation=2, supporters_per_office=10, users_per_office=20, years=1),
+    "medium": dict(corporations=2, offices_per_corporation=3, supporters_per_office=15, users_per_office=40, years=2),
+    "large": dict(corporations=3, offices_per_corporation=5, supporters_per_office=25, users_per_office=60, years=3),
+}
+
+
+class BenchmarkConfig(Config):
+    """ベンチマーク用の設定（既定はインメモリDB、AIはオフラインのスタブ）"""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCHMARK_DATABASE_URL', 'sqlite:///:memory:')
+    AI_PROVIDER = 'stub'
+    AI_CACHE_DIR = None
+    AUDIT_SPOOL_DIR = None
+
+
+class QueryCounter:
+    """エンジンに発行されたSQLの件数と所要時間を数える"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.db_time_ms = 0.0
+        self._started = []
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._started.append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        if self._started:
+            self.db_time_ms += (time.perf_counter() - self._started.pop()) * 1000
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before)
+        event.listen(self.engine, 'after_cursor_execute', self._after)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before)
+        event.remove(self.engine, 'after_cursor_execute', self._after)
+        return False
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    run: object  # (client, headers) -> HTTPステータスコード
+
+
+def build_cases(summary) -> list:
+    """合成データの代表IDを使って計測ケースを組み立てる"""
+    from backend.app.services.attendance_service import AttendanceService
+    from backend.app.services.finance_service import FinanceService
+
+    end = summary.end_date
+    year, month = end.year, end.month
+    user_id = summary.user_ids[0]
+    service_id = summary.service_ids[0]
+    fte_start = end - timedelta(days=27)
+
+    def get(path):
+        return lambda client, headers: client.get(path, headers=headers).status_code
+
+    def generate_shifts(client, headers):
+        # /api/attendance/generate-shifts は service 側と引数が合っていないため、サービスを直接呼ぶ。
+        # 生成結果は保存せず、毎回同じ状態から計測する
+        try:
+            AttendanceService(db.session).generate_monthly_shifts(year, month)
+            return 200
+        finally:
+            db.session.rollback()
+
+    def calculate_fte(client, headers):
+        FinanceService().calculate_fte_for_service(service_id, fte_start, end)
+        return 200
+
+    return [
+        BenchmarkCase("dashboard_summary", get('/api/dashboard/summary')),
+        BenchmarkCase("dashboard_staff_status", get('/api/dashboard/staff/status')),
+        BenchmarkCase("action_items", get('/api/action-items')),
+        BenchmarkCase("export_attendance", get(f'/api/management/export/attendance?year={year}&month={month}')),
+        BenchmarkCase("generate_monthly_shifts", generate_shifts),
+        BenchmarkCase("fte_for_service", calculate_fte),
+        BenchmarkCase("fte_rollup", get(f'/api/management/office/fte-rollup?start_date={fte_start}&end_date={end}')),
+        BenchmarkCase("monthly_usage_summary", get(f'/api/users/{user_id}/monthly-usage-summary?year={year}&month={month}')),
+    ]
+
+
+def run_benchmarks(app, summary, iterations: int = 5, warmup: int = 1) -> dict:
+    """
+    各ケースを warmup 回空実行した後 iterations 回計測し、レイテンシ（p50/p95/max）と
+    1回あたりのSQL発行数・DB時間を返す。
+    """
+    results = {}
+    with app.app_context():
+        token = create_access_token(
+            identity=f"staff:{summary.admin_supporter_ids[0]}", additional_claims={"role_scopes": ["CORPORATE"]}
+        )
+        headers = {'Authorization': f'Bearer {token}'}
+        client = app.test_client()
+        engine = db.engine
+
+        for case in build_cases(summary):
+            for _ in range(warmup):
+                case.run(client, headers)
+
+            latencies, statuses = [], set()
+            with QueryCounter(engine) as counter:
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    statuses.add(case.run(client, headers))
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            latencies.sort()
+            results[case.name] = {
+                "status_codes": sorted(statuses),
+                "p50_ms": round(statistics.median(latencies), 2),
+                "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+                "max_ms": round(latencies[-1], 2),
+                "queries": round(counter.count / iterations, 1),
+                "db_time_ms": round(counter.db_time_ms / iterations, 2),
+            }
+            logger.info(f"⏱️ {case.name}: {results[case.name]}")
+    return results
+
+
+def compare_with_baseline(results: dict, baseline: dict, latency_tolerance: float = 1.5, query_tolerance: int = 0) -> list:
+    """
+    基準値と比較して回帰を列挙する。
+    SQL発行数は環境に依存しないため厳密に比較し、レイテンシは p50 が基準の latency_tolerance 倍を超えた場合のみ回帰とする。
+    """
+    regressions = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if current is None:
+            regressions.append(f"{name}: missing from results")
+            continue
+        if any(code >= 500 for code in current["status_codes"]):
+            regressions.append(f"{name}: server error {current['status_codes']}")
+        if current["queries"] > base["queries"] + query_tolerance:
+            regressions.append(f"{name}: queries {base['queries']} -> {current['queries']}")
+        if current["p50_ms"] > base["p50_ms"] * latency_tolerance:
+            regressions.append(f"{name}: p50 {base['p50_ms']}ms -> {current['p50_ms']}ms")
+    return regressions
+
+
+def main(argv=None) -> int:
+    from backend.app import create_app
+    from backend.benchmarks.synthetic_dataset import SyntheticDatasetGenerator
+
+    parser = argparse.ArgumentParser(description="合成データに対するエンドポイントベンチマーク")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', type=date.fromisoformat, default=None)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--output', help="結果をJSONで保存するパス")
+    parser.add_argument('--baseline', help="比較する基準値のJSON")
+    parser.add_argument('--latency-tolerance', type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        summary = SyntheticDatasetGenerator(seed=args.seed, end_date=args.end_date, **SCALES[args.scale]).generate()
+
+    results = run_benchmarks(app, summary, iterations=args.iterations)
+    report = {"scale": args.scale, "seed": args.seed, "dataset": summary.counts, "results": results}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline.get("results", baseline), args.latency_tolerance)
+        for line in regressions:
+            logger.error(f"🚨 benchmark regression: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
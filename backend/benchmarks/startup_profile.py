@@ -0,0 +1,120 @@
+# backend/benchmarks/startup_profile.py
+"""
+アプリケーションの起動時間（import + create_app）を新しいインタプリタで計測し、モジュール別の import 時間を一覧にする。
+
+    python -m backend.benchmarks.startup_profile --top 30
+    python -m backend.benchmarks.startup_profile --no-blueprints --budget-ms 1500
+
+--budget-ms を指定すると、複数回計測した最小値が予算を超えた場合に終了コード1で終了する。
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+from dataclasses import dataclass
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 起動時に読み込まれてはならない重い依存ライブラリ（使う処理の中でだけ import する）
+HEAVY_MODULES = ('openpyxl', 'numpy', 'pydantic', 'google.genai', 'alembic', 'flask_migrate')
+
+# コールドスタートの予算（ミリ秒）。CI環境に合わせて STARTUP_BUDGET_MS で上書きする
+DEFAULT_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 2500))
+
+_CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from backend.app import create_app
+create_app(register_blueprints={register_blueprints})
+elapsed_ms = (time.perf_counter() - started) * 1000
+print(json.dumps({{"elapsed_ms": elapsed_ms, "heavy_modules": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)\s*$")
+
+
+@dataclass
+class ModuleImport:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int  # 1 が起動スクリプトから直接 import されたモジュール
+
+
+def parse_importtime(stderr: str) -> list:
+    """python -X importtime の出力をモジュールごとの計測値にする"""
+    imports = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append(ModuleImport(name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2 + 1))
+    return imports
+
+
+def run_startup(register_blueprints: bool = True, importtime: bool = False) -> dict:
+    """新しいインタプリタで create_app まで実行し、所要時間と読み込まれた重いモジュールを返す"""
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', _CHILD_SCRIPT.format(register_blueprints=register_blueprints, heavy=HEAVY_MODULES)]
+    result = subprocess.run(command, cwd=PROJECT_ROOT, env=os.environ.copy(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"アプリケーションの起動に失敗しました:\n{result.stderr[-2000:]}")
+
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    if importtime:
+        report["imports"] = parse_importtime(result.stderr)
+    return report
+
+
+def measure_cold_start(runs: int = 3, register_blueprints: bool = True) -> float:
+    """コールドスタートを runs 回計測した最小値（ミリ秒）。ディスクキャッシュ等の揺らぎを避けるため最小値で比較する"""
+    return min(run_startup(register_blueprints=register_blueprints)["elapsed_ms"] for _ in range(runs))
+
+
+def summarize(imports: list, top: int = 20) -> dict:
+    """自己時間の大きいモジュール、パッケージ別の合計、起動スクリプトから直接 import されたモジュールの累積時間"""
+    by_package = Counter()
+    for module in imports:
+        by_package[module.name.split('.')[0]] += module.self_us
+    slowest = sorted(imports, key=lambda m: m.self_us, reverse=True)[:top]
+    roots = sorted((m for m in imports if m.depth == 1), key=lambda m: m.cumulative_us, reverse=True)[:top]
+    return {
+        "total_ms": round(sum(m.self_us for m in imports) / 1000, 1),
+        "by_package_ms": {name: round(us / 1000, 1) for name, us in by_package.most_common(top)},
+        "slowest_modules_ms": {m.name: round(m.self_us / 1000, 1) for m in slowest},
+        "root_imports_ms": {m.name: round(m.cumulative_us / 1000, 1) for m in roots},
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="アプリケーションの起動時間とモジュール別 import 時間の計測")
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--no-blueprints', action='store_true', help="スクリプト用の起動（APIを登録しない）を計測する")
+    parser.add_argument('--budget-ms', type=float, default=None)
+    args = parser.parse_args(argv)
+
+    register_blueprints = not args.no_blueprints
+    profile = run_startup(register_blueprints=register_blueprints, importtime=True)
+    elapsed_ms = measure_cold_start(args.runs, register_blueprints=register_blueprints)
+    report = dict(
+        summarize(profile["imports"], args.top),
+        cold_start_ms=round(elapsed_ms, 1),
+        heavy_modules_loaded=profile["heavy_modules"],
+    )
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.budget_ms is not None and elapsed_ms > args.budget_ms:
+        print(f"🚨 cold start {elapsed_ms:.0f}ms exceeds budget {args.budget_ms:.0f}ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
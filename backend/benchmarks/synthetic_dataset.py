@@ -0,0 +1,283 @@
+# backend/benchmarks/synthetic_dataset.py
+
+import hashlib
+import logging
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from backend.app.extensions import db
+from backend.app.models import (
+    AttendanceRecord, Corporation, EmploymentShiftPattern, GrantedService, IntegratedServiceOperation,
+    IntegratedServiceOperationMember, JobTitleMaster, MunicipalityMaster, OfficeServiceConfiguration,
+    OfficeSetting, RoleMaster, ServiceCertificate, ServiceTypeMaster, StatusMaster, Supporter,
+    SupporterJobAssignment, SupporterTimecard, SupportPlan, User, UserDailyLog
+)
+from backend.app.utils.timezone import get_jst_today
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+LAST_NAMES = ['佐藤', '鈴木', '高橋', '田中', '伊藤', '渡辺', '山本', '中村', '小林', '加藤']
+FIRST_NAMES = ['太郎', '花子', '一郎', '陽子', '健太', '美咲', '大輔', '直美', '翔太', '由美']
+
+
+@dataclass
+class SyntheticDatasetSummary:
+    """生成したデータの件数と、ベンチマークで使う代表ID"""
+    prefix: str
+    start_date: date
+    end_date: date
+    corporation_ids: list = field(default_factory=list)
+    office_ids: list = field(default_factory=list)
+    service_ids: list = field(default_factory=list)
+    admin_supporter_ids: list = field(default_factory=list)
+    user_ids: list = field(default_factory=list)
+    counts: dict = field(default_factory=dict)
+    fingerprint: str = ''
+
+
+class SyntheticDatasetGenerator:
+    """
+    ベンチマーク用の合成データ生成器。
+    法人数・事業所数・職員数・利用者数・履歴年数を指定し、勤怠・利用者打刻・日報・支援計画・受給者証を
+    一括INSERTで投入する。同じ seed と end_date からは常に同じデータが生成される。
+    """
+
+    INSERT_CHUNK_SIZE = 5000
+
+    def __init__(self, seed: int = 42, corporations: int = 1, offices_per_corporation: int = 2,
+                 supporters_per_office: int = 10, users_per_office: int = 20, years: float = 1.0,
+                 end_date: date = None, prefix: str = None):
+        self.seed = seed
+        self.corporations = corporations
+        self.offices_per_corporation = offices_per_corporation
+        self.supporters_per_office = supporters_per_office
+        self.users_per_office = users_per_office
+        self.years = years
+        self.end_date = end_date or get_jst_today()
+        self.start_date = self.end_date - timedelta(days=int(365 * years))
+        # 一意制約のあるコード類の接頭辞。同じDBへ別 seed で追加投入できる
+        self.prefix = prefix or f"SYN{seed}"
+        self.random = random.Random(seed)
+        self._digest = hashlib.sha256()
+        self._counts = {}
+
+    # ====================================================================
+    # 公開API
+    # ====================================================================
+    def generate(self) -> SyntheticDatasetSummary:
+        summary = SyntheticDatasetSummary(prefix=self.prefix, start_date=self.start_date, end_date=self.end_date)
+        masters = self._create_masters()
+        business_days = [d for d in self._days() if d.weekday() < 5]
+
+        for corp_no in range(self.corporations):
+            corp = Corporation(corporation_name=f"{self.prefix} 合成法人{corp_no + 1}", corporation_type="SOCIAL_WELFARE")
+            muni = MunicipalityMaster(municipality_code=f"{self.prefix}{corp_no:02d}"[-10:], name=f"合成市{corp_no + 1}")
+            db.session.add_all([corp, muni])
+            db.session.flush()
+            summary.corporation_ids.append(corp.id)
+
+            operation = IntegratedServiceOperation(
+                corporation_id=corp.id, operation_name=f"{self.prefix} 一体的運営{corp_no + 1}",
+                effective_from=self.start_date, status='APPROVED'
+            )
+            db.session.add(operation)
+            db.session.flush()
+
+            for office_no in range(self.offices_per_corporation):
+                office, service = self._create_office(corp, muni, masters, corp_no, office_no)
+                db.session.add(IntegratedServiceOperationMember(
+                    integrated_service_operation_id=operation.id, office_service_configuration_id=service.id
+                ))
+                summary.office_ids.append(office.id)
+                summary.service_ids.append(service.id)
+
+                supporter_ids = self._create_supporters(office, service, masters, corp_no, office_no)
+                summary.admin_supporter_ids.append(supporter_ids[0])
+                self._create_timecards(office, service, supporter_ids, business_days)
+
+                user_ids = self._create_users(service, muni, masters, supporter_ids, corp_no, office_no)
+                summary.user_ids.extend(user_ids)
+                self._create_user_history(user_ids, business_days)
+
+        db.session.commit()
+        summary.counts = dict(self._counts)
+        summary.fingerprint = self._digest.hexdigest()
+        logger.info(f"🧪 合成データを生成しました ({self.prefix}): {summary.counts}")
+        return summary
+
+    # ====================================================================
+    # 内部処理
+    # ====================================================================
+    def _days(self):
+        day = self.start_date
+        while day <= self.end_date:
+            yield day
+            day += timedelta(days=1)
+
+    def _bulk_insert(self, model, rows: list):
+        """行ごとのORM生成を避け、チャンク単位の executemany で投入する"""
+        for i in range(0, len(rows), self.INSERT_CHUNK_SIZE):
+            db.session.execute(insert(model), rows[i:i + self.INSERT_CHUNK_SIZE])
+        self._counts[model.__tablename__] = self._counts.get(model.__tablename__, 0) + len(rows)
+        # 決定性の検証用に、IDを除いた行内容を要約する
+        for row in rows:
+            self._digest.update(repr(sorted((k, v) for k, v in row.items() if not k.endswith('_id'))).encode('utf-8'))
+
+    def _get_or_create(self, model, defaults: dict = None, **filters):
+        obj = model.query.filter_by(**filters).first()
+        if obj is None:
+            obj = model(**filters, **(defaults or {}))
+            db.session.add(obj)
+            db.session.flush()
+        return obj
+
+    def _create_masters(self) -> dict:
+        return {
+            "status": self._get_or_create(StatusMaster, name="利用中"),
+            "service_type": self._get_or_create(
+                ServiceTypeMaster, service_code=f"{self.prefix}"[:20], defaults={"name": f"就労継続支援B型 ({self.prefix})"}
+            ),
+            "job_title": self._get_or_create(JobTitleMaster, title_name=f"生活支援員 ({self.prefix})"),
+            "admin_role": self._get_or_create(RoleMaster, name="法人管理者 (合成データ)", defaults={"role_scope": "CORPORATE", "is_admin": True}),
+        }
+
+    def _create_office(self, corp, muni, masters, corp_no: int, office_no: int):
+        office = OfficeSetting(
+            corporation_id=corp.id, office_name=f"{self.prefix} 事業所{corp_no + 1}-{office_no + 1}",
+            municipality_id=muni.id, full_time_weekly_minutes=2400
+        )
+        db.session.add(office)
+        db.session.flush()
+        service = OfficeServiceConfiguration(
+            office_id=office.id, service_type_master_id=masters["service_type"].id,
+            jigyosho_bango=f"{self.prefix}{corp_no:03d}{office_no:03d}"[-20:], capacity=max(20, self.users_per_office)
+        )
+        db.session.add(service)
+        db.session.flush()
+        return office, service
+
+    def _create_supporters(self, office, service, masters, corp_no: int, office_no: int) -> list:
+        supporters = []
+        for i in range(self.supporters_per_office):
+            full_time = i == 0 or self.random.random() < 0.6
+            supporter = Supporter(
+                staff_code=f"{self.prefix}-{corp_no}-{office_no}-{i}"[:20],
+                last_name=self.random.choice(LAST_NAMES), first_name=self.random.choice(FIRST_NAMES),
+                last_name_kana="ゴウセイ", first_name_kana="ショクイン", office_id=office.id,
+                hire_date=self.start_date, employment_type="FULL_TIME" if full_time else "PART_TIME",
+                weekly_scheduled_minutes=2400 if full_time else 1200
+            )
+            supporters.append(supporter)
+        db.session.add_all(supporters)
+        db.session.flush()
+        # 各事業所の先頭の職員を法人管理者にする（ベンチマークのログインユーザー）
+        supporters[0].roles.append(masters["admin_role"])
+
+        self._bulk_insert(SupporterJobAssignment, [{
+            "supporter_id": s.id, "job_title_id": masters["job_title"].id, "office_service_configuration_id": service.id,
+            "start_date": self.start_date, "assigned_minutes": s.weekly_scheduled_minutes
+        } for s in supporters])
+        self._bulk_insert(EmploymentShiftPattern, [{
+            "supporter_id": s.id, "day_of_week": day_name, "start_time": "09:00",
+            "end_time": "18:00" if s.employment_type == "FULL_TIME" else "13:00",
+            "break_minutes": 60 if s.employment_type == "FULL_TIME" else 0
+        } for s in supporters for day_name in WEEKDAYS])
+        return [s.id for s in supporters]
+
+    def _create_timecards(self, office, service, supporter_ids: list, business_days: list):
+        rows = []
+        for supporter_id in supporter_ids:
+            for day in business_days:
+                if self.random.random() < 0.05:
+                    continue
+                check_in = datetime.combine(day, datetime.min.time()) + timedelta(hours=9, minutes=self.random.randint(-15, 10))
+                # 当日分は出勤中（退勤前）とする
+                check_out = None if day == self.end_date else check_in + timedelta(hours=8, minutes=self.random.randint(30, 90))
+                rows.append({
+                    "supporter_id": supporter_id, "office_service_configuration_id": service.id, "office_id": office.id,
+                    "work_date": day, "sequence_no": 1, "location_type": "OFFICE",
+                    "check_in": check_in, "check_out": check_out, "total_break_minutes": 60 if check_out else 0
+                })
+        self._bulk_insert(SupporterTimecard, rows)
+
+    def _create_users(self, service, muni, masters, supporter_ids: list, corp_no: int, office_no: int) -> list:
+        users = [
+            User(
+                display_name=f"{self.random.choice(LAST_NAMES)} {self.random.choice(FIRST_NAMES)}",
+                user_code=f"{self.prefix}-{corp_no}-{office_no}-{i}", status_id=masters["status"].id,
+                primary_supporter_id=self.random.choice(supporter_ids), service_start_date=self.start_date
+            ) for i in range(self.users_per_office)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+        user_ids = [u.id for u in users]
+
+        certificates = [
+            ServiceCertificate(
+                user_id=user_id, office_service_configuration_id=service.id, certificate_issue_date=self.start_date,
+                municipality_master_id=muni.id, status='ACTIVE'
+            ) for user_id in user_ids
+        ]
+        db.session.add_all(certificates)
+        db.session.flush()
+        # 支給決定は1年ごとに更新される
+        granted_rows = []
+        for cert in certificates:
+            period_start = self.start_date
+            while period_start <= self.end_date:
+                period_end = min(period_start + timedelta(days=364), self.end_date + timedelta(days=365))
+                granted_rows.append({
+                    "certificate_id": cert.id, "service_type_master_id": masters["service_type"].id,
+                    "granted_start_date": period_start, "granted_end_date": period_end, "max_service_days": 23
+                })
+                period_start = period_end + timedelta(days=1)
+        self._bulk_insert(GrantedService, granted_rows)
+
+        # 個別支援計画は6か月ごと。最新のみ ACTIVE、それ以前は ARCHIVED
+        plan_rows = []
+        for user_id in user_ids:
+            plan_start, version = self.start_date, 1
+            while plan_start <= self.end_date:
+                plan_end = plan_start + timedelta(days=182)
+                plan_rows.append({
+                    "user_id": user_id, "plan_version": version,
+                    "plan_status": 'ACTIVE' if plan_end > self.end_date else 'ARCHIVED',
+                    "plan_start_date": plan_start, "plan_end_date": plan_end
+                })
+                plan_start, version = plan_end + timedelta(days=1), version + 1
+        self._bulk_insert(SupportPlan, plan_rows)
+        return user_ids
+
+    def _create_user_history(self, user_ids: list, business_days: list):
+        """利用者の来所・退所打刻と日報（直近1週間は一部下書き）を投入する"""
+        attendance_rows, log_rows = [], []
+        draft_since = self.end_date - timedelta(days=7)
+        for user_id in user_ids:
+            attendance_rate = self.random.uniform(0.7, 0.95)
+            for day in business_days:
+                if self.random.random() > attendance_rate:
+                    continue
+                check_in = datetime.combine(day, datetime.min.time()) + timedelta(hours=9, minutes=self.random.randint(0, 45))
+                attendance_rows.append({
+                    "user_id": user_id, "record_type": 'CHECK_IN', "timestamp": check_in, "attendance_date": day
+                })
+                if day == self.end_date:
+                    continue
+                attendance_rows.append({
+                    "user_id": user_id, "record_type": 'CHECK_OUT',
+                    "timestamp": check_in + timedelta(hours=6, minutes=self.random.randint(0, 60)), "attendance_date": day
+                })
+                off_site = self.random.random() < 0.1
+                log_rows.append({
+                    "user_id": user_id, "log_date": day,
+                    "location_type": 'OFF_SITE_EXTERNAL' if off_site else 'ON_SITE',
+                    "log_status": 'DRAFT' if day >= draft_since and self.random.random() < 0.3 else 'COMPLETED',
+                    "support_content_notes": "施設外就労で軽作業を実施" if off_site else "作業訓練を実施",
+                    "sleep_quality_score": self.random.randint(1, 5), "physical_condition_score": self.random.randint(1, 5)
+                })
+        self._bulk_insert(AttendanceRecord, attendance_rows)
+        self._bulk_insert(UserDailyLog, log_rows)
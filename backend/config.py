@@ -70,4 +70,99 @@ class Config:
     # (例: CORS, Mailなど)
     
     # --- AI Gateway 設定 ---
-    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
\ No newline at end of file
+    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+    # 'auto' (APIキーがあればGemini、なければスタブ) / 'gemini' / 'stub'
+    AI_PROVIDER = os.environ.get('AI_PROVIDER', 'auto')
+    # 応答キャッシュ（メモリ + ディスク）。AI_CACHE_DIR を空にするとメモリのみ。ディスク層は上限サイズを超えると古い順に削除
+    AI_CACHE_DIR = os.environ.get('AI_CACHE_DIR', os.path.join(basedir, 'instance', 'ai_cache'))
+    AI_CACHE_TTL_SECONDS = int(os.environ.get('AI_CACHE_TTL_SECONDS', 86400))
+    AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES', 512))
+    AI_CACHE_MAX_DISK_BYTES = int(os.environ.get('AI_CACHE_MAX_DISK_BYTES', 50 * 1024 * 1024))
+    # 同時実行数の上限とタイムアウト（秒）
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 4))
+    AI_TIMEOUT_SECONDS = float(os.environ.get('AI_TIMEOUT_SECONDS', 30))
+
+    # --- FTEロールアップ ---
+    # 同一プロセス内の勤怠変更は即時無効化される。TTLは他プロセスでの更新を拾うための上限
+    FTE_ROLLUP_CACHE_TTL_SECONDS = int(os.environ.get('FTE_ROLLUP_CACHE_TTL_SECONDS', 300))
+
+    # --- 職員在席ボード (SSE) ---
+    # 他プロセスでの打刻を取り込むための再構築間隔、SSEのハートビート、1接続あたりの最大保持時間（秒）
+    PRESENCE_REBUILD_SECONDS = int(os.environ.get('PRESENCE_REBUILD_SECONDS', 600))
+    PRESENCE_HEARTBEAT_SECONDS = float(os.environ.get('PRESENCE_HEARTBEAT_SECONDS', 15))
+    PRESENCE_STREAM_MAX_SECONDS = float(os.environ.get('PRESENCE_STREAM_MAX_SECONDS', 300))
+
+    # --- キオスク一括打刻 ---
+    # 1リクエストあたりの最大件数、オフライン端末から受け付ける打刻の遡り上限（時間）、端末時計の進みの許容（秒）
+    KIOSK_BATCH_MAX_ENTRIES = int(os.environ.get('KIOSK_BATCH_MAX_ENTRIES', 500))
+    KIOSK_BACKLOG_MAX_HOURS = float(os.environ.get('KIOSK_BACKLOG_MAX_HOURS', 72))
+    KIOSK_CLOCK_SKEW_SECONDS = float(os.environ.get('KIOSK_CLOCK_SKEW_SECONDS', 300))
+
+    # --- 単価・報酬マスタのキャッシュ ---
+    # 同一プロセス内のマスタ変更はコミット時に読み直す。他プロセスでの変更を確認する間隔（秒）
+    FEE_CATALOG_CHECK_SECONDS = float(os.environ.get('FEE_CATALOG_CHECK_SECONDS', 60))
+
+    # --- マスタデータのキャッシュ ---
+    # 同一プロセス内のマスタ変更はコミット時に読み直す。他プロセスでの変更を取り込むまでの上限（秒）
+    MASTER_CACHE_TTL_SECONDS = float(os.environ.get('MASTER_CACHE_TTL_SECONDS', 300))
+
+    # --- 工賃計算 ---
+    # 作業時間に対する時間単価（円）。出来高のみで支払う事業所は0
+    WAGE_HOURLY_RATE = os.environ.get('WAGE_HOURLY_RATE', '0')
+
+    # --- 国保連請求CSV ---
+    # 提出データの文字コード（Shift_JIS の Windows 拡張）
+    NATIONAL_CLAIM_CSV_ENCODING = os.environ.get('NATIONAL_CLAIM_CSV_ENCODING', 'cp932')
+
+    # --- 帳票（請求書・領収証・代理受領書・工賃受取書） ---
+    # 内容ハッシュをファイル名にして保存するディレクトリと、URL 列に書き込むパスの接頭辞
+    # （ファイルは公開せず、認証付きの GET /api/billing/documents/... が法人の帳票だけを返す）
+    DOCUMENT_STORAGE_DIR = os.environ.get('DOCUMENT_STORAGE_DIR', os.path.join(basedir, 'instance', 'documents'))
+    DOCUMENT_BASE_URL = os.environ.get('DOCUMENT_BASE_URL', '/api/billing/documents/')
+    # 描画のワーカープロセス数（0ならCPUコア数）。未作成の帳票がしきい値未満ならプロセスを起動せずに描画する
+    DOCUMENT_RENDER_WORKERS = int(os.environ.get('DOCUMENT_RENDER_WORKERS', 0))
+    DOCUMENT_RENDER_INLINE_THRESHOLD = int(os.environ.get('DOCUMENT_RENDER_INLINE_THRESHOLD', 32))
+
+    # --- 減算リスクの定時スキャン ---
+    # モニタリングの実施間隔（日）。最後のモニタリング（なければ計画開始日）からこれを超えるとリスクとして記録する
+    DEDUCTION_SCAN_MONITORING_DAYS = int(os.environ.get('DEDUCTION_SCAN_MONITORING_DAYS', 180))
+
+    # --- 利用者×月の活動集計 ---
+    # 打刻・日報・支援記録・通所予定の書き込み時に、コミットの直前で該当月の集計行を更新する
+    MONTHLY_ACTIVITY_ROLLUP_ENABLED = os.environ.get('MONTHLY_ACTIVITY_ROLLUP_ENABLED', 'true').lower() == 'true'
+
+    # --- SQL計測 ---
+    # リクエストごとのSQL件数・DB時間を X-DB-Query-Count / X-DB-Time-Ms ヘッダーで返す。
+    # 同一SQLが閾値を超えて繰り返されたら N+1 として、閾値(ms)を超えたSQLはスロークエリとしてログに出す
+    SQL_PROFILING_ENABLED = os.environ.get('SQL_PROFILING_ENABLED', 'true').lower() == 'true'
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 10))
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 200))
+    SQL_PROFILE_HISTORY = int(os.environ.get('SQL_PROFILE_HISTORY', 200))
+    # /api/debug/sql-stats の公開（システム管理者のみ）。本番では無効のままにする
+    SQL_DEBUG_ENDPOINT_ENABLED = os.environ.get('SQL_DEBUG_ENDPOINT_ENABLED', 'false').lower() == 'true'
+
+    # --- 監査ログの書き込み ---
+    # PII閲覧などの監査イベントはローカルスプールへ追記（fsync）し、バックグラウンドで一括INSERTする。
+    # AUDIT_SPOOL_DIR を空にするとスプールを使わず、リクエスト内で同期的にコミットする
+    AUDIT_SPOOL_DIR = os.environ.get('AUDIT_SPOOL_DIR', os.path.join(basedir, 'instance', 'audit_spool'))
+    AUDIT_FLUSH_INTERVAL_SECONDS = float(os.environ.get('AUDIT_FLUSH_INTERVAL_SECONDS', 1.0))
+    AUDIT_FLUSH_BATCH_SIZE = int(os.environ.get('AUDIT_FLUSH_BATCH_SIZE', 500))
+    AUDIT_SPOOL_FSYNC = os.environ.get('AUDIT_SPOOL_FSYNC', 'true').lower() == 'true'
+    # 停止したプロセスが残したセグメントを取り込み対象にするまでの時間（秒）
+    AUDIT_SPOOL_STALE_SECONDS = float(os.environ.get('AUDIT_SPOOL_STALE_SECONDS', 300))
+
+    # --- 監査ログのアーカイブ ---
+    # 直近 AUDIT_HOT_MONTHS か月より古い月は、月単位で圧縮ファイルへ移してテーブルから削除する
+    AUDIT_HOT_MONTHS = int(os.environ.get('AUDIT_HOT_MONTHS', 13))
+    AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR', os.path.join(basedir, 'instance', 'audit_archive'))
+    AUDIT_ARCHIVE_BATCH_SIZE = int(os.environ.get('AUDIT_ARCHIVE_BATCH_SIZE', 5000))
+
+    # --- リードレプリカ ---
+    # カンマ区切りのレプリカ接続文字列。GETリクエストとレポート・エクスポート処理の読み取りをレプリカへ振り分け、
+    # 書き込みは常にプライマリで行う。空ならすべてプライマリ
+    DATABASE_REPLICA_URLS = [u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+    # 書き込みを行ったクライアントの読み取りをプライマリに固定する時間（秒）
+    DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+    # ハートビートで計測した遅延がこれを超えたレプリカは使わない（秒）。計測は DB_REPLICA_CHECK_SECONDS ごと
+    DB_REPLICA_MAX_LAG_SECONDS = float(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', 5))
+    DB_REPLICA_CHECK_SECONDS = float(os.environ.get('DB_REPLICA_CHECK_SECONDS', 2))
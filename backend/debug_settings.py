@@ -7,7 +7,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from backend.app import create_app
 from backend.app.models import UserDailyLogSetting, OfficeSetting
 
-app = create_app()
+app = create_app(register_blueprints=False)
 with app.app_context():
     office = OfficeSetting.query.first()
     if office:
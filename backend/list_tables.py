@@ -3,7 +3,7 @@ from sqlalchemy import inspect
 from backend.config import Config
 from backend.app import create_app, db
 
-app = create_app(Config)
+app = create_app(Config, register_blueprints=False)
 with app.app_context():
     try:
         tables = inspect(db.engine).get_table_names()
@@ -0,0 +1,29 @@
+"""Add event_id to audit_action_logs for spooled audit writes
+
+Revision ID: a7c4e2f19d35
+Revises: d5a2f8c31b47
+Create Date: 2026-10-19 21:05:47.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c4e2f19d35'
+down_revision = 'd5a2f8c31b47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # スプールからの再送を重複なく取り込むための一意ID（同期書き込みの行は NULL のまま）
+    with op.batch_alter_table('audit_action_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('event_id', sa.String(length=32), nullable=True))
+        batch_op.create_unique_constraint('uq_audit_action_logs_event_id', ['event_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('audit_action_logs', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_audit_action_logs_event_id', type_='unique')
+        batch_op.drop_column('event_id')
@@ -0,0 +1,46 @@
+"""Add user_monthly_activities rollup table
+
+Revision ID: a9d4c2e7f318
+Revises: f2c7a4e9b136
+Create Date: 2026-10-20 15:42:07.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4c2e7f318'
+down_revision = 'f2c7a4e9b136'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_monthly_activities',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('activity_month', sa.Date(), nullable=False),
+    sa.Column('attendance_days', sa.Integer(), nullable=False),
+    sa.Column('scheduled_days', sa.Integer(), nullable=False),
+    sa.Column('completed_logs', sa.Integer(), nullable=False),
+    sa.Column('support_minutes', sa.Integer(), nullable=False),
+    sa.Column('off_site_days', sa.Integer(), nullable=False),
+    sa.Column('actual_days', sa.Integer(), nullable=False),
+    sa.Column('usage_days', sa.Integer(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'activity_month', name='uq_user_monthly_activity')
+    )
+    with op.batch_alter_table('user_monthly_activities', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_monthly_activities_activity_month'), ['activity_month'], unique=False)
+        batch_op.create_index(batch_op.f('ix_user_monthly_activities_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_monthly_activities', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_monthly_activities_user_id'))
+        batch_op.drop_index(batch_op.f('ix_user_monthly_activities_activity_month'))
+
+    op.drop_table('user_monthly_activities')
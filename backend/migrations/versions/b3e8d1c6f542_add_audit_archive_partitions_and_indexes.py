@@ -0,0 +1,62 @@
+"""Add audit archive partition catalog and composite audit search indexes
+
+Revision ID: b3e8d1c6f542
+Revises: a7c4e2f19d35
+Create Date: 2026-10-19 22:18:09.214573
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8d1c6f542'
+down_revision = 'a7c4e2f19d35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('audit_archive_partitions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('source_table', sa.String(length=50), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('part_no', sa.Integer(), nullable=False),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('checksum', sa.String(length=64), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('min_id', sa.Integer(), nullable=True),
+    sa.Column('max_id', sa.Integer(), nullable=True),
+    sa.Column('min_time', sa.DateTime(), nullable=True),
+    sa.Column('max_time', sa.DateTime(), nullable=True),
+    sa.Column('actor_ids', sa.Text(), nullable=True),
+    sa.Column('actions', sa.Text(), nullable=True),
+    sa.Column('entity_types', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source_table', 'period_start', 'part_no', name='uq_audit_archive_partitions_table_period_part')
+    )
+
+    with op.batch_alter_table('audit_action_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_audit_action_logs_created_id', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_audit_action_logs_actor_created', ['actor_supporter_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_audit_action_logs_entity_created', ['entity_type', 'entity_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_audit_action_logs_action_created', ['action', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('system_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_system_logs_timestamp_id', ['timestamp', 'id'], unique=False)
+        batch_op.create_index('ix_system_logs_level_timestamp', ['log_level', 'timestamp', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('system_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_system_logs_level_timestamp')
+        batch_op.drop_index('ix_system_logs_timestamp_id')
+
+    with op.batch_alter_table('audit_action_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_audit_action_logs_action_created')
+        batch_op.drop_index('ix_audit_action_logs_entity_created')
+        batch_op.drop_index('ix_audit_action_logs_actor_created')
+        batch_op.drop_index('ix_audit_action_logs_created_id')
+
+    op.drop_table('audit_archive_partitions')
@@ -0,0 +1,32 @@
+"""Add office_service_configuration_id to billing_data
+
+Revision ID: b3e8f1a6c524
+Revises: a9d4c2e7f318
+Create Date: 2026-10-21 09:42:37.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8f1a6c524'
+down_revision = 'a9d4c2e7f318'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('billing_data', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('office_service_configuration_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_billing_data_office_service_configuration_id'),
+                              ['office_service_configuration_id'], unique=False)
+        batch_op.create_foreign_key('fk_billing_data_office_service_configuration_id',
+                                    'office_service_configurations', ['office_service_configuration_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('billing_data', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_billing_data_office_service_configuration_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_billing_data_office_service_configuration_id'))
+        batch_op.drop_column('office_service_configuration_id')
@@ -0,0 +1,28 @@
+"""Add staff_action_logs timestamp indexes for range-based daily aggregation
+
+Revision ID: c3d7e1a94f20
+Revises: b01649029bec
+Create Date: 2026-10-19 18:05:12.412907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d7e1a94f20'
+down_revision = 'b01649029bec'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('staff_action_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_staff_action_logs_supporter_timestamp', ['supporter_id', 'action_timestamp'], unique=False)
+        batch_op.create_index('ix_staff_action_logs_unprocessed_timestamp', ['is_processed_by_ai', 'action_timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('staff_action_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_staff_action_logs_unprocessed_timestamp')
+        batch_op.drop_index('ix_staff_action_logs_supporter_timestamp')
@@ -0,0 +1,28 @@
+"""Add replica heartbeat table for read-replica lag detection
+
+Revision ID: c6f2a9d4e817
+Revises: b3e8d1c6f542
+Create Date: 2026-10-19 23:04:51.337120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f2a9d4e817'
+down_revision = 'b3e8d1c6f542'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('replica_heartbeats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('beat_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('replica_heartbeats')
@@ -0,0 +1,87 @@
+"""Add attendance_date to attendance_records with batched backfill
+
+Revision ID: d5a2f8c31b47
+Revises: c3d7e1a94f20
+Create Date: 2026-10-19 19:42:03.118245
+
+"""
+from datetime import datetime, timedelta, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a2f8c31b47'
+down_revision = 'c3d7e1a94f20'
+branch_labels = None
+depends_on = None
+
+# 大きなテーブルでロックとWALの肥大化を避けるため、id範囲ごとに分割して埋める
+BACKFILL_BATCH_SIZE = 10000
+
+
+# 日本標準時（夏時間がないため固定オフセット）。マイグレーションはアプリのコードに依存させない
+JST = timezone(timedelta(hours=9))
+
+
+def _jst_date(value):
+    """
+    打刻のJST日付。オフセット付きの日時はJSTへ変換し、naive な日時はJSTの壁時計時刻とみなす
+    （適用時点の AttendanceRecord._sync_attendance_date と同じ規則）
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(JST)
+    return value.date()
+
+
+def _parse_timestamp(value):
+    # SQLite では文字列で返る（オフセット付きで保存された打刻もある）
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value
+
+
+def backfill_attendance_dates(conn, batch_size: int = BACKFILL_BATCH_SIZE):
+    """
+    既存の打刻の attendance_date を id 範囲ごとに埋める。
+    モデルの検証（AttendanceRecord._sync_attendance_date）と同じ規則で日付を求めるため、
+    オフセット付き（UTC）の打刻は JST の日付になり、新規の打刻と同じ日に集計される。
+    """
+    bounds = conn.execute(sa.text("SELECT MIN(id), MAX(id) FROM attendance_records")).fetchone()
+    if not bounds or bounds[0] is None:
+        return
+    min_id, max_id = bounds
+    for lo in range(min_id, max_id + 1, batch_size):
+        rows = conn.execute(sa.text("""
+            SELECT id, "timestamp" FROM attendance_records
+            WHERE id >= :lo AND id < :hi AND attendance_date IS NULL
+        """), {"lo": lo, "hi": lo + batch_size}).fetchall()
+        params = [
+            {"id": row_id, "attendance_date": _jst_date(_parse_timestamp(ts))}
+            for row_id, ts in rows if ts is not None
+        ]
+        if params:
+            conn.execute(
+                sa.text("UPDATE attendance_records SET attendance_date = :attendance_date WHERE id = :id"),
+                params
+            )
+
+
+def upgrade():
+    with op.batch_alter_table('attendance_records', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('attendance_date', sa.Date(), nullable=True))
+
+    backfill_attendance_dates(op.get_bind())
+
+    with op.batch_alter_table('attendance_records', schema=None) as batch_op:
+        batch_op.alter_column('attendance_date', existing_type=sa.Date(), nullable=False)
+        batch_op.create_index(batch_op.f('ix_attendance_records_attendance_date'), ['attendance_date'], unique=False)
+        batch_op.create_index('ix_attendance_records_user_type_date', ['user_id', 'record_type', 'attendance_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance_records', schema=None) as batch_op:
+        batch_op.drop_index('ix_attendance_records_user_type_date')
+        batch_op.drop_index(batch_op.f('ix_attendance_records_attendance_date'))
+        batch_op.drop_column('attendance_date')
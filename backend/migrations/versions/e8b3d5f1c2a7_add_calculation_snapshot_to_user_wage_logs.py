@@ -0,0 +1,26 @@
+"""Add calculation_snapshot to user_wage_logs
+
+Revision ID: e8b3d5f1c2a7
+Revises: c6f2a9d4e817
+Create Date: 2026-10-20 09:12:37.540218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8b3d5f1c2a7'
+down_revision = 'c6f2a9d4e817'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_wage_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('calculation_snapshot', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user_wage_logs', schema=None) as batch_op:
+        batch_op.drop_column('calculation_snapshot')
@@ -0,0 +1,32 @@
+"""Add office_service_configuration_id to client_invoices
+
+Revision ID: f2c7a4e9b136
+Revises: e8b3d5f1c2a7
+Create Date: 2026-10-20 11:03:18.204761
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c7a4e9b136'
+down_revision = 'e8b3d5f1c2a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('client_invoices', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('office_service_configuration_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_client_invoices_office_service_configuration_id'),
+                              ['office_service_configuration_id'], unique=False)
+        batch_op.create_foreign_key('fk_client_invoices_office_service_configuration_id',
+                                    'office_service_configurations', ['office_service_configuration_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('client_invoices', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_client_invoices_office_service_configuration_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_client_invoices_office_service_configuration_id'))
+        batch_op.drop_column('office_service_configuration_id')
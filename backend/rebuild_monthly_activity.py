@@ -0,0 +1,33 @@
+"""
+利用者×月の活動集計（UserMonthlyActivity）を月単位で作り直す。
+ORM を通らない一括取り込みの後や、集計の導入時に過去の月を埋めるときに実行する。
+
+    python rebuild_monthly_activity.py --year 2025 --month 6
+"""
+import argparse
+import json
+import os
+import sys
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from backend.app.extensions import db
+from backend.app import create_app
+from backend.app.services.monthly_activity_service import MonthlyActivityRollup
+
+
+def rebuild_monthly_activity(year, month):
+    app = create_app(register_blueprints=False)
+    with app.app_context():
+        result = MonthlyActivityRollup().rebuild_month(year, month)
+        db.session.commit()
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='利用者×月の活動集計の再作成')
+    parser.add_argument('--year', type=int, required=True)
+    parser.add_argument('--month', type=int, required=True, choices=range(1, 13))
+    args = parser.parse_args()
+    rebuild_monthly_activity(args.year, args.month)
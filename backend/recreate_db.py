@@ -8,7 +8,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from backend.app import create_app
 from backend.app.extensions import db
 
-app = create_app()
+app = create_app(register_blueprints=False)
 with app.app_context():
     db_uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
     print(f"Recreating database: {db_uri}")
@@ -10,7 +10,7 @@ from backend.app.extensions import db
 from backend.app.models import User, AttendanceRecord, UserDailyLog, SupportRecord
 from sqlalchemy import func
 
-app = create_app()
+app = create_app(register_blueprints=False)
 with app.app_context():
     user = User.query.filter_by(user_code='USR001').first()
     if user:
@@ -0,0 +1,32 @@
+"""
+減算リスクの定時スキャン。毎朝 cron などから実行し、検出結果を ComplianceEventLog と URAC に記録する。
+同じ日に再実行しても記録は重複しない。
+
+    python scan_deduction_risks.py [--date YYYY-MM-DD]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from backend.app.extensions import db
+from backend.app import create_app
+from backend.app.services.deduction_risk_scanner_service import DeductionRiskScanner
+
+
+def scan_deduction_risks(scan_date=None):
+    app = create_app(register_blueprints=False)
+    with app.app_context():
+        result = DeductionRiskScanner(scan_date).run()
+        db.session.commit()
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='減算リスクの定時スキャン')
+    parser.add_argument('--date', type=date.fromisoformat, default=None, help='スキャン日（省略時は本日・JST）')
+    scan_deduction_risks(parser.parse_args().date)
@@ -16,7 +16,7 @@ from backend.app.models import (
 )
 
 
-app = create_app()
+app = create_app(register_blueprints=False)
 with app.app_context():
     # 開発中のため、一度全て削除して再作成（スキーマ変更反映のため）
     # db.drop_all()
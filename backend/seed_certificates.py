@@ -10,7 +10,7 @@ from backend.app.models.core.service_certificate import ServiceCertificate, Gran
 from datetime import date, timedelta
 import random
 
-app = create_app()
+app = create_app(register_blueprints=False)
 
 def seed_certificates():
     with app.app_context():
@@ -0,0 +1,28 @@
+import sys
+import os
+import argparse
+from datetime import date
+
+# プロジェクトのルートディレクトリをパスに追加
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.app.extensions import db
+from backend.benchmarks.endpoint_benchmarks import SCALES
+from backend.benchmarks.synthetic_dataset import SyntheticDatasetGenerator
+
+
+parser = argparse.ArgumentParser(description="ベンチマーク用の合成データを現在のDBへ投入する")
+parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--end-date', type=date.fromisoformat, default=None)
+parser.add_argument('--prefix', default=None, help="コード類の接頭辞（既定: SYN<seed>）")
+args = parser.parse_args()
+
+app = create_app(register_blueprints=False)
+with app.app_context():
+    summary = SyntheticDatasetGenerator(
+        seed=args.seed, end_date=args.end_date, prefix=args.prefix, **SCALES[args.scale]
+    ).generate()
+    print(f"✅ 合成データを投入しました: {summary.counts}")
+    print(f"   期間: {summary.start_date} 〜 {summary.end_date} / fingerprint: {summary.fingerprint}")
@@ -41,6 +41,11 @@ class TestConfig(Config):
     """テスト専用の設定"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # AIはオフラインのスタブで動かし、ディスクキャッシュは使わない
+    AI_PROVIDER = 'stub'
+    AI_CACHE_DIR = None
+    # 監査ログはスプールを使わずリクエスト内で書き込む
+    AUDIT_SPOOL_DIR = None
 
 @pytest.fixture(scope='session')
 def app():
@@ -66,6 +71,26 @@ def client(app):
     """テスト用のブラウザ（クライアント）を作成する"""
     return app.test_client()
 
+@pytest.fixture
+def query_budget(app):
+    """
+    エンドポイントのSQL発行数の上限を検証するヘルパー。
+    query_budget(response, max_queries=10, max_repeats=3) のように使い、
+    max_repeats は同一SQLテンプレートの繰り返し回数（N+1の検出）の上限。
+    """
+    from backend.app.services.query_profiler_service import QueryProfiler
+
+    def check(response, max_queries, max_repeats=None):
+        count = int(response.headers[QueryProfiler.COUNT_HEADER])
+        assert count <= max_queries, f"SQL発行数 {count} が上限 {max_queries} を超えました"
+        if max_repeats is not None:
+            profile = QueryProfiler.get(app).last_profile()
+            template, repeats = profile.templates.most_common(1)[0] if profile.templates else ('', 0)
+            assert repeats <= max_repeats, f"同一SQLが {repeats} 回発行されました (上限 {max_repeats}): {template}"
+        return count
+
+    return check
+
 @pytest.fixture
 def runner(app):
     """テスト用のコマンドランナーを作成する"""
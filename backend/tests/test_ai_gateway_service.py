@@ -0,0 +1,173 @@
+# backend/tests/test_ai_gateway_service.py
+
+import os
+import threading
+import time
+import pytest
+from pydantic import BaseModel
+from backend.app.services.ai_gateway_service import (
+    AIGatewayService, AIGatewayRuntime, AIResponseCache,
+    LocalStubProvider, AIGatewayTimeoutError
+)
+
+
+def build_runtime(provider, cache_dir=None, max_concurrency=4, timeout_seconds=5.0):
+    cache = AIResponseCache(cache_dir=cache_dir, max_entries=16, ttl_seconds=3600)
+    return AIGatewayRuntime(provider, cache, max_concurrency=max_concurrency, timeout_seconds=timeout_seconds)
+
+
+@pytest.fixture
+def isolated_runtime(app):
+    """セッション共有のアプリに差し込んだゲートウェイを、テスト後に元へ戻す"""
+    with app.app_context():
+        original = app.extensions.get(AIGatewayService.EXTENSION_KEY)
+        yield
+        if original is None:
+            app.extensions.pop(AIGatewayService.EXTENSION_KEY, None)
+        else:
+            app.extensions[AIGatewayService.EXTENSION_KEY] = original
+
+
+def test_stub_provider_is_deterministic_and_cached(app, isolated_runtime):
+    """同じ入力はスタブでも同じ出力となり、2回目以降はメモリキャッシュから返る"""
+    with app.app_context():
+        provider = LocalStubProvider()
+        AIGatewayService.set_runtime(build_runtime(provider))
+
+        first = AIGatewayService.generate_text("本日の支援内容を要約してください")
+        second = AIGatewayService.generate_text("本日の支援内容を要約してください")
+
+        assert first == second
+        assert first.startswith("[Mock AI Response")
+        assert provider.call_count == 1
+
+        totals = AIGatewayService.get_metrics()["totals"]
+        assert totals["provider_calls"] == 1
+        assert totals["memory_hits"] == 1
+        assert totals["prompt_tokens"] > 0
+
+
+def test_cache_key_depends_on_model_and_system_instruction():
+    key_a = AIResponseCache.build_key("flash", "prompt", "sys-a")
+    key_b = AIResponseCache.build_key("flash", "prompt", "sys-b")
+    key_c = AIResponseCache.build_key("pro", "prompt", "sys-a")
+    assert len({key_a, key_b, key_c}) == 3
+    assert key_a == AIResponseCache.build_key("flash", "prompt", "sys-a")
+
+
+def test_cache_key_follows_response_schema_fields():
+    """response_schema が pydantic モデルの場合、フィールドの変更がキャッシュキーに反映される"""
+    class Before(BaseModel):
+        supporter_id: int
+
+    class After(BaseModel):
+        supporter_id: int
+        date: str
+
+    After.__name__ = Before.__name__
+    key_before = AIResponseCache.build_key("flash", "prompt", options={"response_schema": Before})
+    key_after = AIResponseCache.build_key("flash", "prompt", options={"response_schema": After})
+    assert key_before != key_after
+    assert key_before == AIResponseCache.build_key("flash", "prompt", options={"response_schema": Before})
+
+
+def test_disk_cache_survives_new_runtime(tmp_path):
+    """ディスク層に保存された応答は、新しいランタイム（再起動後）でも再利用される"""
+    provider = LocalStubProvider()
+    runtime = build_runtime(provider, cache_dir=str(tmp_path))
+    runtime.generate("flash", "同じプロンプト")
+
+    new_provider = LocalStubProvider()
+    restarted = build_runtime(new_provider, cache_dir=str(tmp_path))
+    entry = restarted.generate("flash", "同じプロンプト")
+
+    assert new_provider.call_count == 0
+    assert entry["provider"] == "stub"
+    assert restarted.metrics.snapshot()["totals"]["disk_hits"] == 1
+
+
+def test_identical_in_flight_prompts_are_coalesced():
+    """同時に到着した同一プロンプトは、モデル呼び出し1回に合流される"""
+    release = threading.Event()
+
+    def slow_responder(model, prompt, system_instruction, options):
+        release.wait(5)
+        return "合流済みの応答"
+
+    provider = LocalStubProvider(responder=slow_responder)
+    runtime = build_runtime(provider)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(runtime.generate("flash", "重い要約", use_cache=False)["text"]))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    # 全スレッドが合流待ちに入る猶予を与えてから応答を返す
+    threading.Timer(0.2, release.set).start()
+    for t in threads:
+        t.join(5)
+
+    assert results == ["合流済みの応答"] * 5
+    assert provider.call_count < 5
+    totals = runtime.metrics.snapshot()["totals"]
+    assert totals["provider_calls"] + totals["coalesced"] == 5
+
+
+def test_concurrency_limit_times_out():
+    """同時実行枠が埋まっている間に待機時間を超えた呼び出しはタイムアウトとなる"""
+    provider = LocalStubProvider()
+    runtime = build_runtime(provider, max_concurrency=1, timeout_seconds=0.05)
+    runtime.semaphore.acquire()
+    try:
+        with pytest.raises(AIGatewayTimeoutError):
+            runtime.generate("flash", "枠待ち", use_cache=False)
+    finally:
+        runtime.semaphore.release()
+
+    assert runtime.metrics.snapshot()["totals"]["timeouts"] == 1
+    assert provider.call_count == 0
+
+
+def test_pii_responses_are_not_written_to_disk(tmp_path):
+    """個人情報を含む呼び出しの応答はメモリにのみ保持され、ディスクには残らない"""
+    provider = LocalStubProvider()
+    runtime = build_runtime(provider, cache_dir=str(tmp_path))
+    runtime.generate("flash", "職員Aの本日の記録", persist=False)
+    runtime.generate("flash", "職員Aの本日の記録", persist=False)
+
+    assert provider.call_count == 1
+    assert not any(files for _, _, files in os.walk(tmp_path))
+
+
+def test_disk_cache_removes_expired_and_oversized_files(tmp_path):
+    """期限切れのファイルは読み込み時に削除され、上限サイズを超えると古いものから削除される"""
+    cache = AIResponseCache(cache_dir=str(tmp_path), max_entries=16, ttl_seconds=3600, max_disk_bytes=10 ** 6)
+    key = AIResponseCache.build_key("flash", "期限切れ")
+    cache.set(key, {"text": "old", "created_at": time.time() - 7200})
+    assert AIResponseCache(cache_dir=str(tmp_path), ttl_seconds=3600).get(key) == (None, None)
+    assert not os.path.exists(cache._disk_path(key))
+
+    small = AIResponseCache(cache_dir=str(tmp_path), max_entries=16, ttl_seconds=3600, max_disk_bytes=600)
+    keys = [AIResponseCache.build_key("flash", f"prompt-{i}") for i in range(10)]
+    for i, k in enumerate(keys):
+        small.set(k, {"text": "x" * 100, "created_at": time.time()})
+        os.utime(small._disk_path(k), (1_000_000 + i, 1_000_000 + i))
+
+    remaining = [k for k in keys if os.path.exists(small._disk_path(k))]
+    assert sum(os.path.getsize(small._disk_path(k)) for k in remaining) <= 600
+    assert remaining == keys[-len(remaining):]
+
+
+def test_slow_provider_call_times_out():
+    """モデル応答が timeout_seconds を超えると、呼び出し元にはタイムアウトが返る"""
+    release = threading.Event()
+    provider = LocalStubProvider(responder=lambda *args: release.wait(5) and "遅い応答")
+    runtime = build_runtime(provider, timeout_seconds=0.05)
+    try:
+        with pytest.raises(AIGatewayTimeoutError):
+            runtime.generate("flash", "遅いプロンプト", use_cache=False)
+    finally:
+        release.set()
+    assert runtime.metrics.snapshot()["totals"]["timeouts"] == 1
@@ -0,0 +1,65 @@
+# backend/tests/test_attendance_date.py
+
+import importlib.util
+import os
+from datetime import date, datetime, timezone
+import sqlalchemy as sa
+from backend.app import db
+from backend.app.models import User, StatusMaster
+from backend.app.models.support.attendance_workflow import AttendanceRecord
+
+
+def test_attendance_date_follows_timestamp_in_jst(app):
+    """attendance_date は打刻日時のJST日付で保存され、打刻修正にも追従する"""
+    with app.app_context():
+        status = db.session.query(StatusMaster).first()
+        if not status:
+            status = StatusMaster(name="利用中")
+            db.session.add(status)
+            db.session.flush()
+        user = User(display_name="打刻日テスト", status_id=status.id)
+        db.session.add(user)
+        db.session.flush()
+
+        # UTC 15:30 は JST では翌日 00:30。打刻日時もJSTの壁時計時刻に揃えて保存される
+        record = AttendanceRecord(user_id=user.id, record_type='CHECK_IN', timestamp=datetime(2026, 6, 1, 15, 30, tzinfo=timezone.utc))
+        db.session.add(record)
+        db.session.commit()
+        assert record.attendance_date == date(2026, 6, 2)
+        assert record.timestamp == datetime(2026, 6, 2, 0, 30)
+
+        record.timestamp = datetime(2026, 6, 5, 9, 0)
+        db.session.commit()
+
+        found = AttendanceRecord.query.filter_by(
+            user_id=user.id, record_type='CHECK_IN', attendance_date=date(2026, 6, 5)
+        ).one()
+        assert found.id == record.id
+
+
+def load_backfill_migration():
+    path = os.path.join(os.path.dirname(__file__), '..', 'migrations', 'versions',
+                        'd5a2f8c31b47_add_attendance_date_to_attendance_records.py')
+    spec = importlib.util.spec_from_file_location('attendance_date_migration', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_migration_backfill_uses_same_jst_date_as_new_records():
+    """既存打刻の埋め戻しは、UTCのオフセット付き打刻も新規打刻と同じJSTの日付にする"""
+    migration = load_backfill_migration()
+    engine = sa.create_engine('sqlite:///:memory:')
+    with engine.begin() as conn:
+        conn.execute(sa.text('CREATE TABLE attendance_records (id INTEGER PRIMARY KEY, "timestamp" DATETIME, attendance_date DATE)'))
+        conn.execute(sa.text('INSERT INTO attendance_records (id, "timestamp") VALUES (:id, :ts)'), [
+            {"id": 1, "ts": "2026-06-01 15:30:00+00:00"},   # クライアントからUTCで届いた深夜の打刻
+            {"id": 2, "ts": "2026-06-05 09:00:00.000000"},  # JSTの壁時計時刻
+            {"id": 3, "ts": "2026-06-05 23:59:00"},
+        ])
+        migration.backfill_attendance_dates(conn, batch_size=2)
+        dates = dict(conn.execute(sa.text("SELECT id, attendance_date FROM attendance_records")).fetchall())
+
+    new_record = AttendanceRecord(user_id=1, record_type='CHECK_IN', timestamp=datetime(2026, 6, 1, 15, 30, tzinfo=timezone.utc))
+    assert dates == {1: "2026-06-02", 2: "2026-06-05", 3: "2026-06-05"}
+    assert dates[1] == new_record.attendance_date.isoformat()
@@ -0,0 +1,124 @@
+# backend/tests/test_audit_archive.py
+
+import os
+import uuid
+import pytest
+from datetime import date, datetime
+from flask_jwt_extended import create_access_token
+from backend.app import db
+from backend.app.models import Supporter, RoleMaster, PermissionMaster, SystemLog
+from backend.app.models.core.audit_log import AuditActionLog, AuditArchivePartition
+from backend.app.services.audit_archive_service import AuditArchiveService
+
+
+@pytest.fixture
+def archive_dir(app, tmp_path):
+    previous = app.config['AUDIT_ARCHIVE_DIR']
+    app.config['AUDIT_ARCHIVE_DIR'] = str(tmp_path)
+    yield tmp_path
+    app.config['AUDIT_ARCHIVE_DIR'] = previous
+    # 目録は一時ディレクトリのファイルを指すため、他のテストに残さない
+    with app.app_context():
+        AuditArchivePartition.query.delete()
+        db.session.commit()
+
+
+def seed_logs(entity_type, months, per_month=3):
+    """2020年の各月に監査ログを作る（他テストの行と混ざらないよう entity_type を一意にする）"""
+    rows = []
+    for month in months:
+        for i in range(per_month):
+            rows.append(AuditActionLog(
+                action='VIEW_PII' if i % 2 == 0 else 'EDIT_USER', entity_type=entity_type, entity_id=i,
+                created_at=datetime(2020, month, 1 + i, 9, 0), after_value=f"{month}-{i}"
+            ))
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+def test_compaction_moves_old_months_and_search_spans_tiers(app, archive_dir):
+    """古い月はアーカイブへ移り、検索はホットとアーカイブを新しい順に切れ目なくページングする"""
+    with app.app_context():
+        entity_type = f"archive_{uuid.uuid4().hex[:6]}"
+        seed_logs(entity_type, months=[1, 2, 3])
+        recent = AuditActionLog(action='VIEW_PII', entity_type=entity_type, entity_id=0, created_at=datetime(2020, 6, 1))
+        db.session.add(recent)
+        db.session.commit()
+
+        # 2020-06 を基準に直近2か月（4・5月）より前＝1〜3月をアーカイブする
+        results = AuditArchiveService.compact('audit_action_logs', hot_months=2, today=date(2020, 6, 15))
+        assert [(r["period"], r["rows"]) for r in results if r["rows"]][-3:] == [("2020-01", 3), ("2020-02", 3), ("2020-03", 3)]
+        assert AuditActionLog.query.filter_by(entity_type=entity_type).count() == 1
+        partition = AuditArchivePartition.query.filter_by(source_table='audit_action_logs', period_start=date(2020, 3, 1)).one()
+        assert os.path.exists(os.path.join(str(archive_dir), partition.file_path))
+
+        seen, cursor = [], None
+        while True:
+            page = AuditArchiveService.search(entity_type=entity_type, limit=4, cursor=cursor)
+            seen += page["items"]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        assert [item["created_at"][:10] for item in seen] == [
+            "2020-06-01", "2020-03-03", "2020-03-02", "2020-03-01", "2020-02-03", "2020-02-02",
+            "2020-02-01", "2020-01-03", "2020-01-02", "2020-01-01",
+        ]
+        assert [item["source"] for item in seen[:2]] == ["hot", "archive"]
+
+        filtered = AuditArchiveService.search(
+            entity_type=entity_type, action='EDIT_USER',
+            start=datetime(2020, 2, 1), end=datetime(2020, 3, 1)
+        )
+        assert [(i["action"], i["created_at"][:10]) for i in filtered["items"]] == [("EDIT_USER", "2020-02-02")]
+
+
+def test_compaction_archives_system_logs_and_detects_tampering(app, archive_dir):
+    """システムログも同様に移せる。改ざんされたアーカイブは検索時に検出される"""
+    with app.app_context():
+        db.session.add(SystemLog(log_level='INFO', message='old event', timestamp=datetime(2019, 5, 2)))
+        db.session.commit()
+        results = AuditArchiveService.compact('system_logs', hot_months=1, today=date(2019, 7, 1))
+        assert any(r["period"] == "2019-05" for r in results)
+        assert SystemLog.query.filter(SystemLog.timestamp < datetime(2019, 6, 1)).count() == 0
+
+        entity_type = f"tamper_{uuid.uuid4().hex[:6]}"
+        seed_logs(entity_type, months=[1], per_month=1)
+        AuditArchiveService.compact('audit_action_logs', hot_months=0, today=date(2020, 2, 1))
+        partition = AuditArchivePartition.query.filter_by(source_table='audit_action_logs', period_start=date(2020, 1, 1)).order_by(AuditArchivePartition.part_no.desc()).first()
+        with open(os.path.join(str(archive_dir), partition.file_path), 'ab') as f:
+            f.write(b'tampered')
+
+        from backend.app.utils.errors import AppError
+        with pytest.raises(AppError):
+            AuditArchiveService.search(entity_type=entity_type)
+
+
+def test_search_endpoint_requires_permission(app, client, archive_dir):
+    """検索APIは VIEW_AUDIT_LOG 権限が必要で、カーソルで続きを取得できる"""
+    with app.app_context():
+        perm = PermissionMaster.query.filter_by(name='VIEW_AUDIT_LOG').first() or PermissionMaster(name='VIEW_AUDIT_LOG')
+        role = RoleMaster(name=f"監査担当 {uuid.uuid4().hex[:4]}", role_scope='JOB')
+        role.permissions.append(perm)
+        auditor, other = [
+            Supporter(
+                staff_code=f"S_ARC_{uuid.uuid4().hex[:6]}", last_name="監査", first_name=name,
+                last_name_kana="カンサ", first_name_kana="テスト",
+                employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2025, 1, 1)
+            ) for name in ("担当", "一般")
+        ]
+        auditor.roles.append(role)
+        db.session.add_all([auditor, other])
+        db.session.commit()
+        entity_type = f"api_{uuid.uuid4().hex[:6]}"
+        seed_logs(entity_type, months=[4], per_month=2)
+
+        def headers(staff):
+            return {'Authorization': f'Bearer {create_access_token(identity=f"staff:{staff.id}", additional_claims={"role_scopes": []})}'}
+
+        assert client.get(f'/api/audit-logs/search?entity_type={entity_type}', headers=headers(other)).status_code == 403
+        body = client.get(f'/api/audit-logs/search?entity_type={entity_type}&from=2020-04-01&limit=1', headers=headers(auditor)).get_json()
+        assert len(body["items"]) == 1 and body["next_cursor"]
+        rest = client.get(f'/api/audit-logs/search?entity_type={entity_type}&cursor={body["next_cursor"]}', headers=headers(auditor)).get_json()
+        assert [i["created_at"][:10] for i in body["items"] + rest["items"]] == ["2020-04-02", "2020-04-01"]
+        assert client.get('/api/audit-logs/search?from=yesterday', headers=headers(auditor)).status_code == 400
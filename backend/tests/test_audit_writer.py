@@ -0,0 +1,135 @@
+# backend/tests/test_audit_writer.py
+
+import os
+import shutil
+import uuid
+import pytest
+from datetime import date
+from flask_jwt_extended import create_access_token
+from backend.app import db
+from backend.app.models import User, UserPII, Supporter, StatusMaster, RoleMaster, PermissionMaster
+from backend.app.models.core.audit_log import AuditActionLog
+from backend.app.services.audit_writer_service import AuditSpool, AuditWriter
+
+
+@pytest.fixture
+def spool_writer(app, tmp_path):
+    """一時ディレクトリのスプールを使うライターに差し替える（バックグラウンドスレッドは起動せず、flush を明示的に呼ぶ）"""
+    writer = AuditWriter(app, spool_dir=str(tmp_path), flush_interval=0, batch_size=2)
+    previous = app.extensions.get(AuditWriter.EXTENSION_KEY)
+    app.extensions[AuditWriter.EXTENSION_KEY] = writer
+    yield writer
+    if previous is None:
+        app.extensions.pop(AuditWriter.EXTENSION_KEY, None)
+    else:
+        app.extensions[AuditWriter.EXTENSION_KEY] = previous
+
+
+def count_logs(event_ids):
+    return AuditActionLog.query.filter(AuditActionLog.event_id.in_(event_ids)).count()
+
+
+def test_spooled_events_are_flushed_in_bulk_once(app, spool_writer):
+    """記録はスプールに留まり、flush でまとめて取り込まれる。再度 flush しても重複しない"""
+    with app.app_context():
+        event_ids = [
+            AuditWriter.record('VIEW_PII', 'user_pii', entity_id=i, after_value=f"spool test {i}")
+            for i in range(5)
+        ]
+        assert count_logs(event_ids) == 0
+
+        assert spool_writer.flush() == 5
+        assert count_logs(event_ids) == 5
+        assert spool_writer.flush() == 0
+        assert os.listdir(spool_writer.spool.directory) == []
+
+        row = AuditActionLog.query.filter_by(event_id=event_ids[0]).one()
+        assert (row.action, row.entity_type, row.entity_id, row.after_value) == ('VIEW_PII', 'user_pii', 0, "spool test 0")
+        assert row.created_at is not None
+
+
+def test_replayed_segment_is_deduplicated(app, spool_writer, tmp_path):
+    """取り込み後・削除前に停止して同じセグメントが再送されても、重複せず取り込まれる（不完全な末尾行は無視）"""
+    with app.app_context():
+        event_ids = [AuditWriter.record('VIEW_PII', 'user_pii', entity_id=i) for i in range(3)]
+        segment = spool_writer.spool.rotate()
+        backup = str(tmp_path / "backup.bin")
+        shutil.copy(segment, backup)
+
+        assert spool_writer.flush() == 3
+
+        # 削除前に停止した状態を再現：同じ内容のセグメントが残っている
+        shutil.copy(backup, str(tmp_path / "audit-crashed-000001.ready"))
+        os.remove(backup)
+        with open(tmp_path / "audit-crashed-000001.ready", 'ab') as f:
+            f.write(b'{"event_id": "torn')
+        new_id = AuditWriter.record('VIEW_PII', 'user_pii', entity_id=99)
+
+        assert spool_writer.flush() == 1
+        assert count_logs(event_ids + [new_id]) == 4
+
+
+def test_failed_flush_keeps_segment_for_retry(app, spool_writer, monkeypatch):
+    """DBへの取り込みに失敗したセグメントはスプールに戻り、次回の flush で取り込まれる"""
+    with app.app_context():
+        event_id = AuditWriter.record('VIEW_PII', 'user_pii', entity_id=1)
+
+        def fail(events):
+            raise RuntimeError("db down")
+        monkeypatch.setattr(spool_writer, '_insert_events', fail)
+        with pytest.raises(RuntimeError):
+            spool_writer.flush()
+        monkeypatch.undo()
+
+        assert [name.endswith('.ready') for name in os.listdir(spool_writer.spool.directory)] == [True]
+        assert spool_writer.flush() == 1
+        assert count_logs([event_id]) == 1
+
+
+def test_claimed_old_segment_is_not_taken_over(tmp_path):
+    """更新日時の古いセグメントを確保しても、確保した直後に他プロセスから停止扱いで奪われない"""
+    first = AuditSpool(str(tmp_path), fsync=False, stale_seconds=60)
+    second = AuditSpool(str(tmp_path), fsync=False, stale_seconds=60)
+    segment = tmp_path / "audit-old-000001.ready"
+    segment.write_bytes(b'{"event_id": "old"}\n')
+    an_hour_ago = os.path.getmtime(segment) - 3600
+    os.utime(segment, (an_hour_ago, an_hour_ago))
+
+    claimed = first.claim()
+    assert len(claimed) == 1
+    assert second.claim() == []
+    assert first.read(claimed[0]) == [{"event_id": "old"}]
+    first.discard(claimed[0])
+
+
+def test_pii_view_does_not_commit_audit_on_request(app, client, spool_writer):
+    """PII閲覧の監査はリクエスト中にはDBへ書かれず、スプール経由で取り込まれる"""
+    with app.app_context():
+        status = StatusMaster.query.first() or StatusMaster(name="利用中")
+        user = User(display_name="監査 太郎", status=status, user_code=f"AUD_{uuid.uuid4().hex[:6]}")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(UserPII(user_id=user.id, last_name="監査", first_name="太郎"))
+
+        perm = PermissionMaster.query.filter_by(name='VIEW_PII').first() or PermissionMaster(name='VIEW_PII')
+        role = RoleMaster(name=f"PII閲覧 {uuid.uuid4().hex[:4]}", role_scope='JOB')
+        role.permissions.append(perm)
+        staff = Supporter(
+            staff_code=f"S_AUD_{uuid.uuid4().hex[:6]}", last_name="監査", first_name="担当",
+            last_name_kana="カンサ", first_name_kana="タントウ",
+            employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2025, 1, 1)
+        )
+        staff.roles.append(role)
+        db.session.add(staff)
+        db.session.commit()
+        token = create_access_token(identity=f"staff:{staff.id}", additional_claims={"role_scopes": ["JOB"]})
+
+        response = client.post(f'/api/users/{user.id}/decrypt-pii', json={"pii_type": "name"}, headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200
+        assert response.get_json()["value"] == "監査 太郎"
+
+        def view_logs():
+            return AuditActionLog.query.filter_by(action='VIEW_PII', entity_id=user.id, actor_supporter_id=staff.id).count()
+        assert view_logs() == 0
+        spool_writer.flush()
+        assert view_logs() == 1
@@ -0,0 +1,144 @@
+# backend/tests/test_billing_engine.py
+
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from backend.app import db
+from backend.app.models import (
+    AttendanceRecord, BillingData, Corporation, FeeCalculationDecision, GovernmentFeeMaster, GrantedService,
+    MonthlyBillingSummary, MunicipalityMaster, OfficeAdditiveFiling, OfficeServiceConfiguration, OfficeSetting,
+    ServiceCertificate, ServiceTypeMaster, ServiceUnitMaster, StatusMaster, User, UserDailyLog
+)
+from backend.app.models.core.service_certificate import CopaymentLimit
+from backend.app.services.billing_engine_service import MonthlyBillingEngine
+
+
+def _setup_month():
+    """2025年6月: 支給量3日、来所打刻のある完了済み日報4日（うち1日は事業所外）、打刻なし・下書きの日報が各1日"""
+    code = uuid.uuid4().hex[:6]
+    corp = Corporation(corporation_name=f"Billing Corp {code}", corporation_type="KK")
+    muni = MunicipalityMaster(municipality_code=code, name=f"Billing City {code}")
+    stype = ServiceTypeMaster(name=f"Billing Service {code}", service_code=f"BL{code}")
+    status = StatusMaster(name=f"Billing Status {code}")
+    db.session.add_all([corp, muni, stype, status])
+    db.session.flush()
+    office = OfficeSetting(corporation_id=corp.id, office_name=f"Billing Office {code}", municipality_id=muni.id)
+    db.session.add(office)
+    db.session.flush()
+    osc = OfficeServiceConfiguration(office_id=office.id, service_type_master_id=stype.id,
+                                     jigyosho_bango=uuid.uuid4().hex[:10], capacity=20)
+    user = User(display_name=f"Billing User {code}", status_id=status.id)
+    db.session.add_all([osc, user])
+    db.session.flush()
+
+    cert = ServiceCertificate(user_id=user.id, certificate_issue_date=date(2025, 1, 1), municipality_master_id=muni.id,
+                              office_service_configuration_id=osc.id, status='ACTIVE')
+    db.session.add(cert)
+    db.session.flush()
+    db.session.add_all([
+        GrantedService(certificate_id=cert.id, service_type_master_id=stype.id, granted_start_date=date(2025, 1, 1),
+                       granted_end_date=date(2025, 12, 31), max_service_days=3),
+        CopaymentLimit(certificate_id=cert.id, limit_start_date=date(2025, 4, 1), limit_end_date=date(2026, 3, 31),
+                       limit_amount=1000),
+        ServiceUnitMaster(service_type=stype.service_code, unit_count=500, unit_price=10.5, start_date=date(2025, 1, 1),
+                          end_date=date(2025, 12, 31), responsible_id=1, commit_timestamp=datetime(2025, 1, 1)),
+        # 後から登録した改定行が優先される
+        ServiceUnitMaster(service_type=stype.service_code, unit_count=600, unit_price=10.5, start_date=date(2025, 6, 4),
+                          end_date=date(2025, 12, 31), responsible_id=1, commit_timestamp=datetime(2025, 5, 1)),
+    ])
+
+    off_site = GovernmentFeeMaster(name="事業所外加算", code=f"A{code}", category='ADD', units=100,
+                                   needs_office_filing=True, calculation_type='PER_ACTION', logic_key='OFF_SITE')
+    monthly = GovernmentFeeMaster(name="月次減算", code=f"S{code}", category='SUB', units=30,
+                                  needs_office_filing=True, calculation_type='SUBTRACTION', logic_key='MONTHLY')
+    unknown = GovernmentFeeMaster(name="未対応加算", code=f"U{code}", category='ADD', units=10,
+                                  needs_office_filing=True, calculation_type='ADD_TO_BASE', logic_key='NOT_IMPLEMENTED')
+    db.session.add_all([off_site, monthly, unknown])
+    db.session.flush()
+    db.session.add_all([
+        OfficeAdditiveFiling(office_service_configuration_id=osc.id, fee_master_id=fee.id, is_filed=True,
+                             effective_start_date=date(2025, 4, 1))
+        for fee in (off_site, monthly, unknown)
+    ])
+
+    logs = {}
+    for day, location, log_status, checked_in in [
+        (2, 'ON_SITE', 'COMPLETED', True),
+        (3, 'OFF_SITE_USER_HOME', 'COMPLETED', True),
+        (4, 'ON_SITE', 'COMPLETED', True),
+        (5, 'ON_SITE', 'COMPLETED', True),
+        (6, 'ON_SITE', 'COMPLETED', False),
+        (9, 'ON_SITE', 'DRAFT', True),
+    ]:
+        log = UserDailyLog(user_id=user.id, log_date=date(2025, 6, day), location_type=location,
+                           log_status=log_status, support_content_notes="記録")
+        db.session.add(log)
+        logs[day] = log
+        if checked_in:
+            db.session.add(AttendanceRecord(user_id=user.id, record_type='CHECK_IN', timestamp=datetime(2025, 6, day, 9, 0)))
+    db.session.commit()
+    return corp.id, osc.id, user.id, logs, (off_site.code, monthly.code)
+
+
+def test_monthly_billing_is_deterministic_and_reports_diff(app):
+    """支給量・単価改定・加算減算を反映して保存し、再実行では差分なし、入力の変更は changed として報告する"""
+    with app.app_context():
+        corp_id, osc_id, user_id, logs, (add_code, sub_code) = _setup_month()
+
+        first = MonthlyBillingEngine(corp_id, 2025, 6).run()
+        db.session.commit()
+
+        # 6/2: 500-30(月次減算), 6/3: 500+100(事業所外), 6/4: 600(改定後)。6/5 は支給量超過
+        summary = first["summaries"][0]
+        assert (summary["days"], summary["total_units"]) == (3, 1670)
+        assert (summary["total_cost"], summary["copayment"], summary["claim_amount"]) == ("17535", "1000", "16535")
+        assert summary["applied_fees"] == {add_code: 100, sub_code: -30}
+        assert [w["code"] for w in first["warnings"]] == ["OVER_GRANTED_DAYS", "UNKNOWN_FEE_LOGIC"]
+        assert len(first["diff"]["added"]) == 1
+
+        stored = MonthlyBillingSummary.query.filter_by(office_service_configuration_id=osc_id).one()
+        assert (stored.total_units_claimed, stored.claim_amount) == (1670, Decimal("16535"))
+        billed = BillingData.query.filter_by(user_id=user_id).order_by(BillingData.billing_date).all()
+        assert [(b.billing_date.day, b.unit_count) for b in billed] == [(2, 470), (3, 600), (4, 600)]
+        assert {b.office_service_configuration_id for b in billed} == {osc_id}
+        decision = FeeCalculationDecision.query.filter_by(office_service_configuration_id=osc_id).one()
+        assert json.loads(decision.applied_fees_json) == {"fees": {add_code: 100, sub_code: -30}, "total_units": 1670, "users": 1}
+
+        second = MonthlyBillingEngine(corp_id, 2025, 6).run()
+        db.session.commit()
+        assert second["summaries"] == first["summaries"]
+        assert second["diff"] == {"added": [], "changed": [], "removed": [], "locked": [], "unchanged": 1}
+
+        logs[2].location_type = 'OFF_SITE_USER_HOME'
+        db.session.commit()
+        preview = MonthlyBillingEngine(corp_id, 2025, 6).run(dry_run=True)
+        assert preview["diff"]["changed"] == [{
+            "user_id": user_id, "office_service_configuration_id": osc_id, "total_units": 1770,
+            "claim_amount": "17585", "previous_total_units": 1670, "previous_claim_amount": "16535",
+        }]
+        assert BillingData.query.filter_by(user_id=user_id, billing_date=date(2025, 6, 2)).one().unit_count == 470
+
+        MonthlyBillingEngine(corp_id, 2025, 6).run()
+        db.session.commit()
+        assert BillingData.query.filter_by(user_id=user_id, billing_date=date(2025, 6, 2)).one().unit_count == 570
+        assert MonthlyBillingSummary.query.filter_by(office_service_configuration_id=osc_id).one().total_units_claimed == 1770
+
+
+def test_finalized_claims_are_not_changed(app):
+    """確定済みの請求は再計算で変更せず、差分は locked として報告する"""
+    with app.app_context():
+        corp_id, osc_id, user_id, logs, _ = _setup_month()
+        MonthlyBillingEngine(corp_id, 2025, 6).run()
+        summary = MonthlyBillingSummary.query.filter_by(office_service_configuration_id=osc_id).one()
+        summary.claim_status = 'FINALIZED_BY_MANAGER'
+        logs[3].location_type = 'ON_SITE'
+        db.session.commit()
+
+        result = MonthlyBillingEngine(corp_id, 2025, 6).run()
+        db.session.commit()
+
+        assert [e["claim_status"] for e in result["diff"]["locked"]] == ['FINALIZED_BY_MANAGER']
+        assert MonthlyBillingSummary.query.filter_by(office_service_configuration_id=osc_id).one().total_units_claimed == 1670
+        assert BillingData.query.filter_by(user_id=user_id).count() == 3
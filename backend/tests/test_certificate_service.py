@@ -0,0 +1,108 @@
+# backend/tests/test_certificate_service.py
+
+import uuid
+from datetime import date
+
+from backend.app import db
+from backend.app.models import (
+    Corporation, OfficeSetting, OfficeServiceConfiguration,
+    MunicipalityMaster, ServiceTypeMaster, StatusMaster, User,
+    ServiceCertificate, GrantedService, ContractReportDetail,
+)
+from backend.app.models.core.service_certificate import CopaymentLimit, MealAddonStatus
+from backend.app.services.certificate_service import CertificateRepository, GrantedIntervalIndex
+from backend.benchmarks.endpoint_benchmarks import QueryCounter
+
+
+def _setup_user():
+    code = uuid.uuid4().hex[:6]
+    corp = Corporation(corporation_name=f"Cert Corp {code}", corporation_type="KK")
+    muni = MunicipalityMaster(municipality_code=code, name=f"Cert City {code}")
+    stype_a = ServiceTypeMaster(name=f"Cert Service A {code}", service_code=f"A{code}", required_review_months=6)
+    stype_b = ServiceTypeMaster(name=f"Cert Service B {code}", service_code=f"B{code}", required_review_months=6)
+    status = StatusMaster(name=f"Cert Status {code}")
+    db.session.add_all([corp, muni, stype_a, stype_b, status])
+    db.session.flush()
+    office = OfficeSetting(corporation_id=corp.id, office_name=f"Cert Office {code}", municipality_id=muni.id)
+    db.session.add(office)
+    db.session.flush()
+    config = OfficeServiceConfiguration(office_id=office.id, service_type_master_id=stype_a.id,
+                                        jigyosho_bango=uuid.uuid4().hex[:10], capacity=20)
+    user = User(display_name=f"Cert User {code}", status_id=status.id)
+    db.session.add_all([config, user])
+    db.session.flush()
+    return user, muni, config, stype_a, stype_b
+
+
+def _add_cert(user, muni, config, grants, status='ACTIVE'):
+    cert = ServiceCertificate(user_id=user.id, certificate_issue_date=date(2025, 1, 1), municipality_master_id=muni.id,
+                              office_service_configuration_id=config.id, status=status)
+    db.session.add(cert)
+    db.session.flush()
+    for stype, start, end in grants:
+        db.session.add(GrantedService(certificate_id=cert.id, service_type_master_id=stype.id,
+                                      granted_start_date=start, granted_end_date=end))
+    db.session.flush()
+    return cert
+
+
+def test_granted_interval_index_finds_nested_and_boundary_overlaps():
+    """開始日順で手前にある長い区間や、境界日だけが重なる区間も検出するかテスト"""
+    index = GrantedIntervalIndex()
+    intervals = [
+        (1, date(2025, 1, 1), date(2025, 12, 31)),
+        (2, date(2025, 2, 1), date(2025, 2, 10)),
+        (3, date(2025, 6, 1), date(2025, 6, 30)),
+    ]
+    for cert_id, start, end in intervals:
+        index.add(10, GrantedService(certificate_id=cert_id, service_type_master_id=5,
+                                     granted_start_date=start, granted_end_date=end))
+
+    assert index.overlapping(10, 5, date(2025, 3, 1), date(2025, 3, 5)) == {1}
+    assert index.overlapping(10, 5, date(2025, 6, 30), date(2026, 1, 31)) == {1, 3}
+    assert index.overlapping(10, 5, date(2024, 1, 1), date(2024, 12, 31)) == set()
+    assert index.overlapping(10, 6, date(2025, 1, 1), date(2025, 12, 31)) == set()
+    assert index.overlapping(11, 5, date(2025, 1, 1), date(2025, 12, 31)) == set()
+
+
+def test_find_overlapping_active_matches_same_service_type_only(app):
+    """同じサービス種類で期間が重なる ACTIVE の受給者証だけを返すかテスト"""
+    with app.app_context():
+        user, muni, config, stype_a, stype_b = _setup_user()
+        overlapping = _add_cert(user, muni, config, [(stype_a, date(2025, 1, 1), date(2025, 3, 31))])
+        _add_cert(user, muni, config, [(stype_a, date(2025, 6, 1), date(2025, 12, 31))])
+        _add_cert(user, muni, config, [(stype_b, date(2025, 1, 1), date(2025, 12, 31))])
+        _add_cert(user, muni, config, [(stype_a, date(2025, 1, 1), date(2025, 12, 31))], status='VOIDED')
+        new_cert = _add_cert(user, muni, config, [(stype_a, date(2025, 3, 31), date(2025, 4, 30))], status='PENDING_REVIEW')
+
+        assert [c.id for c in CertificateRepository.find_overlapping_active(new_cert)] == [overlapping.id]
+        db.session.rollback()
+
+
+def test_load_graphs_uses_fixed_number_of_queries(app):
+    """受給者証の件数によらず、子レコードをテーブルごとに1クエリで読み込むかテスト"""
+    with app.app_context():
+        user, muni, config, stype_a, _ = _setup_user()
+        for i in range(12):
+            cert = _add_cert(user, muni, config, [(stype_a, date(2025, 1, 1), date(2025, 12, 31))])
+            gs = GrantedService.query.filter_by(certificate_id=cert.id).one()
+            db.session.add_all([
+                ContractReportDetail(granted_service_id=gs.id, office_service_configuration_id=config.id),
+                CopaymentLimit(certificate_id=cert.id, limit_start_date=date(2025, 1, 1), limit_end_date=date(2025, 12, 31), limit_amount=9300),
+                MealAddonStatus(certificate_id=cert.id, meal_addon_start_date=date(2025, 1, 1), meal_addon_end_date=date(2025, 12, 31), is_applicable=True),
+            ])
+        db.session.flush()
+
+        with QueryCounter(db.engine) as counter:
+            graphs = CertificateRepository.for_user(user.id)
+            for graph in graphs:
+                for gs in graph.granted_services:
+                    assert graph.contract_details[gs.id].office_service_configuration_id == config.id
+                assert len(graph.copayment_limits) == 1
+                assert len(graph.meal_addon_statuses) == 1
+                assert graph.copayment_managements == []
+
+        assert len(graphs) == 12
+        # 受給者証 + 支給決定 + 契約内容 + 負担上限 + 食事加算 + 上限管理
+        assert counter.count == 6
+        db.session.rollback()
@@ -0,0 +1,118 @@
+# backend/tests/test_copayment_allocation.py
+
+import uuid
+from datetime import date
+from decimal import Decimal
+
+from backend.app import db
+from backend.app.models import (
+    BillingData, ClientInvoice, Corporation, CopaymentManagement, MonthlyBillingSummary, MunicipalityMaster,
+    OfficeServiceConfiguration, OfficeSetting, ServiceCertificate, ServiceTypeMaster, StatusMaster, User
+)
+from backend.app.models.core.service_certificate import CopaymentLimit
+from backend.app.services.copayment_allocation_service import CopaymentAllocator, PeriodIndex
+
+
+def _setup_two_offices():
+    """
+    法人の同じサービス種類の2事業所を利用する利用者（上限1,000円、上限管理は後から利用を始めた事業所B）と、
+    上限管理の登録がないまま2事業所を利用する利用者
+    """
+    code = uuid.uuid4().hex[:6]
+    corp = Corporation(corporation_name=f"Copay Corp {code}", corporation_type="KK")
+    muni = MunicipalityMaster(municipality_code=code, name=f"Copay City {code}")
+    status = StatusMaster(name=f"Copay Status {code}")
+    db.session.add_all([corp, muni, status])
+    db.session.flush()
+
+    stype = ServiceTypeMaster(name=f"Copay Service {code}", service_code=f"C{code}")
+    db.session.add(stype)
+    services = []
+    for label in ("A", "B"):
+        office = OfficeSetting(corporation_id=corp.id, office_name=f"Copay Office {label} {code}", municipality_id=muni.id)
+        db.session.add(office)
+        db.session.flush()
+        osc = OfficeServiceConfiguration(office_id=office.id, service_type_master_id=stype.id,
+                                         jigyosho_bango=f"{label}{uuid.uuid4().hex[:9]}", capacity=20)
+        db.session.add(osc)
+        db.session.flush()
+        services.append(osc)
+    osc_a, osc_b = services
+
+    managed, unmanaged = users = [User(display_name=f"Copay User {i} {code}", status_id=status.id) for i in range(2)]
+    db.session.add_all(users)
+    db.session.flush()
+    for user in users:
+        cert = ServiceCertificate(user_id=user.id, certificate_issue_date=date(2025, 1, 1), municipality_master_id=muni.id,
+                                  office_service_configuration_id=osc_a.id, status='ACTIVE')
+        db.session.add(cert)
+        db.session.flush()
+        db.session.add_all([
+            # 年度途中で上限額が変わった場合は対象月に掛かる新しい期間を使う
+            CopaymentLimit(certificate_id=cert.id, limit_start_date=date(2024, 4, 1), limit_end_date=date(2025, 3, 31),
+                           limit_amount=9300),
+            CopaymentLimit(certificate_id=cert.id, limit_start_date=date(2025, 4, 1), limit_end_date=date(2026, 3, 31),
+                           limit_amount=1000),
+        ])
+        if user is managed:
+            db.session.add(CopaymentManagement(certificate_id=cert.id, management_start_date=date(2025, 4, 1),
+                                               management_end_date=date(2026, 3, 31), is_applicable=True,
+                                               managing_office_number=osc_b.jigyosho_bango))
+        # 事業所A: 6/2から 8,000円（1割 800円）、事業所B: 6/9から 6,000円（1割 600円）
+        for osc, day, cost in [(osc_a, 2, 5000), (osc_a, 3, 3000), (osc_b, 9, 6000)]:
+            db.session.add(BillingData(user_id=user.id, office_service_configuration_id=osc.id,
+                                       service_type=stype.service_code, billing_date=date(2025, 6, day),
+                                       unit_count=cost // 10, cost=cost))
+        for osc in (osc_a, osc_b):
+            db.session.add(MonthlyBillingSummary(user_id=user.id, office_service_configuration_id=osc.id,
+                                                 billing_month=date(2025, 6, 1), total_units_claimed=0, claim_amount=0))
+    db.session.commit()
+    return corp.id, osc_a.id, osc_b.id, managed.id, unmanaged.id
+
+
+def test_period_index_picks_latest_covering_period():
+    index = PeriodIndex([
+        (1, date(2025, 4, 1), date(2026, 3, 31), "A"),
+        (1, date(2025, 6, 15), date(2025, 6, 30), "B"),
+        (2, date(2025, 1, 1), date(2025, 5, 31), "C"),
+    ])
+    assert index.covering(1, date(2025, 6, 1), date(2025, 6, 30)) == "B"
+    assert index.covering(1, date(2025, 7, 1), date(2025, 7, 31)) == "A"
+    assert index.covering(2, date(2025, 6, 1), date(2025, 6, 30)) is None
+    assert index.covering(3, date(2025, 6, 1), date(2025, 6, 30)) is None
+
+
+def test_allocation_fills_managing_office_first(app):
+    """上限管理事業所の負担を先に充て、残りを他の事業所に按分して事業所ごとの請求書に書き込む"""
+    with app.app_context():
+        corp_id, osc_a, osc_b, managed_id, unmanaged_id = _setup_two_offices()
+
+        result = CopaymentAllocator(corp_id, 2025, 6).run()
+        db.session.commit()
+
+        def self_pay(user_id):
+            return {
+                i.office_service_configuration_id: i.self_pay_amount
+                for i in ClientInvoice.query.filter_by(user_id=user_id, billing_month=date(2025, 6, 1))
+            }
+
+        assert self_pay(managed_id) == {osc_b: Decimal("600"), osc_a: Decimal("400")}
+        # 上限管理の登録がなければ各事業所で上限までとし、合計の超過を警告する
+        assert self_pay(unmanaged_id) == {osc_a: Decimal("800"), osc_b: Decimal("600")}
+        assert result["warnings"] == [{"code": "MANAGEMENT_NOT_REGISTERED", "user_id": unmanaged_id}]
+        assert len(result["diff"]["added"]) == 4
+
+        # 入金済みの請求書は変更せず、再実行では他に差分が出ない
+        invoice = ClientInvoice.query.filter_by(user_id=unmanaged_id, office_service_configuration_id=osc_b).one()
+        invoice.payment_status = 'PAID'
+        db.session.add(CopaymentManagement(
+            certificate_id=ServiceCertificate.query.filter_by(user_id=unmanaged_id).one().id,
+            management_start_date=date(2025, 6, 1), management_end_date=date(2026, 3, 31), is_applicable=True,
+            managing_office_number=db.session.get(OfficeServiceConfiguration, osc_a).jigyosho_bango,
+        ))
+        db.session.commit()
+        rerun = CopaymentAllocator(corp_id, 2025, 6).run()
+        db.session.commit()
+        assert [e["office_service_configuration_id"] for e in rerun["diff"]["locked"]] == [osc_b]
+        assert rerun["diff"]["unchanged"] == 3
+        assert self_pay(unmanaged_id)[osc_b] == Decimal("600")
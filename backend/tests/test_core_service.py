@@ -7,7 +7,9 @@ from backend.app.models import (
     MunicipalityMaster, ServiceTypeMaster, StatusMaster,
     User, ServiceCertificate, GrantedService, ContractReportDetail
 )
-from backend.app.services.core_service import get_corporation_id_for_user
+from backend.app.services.core_service import get_corporation_id_for_user, reconcile_keyed
+from backend.app.models import Supporter, EmploymentShiftPattern
+import uuid
 
 def test_get_corporation_id_for_user(app):
     """
@@ -65,4 +67,53 @@ def test_get_corporation_id_for_user(app):
         result_id = get_corporation_id_for_user(user)
 
         # 4. 判定: 期待通り 999 が返ってくるか？
-        assert result_id == 999
\ No newline at end of file
+        assert result_id == 999
+
+
+def test_reconcile_keyed_returns_change_set(app):
+    """
+    キーで突き合わせて追加・更新・削除を一度に適用し、変更内容を監査用に返すかテスト
+    """
+    with app.app_context():
+        staff = Supporter(
+            staff_code=f"S_RCN_{uuid.uuid4().hex[:6]}", last_name="整合", first_name="太郎",
+            last_name_kana="セイゴウ", first_name_kana="タロウ",
+            employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2025, 1, 1)
+        )
+        for day in ("Monday", "Tuesday", "Wednesday"):
+            staff.shift_patterns.append(EmploymentShiftPattern(day_of_week=day, start_time="09:00", end_time="18:00", break_minutes=60))
+        db.session.add(staff)
+        db.session.commit()
+        ids = {p.day_of_week: p.id for p in staff.shift_patterns}
+
+        def update_shift(item, incoming):
+            item.supporter_id = staff.id
+            item.day_of_week = incoming['day_of_week']
+            item.start_time = incoming.get('start_time')
+            item.end_time = incoming.get('end_time')
+            item.break_minutes = int(incoming.get('break_minutes', 0))
+
+        change_set = reconcile_keyed(
+            staff.shift_patterns,
+            [
+                {"day_of_week": "Monday", "start_time": "09:00", "end_time": "18:00", "break_minutes": 60},
+                {"day_of_week": "Tuesday", "start_time": "10:00", "end_time": "18:00", "break_minutes": 60},
+                {"day_of_week": "Friday", "start_time": "09:00", "end_time": "13:00"},
+            ],
+            EmploymentShiftPattern,
+            db.session,
+            lambda existing: existing.day_of_week,
+            lambda incoming: incoming['day_of_week'],
+            update_shift
+        )
+        db.session.commit()
+
+        audit = change_set.to_audit_dict()
+        assert audit["table"] == "employment_shift_patterns"
+        assert audit["updated"] == [{"id": ids["Tuesday"], "fields": ["start_time"]}]
+        assert audit["deleted"] == [ids["Wednesday"]]
+        assert len(audit["inserted"]) == 1 and audit["inserted"][0] is not None
+        assert [p.id for p in change_set.unchanged] == [ids["Monday"]]
+
+        db.session.refresh(staff)
+        assert sorted(p.day_of_week for p in staff.shift_patterns) == ["Friday", "Monday", "Tuesday"]
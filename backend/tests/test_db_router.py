@@ -0,0 +1,133 @@
+# backend/tests/test_db_router.py
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from backend.app import create_app, db
+from backend.app.models import StatusMaster, ReplicaHeartbeat
+from backend.app.services.db_router_service import DatabaseRouter
+from backend.tests.conftest import TestConfig
+
+
+@pytest.fixture
+def routed_app(tmp_path):
+    """プライマリとレプリカを別々のSQLiteファイルにしたアプリ（レプリケーションはテスト側で行う）"""
+    class RoutedConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        DATABASE_REPLICA_URLS = [f"sqlite:///{tmp_path / 'replica.db'}"]
+        DB_REPLICA_CHECK_SECONDS = 0
+        DB_REPLICA_MAX_LAG_SECONDS = 5
+        DB_REPLICA_STICKY_SECONDS = 30
+
+    app = create_app(RoutedConfig)
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(DatabaseRouter.get(app).engines['replica_1'])
+        with db.engine.begin() as conn:
+            conn.execute(StatusMaster.__table__.insert().values(name='on-primary'))
+        with DatabaseRouter.get(app).engines['replica_1'].begin() as conn:
+            conn.execute(StatusMaster.__table__.insert().values(name='on-replica'))
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+        for engine in DatabaseRouter.get(app).engines.values():
+            engine.dispose()
+
+
+def _replicate_heartbeat(app, shift=timedelta(0)):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            beat = conn.execute(select(ReplicaHeartbeat.__table__)).mappings().first()
+        with DatabaseRouter.get(app).engines['replica_1'].begin() as conn:
+            conn.execute(ReplicaHeartbeat.__table__.delete())
+            if beat:
+                conn.execute(ReplicaHeartbeat.__table__.insert().values(id=1, beat_at=beat['beat_at'] + shift))
+
+
+def _read_status_names():
+    return [s.name for s in StatusMaster.query.order_by(StatusMaster.id)]
+
+
+def _run(app, method='GET', cookies=None, write=False):
+    """リクエストの前後処理を通して、読み取った値・応答・振り分けを返す"""
+    router = DatabaseRouter.get(app)
+    with app.test_request_context('/probe', method=method, headers={'Cookie': cookies} if cookies else None):
+        router.begin()
+        names = _read_status_names()
+        if write:
+            db.session.add(StatusMaster(name='written'))
+            db.session.flush()
+            names = _read_status_names()
+        response = router.finish(app.response_class('ok'))
+        db.session.rollback()
+        db.session.remove()
+    return names, response
+
+
+def test_get_reads_from_replica_and_post_from_primary(routed_app):
+    """GETはレプリカ、それ以外はプライマリで読み取るかテスト"""
+    _run(routed_app)  # 初回のハートビート
+    _replicate_heartbeat(routed_app)
+
+    names, response = _run(routed_app)
+    assert names == ['on-replica']
+    assert response.headers[DatabaseRouter.BIND_HEADER] == 'replica_1'
+
+    names, response = _run(routed_app, method='POST')
+    assert names == ['on-primary']
+    assert response.headers[DatabaseRouter.BIND_HEADER] == 'primary'
+
+
+def test_write_pins_reads_to_primary(routed_app):
+    """書き込んだリクエストの以降の読み取りと、Cookie を返したクライアントの読み取りがプライマリになるかテスト"""
+    _run(routed_app)
+    _replicate_heartbeat(routed_app)
+
+    names, response = _run(routed_app, write=True)
+    assert names == ['on-primary', 'written']
+    cookie = response.headers['Set-Cookie'].split(';', 1)[0]
+    assert cookie.startswith(DatabaseRouter.STICKY_COOKIE + '=')
+
+    _replicate_heartbeat(routed_app)
+    names, _ = _run(routed_app, cookies=cookie)
+    assert names == ['on-primary']
+    names, _ = _run(routed_app)
+    assert names == ['on-replica']
+
+
+def test_lagging_replica_falls_back_to_primary(routed_app):
+    """ハートビートが遅れているレプリカ・接続できないレプリカを使わないかテスト"""
+    _run(routed_app)
+    _run(routed_app)
+    _replicate_heartbeat(routed_app, shift=timedelta(seconds=-60))
+
+    names, response = _run(routed_app)
+    assert names == ['on-primary']
+
+    with routed_app.app_context():
+        router = DatabaseRouter.get(routed_app)
+        metrics = router.metrics()
+        assert metrics["binds"]["replica_1"]["lag_seconds"] >= 60
+        assert metrics["decisions"]["primary:lag"] >= 1
+        assert metrics["binds"]["primary"]["reads"] >= 1
+
+        ReplicaHeartbeat.__table__.drop(router.engines['replica_1'])
+        router.check_replicas()
+        assert router.choose_replica() == (None, 'unavailable')
+        assert router.metrics()["binds"]["replica_1"]["reachable"] is False
+
+
+def test_replica_reads_for_jobs(routed_app):
+    """リクエスト外の処理でもレプリカで読み取れるかテスト"""
+    with routed_app.app_context():
+        DatabaseRouter.get(routed_app).check_replicas()
+    _replicate_heartbeat(routed_app)
+    with routed_app.app_context():
+        with DatabaseRouter.replica_reads():
+            assert _read_status_names() == ['on-replica']
+        db.session.remove()
+        assert _read_status_names() == ['on-primary']
+        db.session.remove()
@@ -0,0 +1,145 @@
+# backend/tests/test_deduction_risk_scanner.py
+
+import uuid
+from datetime import date, datetime
+
+from backend.app import db
+from backend.app.models import (
+    AttendanceRecord, CaseConferenceLog, ComplianceEventLog, Corporation, GrantedService, MonitoringReport,
+    MunicipalityMaster, OfficeServiceConfiguration, OfficeSetting, ServiceCertificate, ServiceTypeMaster,
+    StatusMaster, SupportPlan, Supporter, UnresolvedRiskCounter, User
+)
+from backend.app.services.deduction_risk_scanner_service import DeductionRiskScanner
+
+SCAN_DATE = date(2025, 6, 16)
+
+
+def _supporter(office_id, label):
+    staff = Supporter(staff_code=f"DR{uuid.uuid4().hex[:6]}", last_name=label, first_name="職員",
+                      last_name_kana="ゲンサン", first_name_kana="ショクイン", office_id=office_id,
+                      employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2024, 4, 1))
+    db.session.add(staff)
+    db.session.flush()
+    return staff
+
+
+def _setup_office():
+    """
+    計画なし / 期限切れの計画のみ / モニタリング・担当者会議のない計画 / 要件を満たす計画 の利用者4名
+    """
+    code = uuid.uuid4().hex[:6]
+    corp = Corporation(corporation_name=f"Risk Corp {code}", corporation_type="KK")
+    muni = MunicipalityMaster(municipality_code=code, name=f"Risk City {code}")
+    status = StatusMaster(name=f"Risk Status {code}")
+    stype = ServiceTypeMaster(name=f"Risk Service {code}", service_code=f"R{code}")
+    db.session.add_all([corp, muni, status, stype])
+    db.session.flush()
+    office = OfficeSetting(corporation_id=corp.id, office_name=f"Risk Office {code}", municipality_id=muni.id)
+    db.session.add(office)
+    db.session.flush()
+    manager = _supporter(office.id, "管理")
+    primary = _supporter(office.id, "担当")
+    osc = OfficeServiceConfiguration(office_id=office.id, service_type_master_id=stype.id,
+                                     jigyosho_bango=uuid.uuid4().hex[:10], capacity=20,
+                                     manager_supporter_id=manager.id)
+    db.session.add(osc)
+    db.session.flush()
+
+    users = [User(display_name=f"Risk User {i} {code}", status_id=status.id) for i in range(4)]
+    users[0].primary_supporter_id = primary.id
+    db.session.add_all(users)
+    db.session.flush()
+    for user in users:
+        cert = ServiceCertificate(user_id=user.id, certificate_issue_date=date(2024, 1, 1), municipality_master_id=muni.id,
+                                  office_service_configuration_id=osc.id, status='ACTIVE')
+        db.session.add(cert)
+        db.session.flush()
+        db.session.add(GrantedService(certificate_id=cert.id, service_type_master_id=stype.id,
+                                      granted_start_date=date(2025, 1, 1), granted_end_date=date(2025, 12, 31),
+                                      max_service_days=23))
+
+    _, expired, stale, healthy = users
+    db.session.add(SupportPlan(user_id=expired.id, plan_status='ARCHIVED', plan_start_date=date(2024, 6, 1),
+                               plan_end_date=date(2025, 5, 31)))
+    stale_plan = SupportPlan(user_id=stale.id, plan_status='ACTIVE', plan_start_date=date(2024, 10, 1),
+                             plan_end_date=date(2025, 9, 30))
+    healthy_plan = SupportPlan(user_id=healthy.id, plan_status='ACTIVE', plan_start_date=date(2024, 10, 1),
+                               plan_end_date=date(2025, 9, 30))
+    db.session.add_all([stale_plan, healthy_plan])
+    db.session.flush()
+    db.session.add_all([
+        MonitoringReport(support_plan_id=healthy_plan.id, supporter_id=manager.id, report_date=date(2025, 4, 1),
+                         monitoring_summary="順調"),
+        CaseConferenceLog(initiator_supporter_id=manager.id, user_id=healthy.id, concern_summary="計画作成",
+                          agreed_action="計画どおり支援", support_plan_id=healthy_plan.id,
+                          conference_datetime=datetime(2024, 9, 25, 10, 0)),
+    ])
+    db.session.commit()
+    return office, osc, manager.id, primary.id, [u.id for u in users]
+
+
+def _events(user_ids):
+    return {
+        (e.user_id, e.event_type): (e.start_date, e.end_date)
+        for e in ComplianceEventLog.query.filter(ComplianceEventLog.user_id.in_(user_ids))
+    }
+
+
+def _urac(supporter_id):
+    return {r.risk_type: r.cumulative_count for r in UnresolvedRiskCounter.query.filter_by(supporter_id=supporter_id)}
+
+
+def test_scan_records_each_risk_once_per_day(app):
+    """各ルールの検出結果を期間として記録し、同じ日の再実行では何も進めず、翌日は期間を延ばす"""
+    with app.app_context():
+        _, _, manager_id, primary_id, (missing, expired, stale, healthy) = _setup_office()
+
+        DeductionRiskScanner(SCAN_DATE).run()
+        db.session.commit()
+        today = (SCAN_DATE, SCAN_DATE)
+        assert _events([missing, expired, stale, healthy]) == {
+            (missing, 'PLAN_UNCREATED_SUBTRACTION'): today,
+            (expired, 'PLAN_UNCREATED_SUBTRACTION'): today,
+            (stale, 'MONITORING_OVERDUE'): today,
+            (stale, 'CASE_CONFERENCE_MISSING'): today,
+        }
+        # 担当職員がいなければサービス管理責任者に計上する
+        assert _urac(primary_id) == {'PLAN_UNCREATED': 1}
+        assert _urac(manager_id) == {'PLAN_EXPIRED': 1, 'MONITORING_OVERDUE': 1, 'CASE_CONFERENCE_MISSING': 1}
+
+        DeductionRiskScanner(SCAN_DATE).run()
+        db.session.commit()
+        assert _events([missing])[(missing, 'PLAN_UNCREATED_SUBTRACTION')] == today
+        assert _urac(primary_id) == {'PLAN_UNCREATED': 1}
+
+        # 計画を作成した利用者の期間は終わり、残りは翌日まで延びる
+        db.session.add(SupportPlan(user_id=missing, plan_status='ACTIVE', plan_start_date=date(2025, 6, 16),
+                                   plan_end_date=date(2025, 12, 15)))
+        db.session.commit()
+        next_day = date(2025, 6, 17)
+        DeductionRiskScanner(next_day).run()
+        db.session.commit()
+        events = _events([missing, expired])
+        assert events[(missing, 'PLAN_UNCREATED_SUBTRACTION')] == today
+        assert events[(expired, 'PLAN_UNCREATED_SUBTRACTION')] == (SCAN_DATE, next_day)
+        assert _urac(manager_id)['PLAN_EXPIRED'] == 2
+        # 新しい計画には担当者会議の記録がまだない
+        assert _events([missing])[(missing, 'CASE_CONFERENCE_MISSING')] == (next_day, next_day)
+
+
+def test_staffing_shortfall_is_recorded_for_office_users(app):
+    """前日に職員のいない時間帯に利用者が在所していれば、事業所の利用者全員に人員欠如のリスクを記録する"""
+    with app.app_context():
+        _, _, manager_id, _, user_ids = _setup_office()
+        db.session.add_all([
+            AttendanceRecord(user_id=user_ids[3], record_type='CHECK_IN', timestamp=datetime(2025, 6, 15, 10, 0)),
+            AttendanceRecord(user_id=user_ids[3], record_type='CHECK_OUT', timestamp=datetime(2025, 6, 15, 12, 0)),
+        ])
+        db.session.commit()
+
+        result = DeductionRiskScanner(SCAN_DATE).run()
+        db.session.commit()
+        events = _events(user_ids)
+        assert all(events[(u, 'STAFFING_SHORTFALL_SUBTRACTION')] == (SCAN_DATE, SCAN_DATE) for u in user_ids)
+        assert _urac(manager_id)['STAFFING_SHORTFALL'] == 4
+        assert result["findings"]["STAFFING_SHORTFALL"] >= 4
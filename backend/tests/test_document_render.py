@@ -0,0 +1,125 @@
+# backend/tests/test_document_render.py
+
+import os
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from backend.app import db
+from backend.app.models import ClientInvoice, OfficeSetting, RoleMaster, Supporter
+from backend.app.services.copayment_allocation_service import CopaymentAllocator
+from backend.app.services.document_render_service import DocumentRenderer
+from backend.tests.test_copayment_allocation import _setup_two_offices
+
+
+@pytest.fixture
+def storage_dir(app, tmp_path):
+    previous = app.config['DOCUMENT_STORAGE_DIR']
+    app.config['DOCUMENT_STORAGE_DIR'] = str(tmp_path)
+    yield tmp_path
+    app.config['DOCUMENT_STORAGE_DIR'] = previous
+
+
+def _invoiced_month():
+    corp_id, osc_a, osc_b, managed_id, unmanaged_id = _setup_two_offices()
+    CopaymentAllocator(corp_id, 2025, 6).run()
+    db.session.commit()
+    paid = ClientInvoice.query.filter_by(user_id=managed_id, office_service_configuration_id=osc_b).one()
+    paid.payment_status = 'PAID'
+    paid.payment_date = date(2025, 7, 10)
+    db.session.commit()
+    return corp_id, paid.id
+
+
+def _local_path(storage_dir, url):
+    return os.path.join(storage_dir, *url.split('/')[-3:])
+
+
+def _billing_admin_token(corp_id):
+    office = OfficeSetting.query.filter_by(corporation_id=corp_id).order_by(OfficeSetting.id).first()
+    staff = Supporter(staff_code=f"DOC{uuid.uuid4().hex[:6]}", last_name="帳票", first_name="担当",
+                      last_name_kana="チョウヒョウ", first_name_kana="タントウ", office_id=office.id,
+                      employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2024, 4, 1))
+    staff.roles.append(RoleMaster(name=f"Doc Admin {uuid.uuid4().hex[:6]}", role_scope='CORPORATE', is_admin=True))
+    db.session.add(staff)
+    db.session.commit()
+    return create_access_token(identity=f"staff:{staff.id}")
+
+
+def test_documents_are_rendered_once_per_content(app, storage_dir):
+    """請求書4件と入金済み1件の領収証を描画し、内容が変わらなければ再実行で描画しない"""
+    with app.app_context():
+        corp_id, paid_id = _invoiced_month()
+
+        first = DocumentRenderer(corp_id, 2025, 6).run()
+        db.session.commit()
+        assert first["documents"] == {"invoice": 4, "receipt": 1}
+        assert (first["rendered"], first["urls_updated"]) == (5, 5)
+
+        paid = db.session.get(ClientInvoice, paid_id)
+        assert paid.invoice_pdf_url != paid.receipt_pdf_url
+        receipt = open(_local_path(storage_dir, paid.receipt_pdf_url), encoding='utf-8').read()
+        assert "領収証" in receipt and "600円" in receipt and "2025-07-10" in receipt
+
+        second = DocumentRenderer(corp_id, 2025, 6).run()
+        db.session.commit()
+        assert (second["rendered"], second["reused"], second["urls_updated"]) == (0, 5, 0)
+
+        # 金額が変わった請求書だけを描画し直し、以前のファイルはそのまま残す
+        previous_url = paid.invoice_pdf_url
+        paid.actual_cost_amount = Decimal("500")
+        paid.total_amount = Decimal("1100")
+        db.session.commit()
+        third = DocumentRenderer(corp_id, 2025, 6).run()
+        db.session.commit()
+        assert (third["rendered"], third["urls_updated"]) == (2, 2)
+        assert db.session.get(ClientInvoice, paid_id).invoice_pdf_url != previous_url
+        assert os.path.exists(_local_path(storage_dir, previous_url))
+
+
+def test_process_pool_output_matches_inline(app, storage_dir, tmp_path_factory):
+    """ワーカープロセスで描画しても同じファイル名・同じ内容になる"""
+    with app.app_context():
+        corp_id, paid_id = _invoiced_month()
+        DocumentRenderer(corp_id, 2025, 6).run()
+        db.session.commit()
+        inline_url = db.session.get(ClientInvoice, paid_id).invoice_pdf_url
+        inline_body = open(_local_path(storage_dir, inline_url), 'rb').read()
+
+        pooled_dir = tmp_path_factory.mktemp("pooled")
+        threshold = app.config['DOCUMENT_RENDER_INLINE_THRESHOLD']
+        app.config['DOCUMENT_STORAGE_DIR'] = str(pooled_dir)
+        app.config['DOCUMENT_RENDER_INLINE_THRESHOLD'] = 0
+        try:
+            result = DocumentRenderer(corp_id, 2025, 6, workers=2).run()
+        finally:
+            app.config['DOCUMENT_RENDER_INLINE_THRESHOLD'] = threshold
+        db.session.commit()
+        assert (result["rendered"], result["urls_updated"]) == (5, 0)
+        assert open(_local_path(pooled_dir, inline_url), 'rb').read() == inline_body
+
+
+def test_documents_are_served_only_to_their_corporation(client, app, storage_dir):
+    """帳票は認証した操作者の法人のものだけを返し、他法人の操作者や未登録のファイル名には 404 を返す"""
+    with app.app_context():
+        corp_id, paid_id = _invoiced_month()
+        DocumentRenderer(corp_id, 2025, 6).run()
+        db.session.commit()
+        url = db.session.get(ClientInvoice, paid_id).receipt_pdf_url
+        owner = _billing_admin_token(corp_id)
+        other_corp_id, _ = _invoiced_month()
+        outsider = _billing_admin_token(other_corp_id)
+
+    assert url.startswith('/api/billing/documents/receipt/')
+    assert client.get(url).status_code == 401
+    response = client.get(url, headers={'Authorization': f'Bearer {owner}'})
+    assert response.status_code == 200
+    assert "領収証" in response.get_data(as_text=True)
+    assert response.headers['Cache-Control'] == 'private, no-store'
+    assert client.get(url, headers={'Authorization': f'Bearer {outsider}'}).status_code == 404
+
+    unknown = '/api/billing/documents/receipt/00/' + '0' * 64 + '.html'
+    assert client.get(unknown, headers={'Authorization': f'Bearer {owner}'}).status_code == 404
@@ -0,0 +1,89 @@
+# backend/tests/test_fee_catalog.py
+
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import event, update
+
+from backend.app import db
+from backend.app.models import GovernmentFeeMaster, ServiceUnitMaster
+from backend.app.services.fee_catalog_service import FeeCatalog
+
+
+def _unit(service_type, units, start, end, committed):
+    return ServiceUnitMaster(service_type=service_type, unit_count=units, unit_price=10, start_date=start, end_date=end,
+                             responsible_id=1, commit_timestamp=committed)
+
+
+def test_price_lookup_resolves_overlapping_revisions(app):
+    """重なる期間は後から登録した行を採用し、単発参照とまとめての参照が同じ結果になる"""
+    with app.app_context():
+        service_type = f"FC{uuid.uuid4().hex[:6]}"
+        db.session.add_all([
+            _unit(service_type, 500, date(2025, 1, 1), date(2025, 12, 31), datetime(2025, 1, 1)),
+            _unit(service_type, 600, date(2025, 6, 1), date(2025, 6, 30), datetime(2025, 5, 1)),
+            _unit(service_type, 700, date(2026, 4, 1), date(2026, 9, 30), datetime(2026, 3, 1)),
+        ])
+        db.session.commit()
+
+        catalog = FeeCatalog.current()
+        days = [date(2025, 5, 31), date(2025, 6, 1), date(2025, 6, 30), date(2025, 7, 1), date(2026, 1, 1),
+                date(2026, 4, 1), date(2024, 12, 31)]
+        expected = [500, 600, 600, 500, None, 700, None]
+
+        assert [p.unit_count if p else None for p in (catalog.unit_price_at(service_type, d) for d in days)] == expected
+        # 入力の順序によらず同じ位置に結果を返す
+        pairs = [(service_type, d) for d in reversed(days)] + [("UNKNOWN", date(2025, 6, 1))]
+        assert [p.unit_count if p else None for p in catalog.price_many(pairs)] == list(reversed(expected)) + [None]
+        assert catalog.unit_price_at(service_type, date(2025, 6, 15)).unit_price == Decimal(10)
+
+
+def test_catalog_reloads_after_master_commit_only(app):
+    """マスタ変更のコミットで新しいスナップショットに差し替え、変更がなければ追加のクエリを発行しない"""
+    with app.app_context():
+        code = f"FC{uuid.uuid4().hex[:6]}"
+        before = FeeCatalog.current()
+        assert before.fee(code) is None
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            assert FeeCatalog.current() is before
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert statements == []
+
+        db.session.add(GovernmentFeeMaster(name="取消される加算", code=code, category='ADD', units=10,
+                                          calculation_type='ADD_TO_BASE', needs_office_filing=True))
+        db.session.flush()
+        db.session.rollback()
+        assert FeeCatalog.current() is before
+
+        db.session.add(GovernmentFeeMaster(name="新設加算", code=code, category='ADD', units=10,
+                                          calculation_type='ADD_TO_BASE', needs_office_filing=True))
+        db.session.commit()
+        after = FeeCatalog.current()
+        assert after is not before
+        assert after.fee(code).units == 10
+        # 差し替え前のスナップショットは変わらない
+        assert before.fee(code) is None
+
+
+def test_in_place_fee_edit_by_another_process_is_detected(app):
+    """他のプロセスが加算減算マスタを書き換えた場合（世代が進まない）も、確認時に内容の変化で読み直す"""
+    with app.app_context():
+        code = f"FC{uuid.uuid4().hex[:6]}"
+        db.session.add(GovernmentFeeMaster(name="送迎加算", code=code, category='ADD', units=21,
+                                          calculation_type='PER_ACTION', logic_key='TRANSPORT'))
+        db.session.commit()
+        catalog = FeeCatalog(check_seconds=0)
+        assert catalog.snapshot().fee(code).units == 21
+
+        # ORM を通らない更新ではコミット時の世代更新が起きない
+        db.session.execute(update(GovernmentFeeMaster).where(GovernmentFeeMaster.code == code)
+                           .values(units=27, needs_office_filing=True))
+        db.session.commit()
+        fee = catalog.snapshot().fee(code)
+        assert (fee.units, fee.needs_office_filing) == (27, True)
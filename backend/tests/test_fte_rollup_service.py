@@ -0,0 +1,128 @@
+# backend/tests/test_fte_rollup_service.py
+
+import logging
+import uuid
+from datetime import date, datetime
+from backend.app import db
+from backend.app.models import (
+    Corporation, MunicipalityMaster, ServiceTypeMaster, JobTitleMaster, OfficeSetting,
+    OfficeServiceConfiguration, Supporter, SupporterJobAssignment, SupporterTimecard,
+    IntegratedServiceOperation, IntegratedServiceOperationMember
+)
+from backend.app.services.finance_service import FinanceService
+from backend.app.services.fte_rollup_service import FteRollupService
+
+logger = logging.getLogger(__name__)
+
+PERIOD_START = date(2025, 2, 3)
+PERIOD_END = date(2025, 2, 9)
+
+
+def setup_operation():
+    """法人1・事業所1・サービス2 を一体的運営として束ね、各サービスに職員を配置する"""
+    corp = Corporation(corporation_name=f"FTE Corp {uuid.uuid4().hex[:4]}", corporation_type="KK")
+    muni = MunicipalityMaster(municipality_code=uuid.uuid4().hex[:6], name="FTE City")
+    stype = ServiceTypeMaster(name="FTEロールアップ", service_code=f"FR{uuid.uuid4().hex[:4]}")
+    job_title = JobTitleMaster(title_name=f"FTE Staff {uuid.uuid4().hex[:4]}")
+    db.session.add_all([corp, muni, stype, job_title])
+    db.session.flush()
+
+    office = OfficeSetting(corporation_id=corp.id, office_name="FTE Office", municipality_id=muni.id, full_time_weekly_minutes=2400)
+    db.session.add(office)
+    db.session.flush()
+
+    services = []
+    for _ in range(2):
+        osc = OfficeServiceConfiguration(office_id=office.id, service_type_master_id=stype.id, jigyosho_bango=uuid.uuid4().hex[:10], capacity=20)
+        db.session.add(osc)
+        services.append(osc)
+    db.session.flush()
+
+    operation = IntegratedServiceOperation(corporation_id=corp.id, operation_name="一体的運営A", effective_from=date(2025, 1, 1), status='APPROVED')
+    db.session.add(operation)
+    db.session.flush()
+    for osc in services:
+        db.session.add(IntegratedServiceOperationMember(integrated_service_operation_id=operation.id, office_service_configuration_id=osc.id))
+
+    timecards = []
+    for osc, employment_type in zip(services, ["FULL_TIME", "PART_TIME"]):
+        staff = Supporter(
+            staff_code=f"S_FTE_{uuid.uuid4().hex[:6]}", last_name="常勤", first_name="換算",
+            last_name_kana="ジョウキン", first_name_kana="カンサン", office_id=office.id,
+            employment_type=employment_type, weekly_scheduled_minutes=2400, hire_date=date(2025, 1, 1)
+        )
+        db.session.add(staff)
+        db.session.flush()
+        db.session.add(SupporterJobAssignment(
+            supporter_id=staff.id, job_title_id=job_title.id, office_service_configuration_id=osc.id,
+            start_date=date(2025, 1, 1), assigned_minutes=2400
+        ))
+        tc = SupporterTimecard(
+            supporter_id=staff.id, office_service_configuration_id=osc.id, work_date=PERIOD_START,
+            check_in=datetime(2025, 2, 3, 9, 0), check_out=datetime(2025, 2, 3, 13, 0),
+            total_break_minutes=0, deemed_work_minutes=240, sequence_no=1
+        )
+        db.session.add(tc)
+        timecards.append(tc)
+    db.session.commit()
+    return corp, operation, services, timecards
+
+
+def test_rollup_matches_per_service_calculation(app):
+    """一括ロールアップの結果は、サービス単位の calculate_fte_for_service と一致する"""
+    logger.info("🚀 TEST START: 一体的運営のFTEロールアップ")
+    with app.app_context():
+        corp, operation, services, _ = setup_operation()
+
+        result = FteRollupService().rollup_corporation(corp.id, PERIOD_START, PERIOD_END, use_cache=False)
+
+        assert [op["operation_id"] for op in result["operations"]] == [operation.id]
+        members = {m["office_service_configuration_id"]: m["fte"] for m in result["operations"][0]["members"]}
+        finance = FinanceService()
+        for osc in services:
+            assert members[osc.id] == finance.calculate_fte_for_service(osc.id, PERIOD_START, PERIOD_END)
+        # 常勤専従: (240 + 有給240) / 2400 = 0.2、非常勤: 240 / 2400 = 0.1
+        assert members == {services[0].id: 0.2, services[1].id: 0.1}
+        assert result["total_fte"] == 0.3
+
+
+def test_rollup_cache_is_invalidated_by_timecard_change(app):
+    """同一期間の再計算はキャッシュから返り、勤怠が変わると該当運営だけ再計算される"""
+    with app.app_context():
+        corp, operation, services, timecards = setup_operation()
+        service = FteRollupService()
+
+        first = service.rollup_corporation(corp.id, PERIOD_START, PERIOD_END)
+        cache = FteRollupService.get_cache()
+        assert cache.get(operation.id, PERIOD_START, PERIOD_END) is first["operations"][0]
+        assert service.rollup_corporation(corp.id, PERIOD_START, PERIOD_END)["operations"][0] is first["operations"][0]
+
+        # 非常勤職員の勤務を 8時間に延長 → 480 / 2400 = 0.2
+        timecards[1].check_out = datetime(2025, 2, 3, 17, 0)
+        db.session.commit()
+        assert cache.get(operation.id, PERIOD_START, PERIOD_END) is None
+
+        refreshed = service.rollup_corporation(corp.id, PERIOD_START, PERIOD_END)
+        assert refreshed["total_fte"] == 0.4
+
+
+def test_rollup_cache_is_invalidated_by_employment_type_and_office_standard(app):
+    """常勤専従の判定（雇用形態）や分母（常勤の所定労働時間）が変わっても、該当運営のキャッシュが破棄される"""
+    with app.app_context():
+        corp, operation, services, timecards = setup_operation()
+        service = FteRollupService()
+        cache = FteRollupService.get_cache()
+
+        service.rollup_corporation(corp.id, PERIOD_START, PERIOD_END)
+        full_timer = db.session.get(Supporter, timecards[0].supporter_id)
+        full_timer.employment_type = "PART_TIME"
+        db.session.commit()
+        assert cache.get(operation.id, PERIOD_START, PERIOD_END) is None
+        # 非常勤になったためみなし時間は算入されない: 240 / 2400 + 240 / 2400
+        assert service.rollup_corporation(corp.id, PERIOD_START, PERIOD_END)["total_fte"] == 0.2
+
+        office = services[0].office
+        office.full_time_weekly_minutes = 1200
+        db.session.commit()
+        assert cache.get(operation.id, PERIOD_START, PERIOD_END) is None
+        assert service.rollup_corporation(corp.id, PERIOD_START, PERIOD_END)["total_fte"] == 0.4
@@ -0,0 +1,107 @@
+# backend/tests/test_kiosk_punch_batch.py
+
+from datetime import date, datetime, timedelta
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from backend.app import db
+from backend.app.models import SupporterTimecard
+from backend.app.services.attendance_service import AttendanceService
+from backend.tests.test_presence_service import setup_tenant
+
+NOW = datetime(2025, 6, 2, 18, 0)
+
+
+def corporate_scope(corp):
+    return {'level': 'CORPORATE', 'corp_id': corp.id, 'self_only': False}
+
+
+def punch(staff, action, hours_ago, **extra):
+    return dict(supporter_id=staff.id, action=action, timestamp=(NOW - timedelta(hours=hours_ago)).isoformat(), **extra)
+
+
+def record(scope, office_id, entries):
+    return AttendanceService(db.session).record_punch_batch(office_id, entries, scope, None, now=NOW)
+
+
+def test_batch_punches_use_fixed_number_of_queries(app):
+    """職員数によらず一括で検証・記録し、再送は duplicate として扱う"""
+    with app.app_context():
+        corp, osc, staff = setup_tenant(staff_count=6)
+        scope, office_id = corporate_scope(corp), osc.office_id
+        entries = [punch(s, 'clock_in', 9, client_id=f"in-{s.id}") for s in staff]
+        entries += [punch(s, 'clock_out', 1, break_minutes=60) for s in staff]
+
+        selects = []
+        def count_select(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                selects.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', count_select)
+        try:
+            results = record(scope, office_id, entries)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_select)
+        db.session.commit()
+
+        assert [r["status"] for r in results] == ['ok'] * 12
+        assert results[0]["client_id"] == f"in-{staff[0].id}"
+        # 事業所・職員ロック・打刻・連番・所属の5回（INSERT は flush でまとめて発行される）
+        assert len(selects) == 5
+        timecards = SupporterTimecard.query.filter(SupporterTimecard.supporter_id.in_([s.id for s in staff])).all()
+        assert len(timecards) == 6
+        assert {tc.scheduled_work_minutes for tc in timecards} == {420}
+
+        resent = record(scope, office_id, entries)
+        db.session.commit()
+        assert [r["status"] for r in resent] == ['duplicate'] * 12
+        assert {r["timecard_id"] for r in resent} == {tc.id for tc in timecards}
+
+
+def test_batch_assigns_sequence_numbers_and_rejects_per_entry(app):
+    """同日の複数勤務に連番を振り、不正なエントリだけを拒否する"""
+    with app.app_context():
+        corp, osc, (me, other) = setup_tenant()
+        outsider_corp, _, (outsider,) = setup_tenant(staff_count=1)
+        entries = [
+            punch(me, 'clock_out', 4),  # 時刻順に処理されるため、先の出勤を閉じる
+            punch(me, 'clock_in', 8),
+            punch(me, 'clock_in', 3),
+            punch(me, 'clock_in', 2),  # 勤務中
+            punch(outsider, 'clock_in', 3),
+            punch(other, 'clock_in', 100),
+            punch(other, 'clock_in', -1),
+            dict(supporter_id=other.id, action='lunch', timestamp=NOW.isoformat()),
+        ]
+        results = record(corporate_scope(corp), osc.office_id, entries)
+        db.session.commit()
+
+        assert [r["status"] for r in results] == ['ok', 'ok', 'ok'] + ['error'] * 5
+        assert [results[1]["sequence_no"], results[2]["sequence_no"]] == [1, 2]
+        assert results[0]["timecard_id"] == results[1]["timecard_id"]
+        assert [r["code"] for r in results[3:]] == [409, 403, 400, 400, 400]
+        assert SupporterTimecard.query.filter_by(supporter_id=other.id).count() == 0
+        assert SupporterTimecard.query.filter_by(supporter_id=outsider.id).count() == 0
+
+
+def test_batch_endpoint(client, app):
+    """本人のみのスコープでは他の職員の打刻を拒否し、所属のない職員は 403 になる"""
+    with app.app_context():
+        corp, osc, (me, other) = setup_tenant()
+        token = create_access_token(identity=f"staff:{me.id}", additional_claims={"role_scopes": []})
+        office_id, me_id, other_id = osc.office_id, me.id, other.id
+
+    now = datetime.now()
+    response = client.post('/api/attendance/punches/batch', headers={'Authorization': f'Bearer {token}'}, json={
+        "office_id": office_id,
+        "punches": [
+            {"supporter_id": me_id, "action": "clock_in", "timestamp": (now - timedelta(minutes=5)).isoformat()},
+            {"supporter_id": other_id, "action": "clock_in", "timestamp": now.isoformat()},
+        ],
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["accepted"], body["duplicates"], body["rejected"]) == (1, 0, 1)
+    assert body["results"][1]["code"] == 403
+
+    response = client.post('/api/attendance/punches/batch', headers={'Authorization': f'Bearer {token}'},
+                           json={"office_id": office_id, "punches": []})
+    assert response.status_code == 400
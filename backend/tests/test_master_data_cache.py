@@ -0,0 +1,117 @@
+# backend/tests/test_master_data_cache.py
+
+import uuid
+from datetime import date
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from backend.app import db
+from backend.app.models import PermissionMaster, RoleMaster, StatusMaster, Supporter, User
+from backend.app.services.master_data_service import MasterDataCache
+
+
+class _SelectCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _listener(self, conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._listener)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._listener)
+
+
+def test_masters_endpoint_serves_etag_and_304(client, app):
+    """2回目以降はマスタを読まずに返し、If-None-Match が一致すれば 304、マスタ変更後は新しい ETag になる"""
+    with app.app_context():
+        token = create_access_token(identity="staff:1")
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/api/management/masters', headers=headers)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    with app.app_context():
+        with _SelectCounter(db.engine) as counter:
+            cached = client.get('/api/management/masters', headers=headers)
+            not_modified = client.get('/api/management/masters', headers=dict(headers, **{'If-None-Match': etag}))
+    assert cached.get_json() == first.get_json()
+    assert not_modified.status_code == 304 and not_modified.get_data() == b''
+    assert counter.statements == []
+
+    with app.app_context():
+        from backend.app.models.masters.master_definitions import GenderLegalMaster
+        db.session.add(GenderLegalMaster(name=f"G{uuid.uuid4().hex[:8]}"))
+        db.session.commit()
+    changed = client.get('/api/management/masters', headers=dict(headers, **{'If-None-Match': etag}))
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_name_lookup_and_instance_without_queries(app):
+    """名前からのID参照と関連付け用オブジェクトの取得はキャッシュから行い、ロールバックした変更は取り込まない"""
+    with app.app_context():
+        name = f"Cache Role {uuid.uuid4().hex[:6]}"
+        role = RoleMaster(name=name, role_scope='JOB')
+        db.session.add(role)
+        db.session.commit()
+        role_id = role.id
+        cache = MasterDataCache.get_instance()
+        assert cache.id_for(RoleMaster, name) == role_id
+        db.session.expunge_all()
+
+        with _SelectCounter(db.engine) as counter:
+            assert cache.id_for(RoleMaster, name) == role_id
+            assert cache.get(RoleMaster, role_id)["role_scope"] == 'JOB'
+            attached = cache.instance(RoleMaster, role_id)
+        assert counter.statements == []
+        assert attached in db.session and attached.name == name
+
+        staff = Supporter(staff_code=f"MC{uuid.uuid4().hex[:6]}", last_name="キャッシュ", first_name="確認",
+                          last_name_kana="キャッシュ", first_name_kana="カクニン", employment_type="FULL_TIME",
+                          weekly_scheduled_minutes=2400, hire_date=date(2024, 4, 1))
+        staff.roles = [attached]
+        db.session.add(staff)
+        db.session.commit()
+        assert [r.name for r in db.session.get(Supporter, staff.id).roles] == [name]
+        assert RoleMaster.query.filter_by(name=name).count() == 1
+
+        db.session.add(StatusMaster(name=f"取消 {name}"))
+        db.session.flush()
+        db.session.rollback()
+        assert cache.id_for(StatusMaster, f"取消 {name}") is None
+
+
+def test_create_user_accepts_string_status_id(client, app):
+    """状態IDは文字列で送られても整数として引き、整数に変換できなければ 400 を返す"""
+    with app.app_context():
+        code = uuid.uuid4().hex[:6]
+        status = StatusMaster(name=f"通所中 {code}")
+        permission = PermissionMaster.query.filter_by(name='EDIT_PII').first() or PermissionMaster(name='EDIT_PII')
+        role = RoleMaster(name=f"Cache Editor {code}", role_scope='SYSTEM', is_admin=True)
+        role.permissions.append(permission)
+        staff = Supporter(staff_code=f"MC{code}", last_name="登録", first_name="担当", last_name_kana="トウロク",
+                          first_name_kana="タントウ", employment_type="FULL_TIME", weekly_scheduled_minutes=2400,
+                          hire_date=date(2024, 4, 1))
+        staff.roles.append(role)
+        db.session.add_all([status, staff])
+        db.session.commit()
+        status_id = status.id
+        token = create_access_token(identity=f"staff:{staff.id}")
+    headers = {'Authorization': f'Bearer {token}'}
+
+    created = client.post('/api/users', json={"display_name": f"文字列ID {code}", "status_id": str(status_id)},
+                          headers=headers)
+    assert created.status_code == 201
+    with app.app_context():
+        assert User.query.filter_by(display_name=f"文字列ID {code}").one().status_id == status_id
+
+    invalid = client.post('/api/users', json={"display_name": f"不正ID {code}", "status_id": "abc"}, headers=headers)
+    assert invalid.status_code == 400
@@ -0,0 +1,108 @@
+# backend/tests/test_monthly_activity.py
+
+import uuid
+from datetime import date, datetime
+
+from backend.app import db
+from backend.app.models import (
+    AttendanceRecord, Corporation, MunicipalityMaster, OfficeSetting, StatusMaster, SupportRecord, Supporter, User, UserDailyLog, UserDailySchedule,
+    UserMonthlyActivity
+)
+from backend.app.services.monthly_activity_service import MonthlyActivityRollup
+
+JULY = date(2025, 7, 1)
+AUGUST = date(2025, 8, 1)
+
+
+def _setup_user():
+    code = uuid.uuid4().hex[:6]
+    corp = Corporation(corporation_name=f"Activity Corp {code}", corporation_type="KK")
+    muni = MunicipalityMaster(municipality_code=code, name=f"Activity City {code}")
+    status = StatusMaster(name=f"Activity Status {code}")
+    db.session.add_all([corp, muni, status])
+    db.session.flush()
+    office = OfficeSetting(corporation_id=corp.id, office_name=f"Activity Office {code}", municipality_id=muni.id)
+    db.session.add(office)
+    db.session.flush()
+    user = User(display_name=f"Activity User {code}", status_id=status.id)
+    staff = Supporter(staff_code=f"MA{code}", last_name="集計", first_name="職員", last_name_kana="シュウケイ",
+                      first_name_kana="ショクイン", office_id=office.id,
+                      employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2024, 4, 1))
+    db.session.add_all([user, staff])
+    db.session.commit()
+    return user.id, staff.id
+
+
+def _row(user_id, month):
+    record = UserMonthlyActivity.query.filter_by(user_id=user_id, activity_month=month).one_or_none()
+    if record is None:
+        return None
+    db.session.refresh(record)
+    return (record.attendance_days, record.scheduled_days, record.completed_logs, record.support_minutes,
+            record.off_site_days, record.actual_days, record.usage_days)
+
+
+def test_rollup_follows_writes(app):
+    """打刻・予定・日報・支援記録の書き込みのたびに該当月の行だけが更新される"""
+    with app.app_context():
+        user_id, staff_id = _setup_user()
+        db.session.add_all([
+            AttendanceRecord(user_id=user_id, record_type='CHECK_IN', timestamp=datetime(2025, 7, 1, 10, 0)),
+            AttendanceRecord(user_id=user_id, record_type='CHECK_OUT', timestamp=datetime(2025, 7, 1, 15, 0)),
+            AttendanceRecord(user_id=user_id, record_type='CHECK_IN', timestamp=datetime(2025, 7, 2, 10, 0)),
+            UserDailySchedule(user_id=user_id, date=date(2025, 7, 2), start_time="10:00", end_time="15:00"),
+            UserDailySchedule(user_id=user_id, date=date(2025, 7, 3), start_time="10:00", end_time="15:00"),
+            UserDailySchedule(user_id=user_id, date=date(2025, 7, 4), start_time="10:00", end_time="15:00",
+                              approval_status='CANCELLED'),
+            SupportRecord(user_id=user_id, log_date=date(2025, 7, 1), supporter_id=staff_id, support_content="面談",
+                          support_start_time=datetime(2025, 7, 1, 13, 0), support_end_time=datetime(2025, 7, 1, 13, 45)),
+        ])
+        db.session.commit()
+        # 打刻2日・予定2日（キャンセルは除く）・支援45分、利用日は 7/1・7/2・7/3
+        assert _row(user_id, JULY) == (2, 2, 0, 45, 0, 2, 3)
+
+        off_site = UserDailyLog(user_id=user_id, log_date=date(2025, 7, 8), location_type='OFF_SITE_EXTERNAL',
+                                log_status='COMPLETED', morning_completed=True, support_content_notes="施設外就労")
+        db.session.add(off_site)
+        db.session.commit()
+        assert _row(user_id, JULY) == (2, 2, 1, 45, 1, 3, 4)
+
+        # 月をまたぐ日付の付け替えは両方の月を再集計する
+        off_site.log_date = date(2025, 8, 5)
+        db.session.commit()
+        assert _row(user_id, JULY) == (2, 2, 0, 45, 0, 2, 3)
+        assert _row(user_id, AUGUST) == (0, 0, 1, 0, 1, 1, 1)
+
+        db.session.delete(off_site)
+        db.session.commit()
+        assert _row(user_id, AUGUST) == (0, 0, 0, 0, 0, 0, 0)
+
+        # ロールバックした変更は集計に残らない
+        db.session.add(AttendanceRecord(user_id=user_id, record_type='CHECK_IN', timestamp=datetime(2025, 7, 9, 10, 0)))
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        assert _row(user_id, JULY) == (2, 2, 0, 45, 0, 2, 3)
+
+
+def test_rebuild_month_and_read_through(app):
+    """月単位で作り直すと集計のずれが直り、集計行のない利用者は読み出し時に集計する"""
+    with app.app_context():
+        user_id, _ = _setup_user()
+        other_id, _ = _setup_user()
+        db.session.add(AttendanceRecord(user_id=user_id, record_type='CHECK_IN', timestamp=datetime(2025, 7, 10, 9, 0)))
+        db.session.commit()
+
+        record = UserMonthlyActivity.query.filter_by(user_id=user_id, activity_month=JULY).one()
+        record.attendance_days = 99
+        db.session.commit()
+
+        result = MonthlyActivityRollup().rebuild_month(2025, 7)
+        db.session.commit()
+        assert result["users"] >= 1
+        assert _row(user_id, JULY) == (1, 0, 0, 0, 0, 1, 1)
+
+        activity = MonthlyActivityRollup().get_month([user_id, other_id], 2025, 7)
+        assert activity[user_id]["attendance_days"] == 1
+        assert activity[other_id]["usage_days"] == 0
+        assert _row(other_id, JULY) is None
@@ -0,0 +1,85 @@
+# backend/tests/test_national_claim_csv.py
+
+import hashlib
+import uuid
+from datetime import date
+
+from flask_jwt_extended import create_access_token
+
+from backend.app import db
+from backend.app.models import CopaymentManagement, RoleMaster, ServiceCertificate, ServiceTypeMaster, Supporter
+from backend.app.services.billing_engine_service import MonthlyBillingEngine
+from backend.app.services.national_claim_csv_service import NationalClaimCsvExporter
+from backend.tests.test_billing_engine import _setup_month
+
+
+def _billed_month():
+    corp_id, osc_id, user_id, _, _ = _setup_month()
+    cert = ServiceCertificate.query.filter_by(user_id=user_id).one()
+    cert.recipient_number = "0012345678"
+    db.session.add(CopaymentManagement(certificate_id=cert.id, management_start_date=date(2025, 4, 1),
+                                       management_end_date=date(2026, 3, 31), is_applicable=True,
+                                       managing_office_number="1310000001"))
+    MonthlyBillingEngine(corp_id, 2025, 6).run()
+    db.session.commit()
+    return corp_id, cert
+
+
+def test_csv_records_and_manifest(app):
+    """制御・請求書・明細・エンドの各レコードを cp932 で出力し、manifest の件数・SHA-256 が出力と一致する"""
+    with app.app_context():
+        corp_id, cert = _billed_month()
+        exporter = NationalClaimCsvExporter(corp_id, 2025, 6, created_on=date(2025, 7, 1))
+        body = b''.join(exporter.iter_bytes())
+
+        lines = body.decode('cp932').split('\r\n')
+        assert lines[-1] == ''
+        office_number = cert.managing_service.jigyosho_bango
+        service_code = db.session.get(ServiceTypeMaster, cert.managing_service.service_type_master_id).service_code
+        assert lines[:-1] == [
+            '1,1,0,2,"J1",202506,20250701',
+            f'2,2,"J11",202506,"{office_number}",1,1670,16535',
+            f'2,3,"J12",202506,"{cert.issuance_municipality.municipality_code}","{office_number}","0012345678",'
+            f'"{service_code}",3,"1310000001",1000,1670,16535',
+            '3,4',
+        ]
+        manifest = exporter.manifest
+        assert manifest["record_counts"] == {"control": 1, "J11": 1, "J12": 1, "end": 1}
+        assert (manifest["bytes"], manifest["sha256"]) == (len(body), hashlib.sha256(body).hexdigest())
+        assert manifest["missing_recipient_numbers"] == 0
+
+        # 同じ入力からは同じ内容になる
+        again = NationalClaimCsvExporter(corp_id, 2025, 6, created_on=date(2025, 7, 1)).build_manifest()
+        assert again["sha256"] == manifest["sha256"]
+
+
+def test_csv_download_matches_manifest_endpoint(client, app):
+    with app.app_context():
+        corp_id, cert = _billed_month()
+        staff = Supporter(staff_code=f"CSV{uuid.uuid4().hex[:6]}", last_name="請求", first_name="担当",
+                          last_name_kana="セイキュウ", first_name_kana="タントウ",
+                          office_id=cert.managing_service.office_id, employment_type="FULL_TIME",
+                          weekly_scheduled_minutes=2400, hire_date=date(2024, 4, 1))
+        staff.roles.append(RoleMaster(name=f"CSV Admin {uuid.uuid4().hex[:6]}", role_scope='CORPORATE', is_admin=True))
+        db.session.add(staff)
+        db.session.commit()
+        token = create_access_token(identity=f"staff:{staff.id}")
+
+    headers = {'Authorization': f'Bearer {token}'}
+    download = client.get('/api/billing/national-csv?year=2025&month=6', headers=headers)
+    assert download.status_code == 200
+    assert download.headers['Content-Type'] == 'text/csv; charset=cp932'
+    manifest = client.get('/api/billing/national-csv/manifest?year=2025&month=6', headers=headers).get_json()
+    assert manifest["sha256"] == hashlib.sha256(download.get_data()).hexdigest()
+    assert manifest["total_records"] == 4
+    assert manifest["created_on"] == download.headers['X-Claim-Created-On']
+
+    # 以前の作成日のCSVも、同じ作成日を指定すれば照合できる
+    query = 'year=2025&month=6&created_on=2025-07-01'
+    earlier = client.get(f'/api/billing/national-csv?{query}', headers=headers)
+    assert earlier.get_data().decode('cp932').startswith('1,1,0,2,"J1",202506,20250701')
+    earlier_manifest = client.get(f'/api/billing/national-csv/manifest?{query}', headers=headers).get_json()
+    assert earlier_manifest["sha256"] == hashlib.sha256(earlier.get_data()).hexdigest()
+    assert earlier_manifest["created_on"] == "2025-07-01"
+    bad = client.get('/api/billing/national-csv/manifest?year=2025&month=6&created_on=July', headers=headers)
+    assert bad.status_code == 400
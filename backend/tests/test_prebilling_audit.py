@@ -0,0 +1,101 @@
+# backend/tests/test_prebilling_audit.py
+
+import json
+import uuid
+from datetime import date
+
+from flask_jwt_extended import create_access_token
+
+from backend.app import db
+from backend.app.models import (
+    Corporation, MonthlyBillingSummary, MunicipalityMaster, OfficeServiceConfiguration, OfficeSetting,
+    RoleMaster, ServiceTypeMaster, StatusMaster, SupportPlan, SupportRecord, Supporter, UnresolvedRiskCounter, User
+)
+from backend.app.services.finance_service import FinanceService
+
+
+def _setup_billed_users():
+    """請求対象者3名: 計画・記録あり / 計画なし / 計画期限切れ・記録なし。別法人に計画なしの利用者1名"""
+    code = uuid.uuid4().hex[:6]
+    muni = MunicipalityMaster(municipality_code=code, name=f"Audit City {code}")
+    stype = ServiceTypeMaster(name=f"Audit Service {code}", service_code=f"AU{code}")
+    status = StatusMaster(name=f"Audit Status {code}")
+    db.session.add_all([muni, stype, status])
+    db.session.flush()
+
+    def office_service(label):
+        corp = Corporation(corporation_name=f"Audit Corp {label} {code}", corporation_type="KK")
+        db.session.add(corp)
+        db.session.flush()
+        office = OfficeSetting(corporation_id=corp.id, office_name=f"Audit Office {label}", municipality_id=muni.id)
+        db.session.add(office)
+        db.session.flush()
+        osc = OfficeServiceConfiguration(office_id=office.id, service_type_master_id=stype.id,
+                                         jigyosho_bango=uuid.uuid4().hex[:10], capacity=20)
+        db.session.add(osc)
+        db.session.flush()
+        return corp, office, osc
+
+    corp, office, osc = office_service("main")
+    _, _, other_osc = office_service("other")
+    manager = Supporter(staff_code=f"AUD{code}", last_name="監査", first_name="担当", last_name_kana="カンサ",
+                        first_name_kana="タントウ", office_id=office.id, employment_type="FULL_TIME",
+                        weekly_scheduled_minutes=2400, hire_date=date(2024, 4, 1))
+    db.session.add(manager)
+    db.session.flush()
+
+    users = [User(display_name=f"Audit User {i} {code}", status_id=status.id, primary_supporter_id=manager.id) for i in range(4)]
+    db.session.add_all(users)
+    db.session.flush()
+    ok, no_plan, expired, other_corp = users
+    db.session.add_all([
+        SupportPlan(user_id=ok.id, plan_status='ACTIVE', plan_start_date=date(2025, 4, 1), plan_end_date=date(2025, 9, 30)),
+        SupportPlan(user_id=expired.id, plan_status='ACTIVE', plan_start_date=date(2024, 10, 1), plan_end_date=date(2025, 5, 31)),
+        SupportRecord(user_id=ok.id, log_date=date(2025, 6, 10), supporter_id=manager.id, support_content="面談"),
+        SupportRecord(user_id=no_plan.id, log_date=date(2025, 6, 11), supporter_id=manager.id, support_content="面談"),
+        SupportRecord(user_id=expired.id, log_date=date(2025, 5, 30), supporter_id=manager.id, support_content="面談"),
+    ])
+    for user, service in [(ok, osc), (no_plan, osc), (expired, osc), (other_corp, other_osc)]:
+        db.session.add(MonthlyBillingSummary(user_id=user.id, office_service_configuration_id=service.id,
+                                             billing_month=date(2025, 6, 1), total_units_claimed=100, claim_amount=1000))
+    db.session.commit()
+    return corp.id, manager, no_plan.id, expired.id
+
+
+def test_month_audit_finds_missing_plans_and_records(app):
+    """計画なし・記録なしの請求対象者を抽出し、計画未作成を担当職員ごとにURACへまとめて加算する"""
+    with app.app_context():
+        corp_id, manager, no_plan_id, expired_id = _setup_billed_users()
+
+        report = FinanceService().audit_support_consistency_for_month(corp_id, date(2025, 6, 1))
+        findings = list(report.pop("findings"))
+        db.session.commit()
+
+        assert (report["billed_users"], report["missing_plan"], report["missing_support_records"]) == (3, 2, 1)
+        assert [(f["user_id"], len(f["errors"])) for f in findings] == [(no_plan_id, 1), (expired_id, 2)]
+        counter = UnresolvedRiskCounter.query.filter_by(supporter_id=manager.id, risk_type='PLAN_UNCREATED').one()
+        assert counter.cumulative_count == 2
+
+        # 再実行では既存の行に加算される
+        FinanceService().audit_support_consistency_for_month(corp_id, date(2025, 6, 1))
+        db.session.commit()
+        db.session.refresh(counter)
+        assert counter.cumulative_count == 4
+
+
+def test_pre_audit_endpoint_streams_ndjson(client, app):
+    with app.app_context():
+        corp_id, manager, no_plan_id, expired_id = _setup_billed_users()
+        role = RoleMaster(name=f"Audit Admin {uuid.uuid4().hex[:6]}", role_scope='CORPORATE', is_admin=True)
+        db.session.add(role)
+        manager.roles.append(role)
+        db.session.commit()
+        token = create_access_token(identity=f"staff:{manager.id}")
+
+    response = client.post('/api/billing/pre-audit', headers={'Authorization': f'Bearer {token}'},
+                           json={"year": 2025, "month": 6})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0]["type"] == "summary" and lines[0]["billed_users"] == 3
+    assert [line["user_id"] for line in lines[1:]] == [no_plan_id, expired_id]
@@ -0,0 +1,130 @@
+# backend/tests/test_presence_service.py
+
+import uuid
+from datetime import date, datetime, timedelta
+from flask_jwt_extended import create_access_token
+from backend.app import db
+from backend.app.models import (
+    Corporation, MunicipalityMaster, ServiceTypeMaster, JobTitleMaster, OfficeSetting, OfficeServiceConfiguration,
+    Supporter, SupporterJobAssignment, SupporterTimecard
+)
+from backend.app.services.attendance_service import AttendanceService
+from backend.app.services.presence_service import PresenceService
+from backend.app.utils.timezone import get_jst_today
+
+
+def setup_tenant(staff_count=2):
+    corp = Corporation(corporation_name=f"Presence Corp {uuid.uuid4().hex[:4]}", corporation_type="KK")
+    muni = MunicipalityMaster(municipality_code=uuid.uuid4().hex[:6], name="Presence City")
+    stype = ServiceTypeMaster(name="在席ボード", service_code=f"PR{uuid.uuid4().hex[:4]}")
+    job_title = JobTitleMaster(title_name=f"Presence Staff {uuid.uuid4().hex[:4]}")
+    db.session.add_all([corp, muni, stype, job_title])
+    db.session.flush()
+    office = OfficeSetting(corporation_id=corp.id, office_name="Presence Office", municipality_id=muni.id, full_time_weekly_minutes=2400)
+    db.session.add(office)
+    db.session.flush()
+    osc = OfficeServiceConfiguration(office_id=office.id, service_type_master_id=stype.id, jigyosho_bango=uuid.uuid4().hex[:10], capacity=20)
+    db.session.add(osc)
+    staff = [
+        Supporter(
+            staff_code=f"S_PRS_{uuid.uuid4().hex[:6]}", last_name="在席", first_name=f"{i}",
+            last_name_kana="ザイセキ", first_name_kana="テスト", office_id=office.id,
+            employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2025, 1, 1)
+        ) for i in range(staff_count)
+    ]
+    db.session.add_all(staff)
+    db.session.flush()
+    for s in staff:
+        db.session.add(SupporterJobAssignment(
+            supporter_id=s.id, job_title_id=job_title.id, office_service_configuration_id=osc.id,
+            start_date=date(2025, 1, 1), assigned_minutes=2400
+        ))
+    # SQLite では削除済み職員のIDが再利用されるため、他テストが残した同IDの打刻を除いておく
+    SupporterTimecard.query.filter(
+        SupporterTimecard.supporter_id.in_([s.id for s in staff])
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return corp, osc, staff
+
+
+def clock_in(staff):
+    return AttendanceService(db.session).clock_in(staff.id, staff.office_id, 'OFFICE', None)
+
+
+def test_board_is_updated_on_commit_and_not_on_rollback(app):
+    """打刻のコミットで在席ボードが差分更新され、ロールバックされた打刻は反映されない"""
+    with app.app_context():
+        corp, osc, (me, other) = setup_tenant()
+        corporate_scope = {'level': 'CORPORATE', 'corp_id': corp.id, 'self_only': False}
+
+        first = PresenceService.snapshot(corporate_scope, me.id)
+        assert {e["supporter_id"]: e["status"] for e in first["staff_list"]} == {me.id: "NOT_SCHEDULED", other.id: "NOT_SCHEDULED"}
+
+        clock_in(other)
+        db.session.rollback()
+        assert PresenceService.snapshot(corporate_scope, me.id)["version"] == first["version"]
+
+        clock_in(me)
+        db.session.commit()
+
+        changes = PresenceService.visible_changes(corporate_scope, me.id, corp.id, first["version"])
+        assert [(c["supporter_id"], c["entry"]["status"]) for c in changes] == [(me.id, "WORKING")]
+
+        AttendanceService(db.session).clock_out(me.id)
+        db.session.commit()
+        board = {e["supporter_id"]: e for e in PresenceService.snapshot(corporate_scope, me.id)["staff_list"]}
+        assert board[me.id]["status"] == "FINISHED"
+        assert board[me.id]["timecard"]["check_out"] is not None
+
+        # 一般職員のスコープでは本人分しか見えない
+        self_scope = {'level': 'STAFF', 'corp_id': None, 'self_only': True}
+        assert [e["supporter_id"] for e in PresenceService.snapshot(self_scope, other.id)["staff_list"]] == [other.id]
+
+
+def test_clock_out_of_overnight_shift_updates_board(app):
+    """前日に出勤した勤務の退勤も、当日の在席ボードに反映される"""
+    with app.app_context():
+        corp, osc, (night_staff,) = setup_tenant(staff_count=1)
+        yesterday = get_jst_today() - timedelta(days=1)
+        db.session.add(SupporterTimecard(
+            supporter_id=night_staff.id, office_service_configuration_id=osc.id, office_id=night_staff.office_id,
+            work_date=yesterday, sequence_no=1, location_type='OFFICE',
+            check_in=datetime.combine(yesterday, datetime.min.time()) + timedelta(hours=22)
+        ))
+        db.session.commit()
+        corporate_scope = {'level': 'CORPORATE', 'corp_id': corp.id, 'self_only': False}
+        PresenceService.rebuild(corp.id)
+        assert PresenceService.snapshot(corporate_scope, night_staff.id)["staff_list"][0]["status"] == "WORKING"
+
+        AttendanceService(db.session).clock_out(night_staff.id)
+        db.session.commit()
+        assert PresenceService.snapshot(corporate_scope, night_staff.id)["staff_list"][0]["status"] == "NOT_SCHEDULED"
+
+
+def test_presence_endpoints_snapshot_and_stream(app, client):
+    """スナップショットの version から購読すると、その後の打刻が SSE の presence イベントで届く"""
+    with app.app_context():
+        _, osc, (me, _other) = setup_tenant()
+        token = create_access_token(identity=f"staff:{me.id}", additional_claims={"role_scopes": []})
+        headers = {'Authorization': f'Bearer {token}'}
+
+        snapshot = client.get('/api/dashboard/staff/presence', headers=headers).get_json()
+        assert [e["supporter_id"] for e in snapshot["staff_list"]] == [me.id]
+
+        clock_in(me)
+        db.session.commit()
+
+        app.config['PRESENCE_STREAM_MAX_SECONDS'] = 0
+        try:
+            response = client.get(f'/api/dashboard/staff/presence/stream?since={snapshot["version"]}', headers=headers)
+            body = response.get_data(as_text=True)
+
+            # 購読位置が古すぎる（再構築前）場合は全量スナップショットが送られる
+            stale = client.get('/api/dashboard/staff/presence/stream?since=-1', headers=headers).get_data(as_text=True)
+        finally:
+            app.config['PRESENCE_STREAM_MAX_SECONDS'] = 300
+
+        assert response.mimetype == 'text/event-stream'
+        assert "event: presence" in body
+        assert '"status": "WORKING"' in body
+        assert "event: snapshot" in stale
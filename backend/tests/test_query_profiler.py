@@ -0,0 +1,91 @@
+# backend/tests/test_query_profiler.py
+
+import uuid
+from datetime import date
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+from backend.app import db
+from backend.app.models import Corporation, MunicipalityMaster, OfficeSetting, RoleMaster, Supporter
+from backend.app.services.query_profiler_service import QueryProfiler, normalize_statement
+
+
+def make_staff(role_scope=None):
+    corp = Corporation(corporation_name=f"Profiler Corp {uuid.uuid4().hex[:4]}", corporation_type="KK")
+    muni = MunicipalityMaster(municipality_code=uuid.uuid4().hex[:6], name="Profiler City")
+    db.session.add_all([corp, muni])
+    db.session.flush()
+    office = OfficeSetting(corporation_id=corp.id, office_name="Profiler Office", municipality_id=muni.id, full_time_weekly_minutes=2400)
+    db.session.add(office)
+    db.session.flush()
+    staff = Supporter(
+        staff_code=f"S_PRF_{uuid.uuid4().hex[:6]}", last_name="計測", first_name="太郎",
+        last_name_kana="ケイソク", first_name_kana="タロウ", office_id=office.id,
+        employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2025, 1, 1)
+    )
+    if role_scope:
+        staff.roles.append(RoleMaster(name=f"{role_scope} 管理者 {uuid.uuid4().hex[:4]}", role_scope=role_scope, is_admin=True))
+    db.session.add(staff)
+    db.session.commit()
+    token = create_access_token(identity=f"staff:{staff.id}", additional_claims={"role_scopes": [role_scope] if role_scope else []})
+    return staff, {'Authorization': f'Bearer {token}'}
+
+
+def test_normalize_statement_groups_by_template():
+    """引数やIN句の要素数が違っても同じテンプレートになる"""
+    a = normalize_statement("SELECT * FROM users WHERE id = ? AND name = 'x'")
+    b = normalize_statement("SELECT *  FROM users\n WHERE id = 42 AND name = 'it''s'")
+    assert a == b == "SELECT * FROM users WHERE id = ? AND name = ?"
+    assert normalize_statement("SELECT 1 FROM t WHERE id IN (?, ?, ?)") == normalize_statement("SELECT 1 FROM t WHERE id IN (?)")
+    assert normalize_statement("SELECT x::text FROM t WHERE id = :id_1") == "SELECT x::text FROM t WHERE id = ?"
+
+
+def test_response_headers_and_query_budget(app, client, query_budget):
+    """レスポンスにSQL件数・DB時間のヘッダーが付き、テストから上限を検証できる"""
+    with app.app_context():
+        _, headers = make_staff()
+        response = client.get('/api/dashboard/staff/status', headers=headers)
+
+    assert response.status_code == 200
+    assert float(response.headers[QueryProfiler.TIME_HEADER]) >= 0
+    assert query_budget(response, max_queries=15, max_repeats=3) > 0
+
+
+def test_n_plus_one_and_slow_queries_are_flagged(app):
+    """同一テンプレートの繰り返しは N+1、閾値超えのSQLはスロークエリとして記録される"""
+    profiler = QueryProfiler.get(app)
+    threshold, slow_ms = profiler.n_plus_one_threshold, profiler.slow_query_ms
+    profiler.n_plus_one_threshold, profiler.slow_query_ms = 3, 0
+    try:
+        with app.test_request_context('/api/example'):
+            profiler.begin()
+            for i in range(5):
+                db.session.execute(text("SELECT :value"), {"value": i})
+            db.session.execute(text("SELECT 1 WHERE 1 = 2"))
+            profiler.finish()
+    finally:
+        profiler.n_plus_one_threshold, profiler.slow_query_ms = threshold, slow_ms
+
+    profile = profiler.last_profile()
+    assert profile.query_count == 6
+    assert profile.n_plus_one == [{"template": "SELECT ?", "count": 5}]
+    assert len(profile.slow_queries) == 6
+
+
+def test_debug_endpoint_requires_flag_and_system_admin(app, client):
+    """デバッグエンドポイントは設定で有効化された環境のシステム管理者だけが参照できる"""
+    with app.app_context():
+        _, staff_headers = make_staff()
+        _, admin_headers = make_staff(role_scope='SYSTEM')
+
+    assert client.get('/api/debug/sql-stats', headers=admin_headers).status_code == 404
+
+    app.config['SQL_DEBUG_ENDPOINT_ENABLED'] = True
+    try:
+        client.get('/api/dashboard/staff/status', headers=staff_headers)
+        assert client.get('/api/debug/sql-stats', headers=staff_headers).status_code == 403
+        body = client.get('/api/debug/sql-stats?limit=5', headers=admin_headers).get_json()
+    finally:
+        app.config['SQL_DEBUG_ENDPOINT_ENABLED'] = False
+
+    assert "GET dashboard_staff.get_staff_status" in body["summary"]["endpoints"]
+    assert body["recent"][0]["query_count"] > 0
@@ -0,0 +1,172 @@
+# backend/tests/test_staff_daily_report_service.py
+
+import logging
+import threading
+import uuid
+import pytest
+from datetime import date, datetime, timedelta
+from flask_jwt_extended import create_access_token
+from backend.app import db
+from backend.app.models import Supporter, StaffActionLog, StaffDailyReport
+from backend.app.services.ai_gateway_service import (
+    AIGatewayService, AIGatewayRuntime, AIResponseCache, LocalStubProvider
+)
+from backend.app.services.staff_daily_report_service import StaffDailyReportService
+
+logger = logging.getLogger(__name__)
+
+TARGET_DATE = date(2026, 3, 2)
+
+
+def create_supporter(prefix):
+    supporter = Supporter(
+        staff_code=f"{prefix}_{uuid.uuid4().hex[:6]}",
+        last_name="日報", first_name="太郎", last_name_kana="ニッポウ", first_name_kana="タロウ",
+        employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2025, 1, 1)
+    )
+    db.session.add(supporter)
+    db.session.flush()
+    return supporter
+
+
+def add_log(supporter, hour, content, processed=False, day=TARGET_DATE):
+    log = StaffActionLog(
+        supporter_id=supporter.id,
+        action_timestamp=datetime.combine(day, datetime.min.time()) + timedelta(hours=hour),
+        action_content=content,
+        is_processed_by_ai=processed
+    )
+    db.session.add(log)
+    return log
+
+
+@pytest.fixture
+def stub_gateway(app):
+    """テスト中はスタブのゲートウェイを使い、終了後にセッション共有のアプリへ元の設定を戻す"""
+    with app.app_context():
+        original = app.extensions.get(AIGatewayService.EXTENSION_KEY)
+        AIGatewayService.set_runtime(AIGatewayRuntime(LocalStubProvider(), AIResponseCache()))
+        yield
+        if original is None:
+            app.extensions.pop(AIGatewayService.EXTENSION_KEY, None)
+        else:
+            app.extensions[AIGatewayService.EXTENSION_KEY] = original
+
+
+def test_batch_generates_drafts_for_all_supporters_and_marks_logs(app, stub_gateway):
+    """未処理ログを持つ全職員の日報を一括生成し、対象日のログだけを処理済みにする"""
+    logger.info("🚀 TEST START: 日報一括生成")
+    with app.app_context():
+
+        staff_a = create_supporter("S_RPT_A")
+        staff_b = create_supporter("S_RPT_B")
+        staff_c = create_supporter("S_RPT_C")
+        add_log(staff_a, 9, "朝礼")
+        add_log(staff_a, 14, "企業同行")
+        add_log(staff_b, 10, "面談完了")
+        add_log(staff_c, 11, "処理済みログ", processed=True)
+        # 境界外（翌日0時ちょうど）のログは対象外
+        next_day = add_log(staff_b, 0, "翌日のログ", day=TARGET_DATE + timedelta(days=1))
+        db.session.commit()
+
+        result = StaffDailyReportService.generate_drafts(
+            target_date=TARGET_DATE, supporter_ids=[staff_a.id, staff_b.id, staff_c.id]
+        )
+
+        by_supporter = {r["supporter_id"]: r for r in result["reports"]}
+        assert set(by_supporter) == {staff_a.id, staff_b.id}
+        assert result["processed_log_count"] == 3
+        # スタブ運用時はAI要約を行わず、ハイライトのみで下書きする
+        assert result["ai_summarized_count"] == 0
+        assert "09:00 : 朝礼" in by_supporter[staff_a.id]["content"]
+        assert "翌日のログ" not in by_supporter[staff_b.id]["content"]
+
+        assert StaffActionLog.query.filter_by(supporter_id=staff_a.id, is_processed_by_ai=False).count() == 0
+        assert db.session.get(StaffActionLog, next_day.id).is_processed_by_ai is False
+
+        # 再実行しても未処理ログがなければ何も生成しない
+        again = StaffDailyReportService.generate_drafts(target_date=TARGET_DATE, supporter_ids=[staff_a.id, staff_b.id])
+        assert again["reports"] == []
+        assert StaffDailyReport.query.filter_by(supporter_id=staff_a.id, target_date=TARGET_DATE).count() == 1
+
+
+def test_batch_summarizes_on_bounded_worker_pool(app, stub_gateway):
+    """実モデル構成時は、職員ごとのAI要約を上限付きワーカープールで並列実行する"""
+    with app.app_context():
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def responder(model, prompt, system_instruction, options):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            threading.Event().wait(0.05)
+            with lock:
+                state["active"] -= 1
+            return "要約: " + prompt.splitlines()[1]
+
+        provider = LocalStubProvider(responder=responder)
+        provider.name = "fake-live"
+        AIGatewayService.set_runtime(AIGatewayRuntime(provider, AIResponseCache(), max_concurrency=8))
+
+        staff = [create_supporter("S_RPT_POOL") for _ in range(6)]
+        for i, s in enumerate(staff):
+            add_log(s, 9, f"作業{i}")
+        db.session.commit()
+
+        result = StaffDailyReportService.generate_drafts(
+            target_date=TARGET_DATE, supporter_ids=[s.id for s in staff], max_workers=2
+        )
+
+        assert result["ai_summarized_count"] == 6
+        assert provider.call_count == 6
+        assert 1 <= state["peak"] <= 2
+        assert all(r["content"].startswith("要約: ") for r in result["reports"])
+
+
+def test_overlapping_runs_do_not_append_the_same_logs_twice(app, stub_gateway):
+    """AI要約中に同じ職員の生成が重なっても、ログは先に確定した実行の下書きにだけ追記される"""
+    with app.app_context():
+        staff = create_supporter("S_RPT_RACE")
+        add_log(staff, 9, "重複確認")
+        db.session.commit()
+        overlapping = {}
+
+        def responder(model, prompt, system_instruction, options):
+            # 1回目の実行がAI要約を待っている間に、2回目の実行が走る
+            with app.app_context():
+                overlapping.update(StaffDailyReportService.generate_drafts(target_date=TARGET_DATE, supporter_ids=[staff.id]))
+            return "要約"
+
+        provider = LocalStubProvider(responder=responder)
+        provider.name = "fake-live"
+        AIGatewayService.set_runtime(AIGatewayRuntime(provider, AIResponseCache()))
+
+        result = StaffDailyReportService.generate_drafts(target_date=TARGET_DATE, supporter_ids=[staff.id])
+
+        assert overlapping["reports"] == []
+        assert [r["log_count"] for r in result["reports"]] == [1]
+        report = StaffDailyReport.query.filter_by(supporter_id=staff.id, target_date=TARGET_DATE).one()
+        assert report.report_content.count("重複確認") == 1
+
+
+def test_batch_endpoint_is_self_only_for_general_staff(app, client, stub_gateway):
+    """一般職員が一括生成を呼んでも、本人分しか生成されない"""
+    with app.app_context():
+        me = create_supporter("S_RPT_ME")
+        other = create_supporter("S_RPT_OTHER")
+        add_log(me, 9, "自分のログ")
+        add_log(other, 9, "他人のログ")
+        db.session.commit()
+
+        token = create_access_token(identity=f"staff:{me.id}", additional_claims={"role_scopes": []})
+        response = client.post(
+            '/api/dashboard/staff/daily-report/generate-batch',
+            json={"target_date": TARGET_DATE.isoformat()},
+            headers={'Authorization': f'Bearer {token}'}
+        )
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [r["supporter_id"] for r in data["reports"]] == [me.id]
+        assert StaffActionLog.query.filter_by(supporter_id=other.id, is_processed_by_ai=False).count() == 1
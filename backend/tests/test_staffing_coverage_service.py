@@ -0,0 +1,137 @@
+# backend/tests/test_staffing_coverage_service.py
+
+import logging
+import uuid
+from datetime import date, datetime
+from backend.app import db
+from backend.app.models import (
+    Corporation, MunicipalityMaster, StatusMaster, ServiceTypeMaster, OfficeSetting,
+    OfficeServiceConfiguration, Supporter, SupporterTimecard, User, ServiceCertificate, GrantedService,
+    AttendanceRecord, UserDailyLog
+)
+from backend.app.services.staffing_coverage_service import StaffingCoverageService
+
+logger = logging.getLogger(__name__)
+
+
+def setup_office():
+    corp = Corporation(corporation_name=f"Coverage Corp {uuid.uuid4().hex[:4]}", corporation_type="KK")
+    muni = db.session.query(MunicipalityMaster).first()
+    if not muni:
+        muni = MunicipalityMaster(municipality_code="999998", name="Coverage City")
+        db.session.add(muni)
+    stype = ServiceTypeMaster(name="カバレッジ検証サービス", service_code=f"CV{uuid.uuid4().hex[:4]}")
+    db.session.add_all([corp, stype])
+    db.session.flush()
+
+    office = OfficeSetting(corporation_id=corp.id, office_name="Coverage Office", municipality_id=muni.id, full_time_weekly_minutes=2400)
+    db.session.add(office)
+    db.session.flush()
+    osc = OfficeServiceConfiguration(
+        office_id=office.id, service_type_master_id=stype.id,
+        jigyosho_bango=uuid.uuid4().hex[:10], capacity=20
+    )
+    db.session.add(osc)
+    db.session.flush()
+    return office, osc, muni
+
+
+def add_staff_shift(office, osc, start, end, location_type='OFFICE'):
+    staff = Supporter(
+        staff_code=f"S_COV_{uuid.uuid4().hex[:6]}", last_name="配置", first_name="職員",
+        last_name_kana="ハイチ", first_name_kana="ショクイン", office_id=office.id,
+        employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2025, 1, 1)
+    )
+    db.session.add(staff)
+    db.session.flush()
+    db.session.add(SupporterTimecard(
+        supporter_id=staff.id, office_service_configuration_id=osc.id, office_id=office.id,
+        work_date=start.date(), sequence_no=1, location_type=location_type,
+        check_in=start, check_out=end
+    ))
+
+
+def add_user_visit(osc, muni, check_in, check_out=None, cert_status='ACTIVE', granted=(date(2025, 1, 1), date(2027, 3, 31))):
+    status = db.session.query(StatusMaster).first()
+    if not status:
+        status = StatusMaster(name="利用中")
+        db.session.add(status)
+        db.session.flush()
+    user = User(display_name="在所利用者", status_id=status.id)
+    db.session.add(user)
+    db.session.flush()
+    cert = ServiceCertificate(
+        user_id=user.id, office_service_configuration_id=osc.id, certificate_issue_date=date(2025, 1, 1),
+        municipality_master_id=muni.id, status=cert_status
+    )
+    db.session.add(cert)
+    db.session.flush()
+    db.session.add(GrantedService(
+        certificate_id=cert.id, service_type_master_id=osc.service_type_master_id,
+        granted_start_date=granted[0], granted_end_date=granted[1]
+    ))
+    db.session.add(AttendanceRecord(user_id=user.id, record_type='CHECK_IN', timestamp=check_in))
+    if check_out:
+        db.session.add(AttendanceRecord(user_id=user.id, record_type='CHECK_OUT', timestamp=check_out))
+    return user
+
+
+def test_under_staffed_intervals_are_flagged_per_bucket(app):
+    """職員1名で利用者7名以上となる時間帯だけが人員不足として検出される"""
+    logger.info("🚀 TEST START: 人員配置カバレッジのスイープライン")
+    with app.app_context():
+        office, osc, muni = setup_office()
+        day = date(2026, 4, 6)
+        at = lambda h, m=0: datetime(day.year, day.month, day.day, h, m)
+
+        add_staff_shift(office, osc, at(9), at(17))
+        # 施設外勤務の職員は事業所内の配置に数えない
+        add_staff_shift(office, osc, at(9), at(17), location_type='CLIENT_COMPANY')
+        # 6名は終日在所（基準内）、1名だけ 10:05〜11:00 に在所 → 10:00〜11:00 が不足
+        for _ in range(6):
+            add_user_visit(osc, muni, at(9), at(16))
+        add_user_visit(osc, muni, at(10, 5), at(11))
+        # 施設外就労の日の利用者は除外される
+        off_site = add_user_visit(osc, muni, at(9), at(16))
+        db.session.add(UserDailyLog(user_id=off_site.id, log_date=day, location_type='OFF_SITE_EXTERNAL', support_content_notes="施設外就労"))
+        # 下書きの受給者証や、支給決定期間が対象月に掛からない受給者証の利用者は事業所に帰属させない
+        add_user_visit(osc, muni, at(9), at(16), cert_status='DRAFT')
+        add_user_visit(osc, muni, at(9), at(16), granted=(date(2025, 4, 1), date(2026, 3, 31)))
+        db.session.commit()
+
+        result = StaffingCoverageService().build_monthly_timeline(2026, 4, [office.id], include_timeline=True)
+        office_result = result["offices"][office.id]
+
+        assert office_result["under_staffed_intervals"] == [{
+            "start": at(10).isoformat(),
+            "end": at(11).isoformat(),
+            "max_users_present": 7,
+            "min_staff_on_duty": 1,
+            "required_staff": 2,
+        }]
+        assert office_result["under_staffed_minutes"] == 60
+        assert len(office_result["timeline"]["users_present"]) == 30 * 96
+
+
+def test_coverage_at_specific_time_and_unpaired_check_in(app):
+    """特定時刻の配置を答えられ、退所打刻のない来所は当日末まで在所とみなす"""
+    with app.app_context():
+        office, osc, muni = setup_office()
+        add_staff_shift(office, osc, datetime(2026, 5, 12, 9, 0), datetime(2026, 5, 12, 12, 0))
+        add_user_visit(osc, muni, datetime(2026, 5, 12, 10, 0))
+        db.session.commit()
+
+        service = StaffingCoverageService()
+        morning = service.coverage_at(office.id, datetime(2026, 5, 12, 10, 20))
+        assert morning["staff_on_duty"] == 1
+        assert morning["users_present"] == 1
+        assert morning["ratio_met"] is True
+
+        evening = service.coverage_at(office.id, datetime(2026, 5, 12, 18, 0))
+        assert evening["staff_on_duty"] == 0
+        assert evening["users_present"] == 1
+        assert evening["ratio_met"] is False
+
+        result = service.build_monthly_timeline(2026, 5, [office.id])
+        assert result["unpaired_user_check_ins"] == 1
+        assert result["offices"][office.id]["under_staffed_intervals"][0]["start"] == "2026-05-12T12:00:00"
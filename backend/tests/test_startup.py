@@ -0,0 +1,19 @@
+# backend/tests/test_startup.py
+
+from backend.benchmarks.startup_profile import DEFAULT_BUDGET_MS, measure_cold_start, run_startup, summarize
+
+
+def test_heavy_dependencies_are_loaded_lazily():
+    """起動時に openpyxl・pydantic・alembic などの重い依存ライブラリを読み込まないかテスト"""
+    report = run_startup(importtime=True)
+    assert report["heavy_modules"] == []
+
+    summary = summarize(report["imports"])
+    assert "backend.app" in summary["root_imports_ms"]
+    assert summary["total_ms"] > 0
+
+
+def test_cold_start_within_budget():
+    """コールドスタート（import + create_app）が予算内に収まるかテスト"""
+    elapsed_ms = measure_cold_start(runs=3)
+    assert elapsed_ms <= DEFAULT_BUDGET_MS, f"起動に {elapsed_ms:.0f}ms かかりました（予算 {DEFAULT_BUDGET_MS:.0f}ms）"
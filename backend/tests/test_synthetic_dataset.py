@@ -0,0 +1,55 @@
+# backend/tests/test_synthetic_dataset.py
+
+import pytest
+from datetime import date
+from backend.app import create_app, db
+from backend.benchmarks.endpoint_benchmarks import BenchmarkConfig, SCALES, compare_with_baseline, run_benchmarks
+from backend.benchmarks.synthetic_dataset import SyntheticDatasetGenerator
+
+
+@pytest.fixture(scope='module')
+def bench_app():
+    """共有のテストDBを汚さないよう、ベンチマーク用に別のインメモリDBを持つアプリを作る"""
+    bench_app = create_app(BenchmarkConfig)
+    with bench_app.app_context():
+        db.create_all()
+    yield bench_app
+    with bench_app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+def generate(seed, prefix):
+    return SyntheticDatasetGenerator(seed=seed, end_date=date(2026, 3, 18), prefix=prefix, **SCALES["tiny"]).generate()
+
+
+def test_generator_is_deterministic(bench_app):
+    """同じ seed からは同じデータ（件数とフィンガープリント）が生成され、seed が違えば変わる"""
+    with bench_app.app_context():
+        first = generate(7, "DETA")
+        second = generate(7, "DETB")
+        other = generate(8, "DETC")
+
+    assert first.counts == second.counts
+    assert first.fingerprint == second.fingerprint
+    assert other.fingerprint != first.fingerprint
+    assert first.counts["supporter_timecards"] > 0
+    assert first.counts["attendance_records"] > 0
+
+
+def test_benchmark_runs_every_case(bench_app):
+    """全ケースがサーバーエラーなしで完了し、SQL発行数が記録される"""
+    with bench_app.app_context():
+        summary = generate(42, "BENCH")
+
+    results = run_benchmarks(bench_app, summary, iterations=1, warmup=0)
+
+    assert set(results) >= {"dashboard_summary", "action_items", "export_attendance", "generate_monthly_shifts", "monthly_usage_summary"}
+    for name, result in results.items():
+        assert all(code < 500 for code in result["status_codes"]), name
+        assert result["queries"] > 0, name
+
+    # SQLが増えたら回帰として検出される
+    baseline = {name: dict(r, queries=r["queries"] - 1) for name, r in results.items()}
+    assert compare_with_baseline(results, baseline, latency_tolerance=1000)
+    assert not compare_with_baseline(results, results, latency_tolerance=1000)
@@ -0,0 +1,163 @@
+# backend/tests/test_wage_engine.py
+
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask_jwt_extended import create_access_token
+
+from backend.app import db
+from backend.app.models import (
+    AttendanceRecord, BreakRecord, Corporation, DailyProductivityLog, GrantedService, MunicipalityMaster,
+    OfficeServiceConfiguration, OfficeSetting, ProductMaster, RoleMaster, ServiceCertificate, ServiceTypeMaster,
+    StatusMaster, Supporter, User, UserDailyLog, UserWageLog
+)
+from backend.app.services.wage_engine_service import MonthlyWageEngine
+
+
+def _service_type():
+    stype = ServiceTypeMaster.query.filter_by(service_code='CONTINUOUS_B').first()
+    if stype is None:
+        stype = ServiceTypeMaster(name="就労継続支援B型", service_code='CONTINUOUS_B')
+        db.session.add(stype)
+        db.session.flush()
+    return stype
+
+
+def _setup_workshop():
+    """B型事業所の利用者2名: 生産実績と打刻・休憩あり / 打刻のみ。下書きの日報の実績は数えない"""
+    code = uuid.uuid4().hex[:6]
+    corp = Corporation(corporation_name=f"Wage Corp {code}", corporation_type="KK")
+    muni = MunicipalityMaster(municipality_code=code, name=f"Wage City {code}")
+    status = StatusMaster(name=f"Wage Status {code}")
+    db.session.add_all([corp, muni, status])
+    db.session.flush()
+    office = OfficeSetting(corporation_id=corp.id, office_name=f"Wage Office {code}", municipality_id=muni.id)
+    db.session.add(office)
+    db.session.flush()
+    osc = OfficeServiceConfiguration(office_id=office.id, service_type_master_id=_service_type().id,
+                                     jigyosho_bango=uuid.uuid4().hex[:10], capacity=20)
+    worker, trainee = users = [User(display_name=f"Wage User {i} {code}", status_id=status.id) for i in range(2)]
+    box = ProductMaster(product_name=f"箱折り {code}", standard_wage_rate=Decimal("12.50"))
+    bag = ProductMaster(product_name=f"袋詰め {code}", standard_wage_rate=Decimal("3.30"))
+    db.session.add_all([osc, box, bag, *users])
+    db.session.flush()
+
+    for user in users:
+        cert = ServiceCertificate(user_id=user.id, certificate_issue_date=date(2025, 1, 1), municipality_master_id=muni.id,
+                                  office_service_configuration_id=osc.id, status='ACTIVE')
+        db.session.add(cert)
+        db.session.flush()
+        db.session.add(GrantedService(certificate_id=cert.id, service_type_master_id=osc.service_type_master_id,
+                                      granted_start_date=date(2025, 1, 1), granted_end_date=date(2025, 12, 31),
+                                      max_service_days=23))
+        for day in (2, 3):
+            db.session.add_all([
+                AttendanceRecord(user_id=user.id, record_type='CHECK_IN', timestamp=datetime(2025, 6, day, 10, 0)),
+                AttendanceRecord(user_id=user.id, record_type='CHECK_OUT', timestamp=datetime(2025, 6, day, 15, 0)),
+            ])
+
+    logs = {}
+    for day, log_status in [(2, 'COMPLETED'), (3, 'COMPLETED'), (4, 'DRAFT')]:
+        log = UserDailyLog(user_id=worker.id, log_date=date(2025, 6, day), location_type='ON_SITE',
+                           log_status=log_status, support_content_notes="作業")
+        db.session.add(log)
+        db.session.flush()
+        logs[day] = log
+        db.session.add_all([
+            DailyProductivityLog(user_daily_log_id=log.id, product_id=box.id, units_passed_inspection=40),
+            DailyProductivityLog(user_daily_log_id=log.id, product_id=bag.id, units_passed_inspection=15),
+        ])
+    db.session.add(BreakRecord(user_daily_log_id=logs[2].id, break_start_time=datetime(2025, 6, 2, 12, 0),
+                               break_end_time=datetime(2025, 6, 2, 13, 0), break_duration_seconds=3600))
+    db.session.commit()
+    return corp, office, worker.id, trainee.id, logs
+
+
+def test_monthly_wages_are_reproducible(app):
+    """出来高と作業時間から工賃を計算して一括保存し、再計算では差分なし、支払済みの工賃は変更しない"""
+    with app.app_context():
+        _, office, worker_id, trainee_id, logs = _setup_workshop()
+
+        first = MonthlyWageEngine(office.id, 2025, 6, hourly_rate=Decimal("100")).run()
+        db.session.commit()
+
+        # 出来高: (40*12.50 + 15*3.30) * 2日 = 1099、作業時間: 10h - 休憩1h = 540分 -> 900円
+        wages = {w["user_id"]: w for w in first["wages"]}
+        assert wages[worker_id] == {
+            "user_id": worker_id, "total_work_minutes": 540, "total_units_passed": 110,
+            "gross_wage_amount": "1999", "deductions": "0", "net_payment_amount": "1999",
+        }
+        assert wages[trainee_id]["gross_wage_amount"] == "1000"
+        assert len(first["diff"]["added"]) == 2
+
+        stored = UserWageLog.query.filter_by(user_id=worker_id).one()
+        snapshot = json.loads(stored.calculation_snapshot)
+        assert (snapshot["piece_amount"], snapshot["work_minutes"], snapshot["hourly_rate"]) == ("1099.00", 540, "100")
+        assert [p["units"] for p in snapshot["products"]] == [80, 30]
+
+        # 控除は手入力を引き継ぎ、入力が同じなら再計算しても変わらない
+        stored.deductions = Decimal("200")
+        stored.net_payment_amount = Decimal("1799")
+        db.session.commit()
+        second = MonthlyWageEngine(office.id, 2025, 6, hourly_rate=Decimal("100")).run()
+        db.session.commit()
+        assert second["diff"] == {"added": [], "changed": [], "removed": [], "locked": [], "manual": [], "unchanged": 2}
+
+        # 支払済みの工賃は実績が変わっても変更しない
+        stored = UserWageLog.query.filter_by(user_id=worker_id).one()
+        stored.payment_timestamp = datetime(2025, 7, 10, 12, 0)
+        logs[4].log_status = 'COMPLETED'
+        db.session.commit()
+        third = MonthlyWageEngine(office.id, 2025, 6, hourly_rate=Decimal("100")).run()
+        db.session.commit()
+        assert [e["user_id"] for e in third["diff"]["locked"]] == [worker_id]
+        assert UserWageLog.query.filter_by(user_id=worker_id).one().gross_wage_amount == Decimal("1999")
+
+
+def test_only_engine_rows_are_removed(app):
+    """実績のなくなった月の工賃は、計算で作った行だけを削除し、手入力の行は残して報告する"""
+    with app.app_context():
+        _, office, worker_id, trainee_id, _ = _setup_workshop()
+        july = date(2025, 7, 1)
+        db.session.add_all([
+            UserWageLog(user_id=worker_id, calculation_month=july, gross_wage_amount=Decimal("3000"),
+                        net_payment_amount=Decimal("3000")),
+            UserWageLog(user_id=trainee_id, calculation_month=july, gross_wage_amount=Decimal("500"),
+                        net_payment_amount=Decimal("500"), calculation_snapshot="{}"),
+        ])
+        db.session.commit()
+
+        result = MonthlyWageEngine(office.id, 2025, 7, hourly_rate=Decimal("100")).run()
+        db.session.commit()
+        assert [e["user_id"] for e in result["diff"]["removed"]] == [trainee_id]
+        assert result["diff"]["manual"] == [{"user_id": worker_id, "gross_wage_amount": "3000"}]
+        assert [log.user_id for log in UserWageLog.query.filter_by(calculation_month=july).filter(
+            UserWageLog.user_id.in_([worker_id, trainee_id]))] == [worker_id]
+
+
+def test_wage_run_endpoint_checks_office(client, app):
+    with app.app_context():
+        corp, office, worker_id, _, _ = _setup_workshop()
+        other_corp, other_office, _, _, _ = _setup_workshop()
+        staff = Supporter(staff_code=f"WG{uuid.uuid4().hex[:6]}", last_name="工賃", first_name="担当",
+                          last_name_kana="コウチン", first_name_kana="タントウ", office_id=office.id,
+                          employment_type="FULL_TIME", weekly_scheduled_minutes=2400, hire_date=date(2024, 4, 1))
+        staff.roles.append(RoleMaster(name=f"Wage Admin {uuid.uuid4().hex[:6]}", role_scope='CORPORATE', is_admin=True))
+        db.session.add(staff)
+        db.session.commit()
+        token = create_access_token(identity=f"staff:{staff.id}")
+        office_id, other_office_id = office.id, other_office.id
+
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.post('/api/billing/wage-run', headers=headers,
+                           json={"office_id": office_id, "year": 2025, "month": 6, "dry_run": True})
+    assert response.status_code == 200
+    assert len(response.get_json()["diff"]["added"]) == 2
+    with app.app_context():
+        assert UserWageLog.query.filter_by(user_id=worker_id).count() == 0
+
+    response = client.post('/api/billing/wage-run', headers=headers,
+                           json={"office_id": other_office_id, "year": 2025, "month": 6})
+    assert response.status_code == 404